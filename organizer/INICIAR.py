@@ -146,6 +146,33 @@ def obtener_carpeta_descargas():
     
     return downloads_path
 
+def perfilar_reglas(directorio, logger):
+    """Clasifica todos los archivos con las reglas personalizadas instrumentadas y muestra el reporte."""
+    from organizer.custom_rules import GestorReglasPersonalizadas
+    
+    gestor = GestorReglasPersonalizadas(directorio)
+    gestor.activar_perfilado()
+    
+    logger.info("⏱️ Perfilando reglas personalizadas...")
+    for raiz, carpetas, archivos in os.walk(directorio):
+        carpetas[:] = [c for c in carpetas if not c.startswith('.')]
+        for nombre in archivos:
+            if not nombre.startswith('.'):
+                gestor.obtener_categoria(Path(raiz) / nombre)
+    
+    print(gestor.generar_reporte_perfil())
+
+def ejecutar_daemon(args):
+    """Arranca el servicio headless con el socket de control local."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    directorio = Path(args.dir) if args.dir else obtener_carpeta_descargas()
+    if not directorio.exists():
+        logging.getLogger('DescargasOrdenadas').error(f"El directorio no existe: {directorio}")
+        sys.exit(1)
+    
+    from organizer.daemon import ejecutar_servicio
+    sys.exit(ejecutar_servicio(directorio, puerto_metricas=args.metricas))
+
 def main():
     parser = argparse.ArgumentParser(description="Organiza automáticamente los archivos de descargas")
     parser.add_argument("--gui", action="store_true", help="Abrir interfaz gráfica (por defecto)")
@@ -154,9 +181,20 @@ def main():
     parser.add_argument("--minimizado", action="store_true", help="Iniciar minimizado")
     parser.add_argument("--sin-consola", action="store_true", help="Ocultar ventana de consola")
     parser.add_argument("--dir", type=str, help="Directorio a organizar")
+    parser.add_argument("--perfil-reglas", action="store_true",
+                        help="Medir el coste y la tasa de acierto de las reglas personalizadas sin mover archivos")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Servicio en segundo plano sin interfaz (no requiere PySide6)")
+    parser.add_argument("--metricas", type=int, metavar="PUERTO",
+                        help="Con --daemon: exponer métricas Prometheus en http://127.0.0.1:PUERTO/metrics")
     
     args = parser.parse_args()
     
+    # Modo servicio: sin GUI ni dependencias gráficas, apto para servidores sin pantalla
+    if args.daemon:
+        ejecutar_daemon(args)
+        return
+    
     # Ocultar consola ANTES de cualquier print si se solicita
     if args.sin_consola or args.autostart or args.minimizado:
         if sys.platform == "win32":
@@ -215,7 +253,10 @@ def main():
     logger.info(f"📁 Directorio: {directorio}")
     
     # Modo de funcionamiento
-    if args.auto:
+    if args.perfil_reglas:
+        perfilar_reglas(directorio, logger)
+        
+    elif args.auto:
         # Solo organizar una vez
         logger.info("📂 Organizando archivos...")
         organizador = OrganizadorArchivos(carpeta_descargas=str(directorio), usar_subcarpetas=True)
@@ -224,12 +265,18 @@ def main():
         logger.info(f"✅ {total} archivos organizados")
         
     elif args.autostart:
-        # Modo autostart: organizar + GUI minimizada con auto-organización
+        # Modo autostart: monitor en tiempo real + GUI minimizada
         logger.info("🚀 Modo autostart iniciado...")
         organizador = OrganizadorArchivos(carpeta_descargas=str(directorio), usar_subcarpetas=True)
-        resultados, errores = organizador.organizar()
-        total = sum(len(files) for cat in resultados.values() for files in cat.values())
-        logger.info(f"✅ {total} archivos organizados inicialmente")
+        organizador.inicializar_modulos_avanzados()
+        # El monitor retoma su cola persistente y lo llegado desde la última sesión,
+        # sin recorrer toda la carpeta
+        if organizador.iniciar_monitor_tiempo_real():
+            logger.info("✅ Monitor activo: pendientes de la sesión anterior reanudados")
+        else:
+            resultados, errores = organizador.organizar()
+            total = sum(len(files) for cat in resultados.values() for files in cat.values())
+            logger.info(f"✅ {total} archivos organizados inicialmente")
         
         # Ocultar consola
         if sys.platform == "win32":
@@ -246,6 +293,8 @@ def main():
             run_gui(directorio=directorio, minimizado=True)
         except Exception as e:
             logger.error(f"Error iniciando GUI: {e}")
+        finally:
+            organizador.detener_monitor_tiempo_real()
             
     else:
         # Modo normal: GUI
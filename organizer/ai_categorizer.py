@@ -5,14 +5,17 @@
 Sistema de categorización con IA básica usando análisis de texto y patrones
 """
 
-import re
 import json
+import uuid
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any, Set
+from typing import Dict, List, Optional, Tuple, Any, Set, Sequence
 import logging
 from datetime import datetime
 from collections import defaultdict, Counter
 
+from .file_features import CaracteristicasArchivo, obtener_caracteristicas, limpiar_texto, extraer_palabras
+from .storage import DocumentoConfig
+
 logger = logging.getLogger(__name__)
 
 class CategorizadorIA:
@@ -24,69 +27,79 @@ class CategorizadorIA:
         self.carpeta_descargas = carpeta_descargas
         self.carpeta_config = carpeta_descargas / ".config"
         self.carpeta_config.mkdir(exist_ok=True)
-        self.archivo_modelo = self.carpeta_config / "modelo_ia.json"
-        self.archivo_patrones = self.carpeta_config / "patrones_aprendidos.json"
+        self.modelo = DocumentoConfig(self.carpeta_config, 'ia', "modelo_ia.json")
         
         # Datos del modelo
         self.patrones_nombre: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
         self.palabras_clave: Dict[str, Set[str]] = defaultdict(set)
         self.confianza_minima = 0.6
         self.historial_decisiones: List[Dict[str, Any]] = []
+        # Cambia solo con ajustes explícitos del modelo (no con el refuerzo automático)
+        self.version_modelo = uuid.uuid4().hex
         
         # Cargar modelo existente
         self._cargar_modelo()
         self._inicializar_patrones_base()
     
-    def _cargar_modelo(self):
-        """Carga el modelo de IA desde disco."""
-        if not self.archivo_modelo.exists():
-            return
+    def _aplicar_datos_modelo(self, data: Dict[str, Any]):
+        """Incorpora un modelo guardado o importado al actual."""
+        # Convertir patrones cargados
+        for categoria, palabras in data.get('patrones_nombre', {}).items():
+            for palabra, peso in palabras.items():
+                self.patrones_nombre[categoria][palabra] = peso
+        
+        # Cargar palabras clave
+        for categoria, palabras in data.get('palabras_clave', {}).items():
+            self.palabras_clave[categoria] = set(palabras)
         
+        self.confianza_minima = data.get('confianza_minima', 0.6)
+        self.historial_decisiones = data.get('historial_decisiones', [])
+    
+    def _cargar_modelo(self):
+        """Carga el modelo de IA guardado."""
         try:
-            with open(self.archivo_modelo, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convertir patrones cargados
-            for categoria, palabras in data.get('patrones_nombre', {}).items():
-                for palabra, peso in palabras.items():
-                    self.patrones_nombre[categoria][palabra] = peso
+            data = self.modelo.cargar()
+            if data is None:
+                return
             
-            # Cargar palabras clave
-            for categoria, palabras in data.get('palabras_clave', {}).items():
-                self.palabras_clave[categoria] = set(palabras)
+            self._aplicar_datos_modelo(data)
             
-            self.confianza_minima = data.get('confianza_minima', 0.6)
-            self.historial_decisiones = data.get('historial_decisiones', [])
+            if data.get('version_modelo'):
+                self.version_modelo = data['version_modelo']
+            else:
+                # Modelo de una versión anterior: persistir la versión generada
+                self._guardar_modelo()
             
             logger.info(f"🤖 Modelo de IA cargado: {len(self.patrones_nombre)} categorías")
             
         except Exception as e:
             logger.error(f"Error cargando modelo de IA: {e}")
     
+    def _datos_modelo(self) -> Dict[str, Any]:
+        """El modelo como documento JSON."""
+        # Convertir defaultdict a dict normal para JSON
+        patrones_dict = {}
+        for categoria, palabras in self.patrones_nombre.items():
+            patrones_dict[categoria] = dict(palabras)
+        
+        palabras_clave_dict = {}
+        for categoria, palabras in self.palabras_clave.items():
+            palabras_clave_dict[categoria] = list(palabras)
+        
+        return {
+            'version': '1.0',
+            'ultima_actualizacion': datetime.now().isoformat(),
+            'patrones_nombre': patrones_dict,
+            'palabras_clave': palabras_clave_dict,
+            'confianza_minima': self.confianza_minima,
+            'version_modelo': self.version_modelo,
+            'historial_decisiones': self.historial_decisiones[-500:]  # Últimas 500
+        }
+    
     def _guardar_modelo(self):
-        """Guarda el modelo de IA en disco."""
+        """Guarda el modelo de IA."""
         try:
-            # Convertir defaultdict a dict normal para JSON
-            patrones_dict = {}
-            for categoria, palabras in self.patrones_nombre.items():
-                patrones_dict[categoria] = dict(palabras)
-            
-            palabras_clave_dict = {}
-            for categoria, palabras in self.palabras_clave.items():
-                palabras_clave_dict[categoria] = list(palabras)
-            
-            data = {
-                'version': '1.0',
-                'ultima_actualizacion': datetime.now().isoformat(),
-                'patrones_nombre': patrones_dict,
-                'palabras_clave': palabras_clave_dict,
-                'confianza_minima': self.confianza_minima,
-                'historial_decisiones': self.historial_decisiones[-500:]  # Últimas 500
-            }
-            
-            with open(self.archivo_modelo, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
+            self.modelo.guardar(self._datos_modelo())
         except Exception as e:
             logger.error(f"Error guardando modelo de IA: {e}")
     
@@ -135,22 +148,21 @@ class CategorizadorIA:
         self._guardar_modelo()
         logger.info("🌱 Patrones base de IA inicializados")
     
-    def analizar_nombre_archivo(self, archivo: Path) -> Optional[Tuple[str, float]]:
+    def analizar_nombre_archivo(self, archivo: Path,
+                                caracteristicas: Optional[CaracteristicasArchivo] = None) -> Optional[Tuple[str, float]]:
         """
         Analiza el nombre de archivo usando IA para determinar categoría.
         
         Args:
             archivo: Archivo a analizar
+            caracteristicas: Características ya extraídas del archivo (opcional)
             
         Returns:
             Tupla con (categoría, confianza) o None si no hay coincidencia
         """
-        nombre_completo = archivo.name.lower()
-        nombre_sin_ext = archivo.stem.lower()
-        
-        # Preprocesar nombre - limpiar y dividir en palabras
-        texto_limpio = self._limpiar_texto(nombre_completo)
-        palabras = self._extraer_palabras(texto_limpio)
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo)
+        palabras = caracteristicas.tokens
         
         # Calcular puntuación para cada categoría
         puntuaciones = {}
@@ -176,30 +188,13 @@ class CategorizadorIA:
     
     def _limpiar_texto(self, texto: str) -> str:
         """Limpia el texto para análisis."""
-        # Remover caracteres especiales y números
-        texto = re.sub(r'[^\w\s-]', ' ', texto)
-        # Remover números de versión, fechas, etc.
-        texto = re.sub(r'\b\d+[\d\.-]*\b', ' ', texto)
-        # Remover palabras muy cortas
-        palabras = [p for p in texto.split() if len(p) > 2]
-        return ' '.join(palabras)
+        return limpiar_texto(texto)
     
     def _extraer_palabras(self, texto: str) -> List[str]:
         """Extrae palabras significativas del texto."""
-        # Dividir por espacios, guiones, underscores
-        palabras = re.split(r'[\s_-]+', texto.lower())
-        
-        # Filtrar palabras muy cortas o comunes
-        palabras_filtradas = []
-        palabras_comunes = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'man', 'oil', 'sit', 'usa', 'car', 'few', 'lot', 'run', 'sea', 'set', 'too', 'big', 'end', 'far', 'off', 'own', 'say', 'she', 'try', 'use'}
-        
-        for palabra in palabras:
-            if len(palabra) > 2 and palabra not in palabras_comunes:
-                palabras_filtradas.append(palabra)
-        
-        return palabras_filtradas
+        return extraer_palabras(texto)
     
-    def _calcular_puntuacion_categoria(self, palabras: List[str], categoria: str) -> float:
+    def _calcular_puntuacion_categoria(self, palabras: Sequence[str], categoria: str) -> float:
         """Calcula la puntuación de una categoría para las palabras dadas."""
         if categoria not in self.patrones_nombre:
             return 0.0
@@ -230,7 +225,8 @@ class CategorizadorIA:
         return 0.0
     
     def entrenar_con_decision(self, archivo: Path, categoria_asignada: str, 
-                            subcategoria: Optional[str] = None, fue_correcta: bool = True):
+                            subcategoria: Optional[str] = None, fue_correcta: bool = True,
+                            caracteristicas: Optional[CaracteristicasArchivo] = None):
         """
         Entrena el modelo con una decisión de categorización.
         
@@ -239,9 +235,11 @@ class CategorizadorIA:
             categoria_asignada: Categoría que se le asignó
             subcategoria: Subcategoría asignada
             fue_correcta: Si la decisión fue correcta (feedback del usuario)
+            caracteristicas: Características ya extraídas del archivo (opcional)
         """
-        nombre_limpio = self._limpiar_texto(archivo.name.lower())
-        palabras = self._extraer_palabras(nombre_limpio)
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo)
+        palabras = list(caracteristicas.tokens)
         
         # Factor de aprendizaje
         factor = 0.1 if fue_correcta else -0.05
@@ -266,6 +264,10 @@ class CategorizadorIA:
                         del self.patrones_nombre[categoria_asignada][palabra]
                         self.palabras_clave[categoria_asignada].discard(palabra)
         
+        if not fue_correcta:
+            # Una corrección del usuario puede cambiar clasificaciones ya hechas
+            self._nueva_version_modelo()
+        
         # Registrar decisión para análisis
         decision = {
             'timestamp': datetime.now().isoformat(),
@@ -330,6 +332,7 @@ class CategorizadorIA:
         """
         if 0.0 <= nueva_confianza <= 1.0:
             self.confianza_minima = nueva_confianza
+            self._nueva_version_modelo()
             self._guardar_modelo()
             logger.info(f"🎯 Confianza de IA ajustada a: {nueva_confianza}")
         else:
@@ -340,12 +343,17 @@ class CategorizadorIA:
         self.patrones_nombre.clear()
         self.palabras_clave.clear()
         self.historial_decisiones.clear()
+        self._nueva_version_modelo()
         
         # Reinicializar patrones base
         self._inicializar_patrones_base()
         
         logger.info("🧹 Modelo de IA reiniciado")
     
+    def _nueva_version_modelo(self):
+        """Marca el modelo como cambiado para invalidar clasificaciones cacheadas."""
+        self.version_modelo = uuid.uuid4().hex
+    
     def exportar_modelo(self, archivo_destino: Path) -> bool:
         """
         Exporta el modelo entrenado para compartir o respaldo.
@@ -357,8 +365,8 @@ class CategorizadorIA:
             True si se exportó correctamente
         """
         try:
-            import shutil
-            shutil.copy2(self.archivo_modelo, archivo_destino)
+            with open(archivo_destino, 'w', encoding='utf-8') as f:
+                json.dump(self._datos_modelo(), f, ensure_ascii=False, indent=2)
             logger.info(f"📤 Modelo exportado a: {archivo_destino}")
             return True
         except Exception as e:
@@ -376,9 +384,11 @@ class CategorizadorIA:
             True si se importó correctamente
         """
         try:
-            import shutil
-            shutil.copy2(archivo_origen, self.archivo_modelo)
-            self._cargar_modelo()
+            with open(archivo_origen, 'r', encoding='utf-8') as f:
+                self._aplicar_datos_modelo(json.load(f))
+            # El modelo importado se mezcla con el actual: es un modelo nuevo
+            self._nueva_version_modelo()
+            self._guardar_modelo()
             logger.info(f"📥 Modelo importado desde: {archivo_origen}")
             return True
         except Exception as e:
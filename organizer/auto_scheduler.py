@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Planificador adaptativo de la auto-organización periódica
+"""
+
+import os
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Decisiones registradas en el historial
+EJECUTADO = 'ejecutado'
+SIN_CAMBIOS = 'sin_cambios'
+OMITIDO_EN_CURSO = 'omitido_en_curso'
+
+
+class PlanificadorAdaptativo:
+    """
+    Decide cuándo toca la siguiente auto-organización a partir del intervalo
+    elegido por el usuario (intervalo base).
+
+    - Si la última pasada movió archivos (ráfaga de descargas) el intervalo se
+      reduce a la mitad, hasta intervalo_base / factor_rafaga.
+    - Si la carpeta no cambió el intervalo se duplica, hasta
+      intervalo_base * factor_reposo.
+    - Si la carpeta raíz no cambió desde la última pasada sin movimientos, la
+      pasada se salta sin recorrer el árbol (como mucho hasta que pase
+      limite_superior, para recoger cambios dentro de las subcarpetas).
+    - Una pasada nunca se solapa con la anterior, y el intervalo nunca baja de
+      `ciclo_maximo` veces el coste de la última pasada, para acotar el uso de
+      CPU y disco (portátiles con batería).
+
+    Cada decisión queda en `historial` con su motivo y su coste.
+    """
+
+    def __init__(self, carpeta: Path, intervalo_base: float, factor_rafaga: float = 4.0,
+                 factor_reposo: float = 8.0, intervalo_minimo: float = 10.0,
+                 ciclo_maximo: float = 0.1):
+        self.carpeta = Path(carpeta)
+        self.factor_rafaga = factor_rafaga
+        self.factor_reposo = factor_reposo
+        self.intervalo_minimo = intervalo_minimo
+        self.ciclo_maximo = ciclo_maximo
+        self.historial: Deque[Dict[str, Any]] = deque(maxlen=200)
+        self.en_curso = False
+        self.configurar(intervalo_base)
+
+    def configurar(self, intervalo_base: float):
+        """Fija un nuevo intervalo base y reinicia la adaptación."""
+        self.intervalo_base = float(intervalo_base)
+        self.intervalo_actual = self.intervalo_base
+        # Sin huella previa la primera pasada siempre se ejecuta
+        self._huella: Optional[int] = None
+        self._ultimo_coste = 0.0
+        self._ultima_ejecucion = time.monotonic()
+        self._inicio_pared = 0.0
+        self._inicio_cpu = 0.0
+
+    @property
+    def limite_inferior(self) -> float:
+        return max(self.intervalo_minimo, self.intervalo_base / self.factor_rafaga)
+
+    @property
+    def limite_superior(self) -> float:
+        return max(self.intervalo_base, self.intervalo_base * self.factor_reposo)
+
+    def _huella_carpeta(self) -> Optional[int]:
+        # Crear, borrar o renombrar en la raíz cambia su mtime
+        try:
+            return os.stat(self.carpeta).st_mtime_ns
+        except OSError:
+            return None
+
+    def debe_ejecutar(self, ocupado: bool = False) -> bool:
+        """
+        Llamar en cada tic. Retorna True si hay que organizar ahora; en ese caso
+        hay que llamar a finalizar() al terminar la pasada.
+
+        Args:
+            ocupado: True si otra operación sobre la carpeta sigue en curso
+        """
+        if self.en_curso or ocupado:
+            self._registrar(OMITIDO_EN_CURSO, "la pasada anterior sigue en curso")
+            return False
+
+        reciente = time.monotonic() - self._ultima_ejecucion < self.limite_superior
+        if reciente and self._huella is not None and self._huella_carpeta() == self._huella:
+            self._ajustar(hubo_actividad=False)
+            self._registrar(SIN_CAMBIOS, "la carpeta no cambió desde la última pasada")
+            return False
+
+        self.en_curso = True
+        self._inicio_pared = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+        return True
+
+    def finalizar(self, archivos_movidos: int, exito: bool = True) -> float:
+        """
+        Registra el resultado de una pasada y calcula el siguiente intervalo.
+
+        Args:
+            archivos_movidos: Archivos que movió la pasada
+            exito: False si la pasada falló (no se guarda la huella)
+
+        Returns:
+            Segundos hasta el siguiente tic
+        """
+        duracion = time.perf_counter() - self._inicio_pared
+        cpu = time.process_time() - self._inicio_cpu
+        self.en_curso = False
+        self._ultimo_coste = duracion
+        self._ultima_ejecucion = time.monotonic()
+
+        # La huella se toma después de mover: los movimientos propios no
+        # cuentan como actividad en la siguiente comprobación
+        self._huella = self._huella_carpeta() if exito and archivos_movidos == 0 else None
+        self._ajustar(hubo_actividad=archivos_movidos > 0)
+        motivo = f"{archivos_movidos} archivo(s) movidos" if archivos_movidos else "nada que organizar"
+        self._registrar(EJECUTADO, motivo, archivos=archivos_movidos, duracion=duracion, cpu=cpu)
+        return self.intervalo_actual
+
+    def _ajustar(self, hubo_actividad: bool):
+        if hubo_actividad:
+            intervalo = self.intervalo_actual / 2
+        else:
+            intervalo = self.intervalo_actual * 2
+        intervalo = min(max(intervalo, self.limite_inferior), self.limite_superior)
+        # Acotar la fracción de tiempo dedicada a organizar
+        if self.ciclo_maximo > 0:
+            intervalo = max(intervalo, self._ultimo_coste / self.ciclo_maximo)
+        self.intervalo_actual = intervalo
+
+    def _registrar(self, decision: str, motivo: str, archivos: int = 0,
+                   duracion: float = 0.0, cpu: float = 0.0):
+        entrada = {
+            'timestamp': datetime.now().isoformat(),
+            'decision': decision,
+            'motivo': motivo,
+            'archivos': archivos,
+            'duracion': duracion,
+            'cpu': cpu,
+            'siguiente_intervalo': self.intervalo_actual
+        }
+        self.historial.append(entrada)
+        logger.debug(f"Auto-organización: {decision} ({motivo}), siguiente en {self.intervalo_actual:.0f}s")
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Resumen de decisiones y coste de las pasadas recientes."""
+        ejecuciones = [e for e in self.historial if e['decision'] == EJECUTADO]
+        return {
+            'intervalo_base': self.intervalo_base,
+            'intervalo_actual': self.intervalo_actual,
+            'limites': (self.limite_inferior, self.limite_superior),
+            'ejecutadas': len(ejecuciones),
+            'sin_cambios': sum(1 for e in self.historial if e['decision'] == SIN_CAMBIOS),
+            'omitidas_en_curso': sum(1 for e in self.historial if e['decision'] == OMITIDO_EN_CURSO),
+            'duracion_media': (sum(e['duracion'] for e in ejecuciones) / len(ejecuciones)) if ejecuciones else 0.0,
+            'cpu_total': sum(e['cpu'] for e in ejecuciones),
+            'archivos_movidos': sum(e['archivos'] for e in ejecuciones),
+            'ultimas': list(self.historial)[-10:]
+        }
+
+
+def formatear_intervalo(segundos: float) -> str:
+    """Texto corto para un intervalo: 45s, 12 min, 3.5 h."""
+    if segundos < 120:
+        return f"{segundos:.0f}s"
+    if segundos < 7200:
+        return f"{segundos / 60:.0f} min"
+    return f"{segundos / 3600:.1f} h"
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Caché persistente de clasificaciones indexada por identidad de archivo
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Versión de la lógica de clasificación; subirla invalida todas las cachés guardadas
+VERSION_CLASIFICADOR = 1
+
+ClaveArchivo = Tuple[int, int, int, int]
+
+
+class CacheClasificacion:
+    """
+    Recuerda la (categoría, subcategoría) decidida para cada archivo.
+
+    La clave es (dispositivo, inodo, tamaño, mtime_ns): mover un archivo
+    conserva su identidad, así que un árbol ya organizado se vuelve a recorrer
+    sin clasificar nada. Como la clasificación depende del nombre, cada entrada
+    guarda también el nombre y un renombrado cuenta como fallo. Todas las entradas llevan asociada la firma
+    del clasificador (versión de reglas, versión del modelo IA, módulos activos);
+    cuando la firma cambia la caché se vacía sola.
+    """
+
+    def __init__(self, carpeta_descargas: Path, capacidad: int = 50000):
+        self.carpeta_descargas = carpeta_descargas
+        self.carpeta_config = carpeta_descargas / ".config"
+        self.carpeta_config.mkdir(exist_ok=True)
+        self.archivo_cache = self.carpeta_config / "cache_clasificacion.json"
+        self.capacidad = capacidad
+        self.firma: Optional[str] = None
+        self._entradas: 'OrderedDict[ClaveArchivo, Tuple[str, str, Optional[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._cambios_pendientes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._cargar_cache()
+
+    def _cargar_cache(self):
+        """Carga la caché desde disco."""
+        if not self.archivo_cache.exists():
+            return
+
+        try:
+            with open(self.archivo_cache, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            if data.get('version') != VERSION_CLASIFICADOR:
+                logger.info("🗂️ Caché de clasificación de otra versión, se descarta")
+                return
+
+            self.firma = data.get('firma')
+            for clave, (nombre, categoria, subcategoria) in data.get('entradas', {}).items():
+                self._entradas[tuple(int(parte) for parte in clave.split(':'))] = (nombre, categoria, subcategoria)
+
+            logger.info(f"🗂️ Caché de clasificación cargada: {len(self._entradas)} archivos")
+
+        except Exception as e:
+            logger.error(f"Error cargando caché de clasificación: {e}")
+            self._entradas.clear()
+
+    def guardar(self):
+        """Guarda la caché en disco si cambió desde la última vez."""
+        with self._lock:
+            if not self._cambios_pendientes:
+                return
+            data = {
+                'version': VERSION_CLASIFICADOR,
+                'firma': self.firma,
+                'ultima_actualizacion': datetime.now().isoformat(),
+                'entradas': {
+                    ':'.join(str(parte) for parte in clave): list(resultado)
+                    for clave, resultado in self._entradas.items()
+                }
+            }
+            self._cambios_pendientes = 0
+
+        try:
+            temporal = self.archivo_cache.with_suffix('.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temporal, self.archivo_cache)
+        except Exception as e:
+            logger.error(f"Error guardando caché de clasificación: {e}")
+
+    def guardar_si_necesario(self, umbral: int = 200):
+        """Guarda solo cuando se acumularon suficientes cambios (clasificación archivo a archivo)."""
+        if self._cambios_pendientes >= umbral:
+            self.guardar()
+
+    def _comprobar_firma(self, firma: str):
+        # Llamar con el lock adquirido
+        if firma != self.firma:
+            if self._entradas:
+                logger.info("🗂️ Reglas o modelo cambiaron: caché de clasificación invalidada")
+            self._entradas.clear()
+            self.firma = firma
+            self._cambios_pendientes += 1
+
+    def obtener(self, clave: ClaveArchivo, nombre: str, firma: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Busca la clasificación de un archivo.
+
+        Args:
+            clave: Identidad del archivo (ver identidad_archivo)
+            nombre: Nombre actual del archivo
+            firma: Firma actual del clasificador
+
+        Returns:
+            (categoría, subcategoría) o None si no está en caché
+        """
+        with self._lock:
+            self._comprobar_firma(firma)
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] != nombre:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1], entrada[2]
+
+    def registrar(self, clave: ClaveArchivo, nombre: str, firma: str,
+                  resultado: Tuple[str, Optional[str]]):
+        """Guarda en memoria la clasificación de un archivo."""
+        categoria, subcategoria = resultado
+        with self._lock:
+            self._comprobar_firma(firma)
+            self._entradas[clave] = (nombre, categoria, subcategoria)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+            self._cambios_pendientes += 1
+
+    def limpiar(self):
+        """Vacía la caché."""
+        with self._lock:
+            self._entradas.clear()
+            self._cambios_pendientes += 1
+        self.guardar()
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Retorna tamaño y tasa de aciertos de la caché."""
+        total = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / total if total else 0.0
+        }
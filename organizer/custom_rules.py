@@ -5,13 +5,20 @@
 Sistema de reglas personalizables para categorización de archivos
 """
 
+import hashlib
 import json
 import re
+import threading
+import time
+from collections import defaultdict, deque
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import Callable, Dict, FrozenSet, List, Optional, Pattern, Set, Tuple, Any, Union
 import logging
 from datetime import datetime
 
+from .file_features import CaracteristicasArchivo, obtener_caracteristicas
+from .storage import DocumentoConfig
+
 logger = logging.getLogger(__name__)
 
 class ReglaPersonalizada:
@@ -65,12 +72,13 @@ class ReglaPersonalizada:
         self.fecha_min = fecha_min
         self.fecha_max = fecha_max
     
-    def coincide(self, archivo: Path) -> bool:
+    def coincide(self, archivo: Path, caracteristicas: Optional[CaracteristicasArchivo] = None) -> bool:
         """
         Verifica si un archivo coincide con esta regla.
         
         Args:
             archivo: Archivo a verificar
+            caracteristicas: Características ya extraídas del archivo (opcional)
             
         Returns:
             True si el archivo coincide con la regla
@@ -78,47 +86,56 @@ class ReglaPersonalizada:
         if not self.activa:
             return False
         
-        # Verificar extensión
-        if self.patrones_extension:
-            extension = archivo.suffix.lower()
-            if extension not in self.patrones_extension:
-                return False
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo)
         
-        # Verificar patrones de nombre
+        return all(comprobar(caracteristicas) for _, comprobar in self.comprobaciones())
+    
+    def comprobaciones(self) -> List[Tuple[str, Callable[[CaracteristicasArchivo], bool]]]:
+        """
+        Retorna las comprobaciones que aplica esta regla, en orden de evaluación,
+        como pares (tipo, función). Los tipos son 'extension', 'nombre', 'regex',
+        'tamaño' y 'fecha'.
+        """
+        comprobaciones = []
+        if self.patrones_extension:
+            comprobaciones.append(('extension', self._comprobar_extension))
         if self.patrones_nombre:
-            nombre_lower = archivo.stem.lower()
-            if not any(patron in nombre_lower for patron in self.patrones_nombre):
-                return False
-        
-        # Verificar patrones regex
+            comprobaciones.append(('nombre', self._comprobar_nombre))
         if self.patrones_regex:
-            nombre_completo = archivo.name
-            if not any(re.search(patron, nombre_completo, re.IGNORECASE) 
-                      for patron in self.patrones_regex):
-                return False
-        
-        # Verificar tamaño
+            comprobaciones.append(('regex', self._comprobar_regex))
         if self.tamaño_min is not None or self.tamaño_max is not None:
-            try:
-                tamaño = archivo.stat().st_size
-                if self.tamaño_min is not None and tamaño < self.tamaño_min:
-                    return False
-                if self.tamaño_max is not None and tamaño > self.tamaño_max:
-                    return False
-            except (OSError, IOError):
-                return False
-        
-        # Verificar fecha
+            comprobaciones.append(('tamaño', self._comprobar_tamaño))
         if self.fecha_min is not None or self.fecha_max is not None:
-            try:
-                fecha_mod = datetime.fromtimestamp(archivo.stat().st_mtime)
-                if self.fecha_min is not None and fecha_mod < self.fecha_min:
-                    return False
-                if self.fecha_max is not None and fecha_mod > self.fecha_max:
-                    return False
-            except (OSError, IOError):
-                return False
-        
+            comprobaciones.append(('fecha', self._comprobar_fecha))
+        return comprobaciones
+    
+    def _comprobar_extension(self, caracteristicas: CaracteristicasArchivo) -> bool:
+        return caracteristicas.extension in self.patrones_extension
+    
+    def _comprobar_nombre(self, caracteristicas: CaracteristicasArchivo) -> bool:
+        nombre_lower = caracteristicas.stem_lower
+        return any(patron in nombre_lower for patron in self.patrones_nombre)
+    
+    def _comprobar_regex(self, caracteristicas: CaracteristicasArchivo) -> bool:
+        nombre_completo = caracteristicas.nombre
+        return any(re.search(patron, nombre_completo, re.IGNORECASE)
+                   for patron in self.patrones_regex)
+    
+    def _comprobar_tamaño(self, caracteristicas: CaracteristicasArchivo) -> bool:
+        # Tamaño ya conocido por el escaneo, sin stat adicional
+        if self.tamaño_min is not None and caracteristicas.tamaño < self.tamaño_min:
+            return False
+        if self.tamaño_max is not None and caracteristicas.tamaño > self.tamaño_max:
+            return False
+        return True
+    
+    def _comprobar_fecha(self, caracteristicas: CaracteristicasArchivo) -> bool:
+        fecha_mod = datetime.fromtimestamp(caracteristicas.mtime)
+        if self.fecha_min is not None and fecha_mod < self.fecha_min:
+            return False
+        if self.fecha_max is not None and fecha_mod > self.fecha_max:
+            return False
         return True
     
     def to_dict(self) -> Dict[str, Any]:
@@ -158,6 +175,474 @@ class ReglaPersonalizada:
         
         return regla
 
+class _AhoCorasick:
+    """
+    Autómata de Aho–Corasick para buscar todas las subcadenas de todas las
+    reglas en una sola pasada sobre el nombre del archivo.
+    """
+    
+    def __init__(self, patrones: List[str]):
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        self._salidas: List[Set[int]] = [set()]
+        # Una subcadena vacía está contenida en cualquier nombre
+        self._siempre: Set[int] = set()
+        
+        for indice, patron in enumerate(patrones):
+            if not patron:
+                self._siempre.add(indice)
+                continue
+            estado = 0
+            for caracter in patron:
+                siguiente = self._transiciones[estado].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._transiciones)
+                    self._transiciones.append({})
+                    self._fallo.append(0)
+                    self._salidas.append(set())
+                    self._transiciones[estado][caracter] = siguiente
+                estado = siguiente
+            self._salidas[estado].add(indice)
+        
+        # Construir enlaces de fallo en anchura
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            estado = cola.popleft()
+            for caracter, siguiente in self._transiciones[estado].items():
+                cola.append(siguiente)
+                fallo = self._fallo[estado]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                self._fallo[siguiente] = self._transiciones[fallo].get(caracter, 0)
+                self._salidas[siguiente] |= self._salidas[self._fallo[siguiente]]
+    
+    def buscar(self, texto: str) -> Set[int]:
+        """Retorna los índices de todos los patrones contenidos en el texto."""
+        encontrados = set(self._siempre)
+        transiciones = self._transiciones
+        fallo = self._fallo
+        salidas = self._salidas
+        estado = 0
+        for caracter in texto:
+            while estado and caracter not in transiciones[estado]:
+                estado = fallo[estado]
+            estado = transiciones[estado].get(caracter, 0)
+            if salidas[estado]:
+                encontrados |= salidas[estado]
+        return encontrados
+
+
+def _rangos_disjuntos(min_a, max_a, min_b, max_b) -> bool:
+    """True si los intervalos [min_a, max_a] y [min_b, max_b] (extremos opcionales) no se tocan."""
+    return ((max_a is not None and min_b is not None and max_a < min_b) or
+            (max_b is not None and min_a is not None and max_b < min_a))
+
+
+def _reglas_disjuntas(a: ReglaPersonalizada, b: ReglaPersonalizada) -> bool:
+    """
+    True si se puede asegurar que ningún archivo cumple las dos reglas:
+    extensiones sin ninguna en común o rangos de tamaño o fecha separados.
+    Los patrones de nombre y regex no se analizan (se dan por solapables).
+    """
+    if a.patrones_extension and b.patrones_extension and \
+            not set(a.patrones_extension) & set(b.patrones_extension):
+        return True
+    if _rangos_disjuntos(a.tamaño_min, a.tamaño_max, b.tamaño_min, b.tamaño_max):
+        return True
+    return _rangos_disjuntos(a.fecha_min, a.fecha_max, b.fecha_min, b.fecha_max)
+
+
+class MotorReglas:
+    """
+    Conjunto de reglas compilado en un único comparador.
+    
+    - Índice por extensión: solo se evalúan las reglas que admiten la extensión
+      del archivo (más las que no restringen extensión).
+    - Todas las subcadenas de nombre se buscan a la vez con Aho–Corasick.
+    - Todas las regex se fusionan en una alternancia con grupos con nombre.
+    - Tamaño y fecha salen de las características del escaneo (ningún stat extra).
+    
+    El orden de evaluación es por prioridad descendente y, a igual prioridad,
+    por posición en la lista, conservando la semántica de primera coincidencia.
+    """
+    
+    def __init__(self, reglas: List[ReglaPersonalizada]):
+        activas = [(posicion, regla) for posicion, regla in enumerate(reglas) if regla.activa]
+        activas.sort(key=lambda par: (-par[1].prioridad, par[0]))
+        self.reglas: List[ReglaPersonalizada] = [regla for _, regla in activas]
+        
+        # Índice de extensiones
+        self._por_extension: Dict[str, List[int]] = defaultdict(list)
+        self._sin_extension: List[int] = []
+        for orden, regla in enumerate(self.reglas):
+            if regla.patrones_extension:
+                for extension in set(regla.patrones_extension):
+                    self._por_extension[extension].append(orden)
+            else:
+                self._sin_extension.append(orden)
+        self._candidatas: Dict[str, Tuple[int, ...]] = {}
+        
+        # Subcadenas de nombre
+        patrones: List[str] = []
+        indice_patron: Dict[str, int] = {}
+        self._patrones_regla: List[Optional[FrozenSet[int]]] = []
+        for regla in self.reglas:
+            if not regla.patrones_nombre:
+                self._patrones_regla.append(None)
+                continue
+            ids = set()
+            for patron in regla.patrones_nombre:
+                if patron not in indice_patron:
+                    indice_patron[patron] = len(patrones)
+                    patrones.append(patron)
+                ids.add(indice_patron[patron])
+            self._patrones_regla.append(frozenset(ids))
+        self._automata = _AhoCorasick(patrones) if patrones else None
+        
+        # Regex fusionadas
+        self._grupos_regla: List[Optional[Tuple[str, ...]]] = []
+        self._regex_sueltas: Dict[str, Pattern] = {}
+        self._regex_combinada: Optional[Pattern] = None
+        fragmentos: List[str] = []
+        for orden, regla in enumerate(self.reglas):
+            if not regla.patrones_regex:
+                self._grupos_regla.append(None)
+                continue
+            grupos = []
+            for numero, patron in enumerate(regla.patrones_regex):
+                grupo = f"r{orden}_{numero}"
+                grupos.append(grupo)
+                # [\s\S] y no DOTALL: el flag también cambiaría el `.` del patrón
+                fragmento = f"(?:(?=[\\s\\S]*?(?P<{grupo}>{patron})))?"
+                if self._fusionable(patron) and self._compila(fragmento):
+                    fragmentos.append(fragmento)
+                else:
+                    self._regex_sueltas[grupo] = self._compilar(patron)
+            self._grupos_regla.append(tuple(grupos))
+        
+        if fragmentos:
+            try:
+                self._regex_combinada = re.compile("^" + "".join(fragmentos), re.IGNORECASE)
+            except re.error as e:
+                # Algún patrón no convive con los demás: evaluar todos por separado
+                logger.debug(f"No se pudieron fusionar las regex de reglas: {e}")
+                for orden, regla in enumerate(self.reglas):
+                    for numero, patron in enumerate(regla.patrones_regex):
+                        self._regex_sueltas.setdefault(f"r{orden}_{numero}", self._compilar(patron))
+    
+    @staticmethod
+    def _fusionable(patron: str) -> bool:
+        """Indica si una regex puede fusionarse sin cambiar su significado."""
+        # Las referencias numéricas/por nombre y los flags globales dependen de su posición
+        return not re.search(r'\\\d|\(\?P[=<]|\(\?<|^\(\?[aiLmsux]+\)', patron)
+    
+    @staticmethod
+    def _compila(fragmento: str) -> bool:
+        try:
+            re.compile(fragmento)
+            return True
+        except re.error:
+            return False
+    
+    @staticmethod
+    def _compilar(patron: str) -> Pattern:
+        try:
+            return re.compile(patron, re.IGNORECASE)
+        except re.error:
+            # Nunca debería ocurrir (se valida al añadir), pero no debe coincidir nada
+            return re.compile(r'(?!)')
+    
+    def _obtener_candidatas(self, extension: str) -> Tuple[int, ...]:
+        candidatas = self._candidatas.get(extension)
+        if candidatas is None:
+            candidatas = tuple(sorted(self._por_extension.get(extension, []) + self._sin_extension))
+            self._candidatas[extension] = candidatas
+        return candidatas
+    
+    def buscar(self, caracteristicas: CaracteristicasArchivo) -> Optional[ReglaPersonalizada]:
+        """
+        Retorna la primera regla (por prioridad) que coincide con el archivo.
+        
+        Args:
+            caracteristicas: Características del archivo
+            
+        Returns:
+            La regla que coincide o None
+        """
+        encontrados: Optional[Set[int]] = None
+        grupos: Optional[Dict[str, Optional[str]]] = None
+        fecha_mod: Optional[datetime] = None
+        
+        for orden in self._obtener_candidatas(caracteristicas.extension):
+            regla = self.reglas[orden]
+            
+            # Patrones de nombre
+            ids = self._patrones_regla[orden]
+            if ids is not None:
+                if encontrados is None:
+                    encontrados = self._automata.buscar(caracteristicas.stem_lower)
+                if ids.isdisjoint(encontrados):
+                    continue
+            
+            # Patrones regex
+            nombres_grupo = self._grupos_regla[orden]
+            if nombres_grupo is not None:
+                if grupos is None:
+                    grupos = {}
+                    if self._regex_combinada is not None:
+                        grupos = self._regex_combinada.match(caracteristicas.nombre).groupdict()
+                if not any(self._regex_coincide(grupo, grupos, caracteristicas.nombre)
+                           for grupo in nombres_grupo):
+                    continue
+            
+            # Tamaño
+            if regla.tamaño_min is not None and caracteristicas.tamaño < regla.tamaño_min:
+                continue
+            if regla.tamaño_max is not None and caracteristicas.tamaño > regla.tamaño_max:
+                continue
+            
+            # Fecha
+            if regla.fecha_min is not None or regla.fecha_max is not None:
+                if fecha_mod is None:
+                    fecha_mod = datetime.fromtimestamp(caracteristicas.mtime)
+                if regla.fecha_min is not None and fecha_mod < regla.fecha_min:
+                    continue
+                if regla.fecha_max is not None and fecha_mod > regla.fecha_max:
+                    continue
+            
+            return regla
+        
+        return None
+    
+    def _regex_coincide(self, grupo: str, grupos: Dict[str, Optional[str]], nombre: str) -> bool:
+        if grupo in self._regex_sueltas:
+            if grupo not in grupos:
+                grupos[grupo] = "" if self._regex_sueltas[grupo].search(nombre) else None
+            return grupos[grupo] is not None
+        return grupos.get(grupo) is not None
+
+
+try:
+    import re._parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+
+_REPETICIONES = {_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT}
+_SIN_LIMITE = _sre_parse.MAXREPEAT
+
+
+def analizar_backtracking(patron: str) -> Optional[str]:
+    """
+    Busca estructuras de una regex propensas a backtracking catastrófico
+    (repeticiones ilimitadas anidadas o alternativas solapadas bajo repetición).
+    
+    Args:
+        patron: Expresión regular a analizar
+        
+    Returns:
+        Motivo de la sospecha o None si la regex parece segura
+    """
+    try:
+        arbol = _sre_parse.parse(patron)
+    except Exception:
+        return None
+    
+    def contiene_repeticion_ilimitada(subpatron) -> bool:
+        for operador, argumento in subpatron:
+            if operador in _REPETICIONES:
+                if argumento[1] == _SIN_LIMITE or contiene_repeticion_ilimitada(argumento[2]):
+                    return True
+            elif operador == _sre_parse.SUBPATTERN:
+                if contiene_repeticion_ilimitada(argumento[-1]):
+                    return True
+            elif operador == _sre_parse.BRANCH:
+                if any(contiene_repeticion_ilimitada(rama) for rama in argumento[1]):
+                    return True
+        return False
+    
+    def primeros_caracteres(alternativa) -> Optional[Set[int]]:
+        # None significa "desconocido o vacío": se asume que solapa
+        if not alternativa:
+            return None
+        operador, argumento = alternativa[0]
+        if operador == _sre_parse.LITERAL:
+            return {argumento}
+        if operador == _sre_parse.IN and all(op == _sre_parse.LITERAL for op, _ in argumento):
+            return {valor for _, valor in argumento}
+        return None
+    
+    def ramas_solapadas(subpatron) -> bool:
+        for operador, argumento in subpatron:
+            if operador == _sre_parse.SUBPATTERN:
+                if ramas_solapadas(argumento[-1]):
+                    return True
+            elif operador == _sre_parse.BRANCH:
+                vistos: Set[int] = set()
+                for rama in argumento[1]:
+                    primeros = primeros_caracteres(rama)
+                    if primeros is None or not vistos.isdisjoint(primeros):
+                        return True
+                    vistos |= primeros
+        return False
+    
+    def recorrer(subpatron) -> Optional[str]:
+        for operador, argumento in subpatron:
+            if operador in _REPETICIONES:
+                _, maximo, interior = argumento
+                if maximo == _SIN_LIMITE:
+                    if contiene_repeticion_ilimitada(interior):
+                        return "repetición ilimitada anidada"
+                    if ramas_solapadas(interior):
+                        return "alternativas solapadas bajo repetición ilimitada"
+                motivo = recorrer(interior)
+                if motivo:
+                    return motivo
+            elif operador == _sre_parse.SUBPATTERN:
+                motivo = recorrer(argumento[-1])
+                if motivo:
+                    return motivo
+            elif operador == _sre_parse.BRANCH:
+                for rama in argumento[1]:
+                    motivo = recorrer(rama)
+                    if motivo:
+                        return motivo
+        return None
+    
+    return recorrer(arbol)
+
+
+class PerfiladorReglas:
+    """
+    Instrumentación opcional del gestor de reglas. Registra por regla las
+    evaluaciones, coincidencias y tiempo acumulado por tipo de comprobación,
+    y señala las regex sospechosas de backtracking patológico.
+    """
+    
+    TIPOS = ('extension', 'nombre', 'regex', 'tamaño', 'fecha')
+    
+    def __init__(self, umbral_regex_lenta: float = 0.005):
+        # Una regex que tarda más que esto sobre un nombre de archivo es sospechosa
+        self.umbral_regex_lenta = umbral_regex_lenta
+        self._lock = threading.Lock()
+        self.reiniciar()
+    
+    def reiniciar(self):
+        """Borra todas las mediciones."""
+        with self._lock:
+            self.archivos_evaluados = 0
+            self.inicio = datetime.now()
+            self.reglas: Dict[str, Dict[str, Any]] = {}
+    
+    def _entrada(self, regla: ReglaPersonalizada) -> Dict[str, Any]:
+        entrada = self.reglas.get(regla.nombre)
+        if entrada is None:
+            entrada = {
+                'evaluaciones': 0,
+                'coincidencias': 0,
+                'tiempo_total': 0.0,
+                'tiempo_por_tipo': {tipo: 0.0 for tipo in self.TIPOS},
+                'rechazos_por_tipo': {tipo: 0 for tipo in self.TIPOS},
+                'regex_sospechosas': {},
+            }
+            for patron in regla.patrones_regex:
+                motivo = analizar_backtracking(patron)
+                if motivo:
+                    entrada['regex_sospechosas'][patron] = motivo
+            self.reglas[regla.nombre] = entrada
+        return entrada
+    
+    def evaluar(self, regla: ReglaPersonalizada, caracteristicas: CaracteristicasArchivo) -> bool:
+        """Evalúa una regla midiendo cada comprobación por separado."""
+        mediciones = []
+        coincide = True
+        for tipo, comprobar in regla.comprobaciones():
+            if tipo == 'regex':
+                coincide = self._evaluar_regex(regla, caracteristicas, mediciones)
+            else:
+                inicio = time.perf_counter()
+                coincide = comprobar(caracteristicas)
+                mediciones.append((tipo, time.perf_counter() - inicio))
+            if not coincide:
+                break
+        
+        with self._lock:
+            entrada = self._entrada(regla)
+            entrada['evaluaciones'] += 1
+            for tipo, duracion in mediciones:
+                if tipo in entrada['tiempo_por_tipo']:
+                    entrada['tiempo_por_tipo'][tipo] += duracion
+                    entrada['tiempo_total'] += duracion
+                else:
+                    # Regex que superó el umbral de tiempo
+                    entrada['regex_sospechosas'].setdefault(
+                        tipo, f"lenta en la práctica ({duracion * 1000:.1f} ms)")
+            if coincide:
+                entrada['coincidencias'] += 1
+            elif mediciones:
+                # La última medición siempre es la comprobación que rechazó
+                entrada['rechazos_por_tipo'][mediciones[-1][0]] += 1
+        return coincide
+    
+    def _evaluar_regex(self, regla: ReglaPersonalizada, caracteristicas: CaracteristicasArchivo,
+                       mediciones: List[Tuple[str, float]]) -> bool:
+        total = 0.0
+        lentas = []
+        coincide = False
+        for patron in regla.patrones_regex:
+            inicio = time.perf_counter()
+            encontrado = re.search(patron, caracteristicas.nombre, re.IGNORECASE)
+            duracion = time.perf_counter() - inicio
+            total += duracion
+            if duracion > self.umbral_regex_lenta:
+                lentas.append((patron, duracion))
+            if encontrado:
+                coincide = True
+                break
+        mediciones.extend(lentas)
+        mediciones.append(('regex', total))
+        return coincide
+    
+    def registrar_archivo(self):
+        with self._lock:
+            self.archivos_evaluados += 1
+    
+    def obtener_reporte(self, reglas: List[ReglaPersonalizada]) -> Dict[str, Any]:
+        """
+        Construye el reporte de perfilado.
+        
+        Args:
+            reglas: Reglas del gestor en su orden de evaluación
+            
+        Returns:
+            Diccionario con archivos evaluados y métricas por regla
+        """
+        with self._lock:
+            detalle = []
+            for posicion, regla in enumerate(reglas):
+                entrada = self._entrada(regla)
+                evaluaciones = entrada['evaluaciones']
+                detalle.append({
+                    'nombre': regla.nombre,
+                    'posicion': posicion,
+                    'prioridad': regla.prioridad,
+                    'activa': regla.activa,
+                    'evaluaciones': evaluaciones,
+                    'coincidencias': entrada['coincidencias'],
+                    'tasa_acierto': entrada['coincidencias'] / evaluaciones if evaluaciones else 0.0,
+                    'tiempo_total_ms': entrada['tiempo_total'] * 1000,
+                    'tiempo_medio_us': entrada['tiempo_total'] / evaluaciones * 1e6 if evaluaciones else 0.0,
+                    'tiempo_por_tipo_ms': {tipo: t * 1000 for tipo, t in entrada['tiempo_por_tipo'].items()},
+                    'rechazos_por_tipo': dict(entrada['rechazos_por_tipo']),
+                    'regex_sospechosas': dict(entrada['regex_sospechosas']),
+                    'nunca_coincide': evaluaciones > 0 and entrada['coincidencias'] == 0,
+                })
+            return {
+                'desde': self.inicio.isoformat(),
+                'archivos_evaluados': self.archivos_evaluados,
+                'reglas': detalle,
+            }
+
+
 class GestorReglasPersonalizadas:
     """
     Gestiona las reglas personalizadas del usuario.
@@ -167,19 +652,20 @@ class GestorReglasPersonalizadas:
         self.carpeta_descargas = carpeta_descargas
         self.carpeta_config = carpeta_descargas / ".config"
         self.carpeta_config.mkdir(exist_ok=True)
-        self.archivo_reglas = self.carpeta_config / "reglas_personalizadas.json"
+        self.documento_reglas = DocumentoConfig(self.carpeta_config, 'reglas', "reglas_personalizadas.json")
         self.reglas: List[ReglaPersonalizada] = []
+        self._motor: Optional[MotorReglas] = None
+        self.version_reglas = ''
+        self.perfilador: Optional[PerfiladorReglas] = None
         self._cargar_reglas()
         self._crear_reglas_ejemplo()
     
     def _cargar_reglas(self):
-        """Carga las reglas desde el archivo de configuración."""
-        if not self.archivo_reglas.exists():
-            return
-        
+        """Carga las reglas guardadas."""
         try:
-            with open(self.archivo_reglas, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self.documento_reglas.cargar()
+            if data is None:
+                return
             
             self.reglas = []
             for regla_data in data.get('reglas', []):
@@ -189,22 +675,23 @@ class GestorReglasPersonalizadas:
                 except Exception as e:
                     logger.error(f"Error cargando regla: {e}")
             
+            self.invalidar_motor()
             logger.info(f"✅ Cargadas {len(self.reglas)} reglas personalizadas")
             
         except Exception as e:
             logger.error(f"Error cargando reglas personalizadas: {e}")
     
     def _guardar_reglas(self):
-        """Guarda las reglas en el archivo de configuración."""
+        """Guarda las reglas."""
+        # Toda modificación de reglas pasa por aquí
+        self.invalidar_motor()
         try:
             data = {
                 'version': '1.0',
                 'ultima_actualizacion': datetime.now().isoformat(),
                 'reglas': [regla.to_dict() for regla in self.reglas]
             }
-            
-            with open(self.archivo_reglas, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.documento_reglas.guardar(data)
             
             logger.info(f"💾 Guardadas {len(self.reglas)} reglas personalizadas")
             
@@ -324,23 +811,206 @@ class GestorReglasPersonalizadas:
         logger.warning(f"No se encontró regla: {nombre}")
         return False
     
-    def obtener_categoria(self, archivo: Path) -> Optional[Tuple[str, str]]:
+    def obtener_categoria(self, archivo: Path,
+                          caracteristicas: Optional[CaracteristicasArchivo] = None) -> Optional[Tuple[str, str]]:
         """
         Obtiene la categoría de un archivo según las reglas personalizadas.
         
         Args:
             archivo: Archivo a categorizar
+            caracteristicas: Características ya extraídas del archivo (opcional)
             
         Returns:
             Tupla con (categoria, subcategoria) si coincide, None si no
         """
-        for regla in self.reglas:
-            if regla.coincide(archivo):
-                logger.debug(f"Archivo {archivo.name} coincide con regla: {regla.nombre}")
-                return (regla.categoria, regla.subcategoria)
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo)
+        
+        if self.perfilador is not None:
+            regla = self._buscar_perfilado(caracteristicas)
+        else:
+            regla = self._obtener_motor().buscar(caracteristicas)
+        if regla is not None:
+            logger.debug(f"Archivo {archivo.name} coincide con regla: {regla.nombre}")
+            return (regla.categoria, regla.subcategoria)
         
         return None
     
+    def _obtener_motor(self) -> MotorReglas:
+        """Retorna el motor compilado, compilándolo si las reglas cambiaron."""
+        motor = self._motor
+        if motor is None:
+            motor = MotorReglas(self.reglas)
+            self._motor = motor
+        return motor
+    
+    def _buscar_perfilado(self, caracteristicas: CaracteristicasArchivo) -> Optional[ReglaPersonalizada]:
+        """Evalúa las reglas una a una, en el orden del motor, midiendo cada comprobación."""
+        perfilador = self.perfilador
+        perfilador.registrar_archivo()
+        for regla in self._obtener_motor().reglas:
+            if perfilador.evaluar(regla, caracteristicas):
+                return regla
+        return None
+    
+    # ===== PERFILADO DE REGLAS =====
+    
+    def activar_perfilado(self, activo: bool = True):
+        """
+        Activa o desactiva el modo de instrumentación. Mientras está activo las
+        reglas se evalúan una a una (más lento) para poder medir cada una.
+        """
+        if activo and self.perfilador is None:
+            self.perfilador = PerfiladorReglas()
+            logger.info("⏱️ Perfilado de reglas activado")
+        elif not activo and self.perfilador is not None:
+            self.perfilador = None
+            logger.info("⏱️ Perfilado de reglas desactivado")
+    
+    def obtener_reporte_perfil(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de perfilado por regla en orden de evaluación.
+        
+        Returns:
+            Diccionario con el reporte o con 'error' si el perfilado no está activo
+        """
+        if self.perfilador is None:
+            return {'error': 'El perfilado de reglas no está activo'}
+        reporte = self.perfilador.obtener_reporte(self._obtener_motor().reglas)
+        reporte['orden_sugerido'] = self.sugerir_orden_reglas()
+        return reporte
+    
+    def sugerir_orden_reglas(self) -> List[Dict[str, Any]]:
+        """
+        Sugiere un orden de reglas según la tasa de acierto medida. Dentro de cada
+        nivel de prioridad se adelantan las reglas con más coincidencias por unidad
+        de tiempo y se retrasan las que nunca coinciden. La prioridad nunca se
+        altera y una regla solo adelanta a otra si no pueden coincidir con el
+        mismo archivo (ver _reglas_disjuntas), así que el orden sugerido nunca
+        cambia qué regla gana.
+        
+        Returns:
+            Lista con nombre, posición actual y posición sugerida de cada regla
+        """
+        if self.perfilador is None:
+            return []
+        
+        reglas = self._obtener_motor().reglas
+        actuales = self.perfilador.obtener_reporte(reglas)['reglas']
+        
+        def rendimiento(metrica: Dict[str, Any]) -> float:
+            if not metrica['coincidencias']:
+                return 0.0
+            return metrica['coincidencias'] / max(metrica['tiempo_total_ms'], 1e-6)
+        
+        # Orden topológico voraz: en cada paso, la mejor regla cuyas
+        # predecesoras solapables ya están colocadas
+        pendientes = list(range(len(actuales)))
+        sugeridas = []
+        while pendientes:
+            libres = [
+                i for i in pendientes
+                if not any(j < i and actuales[j]['prioridad'] == actuales[i]['prioridad']
+                           and not _reglas_disjuntas(reglas[j], reglas[i])
+                           for j in pendientes)
+            ]
+            elegida = min(libres, key=lambda i: (-actuales[i]['prioridad'], -rendimiento(actuales[i]), i))
+            pendientes.remove(elegida)
+            sugeridas.append(actuales[elegida])
+        return [
+            {
+                'nombre': metrica['nombre'],
+                'prioridad': metrica['prioridad'],
+                'posicion_actual': metrica['posicion'],
+                'posicion_sugerida': posicion,
+                'tasa_acierto': metrica['tasa_acierto'],
+                'nunca_coincide': metrica['nunca_coincide'],
+            }
+            for posicion, metrica in enumerate(sugeridas)
+        ]
+    
+    def aplicar_orden_sugerido(self) -> bool:
+        """
+        Reordena y guarda las reglas según el orden sugerido por el perfilado.
+        
+        Returns:
+            True si se aplicó el nuevo orden
+        """
+        sugerencia = self.sugerir_orden_reglas()
+        if not sugerencia:
+            return False
+        
+        posiciones = {s['nombre']: s['posicion_sugerida'] for s in sugerencia}
+        self.reglas.sort(key=lambda r: (-r.prioridad, posiciones.get(r.nombre, len(posiciones))))
+        self._guardar_reglas()
+        logger.info("📐 Orden de reglas actualizado según el perfilado")
+        return True
+    
+    def generar_reporte_perfil(self) -> str:
+        """Genera un reporte de texto con las métricas de perfilado."""
+        reporte_datos = self.obtener_reporte_perfil()
+        if 'error' in reporte_datos:
+            return reporte_datos['error']
+        
+        reporte = []
+        reporte.append("=" * 60)
+        reporte.append("   PERFILADO DE REGLAS PERSONALIZADAS")
+        reporte.append("=" * 60)
+        reporte.append("")
+        reporte.append(f"📁 Archivos evaluados: {reporte_datos['archivos_evaluados']:,}")
+        reporte.append("")
+        
+        reporte.append("⏱️ COSTE POR REGLA (orden de evaluación):")
+        for metrica in reporte_datos['reglas']:
+            reporte.append(
+                f"   {metrica['posicion'] + 1:>3}. {metrica['nombre']:<28} "
+                f"{metrica['coincidencias']:>6,}/{metrica['evaluaciones']:<6,} aciertos "
+                f"({metrica['tasa_acierto'] * 100:5.1f}%)  {metrica['tiempo_total_ms']:8.2f} ms"
+            )
+            tiempos = ", ".join(f"{tipo} {ms:.2f} ms" for tipo, ms in metrica['tiempo_por_tipo_ms'].items() if ms > 0)
+            if tiempos:
+                reporte.append(f"        ↳ {tiempos}")
+        reporte.append("")
+        
+        nunca = [m['nombre'] for m in reporte_datos['reglas'] if m['nunca_coincide']]
+        if nunca:
+            reporte.append("💤 REGLAS QUE NUNCA COINCIDEN:")
+            for nombre in nunca:
+                reporte.append(f"   • {nombre}")
+            reporte.append("")
+        
+        sospechosas = [(m['nombre'], patron, motivo) for m in reporte_datos['reglas']
+                       for patron, motivo in m['regex_sospechosas'].items()]
+        if sospechosas:
+            reporte.append("⚠️ REGEX CON POSIBLE BACKTRACKING PATOLÓGICO:")
+            for nombre, patron, motivo in sospechosas:
+                reporte.append(f"   • {nombre}: {patron}  ({motivo})")
+            reporte.append("")
+        
+        cambios = [s for s in reporte_datos['orden_sugerido'] if s['posicion_actual'] != s['posicion_sugerida']]
+        reporte.append("💡 ORDEN SUGERIDO:")
+        if cambios:
+            for sugerencia in reporte_datos['orden_sugerido']:
+                reporte.append(f"   {sugerencia['posicion_sugerida'] + 1:>3}. {sugerencia['nombre']}"
+                               f" (ahora {sugerencia['posicion_actual'] + 1})")
+        else:
+            reporte.append("   ✅ El orden actual ya es el óptimo según las mediciones")
+        reporte.append("")
+        reporte.append("=" * 60)
+        
+        return "\n".join(reporte)
+    
+    def invalidar_motor(self):
+        """
+        Descarta el motor compilado. Llamar si se modifica una regla
+        directamente sin pasar por los métodos del gestor.
+        """
+        self._motor = None
+        # Huella del contenido: mismas reglas dan la misma versión entre sesiones
+        contenido = json.dumps([regla.to_dict() for regla in self.reglas],
+                               sort_keys=True, ensure_ascii=False)
+        self.version_reglas = hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+    
     def listar_reglas(self) -> List[Dict[str, Any]]:
         """Retorna información de todas las reglas."""
         return [
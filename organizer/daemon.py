@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servicio en segundo plano sin interfaz gráfica basado en un único bucle asyncio.
+
+Los eventos de archivos, los escaneos incrementales periódicos, las
+notificaciones y el volcado de estadísticas son tareas del mismo bucle; el
+trabajo de disco (clasificar, mover, stat) se delega a un pool de hilos
+pequeño. Un socket de control local permite consultar y gobernar el servicio
+(p. ej. desde la GUI) con mensajes JSON de una línea; cada mensaje lleva el
+token que el servicio publica en .config/daemon.json.
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
+import logging
+
+from .file_watchers import ESPERA_PAREJA_MOVIMIENTO, crear_observador
+from .metrics import COLA_MONITOR, DURACION_ETAPA, ServidorMetricas, registrar_error
+from .real_time_monitor import SeguimientoEstabilidad, archivos_nuevos_desde, es_temporal
+from .work_queue import ColaPersistente, DESCARTADO, FALLIDO, HECHO, PENDIENTE
+
+logger = logging.getLogger(__name__)
+
+try:
+    from .notifications import notificador
+    NOTIFICATIONS_AVAILABLE = True
+except ImportError:
+    NOTIFICATIONS_AVAILABLE = False
+
+NOMBRE_SOCKET = "daemon.sock"
+NOMBRE_INFO = "daemon.json"
+
+
+class EventosDescargaAsync:
+    """
+    Equivalente de EventosDescarga para el bucle asyncio: los plazos son
+    temporizadores del bucle (no hilos) y las comprobaciones de estabilidad y
+    la organización se ejecutan en el pool de hilos del servicio.
+
+    Los métodos on_* pueden llamarse desde cualquier hilo.
+    """
+
+    def __init__(self, servicio: 'ServicioOrganizador', delay_segundos: float = 3,
+                 intervalo_estabilidad: float = 1.0, ventana_lote: float = 0.5,
+                 tamaño_lote: int = 100):
+        self.servicio = servicio
+        self.delay_segundos = delay_segundos
+        self.intervalo_estabilidad = intervalo_estabilidad
+        self.ventana_lote = ventana_lote
+        self.tamaño_lote = tamaño_lote
+        self.max_reintentos = 3
+        self.espera_maxima = 3600.0
+        self.estabilidad = SeguimientoEstabilidad()
+        self._loop = asyncio.get_running_loop()
+        self._temporizadores: Dict[Path, asyncio.TimerHandle] = {}
+        self._terminados: Set[Path] = set()
+        self._en_proceso: Set[Path] = set()
+        self._intentos: Dict[Path, int] = {}
+        self._primer_evento: Dict[Path, float] = {}
+        self._lote: List[Path] = []
+        self._inicio_lote = 0.0
+        self._temporizador_lote: Optional[asyncio.TimerHandle] = None
+        self.metricas_lotes: Deque[Dict[str, Any]] = deque(maxlen=200)
+
+    # --- Entrada de eventos (cualquier hilo) ---
+
+    def _desde_hilo(self, funcion, *args):
+        self._loop.call_soon_threadsafe(funcion, *args)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._desde_hilo(self.programar, Path(event.src_path), False)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            origen = Path(event.src_path)
+            self._desde_hilo(self.descartar, origen)
+            self._desde_hilo(self.programar, Path(event.dest_path), es_temporal(origen))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._desde_hilo(self._modificado, Path(event.src_path))
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self._desde_hilo(self.programar, Path(event.src_path), True)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._desde_hilo(self.descartar, Path(event.src_path))
+
+    # --- Lógica en el hilo del bucle ---
+
+    def programa(self, archivo: Path) -> bool:
+        return archivo in self._temporizadores or archivo in self._en_proceso
+
+    def programados(self) -> Set[Path]:
+        return set(self._temporizadores) | self._en_proceso | set(self._lote)
+
+    def _modificado(self, archivo: Path):
+        # Si ya tiene plazo, la siguiente comprobación verá el cambio
+        if not self.programa(archivo):
+            self.programar(archivo)
+
+    def programar(self, archivo: Path, terminado: bool = False, retraso: Optional[float] = None):
+        """Programa (o desplaza) la comprobación de un archivo."""
+        if es_temporal(archivo):
+            return
+        self.servicio.registrar_en_cola(archivo, PENDIENTE)
+        if terminado:
+            self._terminados.add(archivo)
+        self._primer_evento.setdefault(archivo, time.monotonic())
+        if retraso is None:
+            retraso = min(self.intervalo_estabilidad, self.delay_segundos) if terminado else self.delay_segundos
+        anterior = self._temporizadores.pop(archivo, None)
+        if anterior:
+            anterior.cancel()
+        self._temporizadores[archivo] = self._loop.call_later(retraso, self._vencido, archivo)
+
+    def descartar(self, archivo: Path, estado: str = DESCARTADO):
+        temporizador = self._temporizadores.pop(archivo, None)
+        if temporizador:
+            temporizador.cancel()
+        self._terminados.discard(archivo)
+        self._intentos.pop(archivo, None)
+        self._primer_evento.pop(archivo, None)
+        self.estabilidad.olvidar(archivo)
+        self.servicio.registrar_en_cola(archivo, estado)
+
+    def _vencido(self, archivo: Path):
+        self._temporizadores.pop(archivo, None)
+        if archivo in self._en_proceso:
+            # Se comprobará de nuevo cuando termine la comprobación en curso
+            self.programar(archivo, retraso=self.intervalo_estabilidad)
+            return
+        self._en_proceso.add(archivo)
+        self._loop.create_task(self._comprobar(archivo))
+
+    def _evaluar(self, archivo: Path, terminado: bool) -> str:
+        """Comprobación con E/S; se ejecuta en el pool de hilos."""
+        if not archivo.exists():
+            return 'desaparecido'
+        if terminado:
+            self.estabilidad.registrar_evento(archivo, terminado=True)
+        if not self.estabilidad.comprobar(archivo):
+            return 'cambiando'
+        try:
+            if archivo.stat().st_size == 0:
+                return 'vacio'
+        except OSError:
+            return 'desaparecido'
+        return 'listo'
+
+    async def _comprobar(self, archivo: Path):
+        try:
+            terminado = archivo in self._terminados
+            estado = await self.servicio.en_executor(self._evaluar, archivo, terminado)
+        except Exception as e:
+            logger.debug(f"Error comprobando {archivo}: {e}")
+            estado = 'cambiando'
+        finally:
+            self._en_proceso.discard(archivo)
+
+        if estado in ('desaparecido', 'vacio'):
+            self.descartar(archivo)
+        elif estado == 'cambiando':
+            esperando = time.monotonic() - self._primer_evento.get(archivo, time.monotonic())
+            if esperando > self.espera_maxima:
+                logger.warning(f"Archivo sigue cambiando tras {esperando:.0f}s, se abandona: {archivo.name}")
+                self.descartar(archivo, FALLIDO)
+            elif archivo not in self._temporizadores:
+                self.programar(archivo, retraso=self.intervalo_estabilidad)
+        else:
+            self._añadir_a_lote(archivo)
+
+    def _añadir_a_lote(self, archivo: Path):
+        if archivo in self._lote:
+            return
+        self._lote.append(archivo)
+        if len(self._lote) == 1:
+            self._inicio_lote = time.monotonic()
+        if len(self._lote) >= self.tamaño_lote:
+            self.vaciar_lote()
+        elif self._temporizador_lote is None:
+            self._temporizador_lote = self._loop.call_later(self.ventana_lote, self.vaciar_lote)
+
+    def vaciar_lote(self) -> Optional[asyncio.Task]:
+        """Lanza la organización del lote en curso como tarea del bucle."""
+        if self._temporizador_lote:
+            self._temporizador_lote.cancel()
+            self._temporizador_lote = None
+        if not self._lote or self.servicio.pausado:
+            return None
+        lote, self._lote = self._lote, []
+        return self._loop.create_task(self._organizar_lote(lote, self._inicio_lote))
+
+    async def _organizar_lote(self, archivos: List[Path], inicio_lote: float):
+        primeros = [self._primer_evento.get(archivo, inicio_lote) for archivo in archivos]
+        inicio = time.monotonic()
+        logger.info(f"🔄 Organizando automáticamente un lote de {len(archivos)} archivo(s)")
+        try:
+            resultado = await self.servicio.en_executor(
+                self.servicio.organizador.organizar_lote, archivos, False
+            )
+        except Exception as e:
+            for archivo in archivos:
+                self._reintentar(archivo, e)
+            return
+        fin = time.monotonic()
+
+        latencias = [fin - primero for primero in primeros]
+        self.metricas_lotes.append({
+            'timestamp': datetime.now().isoformat(),
+            'archivos': len(archivos),
+            'espera_lote': inicio - inicio_lote,
+            'duracion': fin - inicio,
+            'latencia_media': sum(latencias) / len(latencias),
+            'latencia_max': max(latencias)
+        })
+        for archivo in archivos:
+            self.descartar(archivo, HECHO)
+        self.servicio.registrar_resultado(resultado)
+
+    def _reintentar(self, archivo: Path, error: Exception):
+        reintento = self._intentos.get(archivo, 0) + 1
+        self._intentos[archivo] = reintento
+        registrar_error('monitor', error)
+        logger.warning(f"Error organizando {archivo} (intento {reintento}/{self.max_reintentos}): {error}")
+        if reintento < self.max_reintentos:
+            self.servicio.registrar_en_cola(archivo, PENDIENTE, reintento)
+            self.programar(archivo, retraso=self.delay_segundos * reintento)
+        else:
+            logger.error(f"❌ Falló organizar {archivo} después de {self.max_reintentos} intentos")
+            self.descartar(archivo, FALLIDO)
+
+    def restaurar_intentos(self, archivo: Path, intentos: int):
+        if intentos:
+            self._intentos[archivo] = intentos
+
+    def pendientes(self) -> int:
+        return len(self._temporizadores) + len(self._en_proceso) + len(self._lote)
+
+
+class ServicioOrganizador:
+    """
+    Servicio headless: vigila la carpeta, organiza por lotes, reescanea de
+    forma incremental y atiende el socket de control.
+    """
+
+    def __init__(self, carpeta_descargas: Path, intervalo_escaneo: float = 300.0,
+                 intervalo_estadisticas: float = 60.0, delay_segundos: float = 3,
+                 backend: str = 'auto', max_workers: int = 2,
+                 puerto_metricas: Optional[int] = None):
+        self.carpeta_descargas = Path(carpeta_descargas)
+        self.carpeta_config = self.carpeta_descargas / ".config"
+        self.carpeta_config.mkdir(exist_ok=True)
+        self.intervalo_escaneo = intervalo_escaneo
+        self.intervalo_estadisticas = intervalo_estadisticas
+        self.delay_segundos = delay_segundos
+        self.backend = backend
+        self.max_workers = max_workers
+        self.puerto_metricas = puerto_metricas
+        self.servidor_metricas: Optional[ServidorMetricas] = None
+        self.pausado = False
+        self.organizador = None
+        self.estadisticas = None
+        self.eventos: Optional[EventosDescargaAsync] = None
+        self.cola: Optional[ColaPersistente] = None
+        self._observador = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Un solo hilo para la cola: conserva el orden de las escrituras
+        self._executor_cola: Optional[ThreadPoolExecutor] = None
+        self._parar: Optional[asyncio.Event] = None
+        self._escanear_ya: Optional[asyncio.Event] = None
+        self._tareas: List[asyncio.Task] = []
+        self._servidor = None
+        self._token = ''
+        self.inicio = datetime.now()
+        self.archivos_organizados = 0
+        self.ultimo_escaneo: Optional[str] = None
+
+    # --- Utilidades para las demás piezas ---
+
+    async def en_executor(self, funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, funcion, *args)
+
+    def registrar_en_cola(self, archivo: Path, estado: str, intentos: Optional[int] = None):
+        if self.cola is not None:
+            self._executor_cola.submit(self.cola.registrar, archivo, estado, intentos)
+
+    def registrar_resultado(self, resultado: Dict[str, Any]):
+        """Lanza la notificación resumen de un lote (las estadísticas llegan por movimiento)."""
+        movidos = resultado.get('movidos', {})
+        for error in resultado.get('errores', []):
+            logger.error(error)
+        if not movidos:
+            return
+        self.archivos_organizados += len(movidos)
+
+        if NOTIFICATIONS_AVAILABLE:
+            categorias = len(resultado.get('por_categoria', {})) or 1
+            asyncio.get_running_loop().create_task(
+                self.en_executor(notificador.notificar_organizacion, len(movidos), categorias)
+            )
+
+    # --- Ciclo de vida ---
+
+    def _crear_organizador(self):
+        from .file_organizer import OrganizadorArchivos
+        organizador = OrganizadorArchivos(str(self.carpeta_descargas), usar_subcarpetas=True)
+        organizador.inicializar_modulos_avanzados()
+        # Este servicio sustituye al monitor basado en hilos
+        organizador.monitor_tiempo_real = None
+        try:
+            from .statistics import EstadisticasOrganizador
+            self.estadisticas = EstadisticasOrganizador(self.carpeta_descargas)
+            organizador.estadisticas = self.estadisticas
+        except Exception as e:
+            logger.warning(f"Estadísticas no disponibles: {e}")
+        return organizador
+
+    async def ejecutar(self):
+        """Arranca el servicio y espera hasta que se pida detenerlo."""
+        loop = asyncio.get_running_loop()
+        self._parar = asyncio.Event()
+        self._escanear_ya = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="servicio")
+        self._executor_cola = ThreadPoolExecutor(max_workers=1, thread_name_prefix="servicio-cola")
+
+        # Desde aquí, cualquier fallo del arranque también pasa por _apagar
+        try:
+            if sys.platform != "win32":
+                for senal in (signal.SIGINT, signal.SIGTERM):
+                    loop.add_signal_handler(senal, self.detener)
+
+            self.organizador = await self.en_executor(self._crear_organizador)
+            self.cola = await self.en_executor(ColaPersistente, self.carpeta_descargas)
+            self.eventos = EventosDescargaAsync(self, self.delay_segundos)
+
+            await self._iniciar_control()
+            if self.puerto_metricas is not None:
+                self.servidor_metricas = ServidorMetricas(self.puerto_metricas)
+                if self.servidor_metricas.iniciar():
+                    # Lectura sin lock desde el hilo HTTP: solo suma longitudes
+                    COLA_MONITOR.fijar_funcion(self.eventos.pendientes)
+                else:
+                    self.servidor_metricas = None
+            self._iniciar_observador(loop)
+            await self._reanudar()
+
+            # _iniciar_observador ya puede haber añadido el bucle de sondeo
+            self._tareas.extend([
+                loop.create_task(self._bucle_escaneo()),
+                loop.create_task(self._bucle_estadisticas()),
+            ])
+            logger.info(f"🛰️ Servicio activo en {self.carpeta_descargas}")
+
+            await self._parar.wait()
+        finally:
+            await self._apagar(loop)
+
+    def detener(self):
+        if self._parar is not None:
+            self._parar.set()
+
+    def _iniciar_observador(self, loop: asyncio.AbstractEventLoop):
+        observador = crear_observador(self.backend)
+        if observador is None:
+            raise RuntimeError(f"Backend de vigilancia no disponible: {self.backend}")
+        observador.schedule(self.eventos, str(self.carpeta_descargas), recursive=False)
+        observador.abrir()
+        # Solo un observador abierto queda a cargo de _apagar
+        self._observador = observador
+
+        if self._observador.nombre_backend == "inotify":
+            def al_poder_leer():
+                if self._observador.procesar_eventos():
+                    loop.call_later(ESPERA_PAREJA_MOVIMIENTO, al_poder_leer)
+            loop.add_reader(self._observador.fileno(), al_poder_leer)
+        else:
+            self._tareas.append(loop.create_task(self._bucle_sondeo()))
+        logger.info(f"👁️ Vigilancia: {self._observador.nombre_backend}")
+
+    async def _bucle_sondeo(self):
+        while True:
+            await asyncio.sleep(self._observador.intervalo)
+            await self.en_executor(self._observador.sondear)
+
+    async def _reanudar(self):
+        """Pendientes de la sesión anterior y lo llegado mientras no corría."""
+        pendientes = await self.en_executor(self.cola.pendientes)
+        for archivo, intentos in pendientes:
+            self.eventos.restaurar_intentos(archivo, intentos)
+            self.eventos.programar(archivo)
+        await self._escanear(self.cola.marca)
+
+    async def _escanear(self, marca: Optional[int]) -> int:
+        """Escaneo incremental: solo archivos nuevos o cambiados desde `marca`."""
+        inicio = time.time_ns()
+        with DURACION_ETAPA.medir(stage='scan'):
+            nuevos = await self.en_executor(archivos_nuevos_desde, self.carpeta_descargas, marca,
+                                            self.eventos.programados())
+        for archivo in nuevos:
+            self.eventos.programar(archivo)
+        await asyncio.get_running_loop().run_in_executor(self._executor_cola, self.cola.guardar_marca, inicio)
+        self.ultimo_escaneo = datetime.now().isoformat()
+        if nuevos:
+            logger.info(f"🔍 Escaneo incremental: {len(nuevos)} archivo(s) nuevos")
+        return len(nuevos)
+
+    async def _bucle_escaneo(self):
+        # Red de seguridad por si el observador perdió algún evento
+        while True:
+            try:
+                await asyncio.wait_for(self._escanear_ya.wait(), timeout=self.intervalo_escaneo)
+            except asyncio.TimeoutError:
+                pass
+            self._escanear_ya.clear()
+            try:
+                await self._escanear(self.cola.marca)
+            except Exception as e:
+                logger.error(f"Error en escaneo incremental: {e}")
+
+    async def _bucle_estadisticas(self):
+        while True:
+            await asyncio.sleep(self.intervalo_estadisticas)
+            await self._volcar_estadisticas()
+
+    async def _volcar_estadisticas(self):
+        # Cada intervalo con actividad queda como una sesión
+        if self.estadisticas is None:
+            return
+        try:
+            await self.en_executor(self.estadisticas.finalizar_sesion)
+        except Exception as e:
+            logger.error(f"Error guardando estadísticas: {e}")
+
+    async def _apagar(self, loop: asyncio.AbstractEventLoop):
+        logger.info("🛑 Deteniendo servicio...")
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+
+        if self._observador is not None:
+            if self._observador.nombre_backend == "inotify":
+                loop.remove_reader(self._observador.fileno())
+                self._observador.cerrar()
+
+        # Lo ya listo se organiza; lo demás queda en la cola para el próximo arranque
+        if self.eventos is not None:
+            self.pausado = False
+            tarea = self.eventos.vaciar_lote()
+            if tarea:
+                await tarea
+        await self._volcar_estadisticas()
+
+        if self.servidor_metricas is not None:
+            COLA_MONITOR.fijar_funcion(None)
+            await loop.run_in_executor(None, self.servidor_metricas.detener)
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        for nombre in (NOMBRE_SOCKET, NOMBRE_INFO):
+            try:
+                (self.carpeta_config / nombre).unlink()
+            except OSError:
+                pass
+
+        if self.cola is not None:
+            self._executor_cola.submit(self.cola.guardar_marca)
+            self._executor_cola.submit(self.cola.cerrar)
+        self._executor_cola.shutdown(wait=True)
+        if self.organizador is not None and getattr(self.organizador, 'cache_clasificacion', None):
+            await self.en_executor(self.organizador.cache_clasificacion.guardar)
+        self._executor.shutdown(wait=True)
+        logger.info("✅ Servicio detenido")
+
+    # --- Socket de control ---
+
+    async def _iniciar_control(self):
+        """
+        Socket Unix en .config/daemon.sock (o TCP en 127.0.0.1 en Windows).
+        La dirección y un token aleatorio se publican en .config/daemon.json
+        (legible solo por el usuario); sin el token no se acepta ningún
+        comando: en TCP cualquier proceso local puede conectarse.
+        """
+        self._token = secrets.token_hex(32)
+        info: Dict[str, Any] = {'pid': os.getpid(), 'inicio': self.inicio.isoformat(), 'token': self._token}
+        if hasattr(socket, 'AF_UNIX') and sys.platform != "win32":
+            ruta = self.carpeta_config / NOMBRE_SOCKET
+            if ruta.exists():
+                if _socket_responde(str(ruta)):
+                    raise RuntimeError("Ya hay un servicio activo para esta carpeta")
+                ruta.unlink()
+            self._servidor = await asyncio.start_unix_server(self._atender_cliente, path=str(ruta))
+            os.chmod(ruta, 0o600)
+            info['socket'] = str(ruta)
+        else:
+            self._servidor = await asyncio.start_server(self._atender_cliente, host='127.0.0.1', port=0)
+            info['puerto'] = self._servidor.sockets[0].getsockname()[1]
+
+        archivo_info = self.carpeta_config / NOMBRE_INFO
+        try:
+            archivo_info.unlink()
+        except FileNotFoundError:
+            pass
+        descriptor = os.open(archivo_info, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(descriptor, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+
+    async def _atender_cliente(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    peticion = json.loads(linea)
+                except ValueError as e:
+                    peticion, respuesta = None, {'ok': False, 'error': str(e)}
+                if peticion is not None and not self._autorizado(peticion):
+                    logger.warning("⚠️ Comando rechazado en el socket de control: token inválido")
+                    escritor.write((json.dumps({'ok': False, 'error': 'No autorizado'}) + '\n').encode('utf-8'))
+                    await escritor.drain()
+                    break
+                if peticion is not None:
+                    try:
+                        respuesta = await self._ejecutar_comando(peticion.get('comando', ''), peticion)
+                    except Exception as e:
+                        respuesta = {'ok': False, 'error': str(e)}
+                escritor.write((json.dumps(respuesta, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+                await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    def _autorizado(self, peticion: Any) -> bool:
+        token = peticion.get('token') if isinstance(peticion, dict) else None
+        return bool(self._token) and isinstance(token, str) and hmac.compare_digest(token, self._token)
+
+    async def _ejecutar_comando(self, comando: str, peticion: Dict[str, Any]) -> Dict[str, Any]:
+        if comando == 'estado':
+            return {'ok': True, 'estado': self.obtener_estado()}
+        if comando == 'metricas':
+            lotes = list(self.eventos.metricas_lotes) if self.eventos else []
+            return {'ok': True, 'lotes': lotes[-int(peticion.get('limite', 20)):]}
+        if comando == 'escanear':
+            self._escanear_ya.set()
+            return {'ok': True}
+        if comando == 'pausar':
+            self.pausado = True
+            return {'ok': True}
+        if comando == 'reanudar':
+            self.pausado = False
+            self.eventos.vaciar_lote()
+            return {'ok': True}
+        if comando == 'detener':
+            self.detener()
+            return {'ok': True}
+        return {'ok': False, 'error': f"Comando desconocido: {comando}"}
+
+    def obtener_estado(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'carpeta': str(self.carpeta_descargas),
+            'inicio': self.inicio.isoformat(),
+            'vigilancia': self._observador.nombre_backend if self._observador else None,
+            'pausado': self.pausado,
+            'pendientes': self.eventos.pendientes() if self.eventos else 0,
+            'archivos_organizados': self.archivos_organizados,
+            'ultimo_escaneo': self.ultimo_escaneo,
+            'metricas': (f"http://{self.servidor_metricas.host}:{self.servidor_metricas.puerto}/metrics"
+                         if self.servidor_metricas else None)
+        }
+
+
+def _socket_responde(ruta: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(1)
+            s.connect(ruta)
+        return True
+    except OSError:
+        return False
+
+
+def enviar_comando(carpeta_descargas: Path, comando: str, timeout: float = 5.0, **parametros) -> Optional[Dict[str, Any]]:
+    """
+    Envía un comando al servicio en segundo plano (cliente síncrono para la GUI).
+
+    Args:
+        carpeta_descargas: Carpeta que vigila el servicio
+        comando: 'estado', 'metricas', 'escanear', 'pausar', 'reanudar' o 'detener'
+        timeout: Segundos máximos de espera
+        **parametros: Campos adicionales de la petición
+
+    Returns:
+        Respuesta del servicio o None si no hay ninguno activo
+    """
+    archivo_info = Path(carpeta_descargas) / ".config" / NOMBRE_INFO
+    try:
+        with open(archivo_info, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if 'socket' in info:
+            conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            destino: Any = info['socket']
+        else:
+            conexion = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            destino = ('127.0.0.1', info['puerto'])
+        with conexion:
+            conexion.settimeout(timeout)
+            conexion.connect(destino)
+            peticion = dict(parametros, comando=comando, token=info['token'])
+            conexion.sendall((json.dumps(peticion) + '\n').encode('utf-8'))
+            with conexion.makefile('r', encoding='utf-8') as lector:
+                return json.loads(lector.readline())
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def ejecutar_servicio(carpeta_descargas: Path, **opciones) -> int:
+    """Punto de entrada de INICIAR.py --daemon."""
+    servicio = ServicioOrganizador(carpeta_descargas, **opciones)
+    try:
+        asyncio.run(servicio.ejecutar())
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        logger.error(f"❌ {e}")
+        return 1
+    return 0
@@ -6,61 +6,180 @@ Organizador por fechas opcional con capacidad de revertir
 """
 
 import json
-import shutil
+import os
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 import logging
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from .date_sources import ExtractorFechas, FUENTES_FECHA, FUENTES_POR_DEFECTO
+from .folder_pruner import podar_tras_mover
+from .storage import DocumentoConfig
+from .revert_engine import MotorReversion, REVERTIR_FECHAS
+
 logger = logging.getLogger(__name__)
 
 class OrganizadorPorFecha:
     """
     Organiza archivos por fecha de creación/modificación.
     Mantiene un registro para poder revertir la organización.
+    
+    La configuración (espacio 'fechas' del almacén) y el historial de movimientos
+    van por separado. El historial es un diario append-only en JSON Lines
+    (movimientos_fechas.jsonl): cada movimiento añade una línea y una reversión
+    añade una línea que marca los movimientos revertidos. Se hace flush en
+    cada línea y fsync una vez por pasada (sincronizar()). No hay límite de
+    movimientos; el diario se compacta cuando las líneas obsoletas dominan.
+    
+    La fecha de cada archivo sale de las fuentes configuradas (EXIF, metadatos
+    de PDF o vídeo, nombre, modificación); ver ExtractorFechas.
     """
     
     def __init__(self, carpeta_descargas: Path):
         self.carpeta_descargas = carpeta_descargas
         self.carpeta_config = carpeta_descargas / ".config"
         self.carpeta_config.mkdir(exist_ok=True)
-        self.archivo_registro = self.carpeta_config / "organizacion_fechas.json"
+        self.configuracion = DocumentoConfig(self.carpeta_config, 'fechas', "organizacion_fechas.json")
+        self.archivo_diario = self.carpeta_config / "movimientos_fechas.jsonl"
         self.activo = False
         self.patron_fechas = "YYYY/MM-Mes"  # Patrón por defecto
+        self.fuentes_fecha: List[str] = list(FUENTES_POR_DEFECTO)
         self.registro_movimientos: List[Dict[str, Any]] = []
+        self._lock = threading.RLock()
+        self._diario = None
+        self._lineas_diario = 0
+        self._ultimo_numero = 0
         self._cargar_configuracion()
+        self._cargar_diario()
+        self.extractor_fechas = ExtractorFechas(self.carpeta_config, self.fuentes_fecha)
     
     def _cargar_configuracion(self):
         """Carga la configuración de organización por fechas."""
-        if not self.archivo_registro.exists():
-            return
-        
         try:
-            with open(self.archivo_registro, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self.configuracion.cargar()
+            if data is None:
+                return
             
             self.activo = data.get('activo', False)
             self.patron_fechas = data.get('patron_fechas', 'YYYY/MM-Mes')
-            self.registro_movimientos = data.get('registro_movimientos', [])
+            self.fuentes_fecha = data.get('fuentes_fecha', self.fuentes_fecha)
             
             logger.info(f"📅 Configuración de fechas cargada - Activo: {self.activo}")
             
+            # Versiones anteriores guardaban el historial dentro de la configuración
+            if data.get('registro_movimientos') and not self.archivo_diario.exists():
+                self._migrar_registro(data['registro_movimientos'])
+            
         except Exception as e:
             logger.error(f"Error cargando configuración de fechas: {e}")
     
+    def _migrar_registro(self, movimientos: List[Dict[str, Any]]):
+        """Pasa el historial del JSON de configuración al diario."""
+        temporal = self.archivo_diario.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            for numero, movimiento in enumerate(movimientos, 1):
+                f.write(json.dumps(dict(movimiento, n=numero), ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.archivo_diario)
+        # Sin el historial, la configuración vuelve a ser un archivo pequeño
+        self._guardar_configuracion()
+        logger.info(f"📅 {len(movimientos)} movimientos por fecha migrados al diario")
+    
+    def _cargar_diario(self):
+        """Reproduce el diario: movimientos menos los revertidos."""
+        if not self.archivo_diario.exists():
+            return
+        
+        vigentes: Dict[int, Dict[str, Any]] = {}
+        try:
+            with open(self.archivo_diario, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    self._lineas_diario += 1
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea a medio escribir tras una caída
+                        continue
+                    if 'revertidos' in registro:
+                        for numero in registro['revertidos']:
+                            vigentes.pop(numero, None)
+                        continue
+                    numero = registro.get('n', 0)
+                    self._ultimo_numero = max(self._ultimo_numero, numero)
+                    vigentes[numero] = registro
+        except Exception as e:
+            logger.error(f"Error cargando diario de movimientos por fecha: {e}")
+        
+        self.registro_movimientos = list(vigentes.values())
+    
+    def _escribir_diario(self, registro: Dict[str, Any]):
+        # Llamar con el lock adquirido
+        if self._diario is None:
+            self._diario = open(self.archivo_diario, 'a', encoding='utf-8')
+        self._diario.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        # flush basta si matan la app; el fsync se agrupa en sincronizar()
+        self._diario.flush()
+        self._lineas_diario += 1
+    
+    def sincronizar(self):
+        """
+        Lleva a disco (fsync) lo escrito en el diario y guarda la caché de
+        fechas; llamar al final de cada pasada.
+        """
+        self.extractor_fechas.guardar()
+        with self._lock:
+            if self._diario is None:
+                return
+            try:
+                os.fsync(self._diario.fileno())
+            except OSError as e:
+                logger.error(f"Error sincronizando diario de movimientos por fecha: {e}")
+            self._compactar_si_necesario()
+    
+    def _compactar_si_necesario(self):
+        # Llamar con el lock adquirido
+        if self._lineas_diario > 1000 and self._lineas_diario > 2 * (len(self.registro_movimientos) + 1):
+            try:
+                self._compactar()
+            except Exception as e:
+                logger.error(f"Error compactando diario de movimientos por fecha: {e}")
+    
+    def _compactar(self):
+        """Reescribe el diario solo con los movimientos vigentes (escritura atómica)."""
+        temporal = self.archivo_diario.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            for movimiento in self.registro_movimientos:
+                f.write(json.dumps(movimiento, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        if self._diario is not None:
+            self._diario.close()
+            self._diario = None
+        os.replace(temporal, self.archivo_diario)
+        self._lineas_diario = len(self.registro_movimientos)
+        logger.debug(f"Diario de movimientos por fecha compactado: {self._lineas_diario} líneas")
+    
+    def cerrar(self):
+        """Sincroniza y cierra el diario (y guarda la caché de fechas)."""
+        with self._lock:
+            self.sincronizar()
+            if self._diario is not None:
+                self._diario.close()
+                self._diario = None
+    
     def _guardar_configuracion(self):
-        """Guarda la configuración de organización por fechas."""
+        """Guarda la configuración de organización por fechas (sin el historial)."""
         try:
             data = {
                 'activo': self.activo,
                 'patron_fechas': self.patron_fechas,
-                'ultima_actualizacion': datetime.now().isoformat(),
-                'registro_movimientos': self.registro_movimientos[-1000:]  # Mantener últimos 1000
+                'fuentes_fecha': self.fuentes_fecha,
+                'ultima_actualizacion': datetime.now().isoformat()
             }
-            
-            with open(self.archivo_registro, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.configuracion.guardar(data)
             
         except Exception as e:
             logger.error(f"Error guardando configuración de fechas: {e}")
@@ -106,7 +225,38 @@ class OrganizadorPorFecha:
         logger.info("❌ Organización por fechas desactivada")
         return True
     
-    def obtener_carpeta_fecha(self, archivo: Path, categoria: str, subcategoria: Optional[str] = None) -> Path:
+    def configurar_fuentes(self, fuentes: List[str]) -> bool:
+        """
+        Elige qué fuentes de fecha se prueban y en qué orden.
+        
+        Args:
+            fuentes: Nombres de FUENTES_FECHA, p. ej. ['exif', 'nombre', 'modificacion']
+        
+        Returns:
+            True si se aplicó la configuración
+        """
+        desconocidas = [fuente for fuente in fuentes if fuente not in FUENTES_FECHA]
+        if not fuentes or desconocidas:
+            logger.error(f"Fuentes de fecha inválidas: {desconocidas or fuentes}. Válidas: {list(FUENTES_FECHA)}")
+            return False
+        
+        self.fuentes_fecha = list(fuentes)
+        self.extractor_fechas.configurar(self.fuentes_fecha)
+        self._guardar_configuracion()
+        logger.info(f"📅 Fuentes de fecha: {', '.join(self.fuentes_fecha)}")
+        return True
+    
+    def precargar_fechas(self, archivos: List[Path], stats: Optional[Dict[Path, Any]] = None):
+        """Extrae en paralelo las fechas de los archivos de un escaneo (si está activo)."""
+        if not self.activo or not archivos:
+            return
+        try:
+            self.extractor_fechas.precargar(archivos, stats)
+        except Exception as e:
+            logger.error(f"Error extrayendo fechas: {e}")
+    
+    def obtener_carpeta_fecha(self, archivo: Path, categoria: str, subcategoria: Optional[str] = None,
+                              stat_resultado: Optional[os.stat_result] = None) -> Path:
         """
         Obtiene la carpeta de destino basada en la fecha del archivo.
         
@@ -114,6 +264,7 @@ class OrganizadorPorFecha:
             archivo: Archivo a organizar
             categoria: Categoría del archivo
             subcategoria: Subcategoría del archivo
+            stat_resultado: stat del archivo si quien llama ya lo tiene
             
         Returns:
             Ruta de la carpeta de destino
@@ -126,9 +277,8 @@ class OrganizadorPorFecha:
             return carpeta_destino
         
         try:
-            # Obtener fecha del archivo (modificación por defecto)
-            timestamp = archivo.stat().st_mtime
-            fecha = datetime.fromtimestamp(timestamp)
+            # Fecha según las fuentes configuradas (caché por identidad de archivo)
+            fecha, _ = self.extractor_fechas.obtener(archivo, stat_resultado)
             
             # Generar ruta según patrón
             carpeta_fecha = self._generar_carpeta_fecha(fecha)
@@ -185,134 +335,138 @@ class OrganizadorPorFecha:
             categoria: Categoría asignada
             subcategoria: Subcategoría asignada
         """
-        movimiento = {
-            'timestamp': datetime.now().isoformat(),
-            'origen': str(archivo_origen),
-            'destino': str(archivo_destino),
-            'categoria': categoria,
-            'subcategoria': subcategoria,
-            'patron_usado': self.patron_fechas,
-            'activo_fecha': self.activo
-        }
-        
-        self.registro_movimientos.append(movimiento)
-        
-        # Mantener solo los últimos 1000 movimientos
-        if len(self.registro_movimientos) > 1000:
-            self.registro_movimientos = self.registro_movimientos[-1000:]
-        
-        self._guardar_configuracion()
+        with self._lock:
+            self._ultimo_numero += 1
+            movimiento = {
+                'n': self._ultimo_numero,
+                'timestamp': datetime.now().isoformat(),
+                'origen': str(archivo_origen),
+                'destino': str(archivo_destino),
+                'categoria': categoria,
+                'subcategoria': subcategoria,
+                'patron_usado': self.patron_fechas,
+                'activo_fecha': self.activo
+            }
+            
+            self.registro_movimientos.append(movimiento)
+            try:
+                self._escribir_diario(movimiento)
+            except Exception as e:
+                logger.error(f"Error escribiendo diario de movimientos por fecha: {e}")
+    
+    def _peticiones_reversion(self, movimientos: List[Dict[str, Any]]) -> List[Tuple[Path, Path, Optional[int]]]:
+        """Movimiento inverso de cada entrada: de Fechas/... a Categoría/Subcategoría."""
+        peticiones = []
+        for movimiento in reversed(movimientos):  # Revertir en orden inverso
+            archivo_actual = Path(movimiento['destino'])
+            carpeta_categoria = self.carpeta_descargas / movimiento['categoria']
+            
+            # Determinar destino según si había subcategoría
+            if movimiento.get('subcategoria') and movimiento['subcategoria'] != "General":
+                archivo_destino = carpeta_categoria / movimiento['subcategoria'] / archivo_actual.name
+            else:
+                archivo_destino = carpeta_categoria / archivo_actual.name
+            peticiones.append((archivo_actual, archivo_destino, movimiento.get('n')))
+        return peticiones
     
-    def revertir_organizacion_fechas(self, confirmar: bool = False) -> Dict[str, Any]:
+    def revertir_organizacion_fechas(self, confirmar: bool = False, progreso=None,
+                                     cancelacion=None) -> Dict[str, Any]:
         """
         Revierte la organización por fechas, moviendo archivos de vuelta.
         
+        Los movimientos se planifican a partir del diario, se ejecutan en
+        paralelo y se anotan por bloques: una reversión interrumpida se
+        reanuda en la siguiente llamada (ver MotorReversion).
+        
         Args:
             confirmar: Si True, ejecuta la reversión. Si False, solo simula.
+            progreso: Callable opcional que recibe (completados, total)
+            cancelacion: Objeto opcional con is_set() para interrumpirla
             
         Returns:
             Diccionario con información de la reversión
         """
-        if not self.registro_movimientos:
-            return {
-                'exito': False,
-                'mensaje': 'No hay movimientos registrados para revertir',
-                'archivos_afectados': 0
-            }
+        motor = MotorReversion(self.carpeta_descargas, REVERTIR_FECHAS)
         
         # Filtrar solo movimientos con organización por fechas
-        movimientos_fecha = [
-            m for m in self.registro_movimientos 
-            if m.get('activo_fecha', False) and 'Fechas/' in m.get('destino', '')
-        ]
+        carpeta_fechas = self.carpeta_descargas / "Fechas"
+        with self._lock:
+            movimientos_fecha = [
+                m for m in self.registro_movimientos 
+                if m.get('activo_fecha', False) and carpeta_fechas in Path(m.get('destino', '')).parents
+            ]
         
-        if not movimientos_fecha:
+        if not movimientos_fecha and not (confirmar and motor.pendiente()):
             return {
                 'exito': False,
                 'mensaje': 'No hay movimientos por fecha para revertir',
                 'archivos_afectados': 0
             }
         
-        archivos_revertidos = 0
-        archivos_no_encontrados = 0
-        errores = []
+        if not confirmar:
+            existentes = sum(1 for m in movimientos_fecha if Path(m['destino']).exists())
+            logger.info(f"📋 Simulación: se revertirían {existentes} archivos")
+            return {
+                'exito': True,
+                'archivos_revertidos': existentes,
+                'archivos_no_encontrados': len(movimientos_fecha) - existentes,
+                'errores': [],
+                'fue_simulacion': True
+            }
         
-        logger.info(f"🔄 {'Simulando' if not confirmar else 'Ejecutando'} reversión de {len(movimientos_fecha)} movimientos...")
+        logger.info(f"🔄 Ejecutando reversión de {len(movimientos_fecha)} movimientos...")
+        resultado_motor = motor.revertir(lambda: self._peticiones_reversion(movimientos_fecha),
+                                         progreso, cancelacion)
         
-        for movimiento in reversed(movimientos_fecha):  # Revertir en orden inverso
-            try:
-                archivo_actual = Path(movimiento['destino'])
-                carpeta_categoria = self.carpeta_descargas / movimiento['categoria']
-                
-                # Determinar destino según si había subcategoría
-                if movimiento.get('subcategoria') and movimiento['subcategoria'] != "General":
-                    archivo_destino = carpeta_categoria / movimiento['subcategoria'] / archivo_actual.name
-                else:
-                    archivo_destino = carpeta_categoria / archivo_actual.name
-                
-                if archivo_actual.exists():
-                    if confirmar:
-                        # Crear carpeta destino si no existe
-                        archivo_destino.parent.mkdir(parents=True, exist_ok=True)
-                        
-                        # Mover archivo
-                        shutil.move(str(archivo_actual), str(archivo_destino))
-                        logger.debug(f"Revertido: {archivo_actual.name} → {archivo_destino}")
-                    
-                    archivos_revertidos += 1
-                else:
-                    archivos_no_encontrados += 1
-                    
-            except Exception as e:
-                error_msg = f"Error revirtiendo {movimiento.get('destino', 'archivo')}: {e}"
-                errores.append(error_msg)
-                logger.error(error_msg)
+        # Limpiar carpetas vacías de fechas (solo las que quedaron vacías)
+        self._limpiar_carpetas_fechas_vacias([Path(m['o']) for m in resultado_motor['completados']])
         
-        if confirmar:
-            # Limpiar carpetas vacías de fechas
-            self._limpiar_carpetas_fechas_vacias()
-            
-            # Limpiar registro de movimientos revertidos
-            self.registro_movimientos = [
-                m for m in self.registro_movimientos 
-                if not (m.get('activo_fecha', False) and 'Fechas/' in m.get('destino', ''))
-            ]
-            self._guardar_configuracion()
+        # Marcar en el diario los movimientos resueltos (los fallidos siguen vigentes)
+        with self._lock:
+            revertidos = {m['n'] for m in resultado_motor['completados'] if m.get('n') is not None}
+            if revertidos:
+                self.registro_movimientos = [
+                    m for m in self.registro_movimientos if m.get('n') not in revertidos
+                ]
+                try:
+                    self._escribir_diario({'revertidos': sorted(revertidos),
+                                           'timestamp': datetime.now().isoformat()})
+                except Exception as e:
+                    logger.error(f"Error escribiendo diario de movimientos por fecha: {e}")
+                self.sincronizar()
         
         resultado = {
             'exito': True,
-            'archivos_revertidos': archivos_revertidos,
-            'archivos_no_encontrados': archivos_no_encontrados,
-            'errores': errores,
-            'fue_simulacion': not confirmar
+            'archivos_revertidos': resultado_motor['movidos'] + resultado_motor['ya_hechos'],
+            'archivos_no_encontrados': resultado_motor['no_encontrados'],
+            'errores': resultado_motor['errores'],
+            'fue_simulacion': False,
+            'cancelado': resultado_motor['cancelado']
         }
         
-        if confirmar:
-            logger.info(f"✅ Reversión completada: {archivos_revertidos} archivos revertidos")
-        else:
-            logger.info(f"📋 Simulación: se revertirían {archivos_revertidos} archivos")
-        
+        if not resultado['cancelado']:
+            logger.info(f"✅ Reversión completada: {resultado['archivos_revertidos']} archivos revertidos")
         return resultado
     
-    def _limpiar_carpetas_fechas_vacias(self):
-        """Limpia carpetas vacías dentro de la estructura de fechas."""
+    def _limpiar_carpetas_fechas_vacias(self, origenes: List[Path]):
+        """
+        Limpia carpetas vacías dentro de la estructura de fechas.
+        
+        Args:
+            origenes: Rutas de las que salieron archivos; solo se revisan sus
+                      carpetas y, al vaciarse, las superiores
+        """
         carpeta_fechas = self.carpeta_descargas / "Fechas"
         
-        if not carpeta_fechas.exists():
-            return
+        def fuera_de_fechas(carpeta: Path) -> bool:
+            return carpeta != carpeta_fechas and carpeta_fechas not in carpeta.parents
         
         try:
-            # Limpiar desde las carpetas más profundas hacia arriba
-            for ruta in sorted(carpeta_fechas.rglob("*"), key=lambda p: len(p.parts), reverse=True):
-                if ruta.is_dir() and not any(ruta.iterdir()):
-                    ruta.rmdir()
-                    logger.debug(f"Carpeta vacía eliminada: {ruta}")
-            
-            # Eliminar carpeta Fechas si está vacía
-            if not any(carpeta_fechas.iterdir()):
-                carpeta_fechas.rmdir()
-                logger.info("📁 Carpeta 'Fechas' eliminada (estaba vacía)")
-                
+            for carpeta in podar_tras_mover(self.carpeta_descargas, origenes, fuera_de_fechas):
+                if carpeta == carpeta_fechas:
+                    logger.info("📁 Carpeta 'Fechas' eliminada (estaba vacía)")
+                else:
+                    logger.debug(f"Carpeta vacía eliminada: {carpeta}")
         except Exception as e:
             logger.error(f"Error limpiando carpetas de fechas: {e}")
     
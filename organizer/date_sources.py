@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fuentes de fecha para la organización por fechas (EXIF, metadatos de PDF y
+vídeo, patrones del nombre, fecha de modificación) con caché persistente
+"""
+
+import io
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from .file_features import identidad_archivo
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Bytes máximos leídos por fuente: nunca se lee un archivo completo
+MAX_LECTURA_EXIF = 128 * 1024
+MAX_LECTURA_PDF = 64 * 1024
+# Lecturas simultáneas durante un escaneo
+MAX_LECTORES = 8
+
+# Fechas fuera de este rango se consideran basura (relojes sin configurar)
+AÑO_MINIMO = 1990
+
+FuenteFecha = Callable[[Path, os.stat_result], Optional[datetime]]
+
+
+def _fecha_valida(fecha: Optional[datetime]) -> Optional[datetime]:
+    if fecha is None:
+        return None
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    if fecha.year < AÑO_MINIMO or fecha > datetime.now() + timedelta(days=366):
+        return None
+    return fecha
+
+
+def _leer(archivo: Path, tamaño: int, desde_final: bool = False) -> bytes:
+    with open(archivo, 'rb') as f:
+        if desde_final:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - tamaño))
+        return f.read(tamaño)
+
+
+# --- Fuentes ---
+
+EXTENSIONES_EXIF = {'.jpg', '.jpeg', '.tif', '.tiff', '.webp', '.heic', '.png'}
+ETIQUETA_IFD_EXIF = 0x8769
+ETIQUETA_FECHA_ORIGINAL = 36867  # DateTimeOriginal
+ETIQUETA_FECHA = 306             # DateTime
+
+
+def fecha_exif(archivo: Path, stat_resultado: os.stat_result) -> Optional[datetime]:
+    """DateTimeOriginal (o DateTime) del EXIF, con Pillow sobre la cabecera."""
+    if not PIL_AVAILABLE or archivo.suffix.lower() not in EXTENSIONES_EXIF:
+        return None
+    try:
+        # El EXIF va al principio: Pillow trabaja sobre los primeros bytes
+        with Image.open(io.BytesIO(_leer(archivo, MAX_LECTURA_EXIF))) as imagen:
+            exif = imagen.getexif()
+            valor = exif.get_ifd(ETIQUETA_IFD_EXIF).get(ETIQUETA_FECHA_ORIGINAL) or exif.get(ETIQUETA_FECHA)
+    except Exception:
+        return None
+    if not valor:
+        return None
+    try:
+        return _fecha_valida(datetime.strptime(str(valor).strip('\x00 ')[:19], '%Y:%m:%d %H:%M:%S'))
+    except ValueError:
+        return None
+
+
+PATRON_FECHA_PDF = re.compile(rb'/CreationDate\s*\(D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?')
+PATRON_FECHA_XMP = re.compile(rb'<xmp:CreateDate>(\d{4})-(\d{2})-(\d{2})(?:T(\d{2}):(\d{2}):?(\d{2})?)?')
+
+
+def fecha_pdf(archivo: Path, stat_resultado: os.stat_result) -> Optional[datetime]:
+    """CreationDate del diccionario Info o xmp:CreateDate (principio y final del archivo)."""
+    if archivo.suffix.lower() != '.pdf':
+        return None
+    try:
+        bloques = [_leer(archivo, MAX_LECTURA_PDF)]
+        if stat_resultado.st_size > MAX_LECTURA_PDF:
+            # El diccionario Info suele estar cerca del trailer
+            bloques.append(_leer(archivo, MAX_LECTURA_PDF, desde_final=True))
+    except OSError:
+        return None
+    for bloque in bloques:
+        coincidencia = PATRON_FECHA_PDF.search(bloque) or PATRON_FECHA_XMP.search(bloque)
+        if coincidencia:
+            partes = [int(parte) if parte else valor_defecto
+                      for parte, valor_defecto in zip(coincidencia.groups(), (0, 1, 1, 0, 0, 0))]
+            try:
+                return _fecha_valida(datetime(*partes))
+            except ValueError:
+                continue
+    return None
+
+
+EXTENSIONES_VIDEO_ISO = {'.mp4', '.mov', '.m4v', '.3gp', '.m4a'}
+# Segundos entre 1904-01-01 (época de QuickTime/MP4) y 1970-01-01
+DESFASE_EPOCA_MP4 = 2082844800
+
+
+def fecha_video(archivo: Path, stat_resultado: os.stat_result) -> Optional[datetime]:
+    """creation_time de la caja mvhd (MP4/MOV), saltando cajas sin leerlas."""
+    if archivo.suffix.lower() not in EXTENSIONES_VIDEO_ISO:
+        return None
+    try:
+        with open(archivo, 'rb') as f:
+            posicion = 0
+            tamaño_archivo = stat_resultado.st_size
+            # Cajas de primer nivel: solo se leen las cabeceras (moov puede ir al final)
+            while posicion + 8 <= tamaño_archivo:
+                f.seek(posicion)
+                cabecera = f.read(16)
+                if len(cabecera) < 8:
+                    return None
+                tamaño_caja, tipo = struct.unpack('>I4s', cabecera[:8])
+                inicio_datos = 8
+                if tamaño_caja == 1:
+                    tamaño_caja = struct.unpack('>Q', cabecera[8:16])[0]
+                    inicio_datos = 16
+                elif tamaño_caja == 0:
+                    tamaño_caja = tamaño_archivo - posicion
+                if tamaño_caja < inicio_datos:
+                    return None
+                if tipo == b'moov':
+                    f.seek(posicion + inicio_datos)
+                    return _fecha_mvhd(f.read(min(tamaño_caja - inicio_datos, 4096)))
+                posicion += tamaño_caja
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def _fecha_mvhd(moov: bytes) -> Optional[datetime]:
+    posicion = 0
+    while posicion + 8 <= len(moov):
+        tamaño_caja, tipo = struct.unpack('>I4s', moov[posicion:posicion + 8])
+        if tipo == b'mvhd':
+            version = moov[posicion + 8]
+            if version == 1:
+                segundos = struct.unpack('>Q', moov[posicion + 12:posicion + 20])[0]
+            else:
+                segundos = struct.unpack('>I', moov[posicion + 12:posicion + 16])[0]
+            if segundos <= DESFASE_EPOCA_MP4:
+                return None  # 0 = sin fecha
+            fecha = datetime.fromtimestamp(segundos - DESFASE_EPOCA_MP4, tz=timezone.utc)
+            return _fecha_valida(fecha)
+        if tamaño_caja < 8:
+            return None
+        posicion += tamaño_caja
+    return None
+
+
+# IMG_20240131_123456, VID-20240131-WA0001, PXL_20240131_123456789,
+# 20240131_123456, Screenshot_2024-01-31-12-34-56, WhatsApp Image 2024-01-31 at 12.34.56
+PATRON_FECHA_NOMBRE = re.compile(
+    r'(?<!\d)((?:19|20)\d{2})[-_.]?(0[1-9]|1[0-2])[-_.]?(0[1-9]|[12]\d|3[01])(?!\d)'
+    r'(?:(?:[-_ T]|\s+at\s+)([01]\d|2[0-3])[-_.:]?([0-5]\d)[-_.:]?([0-5]\d))?'
+)
+
+
+def fecha_nombre(archivo: Path, stat_resultado: os.stat_result) -> Optional[datetime]:
+    """Fecha en el nombre, como la ponen cámaras, móviles y WhatsApp."""
+    coincidencia = PATRON_FECHA_NOMBRE.search(archivo.stem)
+    if not coincidencia:
+        return None
+    partes = [int(parte) if parte else 0 for parte in coincidencia.groups()]
+    try:
+        return _fecha_valida(datetime(*partes))
+    except ValueError:
+        return None
+
+
+def fecha_modificacion(archivo: Path, stat_resultado: os.stat_result) -> Optional[datetime]:
+    """Fecha de modificación (para descargas, la de descarga)."""
+    return datetime.fromtimestamp(stat_resultado.st_mtime)
+
+
+# Fuentes disponibles; registrar_fuente_fecha() añade otras
+FUENTES_FECHA: Dict[str, FuenteFecha] = {
+    'exif': fecha_exif,
+    'pdf': fecha_pdf,
+    'video': fecha_video,
+    'nombre': fecha_nombre,
+    'modificacion': fecha_modificacion,
+}
+
+# Orden por defecto: metadatos del contenido, luego el nombre, luego mtime
+FUENTES_POR_DEFECTO = ['exif', 'pdf', 'video', 'nombre', 'modificacion']
+
+
+def registrar_fuente_fecha(nombre: str, funcion: FuenteFecha):
+    """
+    Añade una fuente de fecha.
+
+    Args:
+        nombre: Nombre con el que se activa en la configuración
+        funcion: Recibe (archivo, stat) y retorna un datetime o None; debe
+                 leer como mucho la cabecera del archivo
+    """
+    FUENTES_FECHA[nombre] = funcion
+
+
+class ExtractorFechas:
+    """
+    Obtiene la fecha de un archivo probando las fuentes configuradas en
+    orden; si ninguna da resultado se usa la fecha de modificación.
+
+    Los resultados se guardan por identidad de archivo (dispositivo, inodo,
+    tamaño, mtime_ns) junto con el nombre, como la caché de clasificación:
+    mover el archivo no cambia la clave, así que una reorganización no vuelve
+    a leer ningún archivo. Cambiar las fuentes invalida la caché.
+    """
+
+    def __init__(self, carpeta_config: Path, fuentes: Optional[List[str]] = None,
+                 capacidad: int = 50000):
+        self.archivo_cache = Path(carpeta_config) / "cache_fechas.json"
+        self.capacidad = capacidad
+        self._entradas: 'OrderedDict[Tuple[int, int, int, int], Tuple[str, float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._cambios_pendientes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.fuentes: List[str] = []
+        self._cargar_cache()
+        self.configurar(fuentes or FUENTES_POR_DEFECTO)
+
+    def configurar(self, fuentes: List[str]):
+        """Fija el orden de las fuentes; si cambia, la caché se vacía."""
+        desconocidas = [fuente for fuente in fuentes if fuente not in FUENTES_FECHA]
+        if desconocidas:
+            logger.warning(f"Fuentes de fecha desconocidas ignoradas: {desconocidas}")
+        fuentes = [fuente for fuente in fuentes if fuente in FUENTES_FECHA]
+        with self._lock:
+            if fuentes != self.fuentes:
+                if self._entradas and self.fuentes:
+                    logger.info("📅 Fuentes de fecha cambiadas: caché de fechas invalidada")
+                    self._entradas.clear()
+                self.fuentes = fuentes
+                self._cambios_pendientes += 1
+
+    @property
+    def firma(self) -> str:
+        return ','.join(self.fuentes)
+
+    def _cargar_cache(self):
+        if not self.archivo_cache.exists():
+            return
+        try:
+            with open(self.archivo_cache, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.fuentes = data.get('fuentes', '').split(',') if data.get('fuentes') else []
+            for clave, (nombre, timestamp, fuente) in data.get('entradas', {}).items():
+                self._entradas[tuple(int(parte) for parte in clave.split(':'))] = (nombre, timestamp, fuente)
+        except Exception as e:
+            logger.error(f"Error cargando caché de fechas: {e}")
+            self._entradas.clear()
+
+    def guardar(self):
+        """Guarda la caché si cambió."""
+        with self._lock:
+            if not self._cambios_pendientes:
+                return
+            data = {
+                'fuentes': self.firma,
+                'ultima_actualizacion': datetime.now().isoformat(),
+                'entradas': {
+                    ':'.join(str(parte) for parte in clave): list(entrada)
+                    for clave, entrada in self._entradas.items()
+                }
+            }
+            self._cambios_pendientes = 0
+        try:
+            temporal = self.archivo_cache.with_suffix('.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temporal, self.archivo_cache)
+        except Exception as e:
+            logger.error(f"Error guardando caché de fechas: {e}")
+
+    def _extraer(self, archivo: Path, stat_resultado: os.stat_result) -> Tuple[datetime, str]:
+        for nombre in self.fuentes:
+            try:
+                fecha = FUENTES_FECHA[nombre](archivo, stat_resultado)
+            except Exception as e:
+                logger.debug(f"Fuente de fecha '{nombre}' falló con {archivo.name}: {e}")
+                continue
+            if fecha is not None:
+                return fecha, nombre
+        return datetime.fromtimestamp(stat_resultado.st_mtime), 'modificacion'
+
+    def obtener(self, archivo: Path, stat_resultado: Optional[os.stat_result] = None) -> Tuple[datetime, str]:
+        """
+        Fecha del archivo y la fuente que la dio.
+
+        Args:
+            archivo: Archivo a fechar
+            stat_resultado: stat del archivo si quien llama ya lo tiene
+        """
+        if stat_resultado is None:
+            stat_resultado = archivo.stat()
+        clave = identidad_archivo(stat_resultado)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == archivo.name:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return datetime.fromtimestamp(entrada[1]), entrada[2]
+            self.fallos += 1
+
+        fecha, fuente = self._extraer(archivo, stat_resultado)
+        with self._lock:
+            self._entradas[clave] = (archivo.name, fecha.timestamp(), fuente)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+            self._cambios_pendientes += 1
+        return fecha, fuente
+
+    def _precargar_uno(self, archivo: Path, stat_resultado: Optional[os.stat_result]) -> bool:
+        if stat_resultado is None:
+            try:
+                stat_resultado = archivo.stat()
+            except OSError:
+                return False
+        with self._lock:
+            entrada = self._entradas.get(identidad_archivo(stat_resultado))
+        if entrada is not None and entrada[0] == archivo.name:
+            return False
+        self.obtener(archivo, stat_resultado)
+        return True
+
+    def precargar(self, archivos: List[Path], stats: Optional[Dict[Path, Optional[os.stat_result]]] = None) -> int:
+        """
+        Extrae en paralelo las fechas que falten en la caché (durante un
+        escaneo, antes de mover). La caché se guarda con guardar(), una vez
+        por pasada.
+
+        Returns:
+            Número de archivos cuya fecha hubo que extraer
+        """
+        if not archivos:
+            return 0
+        stats = stats or {}
+        if len(archivos) == 1:
+            return int(self._precargar_uno(archivos[0], stats.get(archivos[0])))
+        with ThreadPoolExecutor(max_workers=min(MAX_LECTORES, len(archivos)),
+                                thread_name_prefix='fechas') as pool:
+            return sum(pool.map(lambda archivo: self._precargar_uno(archivo, stats.get(archivo)), archivos))
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Tamaño y tasa de aciertos de la caché."""
+        total = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'fuentes': list(self.fuentes),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / total if total else 0.0
+        }
@@ -7,13 +7,16 @@ Detector de archivos duplicados basado en hash y tamaño
 
 import hashlib
 import os
-import json
+import time
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional, Any
+from typing import Callable, Dict, List, Set, Tuple, Optional, Any
 import logging
 from datetime import datetime
 from collections import defaultdict
 
+from .metrics import BYTES_HASH, DURACION_HASH, registrar_error
+from .storage import DocumentoConfig, transaccion_config
+
 logger = logging.getLogger(__name__)
 
 class DetectorDuplicados:
@@ -21,27 +24,35 @@ class DetectorDuplicados:
     Detecta archivos duplicados usando hash MD5/SHA256 y tamaño.
     """
     
+    # Lecturas de 8 KB entre consultas de cancelación al calcular un hash (1 MB)
+    BLOQUES_ENTRE_CANCELACION = 128
+    # Segundos mínimos entre avisos de progreso
+    INTERVALO_PROGRESO = 0.1
+    
     def __init__(self, carpeta_descargas: Path):
         self.carpeta_descargas = carpeta_descargas
         self.carpeta_config = carpeta_descargas / ".config"
         self.carpeta_config.mkdir(exist_ok=True)
-        self.archivo_cache = self.carpeta_config / "cache_duplicados.json"
-        self.archivo_duplicados = self.carpeta_config / "duplicados_encontrados.json"
+        self.documento_cache = DocumentoConfig(self.carpeta_config, 'duplicados.cache', "cache_duplicados.json")
+        self.documento_duplicados = DocumentoConfig(self.carpeta_config, 'duplicados.encontrados',
+                                                    "duplicados_encontrados.json")
         self.cache_hashes: Dict[str, Dict[str, Any]] = {}
         self.duplicados_encontrados: List[Dict[str, Any]] = []
         self.algoritmo_hash = 'md5'  # 'md5' o 'sha256'
         self.usar_cache = True
         self._cargar_cache()
     
-    def calcular_hash_archivo(self, archivo: Path) -> Optional[str]:
+    def calcular_hash_archivo(self, archivo: Path, cancelacion=None) -> Optional[str]:
         """
         Calcula el hash de un archivo.
         
         Args:
             archivo: Ruta al archivo
+            cancelacion: Objeto opcional con is_set(); se consulta cada
+                         BLOQUES_ENTRE_CANCELACION lecturas
             
         Returns:
-            Hash del archivo o None si hay error
+            Hash del archivo o None si hay error o se canceló
         """
         # Verificar cache primero
         ruta_str = str(archivo)
@@ -63,12 +74,22 @@ class DetectorDuplicados:
             else:
                 hasher = hashlib.sha256()
             
+            inicio = time.perf_counter()
+            leidos = 0
             with open(archivo, 'rb') as f:
                 # Leer en chunks para archivos grandes
+                bloques = 0
                 while chunk := f.read(8192):
                     hasher.update(chunk)
+                    leidos += len(chunk)
+                    bloques += 1
+                    if (cancelacion is not None and bloques % self.BLOQUES_ENTRE_CANCELACION == 0
+                            and cancelacion.is_set()):
+                        return None
             
             hash_resultado = hasher.hexdigest()
+            DURACION_HASH.observar(time.perf_counter() - inicio)
+            BYTES_HASH.inc(leidos)
             
             # Guardar en cache
             if self.usar_cache:
@@ -83,20 +104,20 @@ class DetectorDuplicados:
             return hash_resultado
             
         except (IOError, PermissionError) as e:
+            registrar_error('hash', e)
             logger.warning(f"No se pudo calcular hash de {archivo}: {e}")
             return None
         except Exception as e:
+            registrar_error('hash', e)
             logger.error(f"Error calculando hash de {archivo}: {e}")
             return None
     
     def _cargar_cache(self):
         """Carga el cache de hashes calculados anteriormente."""
-        if not self.archivo_cache.exists():
-            return
-        
         try:
-            with open(self.archivo_cache, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self.documento_cache.cargar()
+            if data is None:
+                return
             
             self.cache_hashes = data.get('hashes', {})
             self.algoritmo_hash = data.get('algoritmo', 'md5')
@@ -121,12 +142,12 @@ class DetectorDuplicados:
                 'hashes': cache_limpio
             }
             
-            with open(self.archivo_cache, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
+            self.documento_cache.guardar(data)
             self.cache_hashes = cache_limpio
             
         except Exception as e:
+            if self.documento_cache.en_transaccion():
+                raise
             logger.error(f"Error guardando cache de duplicados: {e}")
     
     def _guardar_duplicados(self):
@@ -139,23 +160,29 @@ class DetectorDuplicados:
                 'duplicados': self.duplicados_encontrados
             }
             
-            with open(self.archivo_duplicados, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.documento_duplicados.guardar(data)
             
         except Exception as e:
+            if self.documento_duplicados.en_transaccion():
+                raise
             logger.error(f"Error guardando duplicados: {e}")
     
     def escanear_duplicados(self, incluir_subcarpetas: bool = True, 
-                          tamaño_minimo: int = 1024) -> Dict[str, Any]:
+                          tamaño_minimo: int = 1024, cancelacion=None,
+                          progreso: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
         Escanea la carpeta en busca de archivos duplicados.
         
         Args:
             incluir_subcarpetas: Si incluir subcarpetas en el escaneo
             tamaño_minimo: Tamaño mínimo en bytes para considerar archivo
+            cancelacion: Objeto opcional con is_set(); si se activa, el escaneo
+                         se detiene sin tocar los duplicados guardados
+            progreso: Función opcional que recibe (hashes calculados, total)
             
         Returns:
-            Diccionario con resultados del escaneo
+            Diccionario con resultados del escaneo ('cancelado': True si se
+            detuvo antes de terminar)
         """
         logger.info("🔍 Iniciando escaneo de duplicados...")
         
@@ -170,6 +197,8 @@ class DetectorDuplicados:
         # Primera pasada: agrupar por tamaño
         patron = "**/*" if incluir_subcarpetas else "*"
         for archivo in self.carpeta_descargas.glob(patron):
+            if cancelacion is not None and cancelacion.is_set():
+                return self._escaneo_cancelado(archivos_escaneados, archivos_procesados)
             if not archivo.is_file():
                 continue
             
@@ -186,6 +215,9 @@ class DetectorDuplicados:
         
         # Segunda pasada: calcular hashes solo para archivos con mismo tamaño
         grupos_duplicados = []
+        total_hashes = sum(len(archivos) for archivos in archivos_por_tamaño.values() if len(archivos) > 1)
+        avisar = self._avisador_progreso(progreso, total_hashes)
+        hechos = 0
         
         for tamaño, archivos in archivos_por_tamaño.items():
             if len(archivos) < 2:
@@ -195,10 +227,14 @@ class DetectorDuplicados:
             
             # Calcular hashes para archivos con el mismo tamaño
             for archivo in archivos:
-                hash_archivo = self.calcular_hash_archivo(archivo)
+                if cancelacion is not None and cancelacion.is_set():
+                    return self._escaneo_cancelado(archivos_escaneados, archivos_procesados)
+                hash_archivo = self.calcular_hash_archivo(archivo, cancelacion)
                 if hash_archivo:
                     archivos_por_hash[hash_archivo].append(archivo)
                     archivos_procesados += 1
+                hechos += 1
+                avisar(hechos)
         
         # Identificar grupos de duplicados
         for hash_valor, archivos in archivos_por_hash.items():
@@ -232,8 +268,12 @@ class DetectorDuplicados:
         grupos_duplicados.sort(key=lambda g: g['tamaño'], reverse=True)
         
         self.duplicados_encontrados = grupos_duplicados
-        self._guardar_duplicados()
-        self._guardar_cache()
+        try:
+            with transaccion_config(self.carpeta_config):
+                self._guardar_duplicados()
+                self._guardar_cache()
+        except Exception as e:
+            logger.error(f"Error guardando el resultado del escaneo: {e}")
         
         # Calcular estadísticas
         total_duplicados = sum(g['cantidad'] - 1 for g in grupos_duplicados)  # -1 porque uno no es duplicado
@@ -246,7 +286,8 @@ class DetectorDuplicados:
             'total_duplicados': total_duplicados,
             'espacio_desperdiciado': espacio_desperdiciado,
             'espacio_desperdiciado_legible': self._formatear_bytes(espacio_desperdiciado),
-            'duplicados': grupos_duplicados
+            'duplicados': grupos_duplicados,
+            'cancelado': False
         }
         
         logger.info(f"✅ Escaneo completado: {len(grupos_duplicados)} grupos, {total_duplicados} duplicados")
@@ -255,13 +296,17 @@ class DetectorDuplicados:
         return resultado
     
     def eliminar_duplicados(self, estrategia: str = 'mas_nuevo', 
-                          confirmar: bool = False) -> Dict[str, Any]:
+                          confirmar: bool = False, cancelacion=None,
+                          progreso: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
         Elimina archivos duplicados según una estrategia.
         
         Args:
             estrategia: 'mas_nuevo', 'mas_viejo', 'carpeta_principal', 'manual'
             confirmar: Si True, ejecuta la eliminación. Si False, solo simula.
+            cancelacion: Objeto opcional con is_set(); si se activa, no se
+                         eliminan más archivos
+            progreso: Función opcional que recibe (archivos tratados, total)
             
         Returns:
             Diccionario con resultados de la eliminación
@@ -305,8 +350,13 @@ class DetectorDuplicados:
         errores = []
         espacio_liberado = 0
         
+        cancelado = False
         if confirmar:
-            for archivo_info in archivos_a_eliminar:
+            avisar = self._avisador_progreso(progreso, len(archivos_a_eliminar))
+            for hechos, archivo_info in enumerate(archivos_a_eliminar, 1):
+                if cancelacion is not None and cancelacion.is_set():
+                    cancelado = True
+                    break
                 try:
                     archivo = Path(archivo_info['ruta'])
                     if archivo.exists():
@@ -318,6 +368,7 @@ class DetectorDuplicados:
                     error_msg = f"Error eliminando {archivo_info['nombre']}: {e}"
                     errores.append(error_msg)
                     logger.error(error_msg)
+                avisar(hechos)
         
         resultado = {
             'exito': True,
@@ -328,12 +379,17 @@ class DetectorDuplicados:
             'espacio_liberado': espacio_liberado if confirmar else sum(a['tamaño'] for a in archivos_a_eliminar),
             'espacio_liberado_legible': self._formatear_bytes(espacio_liberado if confirmar else sum(a['tamaño'] for a in archivos_a_eliminar)),
             'errores': errores,
-            'fue_simulacion': not confirmar
+            'fue_simulacion': not confirmar,
+            'cancelado': cancelado
         }
         
         if confirmar:
-            logger.info(f"✅ Eliminación completada: {eliminados} archivos, {self._formatear_bytes(espacio_liberado)} liberados")
-            # Limpiar lista de duplicados encontrados
+            if cancelado:
+                logger.info(f"⏹️ Eliminación cancelada tras {eliminados} archivos")
+            else:
+                logger.info(f"✅ Eliminación completada: {eliminados} archivos, {self._formatear_bytes(espacio_liberado)} liberados")
+            # Limpiar lista de duplicados encontrados (tras cancelar ya no es
+            # fiable: hay que volver a escanear)
             self.duplicados_encontrados = []
             self._guardar_duplicados()
         else:
@@ -341,6 +397,36 @@ class DetectorDuplicados:
         
         return resultado
     
+    def _avisador_progreso(self, progreso: Optional[Callable[[int, int], None]],
+                           total: int) -> Callable[[int], None]:
+        """Devuelve avisar(hechos), que llama a `progreso` como mucho cada INTERVALO_PROGRESO."""
+        ultimo = [0.0]
+        
+        def avisar(hechos: int):
+            if progreso is None:
+                return
+            ahora = time.monotonic()
+            if hechos >= total or ahora - ultimo[0] >= self.INTERVALO_PROGRESO:
+                ultimo[0] = ahora
+                progreso(hechos, total)
+        
+        return avisar
+    
+    def _escaneo_cancelado(self, archivos_escaneados: int, archivos_procesados: int) -> Dict[str, Any]:
+        """Resultado de un escaneo interrumpido: conserva los hashes ya calculados."""
+        logger.info(f"⏹️ Escaneo de duplicados cancelado tras {archivos_procesados} hashes")
+        self._guardar_cache()
+        return {
+            'cancelado': True,
+            'archivos_escaneados': archivos_escaneados,
+            'archivos_procesados': archivos_procesados,
+            'grupos_duplicados': 0,
+            'total_duplicados': 0,
+            'espacio_desperdiciado': 0,
+            'espacio_desperdiciado_legible': self._formatear_bytes(0),
+            'duplicados': []
+        }
+    
     def obtener_duplicados_manual(self) -> List[Dict[str, Any]]:
         """
         Retorna la lista de duplicados para selección manual.
@@ -384,8 +470,10 @@ class DetectorDuplicados:
     def limpiar_cache(self):
         """Limpia el cache de hashes."""
         self.cache_hashes = {}
-        if self.archivo_cache.exists():
-            self.archivo_cache.unlink()
+        try:
+            self.documento_cache.borrar()
+        except Exception as e:
+            logger.error(f"Error borrando cache de duplicados: {e}")
         logger.info("🧹 Cache de duplicados limpiado")
     
     def configurar_algoritmo(self, algoritmo: str) -> bool:
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Extracción memoizada de características de nombre de archivo compartida por
+las reglas personalizadas, el categorizador IA y la detección inteligente
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Palabras demasiado comunes para aportar información de categoría
+PALABRAS_COMUNES = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one',
+    'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old',
+    'see', 'two', 'way', 'who', 'boy', 'did', 'man', 'oil', 'sit', 'usa', 'car', 'few', 'lot',
+    'run', 'sea', 'set', 'too', 'big', 'end', 'far', 'off', 'own', 'say', 'she', 'try', 'use'
+})
+
+_RE_CARACTERES_ESPECIALES = re.compile(r'[^\w\s-]')
+_RE_NUMEROS = re.compile(r'\b\d+[\d\.-]*\b')
+_RE_SEPARADORES = re.compile(r'[\s_-]+')
+
+
+def limpiar_texto(texto: str) -> str:
+    """Limpia el texto para análisis (sin caracteres especiales, números ni palabras cortas)."""
+    # Remover caracteres especiales y números
+    texto = _RE_CARACTERES_ESPECIALES.sub(' ', texto)
+    # Remover números de versión, fechas, etc.
+    texto = _RE_NUMEROS.sub(' ', texto)
+    # Remover palabras muy cortas
+    palabras = [p for p in texto.split() if len(p) > 2]
+    return ' '.join(palabras)
+
+
+def extraer_palabras(texto: str) -> List[str]:
+    """Extrae palabras significativas del texto."""
+    # Dividir por espacios, guiones, underscores
+    palabras = _RE_SEPARADORES.split(texto.lower())
+    return [p for p in palabras if len(p) > 2 and p not in PALABRAS_COMUNES]
+
+
+class CaracteristicasArchivo:
+    """
+    Registro inmutable con todo lo que los clasificadores necesitan del nombre
+    de un archivo y de su stat, calculado una sola vez por archivo y pasada.
+    No guarda la ruta: el mismo registro sirve aunque el archivo se mueva.
+    """
+
+    __slots__ = ('nombre', 'nombre_lower', 'stem_lower', 'extension',
+                 'extensiones', 'tokens', 'tamaño', 'mtime')
+
+    def __init__(self, ruta: Path, tamaño: int, mtime: float):
+        nombre = ruta.name
+        nombre_lower = nombre.lower()
+        self.nombre = nombre
+        self.nombre_lower = nombre_lower
+        self.stem_lower = ruta.stem.lower()
+        self.extension = ruta.suffix.lower()
+        self.extensiones: Tuple[str, ...] = tuple(s.lower() for s in ruta.suffixes)
+        self.tokens: Tuple[str, ...] = tuple(extraer_palabras(limpiar_texto(nombre_lower)))
+        self.tamaño = tamaño
+        self.mtime = mtime
+
+    def __repr__(self) -> str:
+        return f"CaracteristicasArchivo({self.nombre!r}, tamaño={self.tamaño}, tokens={self.tokens!r})"
+
+
+class CacheCaracteristicas:
+    """
+    Caché LRU acotada de características indexada por (nombre, tamaño, mtime).
+    Es segura para hilos porque el monitor en tiempo real clasifica en paralelo.
+    """
+
+    def __init__(self, capacidad: int = 4096):
+        self.capacidad = capacidad
+        self._entradas: 'OrderedDict[Tuple[str, int, float], CaracteristicasArchivo]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, archivo: Path, stat_resultado: Optional[os.stat_result] = None) -> CaracteristicasArchivo:
+        """
+        Obtiene las características de un archivo, calculándolas solo si no están en caché.
+
+        Args:
+            archivo: Archivo a analizar
+            stat_resultado: Resultado de stat ya obtenido durante el escaneo (evita otro stat)
+
+        Returns:
+            Características del archivo
+        """
+        if stat_resultado is None:
+            try:
+                stat_resultado = archivo.stat()
+            except OSError:
+                # Sin stat no hay clave fiable; se calcula sin cachear
+                return CaracteristicasArchivo(archivo, 0, 0.0)
+
+        clave = (archivo.name, stat_resultado.st_size, stat_resultado.st_mtime)
+
+        with self._lock:
+            caracteristicas = self._entradas.get(clave)
+            if caracteristicas is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return caracteristicas
+            self.fallos += 1
+
+        caracteristicas = CaracteristicasArchivo(archivo, stat_resultado.st_size, stat_resultado.st_mtime)
+
+        with self._lock:
+            self._entradas[clave] = caracteristicas
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+        return caracteristicas
+
+    def limpiar(self):
+        """Vacía la caché."""
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+class CacheLRU:
+    """Caché LRU acotada y segura para hilos para resultados por identidad de archivo."""
+
+    def __init__(self, capacidad: int = 2048):
+        self.capacidad = capacidad
+        self._entradas: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable, por_defecto: Any = None) -> Any:
+        with self._lock:
+            if clave not in self._entradas:
+                return por_defecto
+            self._entradas.move_to_end(clave)
+            return self._entradas[clave]
+
+    def guardar(self, clave: Hashable, valor: Any):
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+def identidad_archivo(stat_resultado: os.stat_result) -> Tuple[int, int, int, int]:
+    """Clave que identifica un contenido concreto: (dispositivo, inodo, tamaño, mtime_ns)."""
+    return (stat_resultado.st_dev, stat_resultado.st_ino,
+            stat_resultado.st_size, stat_resultado.st_mtime_ns)
+
+
+# Instancia global compartida por todos los clasificadores
+cache_caracteristicas = CacheCaracteristicas()
+
+
+def obtener_caracteristicas(archivo: Path, stat_resultado: Optional[os.stat_result] = None) -> CaracteristicasArchivo:
+    """Atajo para obtener las características de un archivo desde la caché global."""
+    return cache_caracteristicas.obtener(archivo, stat_resultado)
@@ -3,17 +3,25 @@
 
 import os
 import sys
-import json
 import shutil
 import stat
 import subprocess
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional, Any
+from typing import Dict, Iterator, List, Set, Tuple, Optional, Any
 import logging
 
 # Importar nuevos módulos
+from .classification_cache import CacheClasificacion
+from .file_features import CaracteristicasArchivo, identidad_archivo, obtener_caracteristicas
+from .folder_pruner import PodadorCarpetas, es_contenido_visible
+from .metrics import (ARCHIVOS_ESCANEADOS, ARCHIVOS_MOVIDOS, BYTES_MOVIDOS, DURACION_ETAPA,
+                      registrar_error)
+from .storage import DocumentoConfig, transaccion_config
+
 try:
-    from .smart_detection import DetectorInteligente
+    from .smart_detection import DetectorInteligente, leer_cabeceras
     SMART_DETECTION_AVAILABLE = True
 except ImportError:
     SMART_DETECTION_AVAILABLE = False
@@ -284,6 +292,11 @@ for categoria, subcategorias in TIPOS_ARCHIVOS_DETALLADOS.items():
 class OrganizadorArchivos:
     """Clase principal para organizar archivos de la carpeta de descargas."""
     
+    # Archivos por llamada a clasificar_lote() durante los escaneos: las
+    # cabeceras de cada bloque se leen en paralelo y una cancelación no
+    # espera a clasificar todo el árbol
+    TAM_BLOQUE_CLASIFICACION = 512
+    
     def __init__(self, carpeta_descargas: Optional[str] = None, usar_subcarpetas: bool = True):
         """
         Inicializa el organizador de archivos.
@@ -296,10 +309,20 @@ class OrganizadorArchivos:
         # Cambiar la ubicación del archivo de huella a una carpeta oculta dentro de Descargas
         self.carpeta_config = self.carpeta_descargas / ".config"
         self.carpeta_config.mkdir(exist_ok=True)
-        self.archivo_huella = self.carpeta_config / 'organized.json'
+        self.huella = DocumentoConfig(self.carpeta_config, 'huella', 'organized.json')
         self.archivos_procesados: Dict[str, str] = {}
         self.usar_subcarpetas = usar_subcarpetas
         self._cargar_huella()
+        # Estadísticas (EstadisticasOrganizador) a las que informar de cada movimiento
+        self.estadisticas = None
+        # Módulos avanzados: los crea inicializar_modulos_avanzados(); sin
+        # ellos la clasificación se queda en el método por extensión
+        self.detector_inteligente = None
+        self.gestor_reglas = None
+        self.detector_duplicados = None
+        self.categorizador_ia = None
+        self.monitor_tiempo_real = None
+        self.cache_clasificacion = None
         
         # Inicializar organizador de fechas
         if DATE_ORGANIZER_AVAILABLE:
@@ -330,41 +353,39 @@ class OrganizadorArchivos:
             return descargas
     
     def _cargar_huella(self) -> None:
-        """Carga el archivo de huella si existe."""
-        if self.archivo_huella.exists():
-            try:
-                with open(self.archivo_huella, 'r', encoding='utf-8') as f:
-                    self.archivos_procesados = json.load(f)
-                logger.info(f"Archivo de huella cargado: {len(self.archivos_procesados)} archivos ya procesados.")
-            except Exception as e:
-                logger.error(f"Error al cargar archivo de huella: {e}")
-                self.archivos_procesados = {}
+        """Carga la huella de archivos procesados si existe."""
+        try:
+            self.archivos_procesados = self.huella.cargar() or {}
+            if self.archivos_procesados:
+                logger.info(f"Huella cargada: {len(self.archivos_procesados)} archivos ya procesados.")
+        except Exception as e:
+            logger.error(f"Error al cargar archivo de huella: {e}")
+            self.archivos_procesados = {}
     
     def _guardar_huella(self) -> None:
-        """Guarda el archivo de huella con los archivos procesados y lo oculta."""
+        """Guarda la huella con los archivos procesados (solo las entradas que cambiaron)."""
         try:
-            # Asegurar que la carpeta de configuración existe
-            self.carpeta_config.mkdir(exist_ok=True)
-            
-            with open(self.archivo_huella, 'w', encoding='utf-8') as f:
-                json.dump(self.archivos_procesados, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"Archivo de huella guardado: {len(self.archivos_procesados)} archivos procesados.")
+            self.huella.guardar(self.archivos_procesados)
+            logger.info(f"Huella guardada: {len(self.archivos_procesados)} archivos procesados.")
         except Exception as e:
+            if self.huella.en_transaccion():
+                raise
             logger.error(f"Error al guardar archivo de huella: {e}")
     
-    def _obtener_tipo_archivo(self, archivo: Path) -> Tuple[str, Optional[str]]:
+    def _obtener_tipo_archivo(self, archivo: Path,
+                              caracteristicas: Optional[CaracteristicasArchivo] = None) -> Tuple[str, Optional[str]]:
         """
         Determina el tipo de archivo basado en su extensión con lógica de priorización.
         
         Args:
             archivo: Ruta al archivo a verificar.
+            caracteristicas: Características ya extraídas del archivo (opcional).
             
         Returns:
             Tupla con (categoría, subcategoría) a la que pertenece el archivo.
             Si no usa subcarpetas, la subcategoría será None.
         """
-        extension = archivo.suffix.lower()
+        extension = caracteristicas.extension if caracteristicas is not None else archivo.suffix.lower()
         
         # Priorización especial para extensiones que aparecen en múltiples categorías
         prioridades_especificas = {
@@ -429,7 +450,55 @@ class OrganizadorArchivos:
         # Si no se encontró una categoría, añadir a "Otros"
         return "Otros", None
     
-    def _obtener_carpeta_destino(self, archivo: Path, categoria: str, subcategoria: Optional[str] = None) -> Path:
+    def _mover(self, origen: Path, destino: Path):
+        """Mueve un archivo o carpeta midiendo la etapa 'move'."""
+        with DURACION_ETAPA.medir(stage='move'):
+            shutil.move(str(origen), str(destino))
+    
+    def _registrar_estadistica(self, archivo: Path, categoria: str, subcategoria: Optional[str],
+                               tamaño: Optional[int]):
+        """Informa de un movimiento a las estadísticas y métricas con el tamaño ya conocido."""
+        ARCHIVOS_MOVIDOS.inc(category=categoria)
+        BYTES_MOVIDOS.inc(tamaño or 0, category=categoria)
+        if self.estadisticas is None:
+            return
+        try:
+            self.estadisticas.registrar_movimiento(categoria, subcategoria, tamaño or 0, archivo.suffix.lower())
+        except Exception as e:
+            logger.debug(f"Error registrando estadística de {archivo.name}: {e}")
+    
+    def _precargar_fechas(self, archivos: List[Path], stats: Optional[Dict[Path, Any]] = None):
+        """Extrae en paralelo las fechas de los archivos antes de moverlos (solo con fechas activas)."""
+        if self.organizador_fechas is None or not self.organizador_fechas.activo:
+            return
+        self.organizador_fechas.precargar_fechas(archivos, stats)
+    
+    def _guardar_estado_pasada(self, tiempo_inicio: datetime):
+        """
+        Guarda la huella y cierra la sesión de estadísticas en una sola
+        transacción del almacén de configuración: tras una caída o un error
+        al guardar cualquiera de las dos quedan las dos o ninguna (lo no
+        guardado sigue en memoria y se guarda en la próxima pasada).
+        """
+        try:
+            with transaccion_config(self.carpeta_config):
+                self._guardar_huella()
+                if self.estadisticas is not None:
+                    self.estadisticas.finalizar_sesion(tiempo_inicio, datetime.now())
+        except Exception as e:
+            logger.error(f"Error guardando el estado de la pasada: {e}")
+    
+    def _sincronizar_registro_fechas(self):
+        """Un fsync del diario de movimientos por fecha al final de cada pasada."""
+        if self.organizador_fechas is None:
+            return
+        try:
+            self.organizador_fechas.sincronizar()
+        except Exception as e:
+            logger.debug(f"Error sincronizando diario de fechas: {e}")
+    
+    def _obtener_carpeta_destino(self, archivo: Path, categoria: str, subcategoria: Optional[str] = None,
+                                 stat_resultado: Optional[os.stat_result] = None) -> Path:
         """
         Obtiene la carpeta de destino para un archivo, considerando organización por fechas si está activa.
         
@@ -437,6 +506,7 @@ class OrganizadorArchivos:
             archivo: Archivo a organizar
             categoria: Categoría del archivo
             subcategoria: Subcategoría del archivo (opcional)
+            stat_resultado: stat del archivo si quien llama ya lo tiene (opcional)
             
         Returns:
             Ruta de la carpeta de destino
@@ -444,7 +514,9 @@ class OrganizadorArchivos:
         # Si tenemos organizador de fechas y está activo, usarlo
         if self.organizador_fechas and self.organizador_fechas.activo:
             try:
-                carpeta_destino = self.organizador_fechas.obtener_carpeta_fecha(archivo, categoria, subcategoria)
+                carpeta_destino = self.organizador_fechas.obtener_carpeta_fecha(
+                    archivo, categoria, subcategoria, stat_resultado
+                )
                 logger.debug(f"📅 Carpeta con fechas para {archivo.name}: {carpeta_destino}")
                 return carpeta_destino
             except Exception as e:
@@ -459,13 +531,15 @@ class OrganizadorArchivos:
         logger.debug(f"📁 Carpeta normal para {archivo.name}: {carpeta_destino}")
         return carpeta_destino
     
-    def reorganizar_completamente(self, callback=None) -> Tuple[Dict[str, Dict[str, List[str]]], List[str]]:
+    def reorganizar_completamente(self, callback=None, cancelacion=None) -> Tuple[Dict[str, Dict[str, List[str]]], List[str]]:
         """
         Reorganiza TODOS los archivos de forma recursiva, incluso los ya organizados.
         Útil para reorganizar archivos que pueden haber cambiado de lugar o categoría.
         
         Args:
             callback: Función opcional a llamar por cada archivo procesado.
+            cancelacion: Objeto opcional con is_set(); si se activa, se deja de mover
+                archivos y se guarda el estado de lo ya movido.
         
         Returns:
             Tupla con un diccionario de archivos movidos por categoría/subcategoría y una lista de errores.
@@ -475,6 +549,7 @@ class OrganizadorArchivos:
             return {}, [f"La carpeta de descargas no existe: {self.carpeta_descargas}"]
         
         logger.info("🔄 Iniciando reorganización completa de todos los archivos...")
+        tiempo_inicio = datetime.now()
         
         # Diccionario para almacenar los resultados
         archivos_movidos: Dict[str, Dict[str, List[str]]] = {}
@@ -483,33 +558,57 @@ class OrganizadorArchivos:
         # Obtener la lista de categorías para reconocerlas
         categorias = list(TIPOS_ARCHIVOS_DETALLADOS.keys()) + ["Otros", "Carpetas"]
         
-        # Lista para almacenar todos los archivos encontrados
+        # Lista para almacenar todos los archivos encontrados, con el stat
+        # que da el propio escaneo (clasificación y estadísticas, sin otro stat)
         todos_los_archivos: List[Path] = []
+        stats: Dict[Path, os.stat_result] = {}
+        
+        # Cuentas de hijos por carpeta tomadas del propio escaneo, para podar
+        # después solo las carpetas que se queden vacías
+        podador = PodadorCarpetas(self.carpeta_descargas, self._carpeta_protegida_limpieza)
         
         # Función recursiva para encontrar TODOS los archivos
         def encontrar_archivos_recursivamente(directorio: Path):
+            visibles = 0
             try:
-                for item in directorio.iterdir():
-                    if item.is_file():
-                        # Ignorar archivos del sistema y configuración
-                        if not item.name.startswith('.') and item.name not in ['desktop.ini', 'Thumbs.db']:
-                            todos_los_archivos.append(item)
-                    elif item.is_dir():
-                        # No procesar carpetas del sistema o configuración
-                        if not item.name.startswith('.') and item.name not in ['$RECYCLE.BIN', 'System Volume Information']:
-                            encontrar_archivos_recursivamente(item)
-            except PermissionError:
+                with os.scandir(directorio) as entradas:
+                    for entrada in entradas:
+                        if es_contenido_visible(entrada.name):
+                            visibles += 1
+                        try:
+                            if entrada.is_file():
+                                # Ignorar archivos del sistema y configuración
+                                if not entrada.name.startswith('.') and entrada.name not in ['desktop.ini', 'Thumbs.db']:
+                                    item = Path(entrada.path)
+                                    todos_los_archivos.append(item)
+                                    stats[item] = entrada.stat()
+                            elif entrada.is_dir():
+                                # No procesar carpetas del sistema o configuración
+                                if not entrada.name.startswith('.') and entrada.name not in ['$RECYCLE.BIN', 'System Volume Information']:
+                                    encontrar_archivos_recursivamente(Path(entrada.path))
+                        except OSError:
+                            continue
+            except PermissionError as e:
+                registrar_error('scan', e)
                 errores.append(f"Sin permiso para acceder a {directorio}")
+                return
+            podador.registrar_listado(directorio, visibles)
         
         # Encontrar todos los archivos recursivamente
         logger.info("📁 Escaneando todos los archivos...")
-        encontrar_archivos_recursivamente(self.carpeta_descargas)
+        with DURACION_ETAPA.medir(stage='scan'):
+            encontrar_archivos_recursivamente(self.carpeta_descargas)
+        ARCHIVOS_ESCANEADOS.inc(len(todos_los_archivos))
         
         logger.info(f"📋 Se encontraron {len(todos_los_archivos)} archivos para reorganizar")
+        self._precargar_fechas(todos_los_archivos, stats)
         
-        # Procesar cada archivo
+        # Procesar cada archivo (clasificados por bloques)
         archivos_procesados = 0
-        for archivo in todos_los_archivos:
+        for archivo, (categoria, subcategoria) in self._clasificar_por_bloques(todos_los_archivos, stats):
+            if cancelacion is not None and cancelacion.is_set():
+                logger.info(f"⏹️ Reorganización cancelada tras {archivos_procesados} archivos")
+                break
             try:
                 # Calcular ruta relativa desde la carpeta de descargas
                 try:
@@ -518,12 +617,11 @@ class OrganizadorArchivos:
                 except ValueError:
                     nombre_relativo = archivo.name
                 
-                # Determinar la categoría y subcategoría correcta del archivo
-                categoria, subcategoria = self._obtener_tipo_archivo(archivo)
                 subcategoria = subcategoria or "General"
                 
                 # Determinar dónde DEBERÍA estar el archivo
-                carpeta_destino_correcta = self._obtener_carpeta_destino(archivo, categoria, subcategoria)
+                carpeta_destino_correcta = self._obtener_carpeta_destino(archivo, categoria, subcategoria,
+                                                                         stats[archivo])
                 
                 destino_correcto = carpeta_destino_correcta / archivo.name
                 
@@ -551,7 +649,9 @@ class OrganizadorArchivos:
                         indice += 1
                 
                 # Mover el archivo
-                shutil.move(str(archivo), str(destino_correcto))
+                self._mover(archivo, destino_correcto)
+                podador.salida(archivo)
+                podador.entrada(destino_correcto)
                 
                 # Registrar movimiento para el organizador de fechas si está activo
                 if self.organizador_fechas and self.organizador_fechas.activo:
@@ -578,6 +678,7 @@ class OrganizadorArchivos:
                     ruta_relativa_final = os.path.join(categoria, destino_correcto.name)
                     
                 self.archivos_procesados[nombre_relativo] = ruta_relativa_final
+                self._registrar_estadistica(archivo, categoria, subcategoria, stats[archivo].st_size)
                 
                 if callback:
                     callback(nombre_relativo, categoria, subcategoria)
@@ -585,55 +686,46 @@ class OrganizadorArchivos:
                 archivos_procesados += 1
                 
             except Exception as e:
+                registrar_error('move', e)
                 error_msg = f"Error al reorganizar archivo {archivo.name}: {e}"
                 logger.error(error_msg)
                 errores.append(error_msg)
         
         # Limpiar carpetas vacías
-        self._limpiar_carpetas_vacias()
+        self._limpiar_carpetas_vacias(podador)
         
-        # Guardar el archivo de huella
-        self._guardar_huella()
+        # Guardar huella y estadísticas juntas
+        self._guardar_estado_pasada(tiempo_inicio)
+        self._sincronizar_registro_fechas()
         
         logger.info(f"✅ Reorganización completa finalizada. {archivos_procesados} archivos reorganizados.")
         
         return archivos_movidos, errores
     
-    def _limpiar_carpetas_vacias(self):
-        """Elimina carpetas vacías después de la reorganización"""
+    def _carpeta_protegida_limpieza(self, carpeta: Path) -> bool:
+        """
+        Carpetas que la limpieza no elimina aunque estén vacías: las de la
+        raíz, todo lo que hay dentro de una carpeta de categoría y cualquier
+        carpeta con nombre de categoría.
+        """
+        categorias = set(TIPOS_ARCHIVOS_DETALLADOS) | {"Otros", "Carpetas"}
         try:
-            # Obtener la lista de categorías para no eliminarlas
-            categorias = list(TIPOS_ARCHIVOS_DETALLADOS.keys()) + ["Otros", "Carpetas"]
-            
-            def eliminar_si_vacia(directorio: Path):
-                if not directorio.exists() or not directorio.is_dir():
-                    return
-                
-                try:
-                    # Primero, procesar subdirectorios recursivamente
-                    for subdir in [d for d in directorio.iterdir() if d.is_dir()]:
-                        eliminar_si_vacia(subdir)
-                    
-                    # Verificar si el directorio está vacío (solo considera archivos visibles)
-                    contenido = [item for item in directorio.iterdir() 
-                                if not item.name.startswith('.') 
-                                and item.name not in ['desktop.ini', 'Thumbs.db']]
-                    
-                    # Si está vacío y no es una carpeta de categoría principal, eliminarla
-                    if not contenido and directorio.name not in categorias:
-                        # No eliminar si es una subcarpeta directa de la raíz
-                        if directorio.parent != self.carpeta_descargas:
-                            directorio.rmdir()
-                            logger.info(f"🗑️ Carpeta vacía eliminada: {directorio.name}")
-                
-                except (OSError, PermissionError) as e:
-                    logger.debug(f"No se pudo eliminar carpeta {directorio}: {e}")
-            
-            # Empezar desde la carpeta de descargas
-            for item in self.carpeta_descargas.iterdir():
-                if item.is_dir() and item.name not in categorias and not item.name.startswith('.'):
-                    eliminar_si_vacia(item)
-                    
+            partes = carpeta.relative_to(self.carpeta_descargas).parts
+        except ValueError:
+            return True
+        return len(partes) <= 1 or partes[0] in categorias or carpeta.name in categorias
+    
+    def _limpiar_carpetas_vacias(self, podador: PodadorCarpetas):
+        """
+        Elimina carpetas vacías después de la reorganización.
+        
+        Args:
+            podador: Podador con las cuentas del escaneo y los movimientos de
+                     la pasada; solo se visitan las carpetas que se vaciaron
+        """
+        try:
+            for carpeta in podador.podar():
+                logger.info(f"🗑️ Carpeta vacía eliminada: {carpeta.name}")
         except Exception as e:
             logger.error(f"Error al limpiar carpetas vacías: {e}")
 
@@ -653,9 +745,13 @@ class OrganizadorArchivos:
             logger.error(f"La carpeta de descargas no existe: {self.carpeta_descargas}")
             return {}, [f"La carpeta de descargas no existe: {self.carpeta_descargas}"]
         
+        tiempo_inicio = datetime.now()
+        
         # Diccionario para almacenar los resultados
         archivos_movidos: Dict[str, Dict[str, List[str]]] = {}
         errores: List[str] = []
+        # stat que da el propio listado (clasificación y estadísticas)
+        stats: Dict[Path, os.stat_result] = {}
         
         # Crear la carpeta especial para otras carpetas
         carpeta_carpetas = self.carpeta_descargas / "Carpetas"
@@ -665,18 +761,38 @@ class OrganizadorArchivos:
         
         # Lista para hacer seguimiento de archivos no procesados
         archivos_no_procesados: List[Path] = []
+        # Tiempo de listado acumulado (el recorrido se intercala con los movimientos)
+        tiempo_escaneo = [0.0]
         
         # Función recursiva para procesar directorios
         def procesar_directorio(directorio: Path, es_raiz: bool = False):
-            # Listar todos los items en el directorio
+            # Listar todos los items en el directorio (una sola llamada al sistema
+            # por entrada: tipo y tamaño salen del listado)
+            subdirectorios: List[Path] = []
+            archivos: List[Path] = []
+            inicio_listado = time.perf_counter()
             try:
-                items = list(directorio.iterdir())
-            except PermissionError:
+                with os.scandir(directorio) as entradas:
+                    for entrada in entradas:
+                        try:
+                            if entrada.is_dir():
+                                subdirectorios.append(Path(entrada.path))
+                            elif entrada.is_file():
+                                archivo = Path(entrada.path)
+                                archivos.append(archivo)
+                                stats[archivo] = entrada.stat()
+                        except OSError:
+                            continue
+            except PermissionError as e:
+                registrar_error('scan', e)
                 errores.append(f"Sin permiso para acceder a {directorio}")
                 return
+            finally:
+                tiempo_escaneo[0] += time.perf_counter() - inicio_listado
+            ARCHIVOS_ESCANEADOS.inc(len(archivos))
             
             # Primero procesar directorios
-            for item in [i for i in items if i.is_dir()]:
+            for item in subdirectorios:
                 # Si estamos en la raíz y la carpeta es una categoría, la saltamos
                 if es_raiz and item.name in categorias:
                     continue
@@ -705,7 +821,7 @@ class OrganizadorArchivos:
                                 break
                             indice += 1
                     
-                    shutil.move(str(item), str(destino))
+                    self._mover(item, destino)
                     
                     # Registrar movimiento
                     if "Carpetas" not in archivos_movidos:
@@ -725,12 +841,15 @@ class OrganizadorArchivos:
                         
                     logger.info(f"Carpeta movida: {item.name} -> Carpetas/{destino.name}")
                 except Exception as e:
+                    registrar_error('move', e)
                     error_msg = f"Error al mover carpeta {item.name}: {e}"
                     logger.error(error_msg)
                     errores.append(error_msg)
             
-            # Luego procesar archivos
-            for item in [i for i in items if i.is_file()]:
+            # Luego procesar archivos: primero se descartan los ya procesados
+            # y los nuevos se clasifican en bloque
+            nombres_relativos: Dict[Path, str] = {}
+            for item in archivos:
                 # Ignorar el archivo de huella y archivos ocultos
                 if item.name.startswith('.') or (self.carpeta_config in item.parents and self.carpeta_config is not None):
                     continue
@@ -747,14 +866,16 @@ class OrganizadorArchivos:
                 if nombre_relativo in self.archivos_procesados:
                     logger.debug(f"Archivo ya procesado anteriormente: {nombre_relativo}")
                     continue
-                
-                # Determinar la categoría y subcategoría del archivo
-                categoria, subcategoria = self._obtener_tipo_archivo(item)
+                nombres_relativos[item] = nombre_relativo
+            
+            self._precargar_fechas(list(nombres_relativos), stats)
+            for item, (categoria, subcategoria) in self._clasificar_por_bloques(list(nombres_relativos), stats):
+                nombre_relativo = nombres_relativos[item]
                 subcategoria = subcategoria or "General"
                 
                 try:
                     # Crear la carpeta de destino si no existe
-                    carpeta_destino = self._obtener_carpeta_destino(item, categoria, subcategoria)
+                    carpeta_destino = self._obtener_carpeta_destino(item, categoria, subcategoria, stats[item])
                     carpeta_destino.mkdir(parents=True, exist_ok=True)
                     
                     # Ruta de destino
@@ -773,7 +894,7 @@ class OrganizadorArchivos:
                             indice += 1
                     
                     # Mover el archivo
-                    shutil.move(str(item), str(destino))
+                    self._mover(item, destino)
                     
                     # Registrar movimiento para el organizador de fechas si está activo
                     if self.organizador_fechas and self.organizador_fechas.activo:
@@ -800,12 +921,14 @@ class OrganizadorArchivos:
                         ruta_relativa = os.path.join(categoria, destino.name)
                         
                     self.archivos_procesados[nombre_relativo] = ruta_relativa
+                    self._registrar_estadistica(item, categoria, subcategoria, stats[item].st_size)
                     
                     if callback:
                         callback(nombre_relativo, categoria, subcategoria)
                     
                     logger.info(f"Archivo movido: {nombre_relativo} -> {ruta_relativa}")
                 except Exception as e:
+                    registrar_error('move', e)
                     error_msg = f"Error al mover archivo {nombre_relativo}: {e}"
                     logger.error(error_msg)
                     errores.append(error_msg)
@@ -813,6 +936,7 @@ class OrganizadorArchivos:
         
         # Iniciar procesamiento desde la raíz
         procesar_directorio(self.carpeta_descargas, es_raiz=True)
+        DURACION_ETAPA.observar(tiempo_escaneo[0], stage='scan')
         
         # Verificar si quedaron archivos sin procesar y realizar un segundo intento
         if archivos_no_procesados:
@@ -847,7 +971,7 @@ class OrganizadorArchivos:
                             indice += 1
                     
                     # Mover el archivo
-                    shutil.move(str(archivo), str(destino))
+                    self._mover(archivo, destino)
                     
                     # Registrar movimiento para el organizador de fechas si está activo
                     if self.organizador_fechas and self.organizador_fechas.activo:
@@ -879,18 +1003,21 @@ class OrganizadorArchivos:
                         ruta_relativa = os.path.join(categoria, destino.name)
                         
                     self.archivos_procesados[nombre_relativo] = ruta_relativa
+                    self._registrar_estadistica(archivo, categoria, subcategoria, stats[archivo].st_size)
                     
                     if callback:
                         callback(nombre_relativo, categoria, subcategoria)
                     
                     logger.info(f"Archivo movido en segundo intento: {nombre_relativo} -> {ruta_relativa}")
                 except Exception as e:
+                    registrar_error('move', e)
                     error_msg = f"Error al mover archivo en segundo intento {archivo.name}: {e}"
                     logger.error(error_msg)
                     errores.append(error_msg)
         
-        # Guardar el archivo de huella
-        self._guardar_huella()
+        # Guardar huella y estadísticas juntas
+        self._guardar_estado_pasada(tiempo_inicio)
+        self._sincronizar_registro_fechas()
         
         # Notificar si está disponible
         archivos_movidos_count = sum(sum(len(sub) for sub in cat.values()) for cat in archivos_movidos.values())
@@ -913,6 +1040,7 @@ class OrganizadorArchivos:
         self.detector_duplicados = None
         self.categorizador_ia = None
         self.monitor_tiempo_real = None
+        self.cache_clasificacion = None
         
         # Inicializar módulos disponibles
         if SMART_DETECTION_AVAILABLE:
@@ -947,12 +1075,18 @@ class OrganizadorArchivos:
             except Exception as e:
                 logger.warning(f"Error inicializando categorizador IA: {e}")
         
+        try:
+            self.cache_clasificacion = CacheClasificacion(self.carpeta_descargas)
+        except Exception as e:
+            logger.warning(f"Error inicializando caché de clasificación: {e}")
+        
         if REAL_TIME_MONITOR_AVAILABLE:
             try:
                 from .real_time_monitor import MonitorTiempoReal
                 self.monitor_tiempo_real = MonitorTiempoReal(
                     self.carpeta_descargas,
-                    self._organizar_archivo_individual
+                    self._organizar_archivo_individual,
+                    self.organizar_lote
                 )
                 logger.info("🔄 Monitor tiempo real disponible")
             except Exception as e:
@@ -971,10 +1105,11 @@ class OrganizadorArchivos:
         Usado por el monitor en tiempo real.
         """
         try:
-            categoria, subcategoria = self._obtener_tipo_archivo_avanzado(archivo)
+            stat_resultado = self._stat_archivo(archivo)
+            categoria, subcategoria = self._obtener_tipo_archivo_avanzado(archivo, stat_resultado=stat_resultado)
             
             # Determinar carpeta destino
-            carpeta_destino = self._obtener_carpeta_destino(archivo, categoria, subcategoria)
+            carpeta_destino = self._obtener_carpeta_destino(archivo, categoria, subcategoria, stat_resultado)
             
             # Crear carpeta si no existe
             carpeta_destino.mkdir(parents=True, exist_ok=True)
@@ -982,8 +1117,10 @@ class OrganizadorArchivos:
             # Mover archivo
             destino_final = carpeta_destino / archivo.name
             if not destino_final.exists():
-                shutil.move(str(archivo), str(destino_final))
+                self._mover(archivo, destino_final)
                 logger.info(f"📂 Archivo organizado automáticamente: {archivo.name} → {categoria}")
+                self._registrar_estadistica(archivo, categoria, subcategoria,
+                                            stat_resultado.st_size if stat_resultado else None)
                 
                 # Registrar movimiento para el organizador de fechas si está activo
                 if self.organizador_fechas and self.organizador_fechas.activo:
@@ -993,6 +1130,7 @@ class OrganizadorArchivos:
                         )
                     except Exception as e:
                         logger.debug(f"Error registrando movimiento en organizador de fechas: {e}")
+                    self._sincronizar_registro_fechas()
                 
                 # Notificar archivo individual
                 if NOTIFICATIONS_AVAILABLE:
@@ -1002,20 +1140,235 @@ class OrganizadorArchivos:
                         logger.debug(f"Error notificando archivo: {e}")
         
         except Exception as e:
+            registrar_error('move', e)
             logger.error(f"Error organizando archivo {archivo}: {e}")
     
-    def _obtener_tipo_archivo_avanzado(self, archivo: Path) -> Tuple[str, Optional[str]]:
+    def organizar_lote(self, archivos: List[Path], notificar: bool = True) -> Dict[str, Any]:
+        """
+        Organiza un grupo de archivos de una vez. Usado por el monitor en
+        tiempo real cuando llegan muchos archivos juntos: se clasifican en
+        lote, cada carpeta destino se crea una sola vez y se envía una única
+        notificación resumen.
+        
+        Args:
+            archivos: Archivos listos para organizar
+            notificar: Enviar la notificación resumen (el servicio en segundo
+                       plano la envía por su cuenta)
+            
+        Returns:
+            Diccionario con 'movidos' (archivo → destino), 'por_categoria'
+            (mismo formato que organizar()) y 'errores'
+        """
+        movidos: Dict[Path, Path] = {}
+        por_categoria: Dict[str, Dict[str, List[str]]] = {}
+        errores: List[str] = []
+        
+        ARCHIVOS_ESCANEADOS.inc(len(archivos))
+        stats = {archivo: self._stat_archivo(archivo) for archivo in archivos}
+        existentes = [archivo for archivo in archivos if stats[archivo] is not None]
+        clasificaciones = self.clasificar_lote(existentes, stats)
+        self._precargar_fechas(existentes, stats)
+        
+        # Agrupar por carpeta destino
+        por_carpeta: Dict[Path, List[Tuple[Path, str, Optional[str]]]] = {}
+        for archivo, (categoria, subcategoria) in clasificaciones.items():
+            carpeta_destino = self._obtener_carpeta_destino(archivo, categoria, subcategoria, stats[archivo])
+            por_carpeta.setdefault(carpeta_destino, []).append((archivo, categoria, subcategoria))
+        
+        categorias_usadas: Set[str] = set()
+        for carpeta_destino, elementos in por_carpeta.items():
+            try:
+                carpeta_destino.mkdir(parents=True, exist_ok=True)
+            except Exception as e:
+                registrar_error('move', e)
+                errores.append(f"Error creando {carpeta_destino}: {e}")
+                continue
+            
+            for archivo, categoria, subcategoria in elementos:
+                destino_final = carpeta_destino / archivo.name
+                if destino_final.exists():
+                    continue
+                try:
+                    self._mover(archivo, destino_final)
+                except Exception as e:
+                    registrar_error('move', e)
+                    errores.append(f"Error organizando {archivo.name}: {e}")
+                    continue
+                
+                movidos[archivo] = destino_final
+                categorias_usadas.add(categoria)
+                por_categoria.setdefault(categoria, {}).setdefault(subcategoria or "General", []).append(archivo.name)
+                logger.info(f"📂 Archivo organizado automáticamente: {archivo.name} → {categoria}")
+                self._registrar_estadistica(archivo, categoria, subcategoria, stats[archivo].st_size)
+                
+                # Registrar movimiento para el organizador de fechas si está activo
+                if self.organizador_fechas and self.organizador_fechas.activo:
+                    try:
+                        self.organizador_fechas.registrar_movimiento(
+                            archivo, destino_final, categoria, subcategoria
+                        )
+                    except Exception as e:
+                        logger.debug(f"Error registrando movimiento en organizador de fechas: {e}")
+        
+        for error in errores:
+            logger.error(error)
+        if movidos:
+            self._sincronizar_registro_fechas()
+        
+        # Una sola notificación por lote
+        if notificar and NOTIFICATIONS_AVAILABLE and movidos:
+            try:
+                if len(movidos) == 1:
+                    archivo = next(iter(movidos))
+                    notificador.notificar_archivo_nuevo(archivo.name, next(iter(categorias_usadas)))
+                else:
+                    notificador.notificar_organizacion(len(movidos), len(categorias_usadas))
+            except Exception as e:
+                logger.debug(f"Error notificando lote: {e}")
+        
+        return {'movidos': movidos, 'por_categoria': por_categoria, 'errores': errores}
+    
+    def _obtener_tipo_archivo_avanzado(self, archivo: Path,
+                                       caracteristicas: Optional[CaracteristicasArchivo] = None,
+                                       stat_resultado: Optional[os.stat_result] = None) -> Tuple[str, Optional[str]]:
         """
         Determina el tipo de archivo usando todos los métodos disponibles:
         1. Reglas personalizadas (prioridad máxima)
         2. IA categorización
         3. Detección inteligente por contenido
         4. Método original por extensión
+        
+        Las características del nombre se extraen una sola vez y se comparten
+        entre todas las etapas. Si el archivo ya se clasificó con las mismas
+        reglas y el mismo modelo, se reutiliza el resultado de la caché.
         """
+        inicio = time.perf_counter()
+        if stat_resultado is None:
+            stat_resultado = self._stat_archivo(archivo)
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo, stat_resultado)
+        
+        firma = self._firma_clasificador()
+        resultado = self._consultar_cache_clasificacion(archivo, stat_resultado, firma)
+        if resultado is None:
+            resultado = self._clasificar_por_nombre(archivo, caracteristicas)
+            if resultado is None:
+                resultado = self._clasificar_por_contenido(archivo, caracteristicas)
+            
+            self._registrar_cache_clasificacion(archivo, stat_resultado, firma, resultado)
+            if self.cache_clasificacion:
+                self.cache_clasificacion.guardar_si_necesario()
+        DURACION_ETAPA.observar(time.perf_counter() - inicio, stage='classify')
+        return resultado
+    
+    def clasificar_lote(self, archivos: List[Path],
+                        stats: Optional[Dict[Path, Optional[os.stat_result]]] = None) -> Dict[Path, Tuple[str, Optional[str]]]:
+        """
+        Clasifica muchos archivos a la vez con los mismos métodos que
+        _obtener_tipo_archivo_avanzado. Los archivos que no resuelven las reglas
+        ni la IA pasan a la detección por contenido con sus cabeceras leídas en
+        paralelo, en lugar de abrir cada archivo por separado.
+        
+        Args:
+            archivos: Archivos a clasificar
+            stats: stat de cada archivo si quien llama ya lo tiene
+            
+        Returns:
+            Diccionario archivo → (categoría, subcategoría)
+        """
+        inicio = time.perf_counter()
+        resultados: Dict[Path, Tuple[str, Optional[str]]] = {}
+        if stats is None:
+            stats = {archivo: self._stat_archivo(archivo) for archivo in archivos}
+        caracteristicas: Dict[Path, CaracteristicasArchivo] = {}
+        firma = self._firma_clasificador()
+        pendientes: List[Path] = []
+        
+        for archivo in archivos:
+            resultado = self._consultar_cache_clasificacion(archivo, stats[archivo], firma)
+            if resultado is not None:
+                resultados[archivo] = resultado
+                continue
+            
+            caracteristicas[archivo] = obtener_caracteristicas(archivo, stats[archivo])
+            resultado = self._clasificar_por_nombre(archivo, caracteristicas[archivo])
+            if resultado is not None:
+                resultados[archivo] = resultado
+                self._registrar_cache_clasificacion(archivo, stats[archivo], firma, resultado)
+            else:
+                pendientes.append(archivo)
+        
+        cabeceras: Dict[Path, Optional[bytes]] = {}
+        if pendientes and getattr(self, 'detector_inteligente', None):
+            cabeceras = leer_cabeceras(pendientes)
+        
+        for archivo in pendientes:
+            resultados[archivo] = self._clasificar_por_contenido(
+                archivo, caracteristicas[archivo], cabeceras.get(archivo)
+            )
+            self._registrar_cache_clasificacion(archivo, stats[archivo], firma, resultados[archivo])
+        
+        if self.cache_clasificacion:
+            self.cache_clasificacion.guardar()
+        
+        # Coste medio por archivo, para que sea comparable con la vía individual
+        if archivos:
+            DURACION_ETAPA.observar((time.perf_counter() - inicio) / len(archivos),
+                                    cantidad=len(archivos), stage='classify')
+        return resultados
+    
+    def _clasificar_por_bloques(self, archivos: List[Path], stats: Dict[Path, os.stat_result]
+                                ) -> Iterator[Tuple[Path, Tuple[str, Optional[str]]]]:
+        """
+        Clasifica los archivos de un escaneo con clasificar_lote() en bloques
+        de TAM_BLOQUE_CLASIFICACION, a medida que se consumen.
+        
+        Yields:
+            (archivo, (categoría, subcategoría)) en el orden de `archivos`
+        """
+        for inicio in range(0, len(archivos), self.TAM_BLOQUE_CLASIFICACION):
+            bloque = archivos[inicio:inicio + self.TAM_BLOQUE_CLASIFICACION]
+            clasificaciones = self.clasificar_lote(bloque, stats)
+            for archivo in bloque:
+                yield archivo, clasificaciones[archivo]
+    
+    @staticmethod
+    def _stat_archivo(archivo: Path) -> Optional[os.stat_result]:
+        try:
+            return archivo.stat()
+        except OSError:
+            return None
+    
+    def _firma_clasificador(self) -> str:
+        """
+        Resume todo lo que influye en una clasificación: módulos activos,
+        versión de las reglas y versión del modelo IA. Si cambia, la caché
+        de clasificación se invalida.
+        """
+        version_reglas = self.gestor_reglas.version_reglas if self.gestor_reglas else '-'
+        version_modelo = self.categorizador_ia.version_modelo if self.categorizador_ia else '-'
+        detector = 'detector' if self.detector_inteligente else '-'
+        return f"{int(self.usar_subcarpetas)}|{version_reglas}|{version_modelo}|{detector}"
+    
+    def _consultar_cache_clasificacion(self, archivo: Path, stat_resultado: Optional[os.stat_result],
+                                       firma: str) -> Optional[Tuple[str, Optional[str]]]:
+        if not self.cache_clasificacion or stat_resultado is None:
+            return None
+        return self.cache_clasificacion.obtener(identidad_archivo(stat_resultado), archivo.name, firma)
+    
+    def _registrar_cache_clasificacion(self, archivo: Path, stat_resultado: Optional[os.stat_result],
+                                       firma: str, resultado: Tuple[str, Optional[str]]):
+        if not self.cache_clasificacion or stat_resultado is None:
+            return
+        self.cache_clasificacion.registrar(identidad_archivo(stat_resultado), archivo.name, firma, resultado)
+    
+    def _clasificar_por_nombre(self, archivo: Path,
+                               caracteristicas: CaracteristicasArchivo) -> Optional[Tuple[str, Optional[str]]]:
+        """Etapas sin E/S: reglas personalizadas e IA. None si ninguna decide."""
         # 1. Verificar reglas personalizadas primero
         if self.gestor_reglas:
             try:
-                resultado_reglas = self.gestor_reglas.obtener_categoria(archivo)
+                resultado_reglas = self.gestor_reglas.obtener_categoria(archivo, caracteristicas)
                 if resultado_reglas:
                     categoria, subcategoria = resultado_reglas
                     logger.debug(f"Categorizado por regla personalizada: {archivo.name} → {categoria}/{subcategoria}")
@@ -1026,13 +1379,13 @@ class OrganizadorArchivos:
         # 2. Intentar IA categorización
         if self.categorizador_ia:
             try:
-                resultado_ia = self.categorizador_ia.analizar_nombre_archivo(archivo)
+                resultado_ia = self.categorizador_ia.analizar_nombre_archivo(archivo, caracteristicas)
                 if resultado_ia:
                     categoria, confianza = resultado_ia
                     # Buscar subcategoría apropiada en los tipos detallados
                     subcategoria = "General"
                     if categoria in TIPOS_ARCHIVOS_DETALLADOS:
-                        extension = archivo.suffix.lower()
+                        extension = caracteristicas.extension
                         for sub, extensiones in TIPOS_ARCHIVOS_DETALLADOS[categoria].items():
                             if extension in extensiones:
                                 subcategoria = sub
@@ -1041,16 +1394,23 @@ class OrganizadorArchivos:
                     logger.debug(f"Categorizado por IA: {archivo.name} → {categoria} (confianza: {confianza:.2f})")
                     
                     # Entrenar la IA con esta decisión
-                    self.categorizador_ia.entrenar_con_decision(archivo, categoria, subcategoria, True)
+                    self.categorizador_ia.entrenar_con_decision(archivo, categoria, subcategoria, True, caracteristicas)
                     
                     return categoria, subcategoria
             except Exception as e:
                 logger.debug(f"Error en IA categorización: {e}")
         
+        return None
+    
+    def _clasificar_por_contenido(self, archivo: Path, caracteristicas: CaracteristicasArchivo,
+                                  cabecera: Optional[bytes] = None) -> Tuple[str, Optional[str]]:
+        """Detección inteligente por contenido y, si no decide, método por extensión."""
         # 3. Intentar detección inteligente por contenido
         if self.detector_inteligente:
             try:
-                resultado_inteligente = self.detector_inteligente.detectar_tipo_inteligente(archivo)
+                resultado_inteligente = self.detector_inteligente.detectar_tipo_inteligente(
+                    archivo, caracteristicas, cabecera
+                )
                 if resultado_inteligente[0] != "Otros":
                     categoria, subcategoria = resultado_inteligente
                     logger.debug(f"Categorizado por detección inteligente: {archivo.name} → {categoria}/{subcategoria}")
@@ -1059,7 +1419,7 @@ class OrganizadorArchivos:
                 logger.debug(f"Error en detección inteligente: {e}")
         
         # 4. Fallback al método original
-        return self._obtener_tipo_archivo(archivo)
+        return self._obtener_tipo_archivo(archivo, caracteristicas)
     
     def iniciar_monitor_tiempo_real(self, delay_segundos: int = 3) -> bool:
         """
@@ -1092,6 +1452,8 @@ class OrganizadorArchivos:
         """Detiene el monitor en tiempo real."""
         if hasattr(self, 'monitor_tiempo_real') and self.monitor_tiempo_real:
             self.monitor_tiempo_real.detener()
+        if getattr(self, 'cache_clasificacion', None):
+            self.cache_clasificacion.guardar()
     
     def esta_monitor_activo(self) -> bool:
         """Verifica si el monitor en tiempo real está activo."""
@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Observadores de carpetas sin dependencias externas para el monitor en tiempo real:
+inotify nativo (Linux, vía ctypes) y sondeo por mtime para el resto de sistemas.
+
+Ambos imitan la interfaz de watchdog (schedule/start/stop/join/is_alive) y
+entregan eventos a los mismos manejadores (on_created, on_moved, ...).
+"""
+
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+MASCARA_VIGILANCIA = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                      IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF |
+                      IN_ONLYDIR | IN_EXCL_UNLINK)
+
+_CABECERA_EVENTO = struct.Struct('iIII')
+
+# Un movimiento cuyo destino no llega en este tiempo se trata como borrado
+ESPERA_PAREJA_MOVIMIENTO = 0.1
+
+# Un mtime tan cercano al listado no distingue cambios posteriores en el
+# mismo instante (resolución del sistema de archivos): se reescanea siempre
+MARGEN_MTIME_NS = 2_000_000_000
+
+
+def _cargar_libc() -> Optional[Any]:
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        libc.inotify_rm_watch.restype = ctypes.c_int
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _cargar_libc()
+INOTIFY_AVAILABLE = _libc is not None
+
+
+def leer_max_user_watches() -> int:
+    """Límite de vigilancias inotify por usuario (/proc/sys/fs/inotify/max_user_watches)."""
+    try:
+        with open('/proc/sys/fs/inotify/max_user_watches', 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return 8192
+
+
+class EventoArchivo:
+    """Evento con los mismos atributos que los de watchdog."""
+
+    __slots__ = ('event_type', 'src_path', 'dest_path', 'is_directory')
+
+    def __init__(self, event_type: str, src_path: str, is_directory: bool = False,
+                 dest_path: Optional[str] = None):
+        self.event_type = event_type
+        self.src_path = src_path
+        self.dest_path = dest_path
+        self.is_directory = is_directory
+
+    def __repr__(self) -> str:
+        destino = f" → {self.dest_path}" if self.dest_path else ""
+        return f"EventoArchivo({self.event_type}: {self.src_path}{destino})"
+
+
+class _ObservadorBase(abc.ABC):
+    """Hilo de observación con la interfaz mínima de watchdog.Observer."""
+
+    nombre_backend = "base"
+
+    def __init__(self):
+        self._vigilancias: List[Tuple[Any, Path, bool]] = []
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def schedule(self, event_handler: Any, path: str, recursive: bool = False):
+        self._vigilancias.append((event_handler, Path(path), recursive))
+
+    def start(self):
+        self._preparar()
+        self._hilo = threading.Thread(target=self._ejecutar, name=f"observador-{self.nombre_backend}",
+                                      daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._detener.set()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._hilo:
+            self._hilo.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def _preparar(self):
+        pass
+
+    @abc.abstractmethod
+    def _ejecutar(self):
+        """Bucle del hilo de observación; termina cuando se activa _detener."""
+
+    @staticmethod
+    def _despachar(manejador: Any, evento: EventoArchivo):
+        metodo = getattr(manejador, f"on_{evento.event_type}", None)
+        if metodo is None:
+            return
+        try:
+            metodo(evento)
+        except Exception as e:
+            logger.error(f"Error procesando evento {evento}: {e}")
+
+
+class ObservadorInotify(_ObservadorBase):
+    """
+    Observador basado en inotify.
+
+    - Con recursive=True añade vigilancias a las subcarpetas existentes y a las
+      que van apareciendo, repartiendo un presupuesto acotado de descriptores
+      frente a max_user_watches (que comparten todos los procesos del usuario).
+    - Guarda los nombres de cada carpeta vigilada (del listado inicial,
+      actualizados con cada evento) y el mtime que tenía al listarla. Ante
+      IN_Q_OVERFLOW (que no dice qué vigilancia perdió eventos) solo vuelve
+      a listar las carpetas que recibieron eventos desde su último listado
+      o cuyo mtime ya no es el de ese listado, y emite la diferencia con lo
+      guardado: altas como on_created y bajas como on_deleted.
+    - Emite on_closed con IN_CLOSE_WRITE.
+    """
+
+    nombre_backend = "inotify"
+
+    def __init__(self, fraccion_presupuesto: float = 0.25):
+        super().__init__()
+        if not INOTIFY_AVAILABLE:
+            raise OSError("inotify no disponible en este sistema")
+        self.presupuesto_watches = max(1, int(leer_max_user_watches() * fraccion_presupuesto))
+        self._fd = -1
+        self._despertar_r, self._despertar_w = -1, -1
+        # wd → (carpeta, manejador, recursivo)
+        self._watches: Dict[int, Tuple[Path, Any, bool]] = {}
+        self._wd_por_carpeta: Dict[Path, int] = {}
+        # Nombres que contiene cada carpeta vigilada según listado y eventos
+        self._nombres: Dict[Path, Set[str]] = {}
+        # mtime de cada carpeta al listarla (no lo actualizan los eventos)
+        self._mtime_listado: Dict[Path, int] = {}
+        # Carpetas con eventos desde su último listado
+        self._con_eventos: Set[Path] = set()
+        # cookie → (ruta, es_carpeta, manejador, instante)
+        self._movimientos: Dict[int, Tuple[Path, bool, Any, float]] = {}
+        self._presupuesto_avisado = False
+        self.desbordamientos = 0
+
+    def _preparar(self):
+        self._fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            codigo = ctypes.get_errno()
+            raise OSError(codigo, f"inotify_init1: {os.strerror(codigo)}")
+        self._despertar_r, self._despertar_w = os.pipe()
+        for manejador, carpeta, recursivo in self._vigilancias:
+            self._vigilar(carpeta, manejador, recursivo, emitir_existentes=False)
+
+    def stop(self):
+        super().stop()
+        if self._despertar_w >= 0:
+            try:
+                os.write(self._despertar_w, b'x')
+            except OSError:
+                pass
+
+    def _vigilar(self, carpeta: Path, manejador: Any, recursivo: bool, emitir_existentes: bool):
+        """
+        Añade una vigilancia (y, si es recursiva, a sus subcarpetas).
+
+        Args:
+            emitir_existentes: Emitir on_created para lo que ya contiene la carpeta;
+                               cubre lo creado antes de que la vigilancia existiera
+        """
+        pendientes = [carpeta]
+        while pendientes:
+            actual = pendientes.pop()
+            if actual in self._wd_por_carpeta:
+                continue
+            if len(self._watches) >= self.presupuesto_watches:
+                self._avisar_presupuesto()
+                return
+            wd = _libc.inotify_add_watch(self._fd, os.fsencode(str(actual)), MASCARA_VIGILANCIA)
+            if wd < 0:
+                codigo = ctypes.get_errno()
+                if codigo == errno.ENOSPC:
+                    self._avisar_presupuesto()
+                    return
+                logger.debug(f"No se pudo vigilar {actual}: {os.strerror(codigo)}")
+                continue
+            self._watches[wd] = (actual, manejador, recursivo)
+            self._wd_por_carpeta[actual] = wd
+
+            # Listado tomado con la vigilancia ya activa: lo que cambie
+            # después llega como evento
+            entradas = self._listar(actual)
+            if entradas is None:
+                continue
+            for entrada in entradas.values():
+                try:
+                    es_carpeta = entrada.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if es_carpeta:
+                    if recursivo and not entrada.name.startswith('.'):
+                        pendientes.append(Path(entrada.path))
+                elif emitir_existentes:
+                    self._despachar(manejador, EventoArchivo('created', entrada.path))
+
+    def _listar(self, carpeta: Path) -> Optional[Dict[str, os.DirEntry]]:
+        """
+        Lista una carpeta vigilada y guarda sus nombres y el mtime previo al
+        listado (así un cambio durante el listado no queda tapado).
+        """
+        try:
+            mtime = os.stat(carpeta).st_mtime_ns
+            with os.scandir(carpeta) as iterador:
+                entradas = {entrada.name: entrada for entrada in iterador}
+        except OSError:
+            return None
+        self._nombres[carpeta] = set(entradas)
+        self._mtime_listado[carpeta] = mtime
+        if time.time_ns() - mtime < MARGEN_MTIME_NS:
+            self._con_eventos.add(carpeta)
+        else:
+            self._con_eventos.discard(carpeta)
+        return entradas
+
+    def _avisar_presupuesto(self):
+        if not self._presupuesto_avisado:
+            logger.warning(f"⚠️ Presupuesto de vigilancias inotify agotado ({self.presupuesto_watches}); "
+                           f"las carpetas restantes no se vigilarán")
+            self._presupuesto_avisado = True
+
+    # Uso sin hilo propio, desde un bucle de eventos (p. ej. loop.add_reader)
+    
+    def abrir(self):
+        """Crea el descriptor inotify y las vigilancias programadas."""
+        self._preparar()
+    
+    def fileno(self) -> int:
+        return self._fd
+    
+    def procesar_eventos(self) -> bool:
+        """
+        Lee y despacha los eventos disponibles.
+        
+        Returns:
+            True si quedan movimientos esperando su pareja; hay que volver a
+            llamar tras ESPERA_PAREJA_MOVIMIENTO para cerrarlos
+        """
+        self._leer_eventos()
+        self._cerrar_movimientos_huerfanos()
+        return bool(self._movimientos)
+    
+    def cerrar(self):
+        for fd in (self._fd, self._despertar_r, self._despertar_w):
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._fd = self._despertar_r = self._despertar_w = -1
+    
+    def _ejecutar(self):
+        sondeo = select.poll()
+        sondeo.register(self._fd, select.POLLIN)
+        sondeo.register(self._despertar_r, select.POLLIN)
+        try:
+            while not self._detener.is_set():
+                espera = ESPERA_PAREJA_MOVIMIENTO * 1000 if self._movimientos else None
+                listos = sondeo.poll(espera)
+                if self._detener.is_set():
+                    break
+                if any(fd == self._fd for fd, _ in listos):
+                    self._leer_eventos()
+                self._cerrar_movimientos_huerfanos()
+        except Exception as e:
+            logger.error(f"Error en observador inotify: {e}")
+        finally:
+            self.cerrar()
+
+    def _leer_eventos(self):
+        while True:
+            try:
+                datos = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            if not datos:
+                return
+            desplazamiento = 0
+            while desplazamiento + _CABECERA_EVENTO.size <= len(datos):
+                wd, mascara, cookie, longitud = _CABECERA_EVENTO.unpack_from(datos, desplazamiento)
+                desplazamiento += _CABECERA_EVENTO.size
+                nombre = datos[desplazamiento:desplazamiento + longitud].rstrip(b'\0')
+                desplazamiento += longitud
+                self._procesar_evento(wd, mascara, cookie, os.fsdecode(nombre))
+
+    def _procesar_evento(self, wd: int, mascara: int, cookie: int, nombre: str):
+        if mascara & IN_Q_OVERFLOW:
+            self.desbordamientos += 1
+            logger.warning("⚠️ Cola de inotify desbordada; reescaneando carpetas con cambios")
+            self._reescanear_cambiadas()
+            return
+
+        vigilancia = self._watches.get(wd)
+        if vigilancia is None:
+            return
+        carpeta, manejador, recursivo = vigilancia
+
+        if mascara & IN_IGNORED:
+            del self._watches[wd]
+            self._wd_por_carpeta.pop(carpeta, None)
+            self._olvidar_listado(carpeta)
+            return
+        if mascara & (IN_DELETE_SELF | IN_MOVE_SELF):
+            return
+
+        ruta = carpeta / nombre
+        es_carpeta = bool(mascara & IN_ISDIR)
+
+        self._con_eventos.add(carpeta)
+        nombres = self._nombres.get(carpeta)
+        if nombres is not None:
+            if mascara & (IN_CREATE | IN_MOVED_TO):
+                nombres.add(nombre)
+            elif mascara & (IN_DELETE | IN_MOVED_FROM):
+                nombres.discard(nombre)
+
+        if mascara & IN_CREATE:
+            if es_carpeta:
+                if recursivo:
+                    self._vigilar(ruta, manejador, recursivo, emitir_existentes=True)
+            self._despachar(manejador, EventoArchivo('created', str(ruta), es_carpeta))
+        elif mascara & IN_MOVED_FROM:
+            self._movimientos[cookie] = (ruta, es_carpeta, manejador, time.monotonic())
+        elif mascara & IN_MOVED_TO:
+            origen = self._movimientos.pop(cookie, None)
+            if es_carpeta and recursivo:
+                if origen is not None:
+                    self._dejar_de_vigilar(origen[0])
+                self._vigilar(ruta, manejador, recursivo, emitir_existentes=origen is None)
+            if origen is not None:
+                self._despachar(manejador, EventoArchivo('moved', str(origen[0]), es_carpeta, str(ruta)))
+            else:
+                # Llega desde fuera de las carpetas vigiladas
+                self._despachar(manejador, EventoArchivo('created', str(ruta), es_carpeta))
+        elif mascara & IN_DELETE:
+            self._despachar(manejador, EventoArchivo('deleted', str(ruta), es_carpeta))
+        elif mascara & IN_CLOSE_WRITE:
+            self._despachar(manejador, EventoArchivo('closed', str(ruta), es_carpeta))
+        elif mascara & IN_MODIFY:
+            self._despachar(manejador, EventoArchivo('modified', str(ruta), es_carpeta))
+
+    def _cerrar_movimientos_huerfanos(self):
+        """Los movimientos sin destino vigilado salieron del árbol: son borrados."""
+        limite = time.monotonic() - ESPERA_PAREJA_MOVIMIENTO
+        for cookie, (ruta, es_carpeta, manejador, instante) in list(self._movimientos.items()):
+            if instante <= limite:
+                del self._movimientos[cookie]
+                if es_carpeta:
+                    self._dejar_de_vigilar(ruta)
+                self._despachar(manejador, EventoArchivo('deleted', str(ruta), es_carpeta))
+
+    def _dejar_de_vigilar(self, carpeta: Path):
+        for subcarpeta in [c for c in self._wd_por_carpeta if c == carpeta or carpeta in c.parents]:
+            wd = self._wd_por_carpeta.pop(subcarpeta)
+            self._watches.pop(wd, None)
+            self._olvidar_listado(subcarpeta)
+            _libc.inotify_rm_watch(self._fd, wd)
+
+    def _olvidar_listado(self, carpeta: Path):
+        self._nombres.pop(carpeta, None)
+        self._mtime_listado.pop(carpeta, None)
+        self._con_eventos.discard(carpeta)
+
+    def _carpetas_cambiadas(self) -> List[Path]:
+        """
+        Carpetas vigiladas que pueden haber perdido eventos: las que
+        recibieron alguno desde su último listado y las que tienen un mtime
+        distinto del de ese listado. Para las demás basta un stat.
+        """
+        cambiadas = []
+        for carpeta in self._wd_por_carpeta:
+            if carpeta in self._con_eventos:
+                cambiadas.append(carpeta)
+                continue
+            try:
+                mtime = os.stat(carpeta).st_mtime_ns
+            except OSError:
+                continue  # Llegará IN_IGNORED o lo verá el reescaneo del padre
+            if mtime != self._mtime_listado.get(carpeta):
+                cambiadas.append(carpeta)
+        return cambiadas
+
+    def _reescanear_cambiadas(self):
+        """
+        Tras un desbordamiento se vuelven a listar solo las carpetas que
+        pueden haber cambiado y se comparan con los nombres guardados: lo
+        nuevo se emite como creado y lo que falta como borrado.
+        """
+        for carpeta in self._carpetas_cambiadas():
+            wd = self._wd_por_carpeta.get(carpeta)
+            vigilancia = self._watches.get(wd) if wd is not None else None
+            if vigilancia is None:
+                continue  # Dejó de vigilarse durante este mismo reescaneo
+            _, manejador, recursivo = vigilancia
+            conocidos = self._nombres.get(carpeta, set())
+            entradas = self._listar(carpeta)
+            if entradas is None:
+                continue
+
+            for nombre in set(entradas) - conocidos:
+                entrada = entradas[nombre]
+                try:
+                    es_carpeta = entrada.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                ruta = Path(entrada.path)
+                if es_carpeta and recursivo and ruta not in self._wd_por_carpeta and not nombre.startswith('.'):
+                    self._vigilar(ruta, manejador, recursivo, emitir_existentes=True)
+                self._despachar(manejador, EventoArchivo('created', entrada.path, es_carpeta))
+
+            for nombre in conocidos - set(entradas):
+                ruta = carpeta / nombre
+                es_carpeta = ruta in self._wd_por_carpeta
+                if es_carpeta:
+                    self._dejar_de_vigilar(ruta)
+                self._despachar(manejador, EventoArchivo('deleted', str(ruta), es_carpeta))
+
+
+class ObservadorSondeo(_ObservadorBase):
+    """
+    Observador por sondeo para cuando no hay inotify ni watchdog.
+
+    Cada intervalo solo hace un stat por carpeta; únicamente se listan las
+    carpetas cuyo mtime cambió (altas, bajas, renombrados) y, en las demás,
+    se vuelven a consultar solo los archivos modificados recientemente, que
+    son los que pueden seguir creciendo.
+    """
+
+    nombre_backend = "sondeo"
+
+    def __init__(self, intervalo: float = 1.0, ventana_actividad: float = 120.0):
+        super().__init__()
+        self.intervalo = intervalo
+        self.ventana_actividad = ventana_actividad
+        # carpeta → (manejador, recursivo, mtime_ns)
+        self._carpetas: Dict[Path, Tuple[Any, bool, int]] = {}
+        # carpeta → nombre → (inodo, tamaño, mtime_ns, es_carpeta)
+        self._listados: Dict[Path, Dict[str, Tuple[int, int, int, bool]]] = {}
+
+    def _preparar(self):
+        for manejador, carpeta, recursivo in self._vigilancias:
+            self._añadir_carpeta(carpeta, manejador, recursivo, emitir=False)
+
+    def _añadir_carpeta(self, carpeta: Path, manejador: Any, recursivo: bool, emitir: bool):
+        pendientes = [carpeta]
+        while pendientes:
+            actual = pendientes.pop()
+            if actual in self._carpetas:
+                continue
+            try:
+                mtime = actual.stat().st_mtime_ns
+            except OSError:
+                continue
+            listado = self._listar(actual)
+            self._carpetas[actual] = (manejador, recursivo, mtime)
+            self._listados[actual] = listado
+            for nombre, (_, _, _, es_carpeta) in listado.items():
+                if es_carpeta:
+                    if recursivo and not nombre.startswith('.'):
+                        pendientes.append(actual / nombre)
+                elif emitir:
+                    self._despachar(manejador, EventoArchivo('created', str(actual / nombre)))
+
+    @staticmethod
+    def _listar(carpeta: Path) -> Dict[str, Tuple[int, int, int, bool]]:
+        listado = {}
+        try:
+            with os.scandir(carpeta) as entradas:
+                for entrada in entradas:
+                    try:
+                        st = entrada.stat(follow_symlinks=False)
+                        listado[entrada.name] = (st.st_ino, st.st_size, st.st_mtime_ns,
+                                                 entrada.is_dir(follow_symlinks=False))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return listado
+
+    # Uso sin hilo propio: llamar a sondear() cada intervalo
+    
+    def abrir(self):
+        """Toma la instantánea inicial de las carpetas programadas."""
+        self._preparar()
+    
+    def sondear(self):
+        """Hace una pasada de sondeo y despacha los cambios encontrados."""
+        try:
+            self._sondear()
+        except Exception as e:
+            logger.error(f"Error en observador por sondeo: {e}")
+    
+    def _ejecutar(self):
+        while not self._detener.wait(self.intervalo):
+            self.sondear()
+
+    def _sondear(self):
+        for carpeta in list(self._carpetas):
+            if carpeta not in self._carpetas:
+                continue  # Eliminada durante esta misma pasada
+            manejador, recursivo, mtime_anterior = self._carpetas[carpeta]
+            try:
+                mtime = carpeta.stat().st_mtime_ns
+            except OSError:
+                self._quitar_carpeta(carpeta)
+                continue
+            if mtime != mtime_anterior:
+                self._carpetas[carpeta] = (manejador, recursivo, mtime)
+                self._comparar_listado(carpeta, manejador, recursivo)
+            else:
+                self._revisar_activos(carpeta, manejador)
+
+    def _revisar_activos(self, carpeta: Path, manejador: Any):
+        limite = time.time_ns() - int(self.ventana_actividad * 1e9)
+        listado = self._listados[carpeta]
+        for nombre, (inodo, tamaño, mtime, es_carpeta) in list(listado.items()):
+            if es_carpeta or mtime < limite:
+                continue
+            ruta = carpeta / nombre
+            try:
+                st = os.lstat(ruta)
+            except OSError:
+                continue
+            if (st.st_size, st.st_mtime_ns) != (tamaño, mtime):
+                listado[nombre] = (inodo, st.st_size, st.st_mtime_ns, False)
+                self._despachar(manejador, EventoArchivo('modified', str(ruta)))
+
+    def _comparar_listado(self, carpeta: Path, manejador: Any, recursivo: bool):
+        anterior = self._listados.get(carpeta, {})
+        actual = self._listar(carpeta)
+        self._listados[carpeta] = actual
+
+        desaparecidos = {nombre: datos for nombre, datos in anterior.items() if nombre not in actual}
+        por_inodo = {datos[0]: nombre for nombre, datos in desaparecidos.items()}
+
+        for nombre, (inodo, tamaño, mtime, es_carpeta) in actual.items():
+            ruta = carpeta / nombre
+            previo = anterior.get(nombre)
+            if previo is None:
+                origen = por_inodo.pop(inodo, None)
+                if origen is not None:
+                    desaparecidos.pop(origen, None)
+                    self._despachar(manejador, EventoArchivo('moved', str(carpeta / origen), es_carpeta, str(ruta)))
+                    if es_carpeta:
+                        self._quitar_carpeta(carpeta / origen)
+                        if recursivo:
+                            self._añadir_carpeta(ruta, manejador, recursivo, emitir=False)
+                else:
+                    self._despachar(manejador, EventoArchivo('created', str(ruta), es_carpeta))
+                    if es_carpeta and recursivo and not nombre.startswith('.'):
+                        self._añadir_carpeta(ruta, manejador, recursivo, emitir=True)
+            elif not es_carpeta and (previo[1], previo[2]) != (tamaño, mtime):
+                self._despachar(manejador, EventoArchivo('modified', str(ruta)))
+
+        for nombre, (_, _, _, es_carpeta) in desaparecidos.items():
+            if es_carpeta:
+                self._quitar_carpeta(carpeta / nombre)
+            self._despachar(manejador, EventoArchivo('deleted', str(carpeta / nombre), es_carpeta))
+
+    def _quitar_carpeta(self, carpeta: Path):
+        for subcarpeta in [c for c in self._carpetas if c == carpeta or carpeta in c.parents]:
+            del self._carpetas[subcarpeta]
+            self._listados.pop(subcarpeta, None)
+
+
+def crear_observador(backend: str = 'auto') -> Optional[_ObservadorBase]:
+    """
+    Crea un observador propio.
+
+    Args:
+        backend: 'inotify', 'sondeo' o 'auto' (inotify si está disponible)
+
+    Returns:
+        Observador sin iniciar, o None si el backend pedido no está disponible
+    """
+    if backend in ('auto', 'inotify') and INOTIFY_AVAILABLE:
+        try:
+            return ObservadorInotify()
+        except OSError as e:
+            logger.warning(f"inotify no disponible: {e}")
+    if backend in ('auto', 'sondeo'):
+        return ObservadorSondeo()
+    return None
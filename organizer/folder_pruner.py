@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Poda de carpetas vacías proporcional a lo que cambió: cuenta los hijos de
+cada carpeta durante el escaneo y solo visita las que se quedaron sin nada
+"""
+
+import heapq
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Archivos que no cuentan como contenido de una carpeta
+ARCHIVOS_IGNORADOS = {'desktop.ini', 'Thumbs.db'}
+
+
+def es_contenido_visible(nombre: str) -> bool:
+    """True si una entrada con este nombre impide considerar vacía su carpeta."""
+    return not nombre.startswith('.') and nombre not in ARCHIVOS_IGNORADOS
+
+
+class PodadorCarpetas:
+    """
+    Elimina las carpetas que quedan vacías tras mover archivos.
+
+    Quien escanea anota con registrar_listado() cuántas entradas visibles
+    tiene cada carpeta (el número sale del mismo scandir del escaneo, sin
+    volver a listar). Después, cada movimiento se anota con salida() y
+    entrada(): una carpeta solo pasa a candidata cuando su cuenta llega a
+    cero. podar() procesa las candidatas de la más profunda a la más
+    superficial y, al borrar una, descuenta a su padre, que puede pasar a
+    ser candidata a su vez. El coste es proporcional a las carpetas que se
+    vaciaron, no al árbol completo.
+
+    Las carpetas marcadas con marcar() sin listado previo se comprueban con
+    un único scandir al podar. rmdir() solo borra carpetas realmente vacías,
+    así que una cuenta desfasada nunca elimina contenido: como mucho deja
+    una carpeta sin borrar (p. ej. si solo contiene archivos ocultos).
+    """
+
+    def __init__(self, raiz: Path, protegida: Optional[Callable[[Path], bool]] = None):
+        """
+        Args:
+            raiz: Carpeta raíz; nunca se elimina ni se sube por encima de ella
+            protegida: Función opcional que devuelve True para las carpetas
+                       que no deben eliminarse aunque estén vacías
+        """
+        self.raiz = Path(raiz)
+        self.protegida = protegida
+        # Entradas visibles que le quedan a cada carpeta listada
+        self._restantes: Dict[Path, int] = {}
+        # Montículo de candidatas: (-profundidad, ruta) → primero las más profundas
+        self._candidatas: List[Tuple[int, str]] = []
+        self._en_candidatas: Set[Path] = set()
+
+    def _dentro(self, carpeta: Path) -> bool:
+        return carpeta != self.raiz and self.raiz in carpeta.parents
+
+    def _candidata(self, carpeta: Path):
+        if carpeta not in self._en_candidatas and self._dentro(carpeta):
+            self._en_candidatas.add(carpeta)
+            heapq.heappush(self._candidatas, (-len(carpeta.parts), str(carpeta)))
+
+    def registrar_listado(self, carpeta: Path, entradas_visibles: int):
+        """
+        Anota cuántas entradas visibles tiene `carpeta` según el escaneo. Una
+        carpeta que ya estaba vacía queda directamente como candidata.
+        """
+        self._restantes[carpeta] = entradas_visibles
+        if entradas_visibles <= 0:
+            self._candidata(carpeta)
+
+    def marcar(self, carpeta: Path):
+        """Propone `carpeta` para podar aunque no se haya listado."""
+        self._candidata(carpeta)
+
+    def salida(self, origen: Path):
+        """Un archivo o carpeta salió de `origen.parent`."""
+        carpeta = origen.parent
+        restantes = self._restantes.get(carpeta)
+        if restantes is None:
+            self._candidata(carpeta)
+            return
+        self._restantes[carpeta] = restantes - 1
+        if restantes - 1 <= 0:
+            self._candidata(carpeta)
+
+    def entrada(self, destino: Path):
+        """
+        Un archivo llegó a `destino`. Las carpetas listadas que lo contienen
+        ganan un hijo; las que no se habían listado se dan por recién
+        creadas (con ese único hijo).
+        """
+        hijo = destino
+        while self._dentro(hijo.parent):
+            carpeta = hijo.parent
+            restantes = self._restantes.get(carpeta)
+            if restantes is not None:
+                self._restantes[carpeta] = restantes + 1
+                return
+            self._restantes[carpeta] = 1
+            hijo = carpeta
+
+    def _vacia(self, carpeta: Path) -> bool:
+        restantes = self._restantes.get(carpeta)
+        if restantes is not None:
+            return restantes <= 0
+        try:
+            with os.scandir(carpeta) as entradas:
+                return not any(es_contenido_visible(entrada.name) for entrada in entradas)
+        except OSError:
+            return False
+
+    def podar(self) -> List[Path]:
+        """
+        Elimina las candidatas vacías, de dentro hacia fuera.
+
+        Returns:
+            Carpetas eliminadas
+        """
+        eliminadas: List[Path] = []
+        while self._candidatas:
+            _, ruta = heapq.heappop(self._candidatas)
+            carpeta = Path(ruta)
+            self._en_candidatas.discard(carpeta)
+            if not self._vacia(carpeta):
+                continue
+            if self.protegida is not None and self.protegida(carpeta):
+                continue
+            try:
+                carpeta.rmdir()
+            except OSError as e:
+                # Quedan archivos ocultos, permisos o ya no existe
+                logger.debug(f"No se pudo eliminar carpeta {carpeta}: {e}")
+                continue
+            self._restantes.pop(carpeta, None)
+            eliminadas.append(carpeta)
+            self.salida(carpeta)
+        return eliminadas
+
+
+def podar_tras_mover(raiz: Path, origenes: Iterable[Path],
+                     protegida: Optional[Callable[[Path], bool]] = None) -> List[Path]:
+    """
+    Atajo sin escaneo previo: poda las carpetas de las que salieron
+    `origenes`, comprobando cada una con un scandir.
+    """
+    podador = PodadorCarpetas(raiz, protegida)
+    for origen in origenes:
+        podador.marcar(Path(origen).parent)
+    return podador.podar()
@@ -27,6 +27,10 @@ except ImportError:
 
 from .file_organizer import OrganizadorArchivos
 from .autostart import GestorAutoarranque
+from .auto_scheduler import PlanificadorAdaptativo, formatear_intervalo
+from .gui_jobs import EjecutorTareas
+from .log_buffer import ManejadorLogsEnBuffer
+from .revert_engine import CARPETAS_EXCLUIDAS, DESHACER_TODO, MotorReversion, planificar_deshacer_todo
 
 # Importar notificaciones nativas
 try:
@@ -69,6 +73,102 @@ except ImportError:
 
 logger = logging.getLogger('organizador.gui_avanzada')
 
+# Líneas que conservan el buffer de logs y el widget de la pestaña Logs
+MAX_LINEAS_LOG = 5000
+
+
+# Trabajos de disco: se ejecutan en un hilo del EjecutorTareas y no tocan widgets.
+# Reciben (token, progreso, ...) y lo que devuelven llega a la GUI por señal.
+
+def _reorganizar_en_segundo_plano(token, progreso, organizador):
+    """Reorganización completa; informa de cada archivo movido."""
+    callback = lambda archivo, categoria, subcategoria: progreso((archivo, categoria, subcategoria))
+    return organizador.reorganizar_completamente(callback=callback, cancelacion=token)
+
+
+def _deshacer_en_segundo_plano(token, progreso, organizador):
+    """Mueve todos los archivos de las carpetas organizadas de vuelta a la raíz."""
+    carpeta_descargas = Path(organizador.carpeta_descargas)
+    
+    # Carpetas organizadas (las que se limpiarán al final)
+    carpetas_a_revisar = []
+    for item in carpeta_descargas.iterdir():
+        if item.is_dir() and item.name not in CARPETAS_EXCLUIDAS:
+            carpetas_a_revisar.append(item)
+    
+    # Plan completo por adelantado, movimientos en paralelo y punto de control:
+    # si se cancela o se cierra la app, el siguiente deshacer continúa el plan
+    motor = MotorReversion(carpeta_descargas, DESHACER_TODO)
+    if motor.pendiente():
+        progreso("⏯️ Reanudando un deshacer interrumpido...")
+    resultado = motor.revertir(
+        lambda: planificar_deshacer_todo(carpeta_descargas),
+        progreso=lambda hechos, total: progreso(f"📁➡️📄 {hechos}/{total} archivos devueltos a la raíz"),
+        cancelacion=token
+    )
+    archivos_movidos = resultado['movidos']
+    errores = resultado['errores']
+    
+    # Eliminar carpetas vacías (también tras cancelar: no dejar carpetas huecas)
+    def eliminar_carpetas_vacias(carpeta):
+        try:
+            for item in carpeta.iterdir():
+                if item.is_dir():
+                    eliminar_carpetas_vacias(item)
+                    try:
+                        if not any(item.iterdir()):  # Si está vacía
+                            item.rmdir()
+                            progreso(f"🗑️ Carpeta vacía eliminada: {item.name}")
+                    except OSError:
+                        pass  # No pasa nada si no se puede eliminar
+        except Exception:
+            pass
+    
+    for carpeta in carpetas_a_revisar:
+        if carpeta.exists():
+            eliminar_carpetas_vacias(carpeta)
+            try:
+                if not any(carpeta.iterdir()):
+                    carpeta.rmdir()
+                    progreso(f"🗑️ Carpeta principal eliminada: {carpeta.name}")
+            except OSError:
+                pass
+    
+    # Limpiar huella de archivos organizados
+    if hasattr(organizador, 'archivos_procesados'):
+        organizador.archivos_procesados.clear()
+        organizador._guardar_huella()
+    
+    return archivos_movidos, errores
+
+
+def _muestra_archivos_fechas(token, progreso, carpeta_descargas, limite=10):
+    """
+    Toma hasta `limite` archivos de ejemplo con su fecha de modificación.
+    
+    Returns:
+        Lista de (archivo, fecha o excepción); None si la carpeta no existe;
+        'sin_permiso' si no se puede leer
+    """
+    if not carpeta_descargas.exists():
+        return None
+    
+    extensiones_comunes = {'.pdf', '.doc', '.docx', '.jpg', '.png', '.mp4', '.zip', '.exe', '.txt'}
+    muestra = []
+    try:
+        for archivo in carpeta_descargas.iterdir():
+            if archivo.is_file() and archivo.suffix.lower() in extensiones_comunes:
+                try:
+                    muestra.append((archivo, datetime.fromtimestamp(archivo.stat().st_mtime)))
+                except Exception as e:
+                    muestra.append((archivo, e))
+                if len(muestra) >= limite:  # Limitar a 10 ejemplos
+                    break
+    except PermissionError:
+        return 'sin_permiso'
+    return muestra
+
+
 class OrganizadorAvanzado(QMainWindow):
     """GUI completa con todas las funcionalidades avanzadas."""
     
@@ -122,6 +222,9 @@ class OrganizadorAvanzado(QMainWindow):
         else:
             self.notificador = None
         
+        # Trabajos de disco fuera del hilo de la interfaz
+        self.tareas = EjecutorTareas(self)
+        
         # Estado de la aplicación
         self.en_bandeja = False
         self.cerrar_completamente = False
@@ -137,9 +240,11 @@ class OrganizadorAvanzado(QMainWindow):
         self._setup_system_tray()
         self._inicializar_modulos()
         
-        # Timer para organización automática
+        # Timer para organización automática (un disparo: cada pasada programa la siguiente)
         self.timer_auto = QTimer()
+        self.timer_auto.setSingleShot(True)
         self.timer_auto.timeout.connect(self._organizar_automatico)
+        self.planificador_auto = None
         
         # Timer para verificar actualizaciones periódicamente
         self.timer_actualizaciones = QTimer()
@@ -526,6 +631,8 @@ class OrganizadorAvanzado(QMainWindow):
         try:
             from .statistics import EstadisticasOrganizador
             self.stats_manager = EstadisticasOrganizador(carpeta)
+            # El organizador informa de cada archivo movido
+            self.organizador.estadisticas = self.stats_manager
             funciones.append("📊 Stats")
         except Exception as e:
             self.stats_manager = None
@@ -640,6 +747,18 @@ class OrganizadorAvanzado(QMainWindow):
         if hasattr(self, 'timer_auto') and self.timer_auto.isActive():
             self.timer_auto.stop()
         
+        # Cancelar los trabajos en curso y esperar a que dejen el disco en orden
+        if hasattr(self, 'tareas') and self.tareas.en_curso():
+            self._agregar_log("⏹️ Cancelando trabajos en segundo plano...")
+            self.tareas.esperar()
+        
+        if getattr(self, 'stats_manager', None):
+            self.stats_manager.cerrar()
+        if getattr(self, 'date_organizer', None):
+            self.date_organizer.cerrar()
+        if getattr(self, 'config_portable', None):
+            self.config_portable.guardar()
+        
         if hasattr(self, 'timer_actualizaciones') and self.timer_actualizaciones.isActive():
             self.timer_actualizaciones.stop()
         
@@ -684,15 +803,9 @@ class OrganizadorAvanzado(QMainWindow):
                 if hasattr(self, 'chk_auto_detallado'):
                     self.chk_auto_detallado.setChecked(False)
                 
-                if not hasattr(self, 'timer_auto') or self.timer_auto is None:
-                    self.timer_auto = QTimer()
-                    self.timer_auto.timeout.connect(self._organizar_automatico)
-                
-                # Obtener intervalo del selector
-                intervalo_segundos = self.combo_intervalo_auto.currentData()
-                intervalo_ms = intervalo_segundos * 1000
+                # El intervalo del selector es la base del planificador adaptativo
                 intervalo_texto = self.combo_intervalo_auto.currentText()
-                self.timer_auto.start(intervalo_ms)
+                self._iniciar_timer_auto()
                 self._agregar_log(f"⚡ Auto-organización BÁSICA ACTIVADA ({intervalo_texto})")
                 
                 # Actualizar tooltip de la bandeja
@@ -729,15 +842,9 @@ class OrganizadorAvanzado(QMainWindow):
                 if hasattr(self, 'chk_auto_basico'):
                     self.chk_auto_basico.setChecked(False)
                 
-                if not hasattr(self, 'timer_auto') or self.timer_auto is None:
-                    self.timer_auto = QTimer()
-                    self.timer_auto.timeout.connect(self._organizar_automatico)
-                
-                # Obtener intervalo del selector
-                intervalo_segundos = self.combo_intervalo_auto.currentData()
-                intervalo_ms = intervalo_segundos * 1000
+                # El intervalo del selector es la base del planificador adaptativo
                 intervalo_texto = self.combo_intervalo_auto.currentText()
-                self.timer_auto.start(intervalo_ms)
+                self._iniciar_timer_auto()
                 self._agregar_log(f"⚡ Auto-organización DETALLADA ACTIVADA ({intervalo_texto})")
                 
                 # Actualizar tooltip de la bandeja
@@ -765,6 +872,34 @@ class OrganizadorAvanzado(QMainWindow):
             self._agregar_log(f"❌ Error configurando auto-organización detallada: {e}")
             QMessageBox.critical(self, "Error", f"❌ Error: {e}")
     
+    def _iniciar_timer_auto(self):
+        """Arranca la auto-organización con el intervalo del selector como base."""
+        if not hasattr(self, 'timer_auto') or self.timer_auto is None:
+            self.timer_auto = QTimer()
+            self.timer_auto.setSingleShot(True)
+            self.timer_auto.timeout.connect(self._organizar_automatico)
+        
+        intervalo_segundos = self.combo_intervalo_auto.currentData()
+        if self.planificador_auto is None:
+            self.planificador_auto = PlanificadorAdaptativo(self.organizador.carpeta_descargas, intervalo_segundos)
+        else:
+            self.planificador_auto.carpeta = Path(self.organizador.carpeta_descargas)
+            self.planificador_auto.configurar(intervalo_segundos)
+        self.timer_auto.start(int(intervalo_segundos * 1000))
+    
+    def _auto_organizacion_activa(self):
+        return ((hasattr(self, 'chk_auto_basico') and self.chk_auto_basico.isChecked()) or
+                (hasattr(self, 'chk_auto_detallado') and self.chk_auto_detallado.isChecked()))
+    
+    def _programar_siguiente_auto(self):
+        """Programa el siguiente tic con el intervalo que decidió el planificador."""
+        if self.planificador_auto and self._auto_organizacion_activa():
+            self.timer_auto.start(int(self.planificador_auto.intervalo_actual * 1000))
+    
+    def obtener_metricas_auto(self):
+        """Decisiones y coste de la auto-organización adaptativa."""
+        return self.planificador_auto.obtener_metricas() if self.planificador_auto else {}
+    
     def _actualizar_estado_auto_organizacion(self):
         """Actualiza el estado visual cuando no hay auto-organización activa."""
         # Verificar si algún modo sigue activo
@@ -802,86 +937,8 @@ class OrganizadorAvanzado(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            try:
-                self.progress_bar.setVisible(True)
-                self.progress_bar.setRange(0, 0)
-                
-                carpeta_descargas = Path(self.organizador.carpeta_descargas)
-                archivos_movidos = 0
-                errores = []
-                
-                # Buscar todas las carpetas organizadas
-                carpetas_a_revisar = []
-                for item in carpeta_descargas.iterdir():
-                    if item.is_dir() and item.name not in ['.config', '.git', '__pycache__']:
-                        carpetas_a_revisar.append(item)
-                
-                # Mover archivos recursivamente de vuelta a la raíz
-                def mover_archivos_de_carpeta(carpeta, nivel=0):
-                    nonlocal archivos_movidos, errores
-                    
-                    if nivel > 10:  # Evitar bucles infinitos
-                        return
-                        
-                    try:
-                        for item in carpeta.iterdir():
-                            if item.is_file():
-                                # Encontrar un nombre único en la raíz
-                                nombre_destino = item.name
-                                contador = 1
-                                while (carpeta_descargas / nombre_destino).exists():
-                                    nombre_base, extension = os.path.splitext(item.name)
-                                    nombre_destino = f"{nombre_base}_{contador}{extension}"
-                                    contador += 1
-                                
-                                try:
-                                    destino = carpeta_descargas / nombre_destino
-                                    item.rename(destino)
-                                    archivos_movidos += 1
-                                    self._agregar_log(f"📁➡️📄 {item.name} → raíz")
-                                except Exception as e:
-                                    errores.append(f"Error moviendo {item.name}: {e}")
-                                    
-                            elif item.is_dir():
-                                # Recursivamente mover archivos de subcarpetas
-                                mover_archivos_de_carpeta(item, nivel + 1)
-                    except Exception as e:
-                        errores.append(f"Error procesando carpeta {carpeta.name}: {e}")
-                
-                # Procesar todas las carpetas
-                for carpeta in carpetas_a_revisar:
-                    mover_archivos_de_carpeta(carpeta)
-                
-                # Eliminar carpetas vacías
-                def eliminar_carpetas_vacias(carpeta):
-                    try:
-                        for item in carpeta.iterdir():
-                            if item.is_dir():
-                                eliminar_carpetas_vacias(item)
-                                try:
-                                    if not any(item.iterdir()):  # Si está vacía
-                                        item.rmdir()
-                                        self._agregar_log(f"🗑️ Carpeta vacía eliminada: {item.name}")
-                                except OSError:
-                                    pass  # No pasa nada si no se puede eliminar
-                    except Exception:
-                        pass
-                
-                for carpeta in carpetas_a_revisar:
-                    if carpeta.exists():
-                        eliminar_carpetas_vacias(carpeta)
-                        try:
-                            if not any(carpeta.iterdir()):
-                                carpeta.rmdir()
-                                self._agregar_log(f"🗑️ Carpeta principal eliminada: {carpeta.name}")
-                        except OSError:
-                            pass
-                
-                # Limpiar huella de archivos organizados
-                if hasattr(self.organizador, 'archivos_procesados'):
-                    self.organizador.archivos_procesados.clear()
-                    self.organizador._guardar_huella()
-                
+            def al_completar(resultado):
+                archivos_movidos, errores = resultado
                 mensaje = f"✅ Organización deshecha!\n\n"
                 mensaje += f"📁 {archivos_movidos} archivos movidos a la raíz"
                 if errores:
@@ -889,45 +946,64 @@ class OrganizadorAvanzado(QMainWindow):
                 
                 QMessageBox.information(self, "Operación Completada", mensaje)
                 self._actualizar_datos()
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"❌ Error deshaciendo organización: {e}")
-            finally:
-                self.progress_bar.setVisible(False)
+            
+            lanzado = self.tareas.lanzar(
+                'organizar', _deshacer_en_segundo_plano, self.organizador,
+                al_completar=al_completar,
+                al_progreso=self._agregar_log,
+                al_error=lambda e: QMessageBox.critical(self, "Error", f"❌ Error deshaciendo organización: {e}"),
+                al_cancelar=lambda: self._agregar_log("⏹️ Deshacer cancelado: los archivos ya movidos quedan en la raíz")
+            )
+            if lanzado is None:
+                QMessageBox.information(self, "En curso", "⏳ Ya hay una organización en curso")
     
     def _organizar_automatico(self):
         """Organiza archivos automáticamente en segundo plano."""
-        try:
-            import datetime
-            hora_actual = datetime.datetime.now().strftime("%H:%M:%S")
-            
-            # DEBUG: Mostrar que el timer está funcionando
-            if hasattr(self, '_debug_timer_count'):
-                self._debug_timer_count += 1
-            else:
-                self._debug_timer_count = 1
-            
-            # Determinar qué modo usar basado en qué checkbox está activo
-            usar_subcarpetas = None
-            modo_texto = ""
-            
-            if hasattr(self, 'chk_auto_detallado') and self.chk_auto_detallado.isChecked():
-                usar_subcarpetas = True
-                modo_texto = " (DETALLADO)"
-            elif hasattr(self, 'chk_auto_basico') and self.chk_auto_basico.isChecked():
-                usar_subcarpetas = False
-                modo_texto = " (BÁSICO)"
-            else:
-                # Fallback: usar la configuración del checkbox normal
-                usar_subcarpetas = self.chk_subcarpetas.isChecked()
-                modo_texto = f" ({'DETALLADO' if usar_subcarpetas else 'BÁSICO'})"
-            
-            # Aplicar configuración
-            self.organizador.usar_subcarpetas = usar_subcarpetas
-            
-            # Reorganizar todo de forma silenciosa (incluye subcarpetas)
-            resultados, errores = self.organizador.reorganizar_completamente()
+        planificador = self.planificador_auto
+        if planificador is None:
+            return
+        if planificador.carpeta != Path(self.organizador.carpeta_descargas):
+            # Cambió la carpeta de descargas: empezar de cero con la nueva
+            planificador.carpeta = Path(self.organizador.carpeta_descargas)
+            planificador.configurar(planificador.intervalo_base)
+        intervalo_anterior = planificador.intervalo_actual
+        if not planificador.debe_ejecutar(ocupado=self.tareas.en_curso('organizar')):
+            self._programar_siguiente_auto()
+            return
+        
+        import datetime
+        hora_actual = datetime.datetime.now().strftime("%H:%M:%S")
+        
+        # DEBUG: Mostrar que el timer está funcionando
+        if hasattr(self, '_debug_timer_count'):
+            self._debug_timer_count += 1
+        else:
+            self._debug_timer_count = 1
+        
+        # Determinar qué modo usar basado en qué checkbox está activo
+        usar_subcarpetas = None
+        modo_texto = ""
+        
+        if hasattr(self, 'chk_auto_detallado') and self.chk_auto_detallado.isChecked():
+            usar_subcarpetas = True
+            modo_texto = " (DETALLADO)"
+        elif hasattr(self, 'chk_auto_basico') and self.chk_auto_basico.isChecked():
+            usar_subcarpetas = False
+            modo_texto = " (BÁSICO)"
+        else:
+            # Fallback: usar la configuración del checkbox normal
+            usar_subcarpetas = self.chk_subcarpetas.isChecked()
+            modo_texto = f" ({'DETALLADO' if usar_subcarpetas else 'BÁSICO'})"
+        
+        # Aplicar configuración
+        self.organizador.usar_subcarpetas = usar_subcarpetas
+        
+        pasada = {'total': 0, 'exito': False}
+        
+        def al_completar(resultado):
+            resultados, errores = resultado
             total = sum(len(files) for cat in resultados.values() for files in cat.values())
+            pasada.update(total=total, exito=True)
             
             # Log de actividad (con o sin archivos)
             if total > 0:
@@ -952,9 +1028,22 @@ class OrganizadorAvanzado(QMainWindow):
                 # Actualizar tooltip para mostrar que está funcionando
                 if self.tray_icon:
                     self.tray_icon.setToolTip(f"🍄 DescargasOrdenadas - Revisando: {hora_actual} (Activo)")
-                
-        except Exception as e:
-            self._agregar_log(f"❌ Error en auto-organización: {e}")
+        
+        def al_terminar():
+            siguiente = planificador.finalizar(pasada['total'], pasada['exito'])
+            ultima = planificador.historial[-1]
+            if siguiente != intervalo_anterior:
+                self._agregar_log(f"⏱️ Próxima auto-organización en {formatear_intervalo(siguiente)} "
+                                  f"(última pasada: {ultima['duracion']:.2f}s, CPU {ultima['cpu']:.2f}s)")
+            self._programar_siguiente_auto()
+        
+        # Reorganizar todo de forma silenciosa (incluye subcarpetas) fuera del hilo de la GUI
+        self.tareas.lanzar(
+            'organizar', _reorganizar_en_segundo_plano, self.organizador,
+            al_completar=al_completar,
+            al_error=lambda e: self._agregar_log(f"❌ Error en auto-organización: {e}"),
+            al_terminar=al_terminar
+        )
     
     def _ocultar_consola(self):
         """Oculta la consola de Windows de forma optimizada."""
@@ -1082,6 +1171,20 @@ class OrganizadorAvanzado(QMainWindow):
                     self.showMinimized()
                     event.ignore()
 
+    @Slot(bool)
+    def _mostrar_tareas_en_curso(self, ocupado):
+        """Muestra la barra de progreso y el botón de cancelar mientras hay trabajos."""
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(ocupado)
+        self.btn_cancelar_tareas.setVisible(ocupado)
+    
+    def _mostrar_progreso(self, dato):
+        """Pasa la barra de progreso a determinada con (hechos, total) de un trabajo."""
+        hechos, total = dato
+        if total > 0:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(hechos)
+    
     def _setup_ui(self):
         """Configura la interfaz principal."""
         central_widget = QWidget()
@@ -1123,10 +1226,17 @@ class OrganizadorAvanzado(QMainWindow):
         self._crear_tab_estadisticas()
         self._crear_tab_logs()
         
-        # Barra de progreso
+        # Barra de progreso (visible mientras hay trabajos en segundo plano)
+        progreso_layout = QHBoxLayout()
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
-        layout.addWidget(self.progress_bar)
+        progreso_layout.addWidget(self.progress_bar)
+        self.btn_cancelar_tareas = QPushButton("⏹️ Cancelar")
+        self.btn_cancelar_tareas.setVisible(False)
+        self.btn_cancelar_tareas.clicked.connect(lambda: self.tareas.cancelar())
+        progreso_layout.addWidget(self.btn_cancelar_tareas)
+        layout.addLayout(progreso_layout)
+        self.tareas.ocupado.connect(self._mostrar_tareas_en_curso)
         
         self.statusBar().showMessage("🍄 Listo - Todas las funcionalidades cargadas")
     
@@ -1856,6 +1966,8 @@ class OrganizadorAvanzado(QMainWindow):
         # Área de logs
         self.text_logs = QPlainTextEdit()
         self.text_logs.setReadOnly(True)
+        # El widget descarta las líneas más antiguas al pasar del límite
+        self.text_logs.setMaximumBlockCount(MAX_LINEAS_LOG)
         self.text_logs.setStyleSheet("""
             QPlainTextEdit {
                 background-color: #1e1e1e;
@@ -1879,39 +1991,9 @@ class OrganizadorAvanzado(QMainWindow):
         """Configura la captura de logs en la pestaña interna."""
         import logging
         
-        # Handler personalizado para capturar logs
-        class GuiLogHandler(logging.Handler):
-            def __init__(self, text_widget):
-                super().__init__()
-                self.text_widget = text_widget
-                
-            def emit(self, record):
-                try:
-                    msg = self.format(record)
-                    # Agregar timestamp y formatear
-                    from datetime import datetime
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    level_color = {
-                        'INFO': '🟢',
-                        'WARNING': '🟡', 
-                        'ERROR': '🔴',
-                        'DEBUG': '🔵'
-                    }.get(record.levelname, '⚪')
-                    
-                    formatted_msg = f"[{timestamp}] {level_color} {msg}"
-                    
-                    # Agregar al widget directamente
-                    try:
-                        self.text_widget.appendPlainText(formatted_msg)
-                        scrollbar = self.text_widget.verticalScrollBar()
-                        scrollbar.setValue(scrollbar.maximum())
-                    except:
-                        pass
-                except:
-                    pass
-        
-        # Crear handler
-        self.log_handler = GuiLogHandler(self.text_logs)
+        # Los logs (de cualquier hilo) van a un buffer circular; la GUI lo vuelca
+        # por lotes con un temporizador en lugar de tocar el widget por cada línea
+        self.log_handler = ManejadorLogsEnBuffer(capacidad=MAX_LINEAS_LOG)
         self.log_handler.setFormatter(
             logging.Formatter('%(name)s - %(levelname)s - %(message)s')
         )
@@ -1920,6 +2002,20 @@ class OrganizadorAvanzado(QMainWindow):
         logging.getLogger('DescargasOrdenadas').addHandler(self.log_handler)
         logging.getLogger('organizador').addHandler(self.log_handler)
         logging.getLogger('organizer').addHandler(self.log_handler)
+        
+        self.timer_logs = QTimer(self)
+        self.timer_logs.timeout.connect(self._volcar_logs)
+        self.timer_logs.start(200)
+    
+    def _volcar_logs(self):
+        """Añade al widget las líneas pendientes del buffer en una sola operación."""
+        lineas = self.log_handler.drenar()
+        if not lineas:
+            return
+        self.text_logs.appendPlainText("\n".join(lineas))
+        # Auto-scroll al final
+        scrollbar = self.text_logs.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
     
     def _limpiar_logs(self):
         """Limpia el área de logs."""
@@ -1963,15 +2059,8 @@ class OrganizadorAvanzado(QMainWindow):
             self._agregar_log(f"❌ Error gestionando consola: {e}")
     
     def _agregar_log(self, mensaje):
-        """Agrega un mensaje al área de logs."""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_msg = f"[{timestamp}] 📋 {mensaje}"
-        
-        self.text_logs.appendPlainText(formatted_msg)
-        # Auto-scroll al final
-        scrollbar = self.text_logs.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        """Agrega un mensaje al área de logs (se muestra en el siguiente volcado)."""
+        self.log_handler.añadir(mensaje, emoji='📋')
     
     def _organizar(self):
         """Compatibilidad: ahora organiza todo usando el flujo de reorganización."""
@@ -1982,6 +2071,10 @@ class OrganizadorAvanzado(QMainWindow):
         usar_subcarpetas = self.chk_subcarpetas.isChecked()
         modo = "DETALLADO" if usar_subcarpetas else "BÁSICO"
         
+        if self.tareas.en_curso('organizar'):
+            QMessageBox.information(self, "En curso", "⏳ Ya hay una organización en curso")
+            return
+        
         reply = QMessageBox.question(
             self, "Reorganizar TODO",
             f"¿Reorganizar TODOS los archivos en modo {modo}?\n\n"
@@ -1990,22 +2083,27 @@ class OrganizadorAvanzado(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            try:
-                self.progress_bar.setVisible(True)
-                self.progress_bar.setRange(0, 0)
-                
-                # Aplicar configuración de subcarpetas dinámicamente
-                self.organizador.usar_subcarpetas = usar_subcarpetas
-                
-                resultados, errores = self.organizador.reorganizar_completamente()
-                
+            # Aplicar configuración de subcarpetas dinámicamente
+            self.organizador.usar_subcarpetas = usar_subcarpetas
+            
+            def al_completar(resultado):
+                resultados, errores = resultado
                 total = sum(len(files) for cat in resultados.values() for files in cat.values())
                 QMessageBox.information(self, "Reorganización", f"✅ {total} archivos reorganizados (modo {modo})")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"❌ Error: {e}")
-            finally:
-                self.progress_bar.setVisible(False)
+            
+            def al_progreso(dato):
+                archivo, categoria, subcategoria = dato
+                self._agregar_log(f"🔄 {archivo} → {categoria}/{subcategoria}")
+            
+            lanzado = self.tareas.lanzar(
+                'organizar', _reorganizar_en_segundo_plano, self.organizador,
+                al_completar=al_completar,
+                al_progreso=al_progreso,
+                al_error=lambda e: QMessageBox.critical(self, "Error", f"❌ Error: {e}"),
+                al_cancelar=lambda: self._agregar_log("⏹️ Reorganización cancelada")
+            )
+            if lanzado is None:
+                QMessageBox.information(self, "En curso", "⏳ Ya hay una organización en curso")
     
     @Slot(bool)
     def _toggle_subcarpetas(self, usar_subcarpetas):
@@ -2017,6 +2115,7 @@ class OrganizadorAvanzado(QMainWindow):
                 carpeta_descargas=str(carpeta_actual), 
                 usar_subcarpetas=usar_subcarpetas
             )
+            self.organizador.estadisticas = getattr(self, 'stats_manager', None)
             
             # Actualizar estado visual
             if usar_subcarpetas:
@@ -2498,8 +2597,23 @@ class OrganizadorAvanzado(QMainWindow):
         
         reply = QMessageBox.question(self, "Revertir", "¿Revertir organización por fechas?")
         if reply == QMessageBox.Yes:
-            resultado = self.date_organizer.revertir_organizacion_fechas(True)
-            QMessageBox.information(self, "Revertido", f"✅ {resultado.get('archivos_revertidos', 0)} archivos revertidos")
+            def revertir(token, progreso, organizador_fechas):
+                return organizador_fechas.revertir_organizacion_fechas(
+                    True,
+                    progreso=lambda hechos, total: progreso(f"📅↩️ {hechos}/{total} archivos revertidos"),
+                    cancelacion=token
+                )
+            
+            lanzado = self.tareas.lanzar(
+                'organizar', revertir, self.date_organizer,
+                al_completar=lambda resultado: QMessageBox.information(
+                    self, "Revertido", f"✅ {resultado.get('archivos_revertidos', 0)} archivos revertidos"),
+                al_progreso=self._agregar_log,
+                al_error=lambda e: QMessageBox.critical(self, "Error", f"❌ Error revirtiendo fechas: {e}"),
+                al_cancelar=lambda: self._agregar_log("⏹️ Reversión interrumpida: se reanudará la próxima vez")
+            )
+            if lanzado is None:
+                QMessageBox.information(self, "En curso", "⏳ Ya hay una organización en curso")
     
     def _actualizar_ejemplo_fecha(self):
         """Actualiza el ejemplo visual del patrón de fechas seleccionado."""
@@ -2556,108 +2670,106 @@ class OrganizadorAvanzado(QMainWindow):
     
     def _previsualizar_organizacion_fechas(self):
         """Muestra una previsualización de cómo se organizarían los archivos."""
-        try:
-            import os
-            from pathlib import Path
-            
-            # Obtener carpeta de descargas
-            carpeta_descargas = Path(self.organizador.carpeta_descargas)
-            
-            if not carpeta_descargas.exists():
+        # Obtener carpeta de descargas
+        carpeta_descargas = Path(self.organizador.carpeta_descargas)
+        
+        # Obtener patrón seleccionado
+        patron_actual = self.combo_patron.currentData()
+        if not patron_actual:
+            patron_actual = self.combo_patron.currentText().split(" - ")[0] if " - " in self.combo_patron.currentText() else "YYYY/MM-Mes"
+        
+        def al_error(mensaje):
+            QMessageBox.critical(self, "Error", f"❌ Error generando previsualización:\n\n{mensaje}")
+        
+        def al_completar(resultado):
+            if resultado is None:
                 QMessageBox.warning(self, "Error", f"La carpeta {carpeta_descargas} no existe")
                 return
-            
-            # Buscar archivos en la carpeta
-            archivos_encontrados = []
-            extensiones_comunes = {'.pdf', '.doc', '.docx', '.jpg', '.png', '.mp4', '.zip', '.exe', '.txt'}
-            
-            try:
-                for archivo in carpeta_descargas.iterdir():
-                    if archivo.is_file() and archivo.suffix.lower() in extensiones_comunes:
-                        archivos_encontrados.append(archivo)
-                        if len(archivos_encontrados) >= 10:  # Limitar a 10 ejemplos
-                            break
-            except PermissionError:
+            if resultado == 'sin_permiso':
                 QMessageBox.warning(self, "Error", "No se puede acceder a la carpeta de descargas")
                 return
-            
-            if not archivos_encontrados:
-                QMessageBox.information(self, "Previsualización", 
-                                      "No se encontraron archivos para previsualizar en la carpeta de descargas")
-                return
-            
-            # Obtener patrón seleccionado
-            patron_actual = self.combo_patron.currentData()
-            if not patron_actual:
-                patron_actual = self.combo_patron.currentText().split(" - ")[0] if " - " in self.combo_patron.currentText() else "YYYY/MM-Mes"
-            
-            # Simular organización
-            texto_previsualizacion = f"🔍 PREVISUALIZACIÓN DE ORGANIZACIÓN\n"
-            texto_previsualizacion += f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            texto_previsualizacion += f"📋 Patrón seleccionado: {patron_actual}\n\n"
-            texto_previsualizacion += f"📁 Se encontraron {len(archivos_encontrados)} archivos de ejemplo:\n\n"
-            
-            for i, archivo in enumerate(archivos_encontrados, 1):
-                try:
-                    # Obtener fecha del archivo
-                    fecha_archivo = datetime.fromtimestamp(archivo.stat().st_mtime)
-                    
-                    # Simular categorización
-                    extension = archivo.suffix.lower()
-                    if extension in ['.pdf']:
-                        categoria = "Documentos"
-                        subcategoria = "PDFs"
-                    elif extension in ['.doc', '.docx']:
-                        categoria = "Documentos"
-                        subcategoria = "Word"
-                    elif extension in ['.jpg', '.png']:
-                        categoria = "Imágenes"
-                        subcategoria = "Fotos"
-                    elif extension in ['.mp4']:
-                        categoria = "Videos"
-                        subcategoria = "MP4"
-                    elif extension in ['.zip']:
-                        categoria = "Comprimidos"
-                        subcategoria = "ZIP"
-                    else:
-                        categoria = "Otros"
-                        subcategoria = "General"
-                    
-                    # Generar ruta de destino según patrón
-                    if patron_actual == "YYYY/MM-Mes":
-                        carpeta_fecha = f"{fecha_archivo.year}/{fecha_archivo.month:02d}-{fecha_archivo.strftime('%B')}"
-                    elif patron_actual == "YYYY/MM":
-                        carpeta_fecha = f"{fecha_archivo.year}/{fecha_archivo.month:02d}"
-                    elif patron_actual == "YYYY":
-                        carpeta_fecha = f"{fecha_archivo.year}"
-                    elif patron_actual == "MM-YYYY":
-                        carpeta_fecha = f"{fecha_archivo.month:02d}-{fecha_archivo.year}"
-                    elif patron_actual == "Mes-YYYY":
-                        carpeta_fecha = f"{fecha_archivo.strftime('%B')}-{fecha_archivo.year}"
-                    else:
-                        carpeta_fecha = f"{fecha_archivo.year}/{fecha_archivo.month:02d}-{fecha_archivo.strftime('%B')}"
-                    
-                    ruta_destino = f"Downloads/Fechas/{carpeta_fecha}/{categoria}/{subcategoria}/"
-                    
-                    texto_previsualizacion += f"{i:2d}. 📄 {archivo.name}\n"
-                    texto_previsualizacion += f"    📅 Fecha: {fecha_archivo.strftime('%d/%m/%Y %H:%M')}\n"
-                    texto_previsualizacion += f"    📁 Destino: {ruta_destino}\n\n"
-                    
-                except Exception as e:
-                    texto_previsualizacion += f"{i:2d}. ❌ Error procesando {archivo.name}: {e}\n\n"
-            
-            texto_previsualizacion += f"\n💡 Esta es solo una simulación. Los archivos no se han movido."
-            
-            # Mostrar diálogo con previsualización
-            dialog = QMessageBox(self)
-            dialog.setWindowTitle("🔍 Previsualización de Organización por Fechas")
-            dialog.setText("Vista previa de cómo se organizarían los archivos:")
-            dialog.setDetailedText(texto_previsualizacion)
-            dialog.setIcon(QMessageBox.Information)
-            dialog.exec()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"❌ Error generando previsualización:\n\n{str(e)}")
+            try:
+                self._mostrar_previsualizacion_fechas(resultado, patron_actual)
+            except Exception as e:
+                al_error(str(e))
+        
+        self.tareas.lanzar(
+            'previsualizacion', _muestra_archivos_fechas, carpeta_descargas,
+            al_completar=al_completar,
+            al_error=al_error
+        )
+    
+    def _mostrar_previsualizacion_fechas(self, archivos_encontrados, patron_actual):
+        """Construye y muestra el diálogo de previsualización a partir de la muestra."""
+        if not archivos_encontrados:
+            QMessageBox.information(self, "Previsualización", 
+                                  "No se encontraron archivos para previsualizar en la carpeta de descargas")
+            return
+        
+        # Simular organización
+        texto_previsualizacion = f"🔍 PREVISUALIZACIÓN DE ORGANIZACIÓN\n"
+        texto_previsualizacion += f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        texto_previsualizacion += f"📋 Patrón seleccionado: {patron_actual}\n\n"
+        texto_previsualizacion += f"📁 Se encontraron {len(archivos_encontrados)} archivos de ejemplo:\n\n"
+        
+        for i, (archivo, fecha_archivo) in enumerate(archivos_encontrados, 1):
+            try:
+                if isinstance(fecha_archivo, Exception):
+                    raise fecha_archivo
+                
+                # Simular categorización
+                extension = archivo.suffix.lower()
+                if extension in ['.pdf']:
+                    categoria = "Documentos"
+                    subcategoria = "PDFs"
+                elif extension in ['.doc', '.docx']:
+                    categoria = "Documentos"
+                    subcategoria = "Word"
+                elif extension in ['.jpg', '.png']:
+                    categoria = "Imágenes"
+                    subcategoria = "Fotos"
+                elif extension in ['.mp4']:
+                    categoria = "Videos"
+                    subcategoria = "MP4"
+                elif extension in ['.zip']:
+                    categoria = "Comprimidos"
+                    subcategoria = "ZIP"
+                else:
+                    categoria = "Otros"
+                    subcategoria = "General"
+                
+                # Generar ruta de destino según patrón
+                if patron_actual == "YYYY/MM-Mes":
+                    carpeta_fecha = f"{fecha_archivo.year}/{fecha_archivo.month:02d}-{fecha_archivo.strftime('%B')}"
+                elif patron_actual == "YYYY/MM":
+                    carpeta_fecha = f"{fecha_archivo.year}/{fecha_archivo.month:02d}"
+                elif patron_actual == "YYYY":
+                    carpeta_fecha = f"{fecha_archivo.year}"
+                elif patron_actual == "MM-YYYY":
+                    carpeta_fecha = f"{fecha_archivo.month:02d}-{fecha_archivo.year}"
+                elif patron_actual == "Mes-YYYY":
+                    carpeta_fecha = f"{fecha_archivo.strftime('%B')}-{fecha_archivo.year}"
+                else:
+                    carpeta_fecha = f"{fecha_archivo.year}/{fecha_archivo.month:02d}-{fecha_archivo.strftime('%B')}"
+                
+                ruta_destino = f"Downloads/Fechas/{carpeta_fecha}/{categoria}/{subcategoria}/"
+                
+                texto_previsualizacion += f"{i:2d}. 📄 {archivo.name}\n"
+                texto_previsualizacion += f"    📅 Fecha: {fecha_archivo.strftime('%d/%m/%Y %H:%M')}\n"
+                texto_previsualizacion += f"    📁 Destino: {ruta_destino}\n\n"
+                
+            except Exception as e:
+                texto_previsualizacion += f"{i:2d}. ❌ Error procesando {archivo.name}: {e}\n\n"
+        
+        texto_previsualizacion += f"\n💡 Esta es solo una simulación. Los archivos no se han movido."
+        
+        # Mostrar diálogo con previsualización
+        dialog = QMessageBox(self)
+        dialog.setWindowTitle("🔍 Previsualización de Organización por Fechas")
+        dialog.setText("Vista previa de cómo se organizarían los archivos:")
+        dialog.setDetailedText(texto_previsualizacion)
+        dialog.setIcon(QMessageBox.Information)
+        dialog.exec()
     
     def _buscar_duplicados(self):
         """Busca duplicados."""
@@ -2665,10 +2777,7 @@ class OrganizadorAvanzado(QMainWindow):
             QMessageBox.warning(self, "No Disponible", "Detector de duplicados no disponible")
             return
         
-        try:
-            self.text_duplicados.setPlainText("🔍 Buscando...")
-            resultado = self.duplicate_detector.escanear_duplicados()
-            
+        def al_completar(resultado):
             if not resultado.get('duplicados_encontrados'):
                 self.text_duplicados.setPlainText("✅ No hay duplicados")
                 return
@@ -2687,8 +2796,20 @@ class OrganizadorAvanzado(QMainWindow):
                     texto += "\n"
             
             self.text_duplicados.setPlainText(texto)
-        except Exception as e:
-            self.text_duplicados.setPlainText(f"❌ Error: {e}")
+        
+        detector = self.duplicate_detector
+        lanzado = self.tareas.lanzar(
+            'duplicados',
+            lambda token, progreso: detector.escanear_duplicados(
+                cancelacion=token, progreso=lambda hechos, total: progreso((hechos, total))
+            ),
+            al_completar=al_completar,
+            al_progreso=self._mostrar_progreso,
+            al_error=lambda e: self.text_duplicados.setPlainText(f"❌ Error: {e}"),
+            al_cancelar=lambda: self.text_duplicados.setPlainText("⏹️ Búsqueda cancelada")
+        )
+        if lanzado is not None:
+            self.text_duplicados.setPlainText("🔍 Buscando...")
     
     def _eliminar_duplicados(self):
         """Elimina duplicados."""
@@ -2697,16 +2818,36 @@ class OrganizadorAvanzado(QMainWindow):
         
         reply = QMessageBox.question(self, "Eliminar", "¿Eliminar duplicados? Se conservará la copia más reciente.")
         if reply == QMessageBox.Yes:
-            try:
-                resultado = self.duplicate_detector.eliminar_duplicados(estrategia='mas_nuevo', confirmar=True)
+            estado = {'exito': False}
+            
+            def al_completar(resultado):
+                estado['exito'] = True
                 QMessageBox.information(
                     self, "Duplicados",
                     f"✅ {resultado.get('archivos_eliminados', 0)} duplicados eliminados\n" +
                     f"💾 {self._formatear_bytes(resultado.get('espacio_liberado', 0))} liberados"
                 )
-                self._buscar_duplicados()
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"❌ Error: {e}")
+            
+            def al_terminar():
+                # Volver a escanear cuando el trabajo de duplicados ya no está en curso
+                if estado['exito']:
+                    self._buscar_duplicados()
+            
+            detector = self.duplicate_detector
+            lanzado = self.tareas.lanzar(
+                'duplicados',
+                lambda token, progreso: detector.eliminar_duplicados(
+                    estrategia='mas_nuevo', confirmar=True, cancelacion=token,
+                    progreso=lambda hechos, total: progreso((hechos, total))
+                ),
+                al_completar=al_completar,
+                al_progreso=self._mostrar_progreso,
+                al_cancelar=lambda: self._agregar_log("⏹️ Eliminación de duplicados cancelada; vuelve a buscar duplicados"),
+                al_error=lambda e: QMessageBox.critical(self, "Error", f"❌ Error: {e}"),
+                al_terminar=al_terminar
+            )
+            if lanzado is None:
+                QMessageBox.information(self, "En curso", "⏳ Ya hay una operación de duplicados en curso")
     
     def _actualizar_estadisticas(self):
         """Actualiza estadísticas."""
@@ -2851,10 +2992,9 @@ class OrganizadorAvanzado(QMainWindow):
 
     def _cambiar_intervalo_auto(self, index):
         """Cambia el intervalo de auto-organización."""
-        if hasattr(self, 'timer_auto') and self.timer_auto and self.timer_auto.isActive():
-            # Si el timer está activo, reiniciar con el nuevo intervalo
-            intervalo_ms = self.combo_intervalo_auto.currentData() * 1000
-            self.timer_auto.setInterval(intervalo_ms)
+        if self.planificador_auto and self._auto_organizacion_activa():
+            # Si la auto-organización está activa, reiniciar la adaptación con la nueva base
+            self._iniciar_timer_auto()
             
             intervalo_texto = self.combo_intervalo_auto.currentText()
             self._agregar_log(f"⏱️ Intervalo de auto-organización cambiado a: {intervalo_texto}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ejecución de trabajos de disco fuera del hilo de la interfaz (Qt)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+logger = logging.getLogger(__name__)
+
+
+class TareaCancelada(Exception):
+    """Se lanza desde un trabajo para abandonarlo tras una cancelación."""
+
+
+class TokenCancelacion:
+    """
+    Señal de cancelación compartida entre la GUI y un trabajo.
+
+    Los trabajos la consultan entre unidades de trabajo (is_set / comprobar);
+    también puede pasarse a funciones del organizador que aceptan `cancelacion`.
+    """
+
+    def __init__(self):
+        self._evento = threading.Event()
+
+    def cancelar(self):
+        self._evento.set()
+
+    def is_set(self) -> bool:
+        return self._evento.is_set()
+
+    def comprobar(self):
+        """Lanza TareaCancelada si se pidió cancelar."""
+        if self._evento.is_set():
+            raise TareaCancelada()
+
+
+class TrabajoSegundoPlano(QThread):
+    """
+    Hilo que ejecuta `funcion(token, progreso, *args)`.
+
+    `progreso` es un callable que el trabajo puede llamar desde su hilo; llega
+    a la GUI como señal encolada, igual que el resultado o el error.
+    """
+
+    progreso = Signal(object)
+    completado = Signal(object)
+    error = Signal(str)
+    cancelado = Signal()
+
+    def __init__(self, nombre: str, funcion: Callable[..., Any], *args, **kwargs):
+        super().__init__()
+        self.nombre = nombre
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.token = TokenCancelacion()
+
+    def run(self):
+        try:
+            resultado = self.funcion(self.token, self.progreso.emit, *self.args, **self.kwargs)
+        except TareaCancelada:
+            self.cancelado.emit()
+            return
+        except Exception as e:
+            logger.error(f"Error en trabajo '{self.nombre}': {e}", exc_info=True)
+            self.error.emit(str(e))
+            return
+
+        if self.token.is_set():
+            # Resultado parcial de un trabajo cancelado: no se entrega
+            self.cancelado.emit()
+        else:
+            self.completado.emit(resultado)
+
+
+class EjecutorTareas(QObject):
+    """
+    Lanza trabajos en segundo plano con protección de vuelo único: mientras un
+    trabajo de un nombre está en curso, los nuevos lanzamientos de ese nombre
+    se rechazan (p. ej. tics del temporizador que se solapan).
+    """
+
+    ocupado = Signal(bool)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._trabajos: Dict[str, TrabajoSegundoPlano] = {}
+
+    def en_curso(self, nombre: Optional[str] = None) -> bool:
+        if nombre is None:
+            return bool(self._trabajos)
+        return nombre in self._trabajos
+
+    def lanzar(self, nombre: str, funcion: Callable[..., Any], *args,
+               al_completar: Optional[Callable[[Any], None]] = None,
+               al_error: Optional[Callable[[str], None]] = None,
+               al_progreso: Optional[Callable[[Any], None]] = None,
+               al_cancelar: Optional[Callable[[], None]] = None,
+               al_terminar: Optional[Callable[[], None]] = None,
+               **kwargs) -> Optional[TrabajoSegundoPlano]:
+        """
+        Ejecuta `funcion(token, progreso, *args, **kwargs)` en un hilo.
+
+        Args:
+            nombre: Clave de vuelo único
+            funcion: Trabajo a ejecutar; no debe tocar widgets
+            al_completar: Recibe el valor de retorno (hilo de la GUI)
+            al_error: Recibe el mensaje de error (hilo de la GUI)
+            al_progreso: Recibe lo que el trabajo pase a progreso() (hilo de la GUI)
+            al_cancelar: Se llama si el trabajo se canceló
+            al_terminar: Se llama siempre al final, tras los anteriores
+
+        Returns:
+            El trabajo lanzado, o None si ya había uno con ese nombre en curso
+        """
+        if nombre in self._trabajos:
+            logger.debug(f"Trabajo '{nombre}' ya en curso, se omite")
+            return None
+
+        trabajo = TrabajoSegundoPlano(nombre, funcion, *args, **kwargs)
+        trabajo.callbacks = {
+            'completado': al_completar, 'error': al_error, 'progreso': al_progreso,
+            'cancelado': al_cancelar, 'terminado': al_terminar
+        }
+        # Las señales del hilo pasan por slots de este objeto (que vive en el
+        # hilo de la GUI), así los callbacks siempre se ejecutan allí
+        trabajo.completado.connect(self._al_completar)
+        trabajo.error.connect(self._al_error)
+        trabajo.progreso.connect(self._al_progreso)
+        trabajo.cancelado.connect(self._al_cancelar)
+        trabajo.finished.connect(self._al_terminar)
+
+        estaba_ocupado = bool(self._trabajos)
+        self._trabajos[nombre] = trabajo
+        trabajo.start()
+        if not estaba_ocupado:
+            self.ocupado.emit(True)
+        return trabajo
+
+    def _llamar(self, evento: str, *args):
+        trabajo = self.sender()
+        callback = getattr(trabajo, 'callbacks', {}).get(evento)
+        if callback:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Error en callback '{evento}' del trabajo '{trabajo.nombre}': {e}", exc_info=True)
+
+    @Slot(object)
+    def _al_completar(self, resultado):
+        self._llamar('completado', resultado)
+
+    @Slot(str)
+    def _al_error(self, mensaje):
+        self._llamar('error', mensaje)
+
+    @Slot(object)
+    def _al_progreso(self, dato):
+        self._llamar('progreso', dato)
+
+    @Slot()
+    def _al_cancelar(self):
+        self._llamar('cancelado')
+
+    @Slot()
+    def _al_terminar(self):
+        trabajo = self.sender()
+        if self._trabajos.get(trabajo.nombre) is trabajo:
+            del self._trabajos[trabajo.nombre]
+        try:
+            self._llamar('terminado')
+        finally:
+            trabajo.deleteLater()
+            if not self._trabajos:
+                self.ocupado.emit(False)
+
+    def cancelar(self, nombre: Optional[str] = None):
+        """Pide cancelar un trabajo (o todos si nombre es None)."""
+        for clave, trabajo in list(self._trabajos.items()):
+            if nombre is None or clave == nombre:
+                trabajo.token.cancelar()
+
+    def esperar(self, timeout_ms: int = 5000) -> bool:
+        """Cancela y espera a que terminen los trabajos (cierre de la app)."""
+        self.cancelar()
+        terminados = True
+        for trabajo in list(self._trabajos.values()):
+            terminados = trabajo.wait(timeout_ms) and terminados
+        return terminados
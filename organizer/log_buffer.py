@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Handler de logging con buffer circular para mostrar logs en la interfaz
+"""
+
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Tuple
+
+NIVELES_EMOJI = {
+    'INFO': '🟢',
+    'WARNING': '🟡',
+    'ERROR': '🔴',
+    'CRITICAL': '🔴',
+    'DEBUG': '🔵'
+}
+
+
+class ManejadorLogsEnBuffer(logging.Handler):
+    """
+    Guarda las líneas de log ya formateadas en un buffer circular acotado.
+
+    emit() puede llamarse desde cualquier hilo y no toca widgets: solo añade
+    al deque (append y popleft son atómicos en CPython). La interfaz vacía el
+    buffer por lotes con drenar() desde un temporizador. Si el buffer se
+    llena se descartan las líneas más antiguas.
+
+    Cada logger tiene un cubo de tokens (`tasa` líneas/s, ráfagas de hasta
+    `rafaga`); lo que lo supera se cuenta y se resume en una sola línea.
+    """
+
+    def __init__(self, capacidad: int = 5000, tasa: float = 50.0, rafaga: int = 200):
+        super().__init__()
+        self.buffer: Deque[str] = deque(maxlen=capacidad)
+        self.tasa = tasa
+        self.rafaga = rafaga
+        # logger → (tokens, último instante)
+        self._cubos: Dict[str, Tuple[float, float]] = {}
+        # logger → líneas omitidas por límite de ritmo sin avisar todavía
+        self._omitidas: Dict[str, int] = {}
+        self.descartadas = 0
+
+    def _permitir(self, nombre: str) -> bool:
+        # Se llama con el lock del handler (logging.Handler.handle lo adquiere)
+        ahora = time.monotonic()
+        tokens, ultimo = self._cubos.get(nombre, (float(self.rafaga), ahora))
+        tokens = min(float(self.rafaga), tokens + (ahora - ultimo) * self.tasa)
+        if tokens < 1.0:
+            self._cubos[nombre] = (tokens, ahora)
+            self._omitidas[nombre] = self._omitidas.get(nombre, 0) + 1
+            return False
+        self._cubos[nombre] = (tokens - 1.0, ahora)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            # Los avisos y errores nunca se limitan
+            if record.levelno < logging.WARNING and not self._permitir(record.name):
+                return
+            self.añadir(self.format(record), record.levelname)
+        except Exception:
+            self.handleError(record)
+
+    def añadir(self, mensaje: str, nivel: str = 'INFO', emoji: str = None):
+        """Añade una línea al buffer con hora y marca de nivel."""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        marca = emoji or NIVELES_EMOJI.get(nivel, '⚪')
+        if len(self.buffer) == self.buffer.maxlen:
+            self.descartadas += 1
+        self.buffer.append(f"[{timestamp}] {marca} {mensaje}")
+
+    def drenar(self, maximo: int = 2000) -> List[str]:
+        """
+        Saca hasta `maximo` líneas del buffer (llamar desde la GUI).
+
+        Returns:
+            Líneas en orden de llegada, con los resúmenes de líneas omitidas
+        """
+        self.acquire()
+        try:
+            omitidas, self._omitidas = self._omitidas, {}
+        finally:
+            self.release()
+
+        lineas = []
+        while len(lineas) < maximo:
+            try:
+                lineas.append(self.buffer.popleft())
+            except IndexError:
+                break
+
+        for nombre, cantidad in omitidas.items():
+            lineas.append(f"[{datetime.now().strftime('%H:%M:%S')}] ⏩ {cantidad} mensajes de {nombre} "
+                          f"omitidos (más de {self.tasa:.0f}/s)")
+        return lineas
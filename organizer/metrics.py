@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentos de métricas en proceso y endpoint HTTP en formato Prometheus
+"""
+
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites por defecto de los histogramas de latencia (segundos)
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Instrumento(abc.ABC):
+    """Base común: nombre, ayuda, nombres de etiqueta y un lock propio."""
+
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: Dict[str, str]) -> Etiquetas:
+        if set(valores) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}, recibió {tuple(valores)}")
+        return tuple(str(valores[etiqueta]) for etiqueta in self.etiquetas)
+
+    def _texto_etiquetas(self, clave: Etiquetas, extra: Optional[Tuple[str, str]] = None) -> str:
+        pares = list(zip(self.etiquetas, clave))
+        if extra:
+            pares.append(extra)
+        if not pares:
+            return ''
+        return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + '}'
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._muestras())
+        return lineas
+
+    @abc.abstractmethod
+    def _muestras(self) -> List[str]:
+        """Líneas de muestra del instrumento en formato de exposición."""
+
+
+class Contador(_Instrumento):
+    """Valor que solo crece (archivos movidos, bytes, errores...)."""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Etiquetas, float] = {}
+        if not self.etiquetas:
+            self._valores[()] = 0.0
+
+    def inc(self, cantidad: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas) -> float:
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def _muestras(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{self._texto_etiquetas(clave)} {_formatear_valor(valor)}" for clave, valor in valores]
+
+
+class Medidor(_Instrumento):
+    """
+    Valor que sube y baja. Puede leerse de una función en el momento de la
+    consulta (p. ej. la profundidad de la cola del monitor).
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, nombre: str, ayuda: str):
+        super().__init__(nombre, ayuda)
+        self._valor = 0.0
+        self._funcion: Optional[Callable[[], float]] = None
+
+    def fijar(self, valor: float):
+        with self._lock:
+            self._valor = valor
+
+    def fijar_funcion(self, funcion: Optional[Callable[[], float]]):
+        """Lee el valor de `funcion` al exponer (None para dejar de hacerlo)."""
+        with self._lock:
+            self._funcion = funcion
+
+    def _muestras(self) -> List[str]:
+        with self._lock:
+            funcion, valor = self._funcion, self._valor
+        if funcion is not None:
+            try:
+                valor = funcion()
+            except Exception as e:
+                logger.debug(f"Error leyendo {self.nombre}: {e}")
+        return [f"{self.nombre} {_formatear_valor(valor)}"]
+
+
+class Histograma(_Instrumento):
+    """Distribución de valores (latencias) en buckets acumulativos."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # clave → (cuentas por bucket, suma, total)
+        self._series: Dict[Etiquetas, Tuple[List[int], float, int]] = {}
+
+    def observar(self, valor: float, cantidad: int = 1, **etiquetas):
+        """
+        Registra `cantidad` observaciones de `valor` (cantidad > 1 para
+        repartir el coste de una operación por lotes entre sus elementos).
+        """
+        clave = self._clave(etiquetas)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            cuentas, suma, total = self._series.get(clave) or ([0] * len(self.buckets), 0.0, 0)
+            if indice < len(cuentas):
+                cuentas[indice] += cantidad
+            self._series[clave] = (cuentas, suma + valor * cantidad, total + cantidad)
+
+    @contextmanager
+    def medir(self, **etiquetas) -> Iterator[None]:
+        """Observa la duración del bloque `with`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def _muestras(self) -> List[str]:
+        with self._lock:
+            series = sorted((clave, (list(cuentas), suma, total))
+                            for clave, (cuentas, suma, total) in self._series.items())
+        lineas = []
+        for clave, (cuentas, suma, total) in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets, cuentas):
+                acumulado += cuenta
+                lineas.append(f"{self.nombre}_bucket{self._texto_etiquetas(clave, ('le', _formatear_valor(limite)))} {acumulado}")
+            lineas.append(f"{self.nombre}_bucket{self._texto_etiquetas(clave, ('le', '+Inf'))} {total}")
+            lineas.append(f"{self.nombre}_sum{self._texto_etiquetas(clave)} {_formatear_valor(suma)}")
+            lineas.append(f"{self.nombre}_count{self._texto_etiquetas(clave)} {total}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Conjunto de instrumentos que se exponen juntos."""
+
+    def __init__(self):
+        self._instrumentos: Dict[str, _Instrumento] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, instrumento: _Instrumento) -> _Instrumento:
+        with self._lock:
+            if instrumento.nombre in self._instrumentos:
+                raise ValueError(f"Métrica duplicada: {instrumento.nombre}")
+            self._instrumentos[instrumento.nombre] = instrumento
+        return instrumento
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str) -> Medidor:
+        return self._registrar(Medidor(nombre, ayuda))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def exponer(self) -> str:
+        """Texto en formato de exposición de Prometheus."""
+        with self._lock:
+            instrumentos = list(self._instrumentos.values())
+        lineas: List[str] = []
+        for instrumento in instrumentos:
+            lineas.extend(instrumento.exponer())
+        return '\n'.join(lineas) + '\n'
+
+
+# Registro del proceso e instrumentos del organizador
+REGISTRO = RegistroMetricas()
+
+ARCHIVOS_ESCANEADOS = REGISTRO.contador(
+    'organizer_files_scanned_total', 'Archivos encontrados al recorrer carpetas o recibidos en lotes')
+ARCHIVOS_MOVIDOS = REGISTRO.contador(
+    'organizer_files_moved_total', 'Archivos organizados', ('category',))
+BYTES_MOVIDOS = REGISTRO.contador(
+    'organizer_bytes_moved_total', 'Bytes de los archivos organizados', ('category',))
+DURACION_ETAPA = REGISTRO.histograma(
+    'organizer_stage_duration_seconds', 'Duración por etapa: scan (por pasada), classify y move (por archivo)',
+    ('stage',))
+ERRORES = REGISTRO.contador(
+    'organizer_errors_total', 'Errores por etapa y tipo de excepción', ('stage', 'type'))
+COLA_MONITOR = REGISTRO.medidor(
+    'organizer_monitor_queue_depth', 'Archivos del monitor esperando estabilidad u organización')
+BYTES_HASH = REGISTRO.contador(
+    'organizer_hash_bytes_total', 'Bytes leídos para calcular hashes de duplicados')
+DURACION_HASH = REGISTRO.histograma(
+    'organizer_hash_duration_seconds', 'Tiempo de cálculo del hash de un archivo')
+
+
+def registrar_error(etapa: str, error: BaseException):
+    """Cuenta un error de `etapa` por su tipo de excepción."""
+    ERRORES.inc(stage=etapa, type=type(error).__name__)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    registro: RegistroMetricas = REGISTRO
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        cuerpo = self.registro.exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', TIPO_CONTENIDO)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        logger.debug(f"Métricas: {formato % args}")
+
+
+class ServidorMetricas:
+    """
+    Servidor HTTP de solo lectura para /metrics, en un hilo propio.
+
+    Escucha por defecto solo en 127.0.0.1: no hay autenticación.
+    """
+
+    def __init__(self, puerto: int = 9464, host: str = '127.0.0.1',
+                 registro: RegistroMetricas = REGISTRO):
+        self.host = host
+        self.puerto = puerto
+        self.registro = registro
+        self._servidor: Optional[ThreadingHTTPServer] = None
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> bool:
+        """
+        Returns:
+            True si el servidor quedó escuchando (con puerto 0 se elige uno
+            libre y queda en self.puerto)
+        """
+        manejador = type('ManejadorMetricas', (_ManejadorMetricas,), {'registro': self.registro})
+        try:
+            self._servidor = ThreadingHTTPServer((self.host, self.puerto), manejador)
+        except OSError as e:
+            logger.error(f"❌ No se pudo abrir el endpoint de métricas en {self.host}:{self.puerto}: {e}")
+            return False
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name='metricas', daemon=True)
+        self._hilo.start()
+        logger.info(f"📈 Métricas en http://{self.host}:{self.puerto}/metrics")
+        return True
+
+    def detener(self):
+        if self._servidor is None:
+            return
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._servidor = None
+        if self._hilo:
+            self._hilo.join(timeout=5)
+            self._hilo = None
@@ -2,22 +2,66 @@
 # -*- coding: utf-8 -*-
 """Gestor de configuración portable para DescargasOrdenadas v3.1"""
 
+import atexit
+import copy
 import json
 import logging
+import os
 import sys
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
 logger = logging.getLogger('organizador.portable_config')
 
+# Segundos que se espera tras un cambio antes de escribir (los cambios
+# seguidos, p. ej. al redimensionar la ventana, se agrupan en una escritura)
+RETARDO_ESCRITURA = 0.5
+
+# Recibe (clave cambiada, valor nuevo)
+Suscriptor = Callable[[str, Any], None]
+
+
+def _congelar(valor: Any) -> Any:
+    """Copia inmutable de un valor JSON: dict → MappingProxyType, list → tuple."""
+    if isinstance(valor, dict):
+        return MappingProxyType({clave: _congelar(v) for clave, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def _afecta(clave_cambiada: str, clave_suscrita: Optional[str]) -> bool:
+    """True si un cambio en `clave_cambiada` interesa a quien sigue `clave_suscrita`."""
+    if clave_suscrita is None or clave_cambiada == clave_suscrita:
+        return True
+    return (clave_cambiada.startswith(clave_suscrita + '.')
+            or clave_suscrita.startswith(clave_cambiada + '.'))
+
+
 class ConfigPortable:
-    """Gestor de configuración portable."""
+    """
+    Gestor de configuración portable.
+    
+    Los lectores usan una instantánea inmutable que se sustituye entera en
+    cada cambio (leer no bloquea ni toca disco). Las escrituras se agrupan:
+    establecer() solo programa un guardado a RETARDO_ESCRITURA segundos, y
+    el archivo se reemplaza de forma atómica (temporal, fsync, rename).
+    guardar() fuerza la escritura; también se hace al salir del proceso.
+    """
     
     def __init__(self, nombre_app="DescargasOrdenadas"):
         self.nombre_app = nombre_app
-        self._config = {}
+        self._config: Dict[str, Any] = {}
+        self._instantanea: Mapping[str, Any] = MappingProxyType({})
+        self._lock = threading.RLock()
+        self._temporizador: Optional[threading.Timer] = None
+        self._pendiente = False
+        self._suscriptores: List[Tuple[Suscriptor, Optional[str]]] = []
         self._config_path = self._obtener_ruta_config()
         self._cargar_config()
+        atexit.register(self.guardar)
     
     def _obtener_ruta_config(self) -> Path:
         """Obtiene la ruta del archivo de configuración."""
@@ -42,14 +86,45 @@ class ConfigPortable:
         except Exception as e:
             logger.error(f"Error cargando configuración: {e}")
             self._config = self._obtener_config_por_defecto()
+        self._instantanea = _congelar(self._config)
     
     def _guardar_config(self):
-        """Guarda la configuración en el archivo."""
-        try:
-            with open(self._config_path, 'w', encoding='utf-8') as f:
-                json.dump(self._config, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Error guardando configuración: {e}")
+        """Guarda la configuración en el archivo (temporal + fsync + rename)."""
+        with self._lock:
+            self._pendiente = False
+            contenido = json.dumps(self._config, indent=4, ensure_ascii=False)
+            try:
+                temporal = self._config_path.with_suffix('.tmp')
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    f.write(contenido)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporal, self._config_path)
+            except Exception as e:
+                logger.error(f"Error guardando configuración: {e}")
+    
+    def _programar_guardado(self):
+        # Llamar con el lock adquirido
+        self._pendiente = True
+        if self._temporizador is None:
+            self._temporizador = threading.Timer(RETARDO_ESCRITURA, self._guardado_programado)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+    
+    def _guardado_programado(self):
+        with self._lock:
+            self._temporizador = None
+            if self._pendiente:
+                self._guardar_config()
+    
+    def guardar(self):
+        """Escribe ya los cambios pendientes (si los hay)."""
+        with self._lock:
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+            if self._pendiente:
+                self._guardar_config()
     
     def _obtener_config_por_defecto(self) -> Dict[str, Any]:
         """Obtiene la configuración por defecto."""
@@ -66,46 +141,95 @@ class ConfigPortable:
             "ai": {"nivel_confianza": 60}
         }
     
+    def instantanea(self) -> Mapping[str, Any]:
+        """Configuración actual como mapeo inmutable (no cambia al establecer)."""
+        return self._instantanea
+    
     def obtener(self, clave: str, valor_por_defecto: Any = None) -> Any:
-        """Obtiene un valor de configuración."""
+        """Obtiene un valor de configuración (los dict y listas, inmutables)."""
         try:
             if '.' in clave:
                 partes = clave.split('.')
-                valor = self._config
+                valor = self._instantanea
                 for parte in partes:
                     valor = valor.get(parte, {})
                 return valor if valor != {} else valor_por_defecto
             else:
-                return self._config.get(clave, valor_por_defecto)
+                return self._instantanea.get(clave, valor_por_defecto)
         except Exception:
             return valor_por_defecto
     
     def establecer(self, clave: str, valor: Any):
-        """Establece un valor de configuración."""
+        """Establece un valor de configuración; se escribe a disco en breve."""
         try:
-            if '.' in clave:
-                partes = clave.split('.')
-                config_actual = self._config
-                for parte in partes[:-1]:
-                    if parte not in config_actual:
-                        config_actual[parte] = {}
-                    config_actual = config_actual[parte]
-                config_actual[partes[-1]] = valor
-            else:
-                self._config[clave] = valor
+            with self._lock:
+                if '.' in clave:
+                    partes = clave.split('.')
+                    config_actual = self._config
+                    for parte in partes[:-1]:
+                        if not isinstance(config_actual.get(parte), dict):
+                            config_actual[parte] = {}
+                        config_actual = config_actual[parte]
+                    ultima = partes[-1]
+                else:
+                    config_actual = self._config
+                    ultima = clave
+                
+                if ultima in config_actual and config_actual[ultima] == valor:
+                    return
+                config_actual[ultima] = copy.deepcopy(valor)
+                self._instantanea = _congelar(self._config)
+                self._programar_guardado()
             
-            self._guardar_config()
+            self._notificar([clave])
         except Exception as e:
             logger.error(f"Error estableciendo configuración {clave}: {e}")
     
+    def suscribir(self, funcion: Suscriptor, clave: Optional[str] = None):
+        """
+        Llama a `funcion(clave, valor)` cuando cambie la configuración.
+        
+        Args:
+            funcion: Se ejecuta en el hilo que hizo el cambio
+            clave: Solo cambios de esta clave, de sus hijas ('ventana' recibe
+                   'ventana.ancho') o de sus padres; None para todos
+        """
+        with self._lock:
+            self._suscriptores.append((funcion, clave))
+    
+    def cancelar_suscripcion(self, funcion: Suscriptor):
+        """Deja de avisar a `funcion`."""
+        with self._lock:
+            self._suscriptores = [(f, c) for f, c in self._suscriptores if f is not funcion]
+    
+    def _notificar(self, claves: List[str]):
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for clave in claves:
+            valor = self.obtener(clave)
+            for funcion, clave_suscrita in suscriptores:
+                if not _afecta(clave, clave_suscrita):
+                    continue
+                try:
+                    funcion(clave, valor)
+                except Exception as e:
+                    logger.error(f"Error avisando cambio de configuración {clave}: {e}")
+    
     def obtener_todas(self) -> Dict[str, Any]:
-        """Obtiene toda la configuración."""
-        return self._config.copy()
+        """Obtiene toda la configuración (copia modificable)."""
+        with self._lock:
+            return copy.deepcopy(self._config)
     
     def restablecer(self):
         """Restablece la configuración."""
-        self._config = self._obtener_config_por_defecto()
-        self._guardar_config()
+        with self._lock:
+            anterior = self._config
+            self._config = self._obtener_config_por_defecto()
+            self._instantanea = _congelar(self._config)
+            self._guardar_config()
+            cambiadas = [clave for clave in set(anterior) | set(self._config)
+                         if anterior.get(clave) != self._config.get(clave)]
+        self._notificar(sorted(cambiadas))
 
 # Instancia global
 _config_global = None
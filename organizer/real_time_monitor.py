@@ -5,14 +5,23 @@
 Monitor en tiempo real para organización automática de archivos
 """
 
+import heapq
+import itertools
+import os
 import time
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Optional, Set, Dict
+from typing import Any, Callable, Deque, Hashable, Optional, Set, Dict, List, Tuple
 import logging
 from datetime import datetime
 import sys
 
+from .file_watchers import INOTIFY_AVAILABLE, crear_observador
+from .metrics import COLA_MONITOR
+from .work_queue import ColaPersistente, DESCARTADO, FALLIDO, HECHO, PENDIENTE
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -24,7 +33,7 @@ try:
     Observer = WatchdogObserver
     FileSystemEventHandler = WatchdogFileSystemEventHandler
 except ImportError:
-    logger.warning("Watchdog no está disponible. Monitoreo en tiempo real deshabilitado.")
+    logger.info("Watchdog no está disponible; el monitor usará inotify o sondeo por mtime.")
     WATCHDOG_AVAILABLE = False
     
     # Crear clases mock para evitar errores
@@ -63,17 +72,265 @@ except ImportError:
         def on_deleted(self, event):
             pass
 
+class PlanificadorOrganizacion:
+    """
+    Cola de plazos con un único hilo planificador y un pool acotado de workers.
+    
+    Cada archivo tiene como mucho un plazo pendiente: un nuevo evento sobre la
+    misma ruta lo desplaza en lugar de crear otro temporizador (las entradas
+    antiguas del heap se descartan al salir). El número de hilos es constante
+    (1 + max_workers) sea cual sea el ritmo de eventos. Las claves suelen ser
+    rutas, pero vale cualquier objeto hashable (p. ej. el vaciado de un lote).
+    """
+    
+    def __init__(self, accion: Callable[[Hashable], None], max_workers: Optional[int] = None):
+        self.accion = accion
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._plazos: Dict[Hashable, float] = {}
+        self._en_proceso: Set[Hashable] = set()
+        self._secuencia = itertools.count()
+        self._condicion = threading.Condition()
+        self._activo = True
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                        thread_name_prefix="organizador-worker")
+        self._hilo = threading.Thread(target=self._bucle, name="organizador-planificador", daemon=True)
+        self._hilo.start()
+    
+    def programar(self, archivo: Hashable, retraso: float):
+        """Programa (o reprograma) un archivo para dentro de `retraso` segundos."""
+        plazo = time.monotonic() + retraso
+        with self._condicion:
+            if not self._activo:
+                return
+            self._plazos[archivo] = plazo
+            heapq.heappush(self._heap, (plazo, next(self._secuencia), archivo))
+            # Solo hace falta despertar al planificador si el plazo adelanta al primero
+            if self._heap[0][2] == archivo:
+                self._condicion.notify()
+    
+    def cancelar(self, archivo: Hashable):
+        """Quita un archivo de la cola (su entrada del heap queda obsoleta)."""
+        with self._condicion:
+            self._plazos.pop(archivo, None)
+    
+    def esta_programado(self, archivo: Hashable) -> bool:
+        with self._condicion:
+            return archivo in self._plazos or archivo in self._en_proceso
+    
+    def pendientes(self) -> int:
+        """Número de archivos esperando su plazo."""
+        with self._condicion:
+            return len(self._plazos)
+    
+    def en_proceso(self) -> int:
+        """Número de archivos que están tratando los workers."""
+        with self._condicion:
+            return len(self._en_proceso)
+    
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                listos = self._extraer_listos()
+                while self._activo and not listos:
+                    espera = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condicion.wait(espera)
+                    listos = self._extraer_listos()
+                if not self._activo:
+                    return
+            
+            for archivo in listos:
+                self._pool.submit(self._ejecutar, archivo)
+    
+    def _extraer_listos(self) -> List[Hashable]:
+        # Llamar con la condición adquirida
+        ahora = time.monotonic()
+        listos = []
+        while self._heap and self._heap[0][0] <= ahora:
+            plazo, _, archivo = heapq.heappop(self._heap)
+            if self._plazos.get(archivo) != plazo:
+                continue  # Entrada obsoleta: reprogramada o cancelada
+            if archivo in self._en_proceso:
+                # Un worker ya lo está tratando; se reintenta cuando termine
+                continue
+            del self._plazos[archivo]
+            self._en_proceso.add(archivo)
+            listos.append(archivo)
+        return listos
+    
+    def _ejecutar(self, archivo: Hashable):
+        try:
+            self.accion(archivo)
+        except Exception as e:
+            logger.error(f"Error procesando {archivo}: {e}")
+        finally:
+            with self._condicion:
+                self._en_proceso.discard(archivo)
+                plazo = self._plazos.get(archivo)
+                if plazo is not None:
+                    # Llegaron eventos mientras se procesaba: volver a encolarlo
+                    heapq.heappush(self._heap, (plazo, next(self._secuencia), archivo))
+                    self._condicion.notify()
+    
+    def detener(self, esperar: bool = True):
+        """Vacía la cola y detiene el planificador y los workers."""
+        with self._condicion:
+            self._activo = False
+            self._heap.clear()
+            self._plazos.clear()
+            self._condicion.notify()
+        self._hilo.join(timeout=5)
+        self._pool.shutdown(wait=esperar)
+
+
+# Sufijos de archivos temporales de navegadores y gestores de descargas; el
+# archivo definitivo aparece al renombrarlos
+SUFIJOS_TEMPORALES = ('.crdownload', '.part', '.partial', '.download', '.opdownload',
+                      '.tmp', '.temp')
+
+
+def es_temporal(archivo: Path) -> bool:
+    """Indica si el nombre corresponde a una descarga en curso o a un archivo auxiliar."""
+    nombre = archivo.name.lower()
+    return nombre.endswith(SUFIJOS_TEMPORALES) or nombre.startswith(('~', '.'))
+
+
+def archivos_nuevos_desde(carpeta: Path, marca: Optional[int],
+                          excluir: Optional[Set[Path]] = None) -> List[Path]:
+    """
+    Archivos de la carpeta (sin subcarpetas) creados, modificados o movidos a
+    ella después de `marca` (ns). Sin marca se devuelven todos.
+    
+    Args:
+        carpeta: Carpeta a revisar
+        marca: Instante en ns; None para devolver todos los archivos
+        excluir: Rutas a omitir (ya programadas)
+    """
+    nuevos = []
+    excluir = excluir or set()
+    try:
+        with os.scandir(carpeta) as entradas:
+            for entrada in entradas:
+                archivo = Path(entrada.path)
+                if archivo in excluir or es_temporal(archivo):
+                    continue
+                try:
+                    if not entrada.is_file(follow_symlinks=False):
+                        continue
+                    st = entrada.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                # ctime cambia también al mover o renombrar el archivo dentro de la carpeta
+                if marca is not None and max(st.st_mtime_ns, st.st_ctime_ns) <= marca:
+                    continue
+                nuevos.append(archivo)
+    except OSError as e:
+        logger.warning(f"No se pudo revisar {carpeta}: {e}")
+    return nuevos
+
+
+class SeguimientoEstabilidad:
+    """
+    Decide sin esperas bloqueantes cuándo un archivo terminó de escribirse.
+    
+    Cada evento o comprobación toma una muestra (tamaño, mtime_ns); el archivo
+    es estable tras `intervalos_quietos` comprobaciones seguidas sin cambios.
+    Un cierre tras escritura (inotify IN_CLOSE_WRITE) o el renombrado de un
+    temporal del navegador lo dan por terminado en cuanto la muestra coincide.
+    """
+    
+    def __init__(self, intervalos_quietos: int = 2):
+        self.intervalos_quietos = intervalos_quietos
+        # archivo → [muestra, comprobaciones sin cambios, terminado]
+        self._estados: Dict[Path, list] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _muestra(archivo: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = archivo.stat()
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+    
+    def registrar_evento(self, archivo: Path, terminado: bool = False):
+        """
+        Anota una actividad sobre el archivo.
+        
+        Args:
+            archivo: Archivo afectado
+            terminado: True si el evento indica que la escritura acabó
+                       (cierre tras escritura o renombrado desde un temporal)
+        """
+        muestra = self._muestra(archivo)
+        with self._lock:
+            estado = self._estados.get(archivo)
+            if estado is None or estado[0] != muestra:
+                self._estados[archivo] = [muestra, 0, terminado]
+            elif terminado:
+                estado[2] = True
+    
+    def comprobar(self, archivo: Path) -> bool:
+        """
+        Toma una nueva muestra y retorna True si el archivo ya es estable.
+        """
+        muestra = self._muestra(archivo)
+        if muestra is None:
+            return False
+        with self._lock:
+            estado = self._estados.get(archivo)
+            if estado is None or estado[0] != muestra:
+                # Primera muestra o el archivo sigue cambiando
+                self._estados[archivo] = [muestra, 0, False]
+                return False
+            if estado[2]:
+                return True
+            estado[1] += 1
+            return estado[1] >= self.intervalos_quietos
+    
+    def olvidar(self, archivo: Path):
+        with self._lock:
+            self._estados.pop(archivo, None)
+
+
+# Clave del planificador para vaciar el lote en curso cuando vence su ventana
+_VACIAR_LOTE = 'vaciar-lote'
+
+
 class EventosDescarga(FileSystemEventHandler):
     """
     Maneja eventos de descarga de archivos.
+    
+    Si se indica organizador_lote_callback, los archivos listos se agrupan en
+    micro-lotes (por ventana de tiempo o por tamaño) y se organizan juntos.
+    Con una cola persistente, cada archivo pendiente queda anotado en disco
+    hasta que se organiza o se descarta.
     """
     
-    def __init__(self, organizador_callback: Callable, delay_segundos: int = 3):
+    def __init__(self, organizador_callback: Callable, delay_segundos: int = 3,
+                 max_workers: Optional[int] = None, intervalo_estabilidad: float = 1.0,
+                 organizador_lote_callback: Optional[Callable[[List[Path]], Any]] = None,
+                 ventana_lote: float = 0.5, tamaño_lote: int = 100,
+                 cola: Optional[ColaPersistente] = None):
         super().__init__()
+        self.cola = cola
         self.organizador_callback = organizador_callback
+        self.organizador_lote_callback = organizador_lote_callback
+        self.ventana_lote = ventana_lote
+        self.tamaño_lote = tamaño_lote
         self.delay_segundos = delay_segundos
-        self.timers: Dict[Path, threading.Timer] = {}
-        self.lock = threading.Lock()
+        self.intervalo_estabilidad = intervalo_estabilidad
+        self.max_reintentos = 3
+        # Tiempo máximo esperando a que un archivo deje de cambiar
+        self.espera_maxima = 3600.0
+        self.estabilidad = SeguimientoEstabilidad()
+        self._intentos: Dict[Path, int] = {}
+        self._primer_evento: Dict[Path, float] = {}
+        self._lock = threading.Lock()
+        # Archivos listos esperando a que se vacíe el lote: (archivo, instante en que quedó listo)
+        self._lote: List[Tuple[Path, float]] = []
+        self.metricas_lotes: Deque[Dict[str, Any]] = deque(maxlen=200)
+        self.planificador = PlanificadorOrganizacion(self._procesar, max_workers)
     
     def on_created(self, event):
         if not event.is_directory:
@@ -82,111 +339,237 @@ class EventosDescarga(FileSystemEventHandler):
     
     def on_moved(self, event):
         if not event.is_directory:
+            origen = Path(event.src_path)
             archivo = Path(event.dest_path)
-            self._programar_organizacion(archivo)
+            self._descartar(origen)
+            # Chrome/Firefox renombran el temporal al terminar la descarga
+            self._programar_organizacion(archivo, terminado=es_temporal(origen))
     
     def on_modified(self, event):
         if not event.is_directory:
             archivo = Path(event.src_path)
-            # Solo para archivos que no están siendo monitoreados aún
-            if archivo not in self.timers:
+            # La muestra se actualiza siempre; el plazo solo si no estaba programado
+            if self.planificador.esta_programado(archivo):
+                self.estabilidad.registrar_evento(archivo)
+            else:
                 self._programar_organizacion(archivo)
     
-    def _programar_organizacion(self, archivo: Path):
+    def on_closed(self, event):
+        # Solo lo emite el backend inotify de watchdog (IN_CLOSE_WRITE en Linux)
+        if not event.is_directory:
+            self._programar_organizacion(Path(event.src_path), terminado=True)
+    
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._descartar(Path(event.src_path))
+    
+    def _programar_organizacion(self, archivo: Path, terminado: bool = False):
         """
         Programa la organización de un archivo después del delay especificado.
-        Cancela cualquier timer previo para el mismo archivo.
+        Un evento repetido sobre el mismo archivo desplaza su plazo; si el
+        evento indica que la escritura terminó, se comprueba enseguida.
         """
-        with self.lock:
-            # Cancelar timer existente si lo hay
-            if archivo in self.timers:
-                self.timers[archivo].cancel()
-            
-            # Crear nuevo timer
-            timer = threading.Timer(self.delay_segundos, self._organizar_archivo, [archivo])
-            self.timers[archivo] = timer
-            timer.start()
-            
-            logger.debug(f"⏳ Programado para organizar en {self.delay_segundos}s: {archivo.name}")
+        if es_temporal(archivo):
+            # Se organizará cuando el navegador lo renombre
+            return
+        if self.cola:
+            self.cola.registrar(archivo, PENDIENTE)
+        self.estabilidad.registrar_evento(archivo, terminado)
+        with self._lock:
+            self._primer_evento.setdefault(archivo, time.monotonic())
+        retraso = min(self.intervalo_estabilidad, self.delay_segundos) if terminado else self.delay_segundos
+        self.planificador.programar(archivo, retraso)
+        logger.debug(f"⏳ Programado para organizar en {retraso}s: {archivo.name}")
     
-    def _organizar_archivo(self, archivo: Path):
+    def _descartar(self, archivo: Path, estado: str = DESCARTADO):
+        self.planificador.cancelar(archivo)
+        self.estabilidad.olvidar(archivo)
+        with self._lock:
+            self._intentos.pop(archivo, None)
+            self._primer_evento.pop(archivo, None)
+        if self.cola:
+            self.cola.registrar(archivo, estado)
+    
+    def reanudar_pendientes(self, carpeta: Path) -> int:
         """
-        Organiza un archivo específico con sistema de reintentos mejorado.
+        Vuelve a programar lo que quedó pendiente en la cola persistente y lo
+        que llegó a la carpeta mientras el monitor no estaba activo (archivos
+        con mtime o ctime posterior a la última marca). Sustituye al pase
+        completo de organización al arrancar.
+        
+        Returns:
+            Número de archivos programados
         """
-        max_reintentos = 3
-        reintento = 0
+        if not self.cola:
+            return 0
         
-        while reintento < max_reintentos:
-            try:
-                with self.lock:
-                    # Remover de timers
-                    if archivo in self.timers:
-                        del self.timers[archivo]
-                
-                # Verificar que el archivo aún existe
-                if not archivo.exists():
-                    logger.debug(f"Archivo ya no existe: {archivo.name}")
-                    return
-                
-                # Verificar si el archivo aún se está descargando
-                if self._archivo_en_uso(archivo):
-                    if reintento < max_reintentos - 1:
-                        logger.debug(f"Archivo aún en uso, reintentando en {self.delay_segundos * 2} segundos: {archivo.name}")
-                        # Aumentar el delay para archivos problemáticos
-                        timer = threading.Timer(self.delay_segundos * 2, self._organizar_archivo, [archivo])
-                        with self.lock:
-                            self.timers[archivo] = timer
-                        timer.start()
-                        return
-                    else:
-                        logger.warning(f"Archivo sigue en uso después de {max_reintentos} intentos: {archivo.name}")
-                        return
-                
-                # Verificar que el archivo tenga un tamaño razonable (no esté vacío)
-                if archivo.stat().st_size == 0:
-                    logger.debug(f"Archivo vacío, saltando: {archivo.name}")
+        marca = self.cola.marca
+        inicio = time.time_ns()
+        programados: Set[Path] = set()
+        
+        for archivo, intentos in self.cola.pendientes():
+            if not archivo.exists():
+                self.cola.registrar(archivo, DESCARTADO)
+                continue
+            with self._lock:
+                self._intentos[archivo] = intentos
+            self._programar_organizacion(archivo)
+            programados.add(archivo)
+        
+        for archivo in archivos_nuevos_desde(carpeta, marca, programados):
+            self._programar_organizacion(archivo)
+            programados.add(archivo)
+        
+        self.cola.guardar_marca(inicio)
+        return len(programados)
+    
+    def _procesar(self, clave: Hashable):
+        if clave == _VACIAR_LOTE:
+            self._vaciar_lote()
+        else:
+            self._organizar_archivo(clave)
+    
+    def _organizar_archivo(self, archivo: Path):
+        """
+        Organiza un archivo si ya terminó de escribirse. Nunca duerme: si el
+        archivo sigue cambiando o falla, se vuelve a programar.
+        """
+        try:
+            # Verificar que el archivo aún existe
+            if not archivo.exists():
+                logger.debug(f"Archivo ya no existe: {archivo.name}")
+                self._descartar(archivo)
+                return
+            
+            # Verificar si el archivo aún se está descargando
+            if self._archivo_en_uso(archivo):
+                with self._lock:
+                    esperando = time.monotonic() - self._primer_evento.get(archivo, time.monotonic())
+                if esperando > self.espera_maxima:
+                    logger.warning(f"Archivo sigue cambiando tras {esperando:.0f}s, se abandona: {archivo.name}")
+                    self._descartar(archivo, FALLIDO)
                     return
-                
-                # Organizar el archivo
-                logger.info(f"🔄 Organizando automáticamente: {archivo.name}")
-                self.organizador_callback(archivo)
-                return  # Éxito, salir del bucle
+                logger.debug(f"Archivo aún en uso, se comprobará en {self.intervalo_estabilidad}s: {archivo.name}")
+                self.planificador.programar(archivo, self.intervalo_estabilidad)
+                return
             
-            except Exception as e:
-                reintento += 1
-                logger.warning(f"Error organizando {archivo} (intento {reintento}/{max_reintentos}): {e}")
-                
-                if reintento < max_reintentos:
-                    # Esperar más tiempo antes del siguiente reintento
-                    time.sleep(self.delay_segundos * reintento)
-                else:
-                    logger.error(f"❌ Falló organizar {archivo} después de {max_reintentos} intentos")
-                    # Podrías agregar el archivo a una lista de "archivos problemáticos" aquí
+            # Verificar que el archivo tenga un tamaño razonable (no esté vacío)
+            if archivo.stat().st_size == 0:
+                # Firefox crea el destino vacío y lo sustituye al renombrar el .part
+                logger.debug(f"Archivo vacío, saltando: {archivo.name}")
+                self._descartar(archivo)
+                return
+            
+            if self.organizador_lote_callback:
+                self._añadir_a_lote(archivo)
+                return
+            
+            # Organizar el archivo
+            logger.info(f"🔄 Organizando automáticamente: {archivo.name}")
+            self.organizador_callback(archivo)
+            self._descartar(archivo, HECHO)
+        
+        except Exception as e:
+            self._reintentar(archivo, e)
+    
+    def _reintentar(self, archivo: Path, error: Exception):
+        with self._lock:
+            reintento = self._intentos.get(archivo, 0) + 1
+            self._intentos[archivo] = reintento
+        logger.warning(f"Error organizando {archivo} (intento {reintento}/{self.max_reintentos}): {error}")
+        
+        if reintento < self.max_reintentos:
+            if self.cola:
+                self.cola.registrar(archivo, PENDIENTE, reintento)
+            # Esperar más tiempo antes del siguiente reintento
+            self.planificador.programar(archivo, self.delay_segundos * reintento)
+        else:
+            logger.error(f"❌ Falló organizar {archivo} después de {self.max_reintentos} intentos")
+            self._descartar(archivo, FALLIDO)
+    
+    def _añadir_a_lote(self, archivo: Path):
+        """Añade un archivo listo al lote; lo vacía al llenarse o al vencer la ventana."""
+        with self._lock:
+            self._lote.append((archivo, time.monotonic()))
+            lleno = len(self._lote) >= self.tamaño_lote
+            primero = len(self._lote) == 1
+        
+        if lleno:
+            self.planificador.cancelar(_VACIAR_LOTE)
+            self._vaciar_lote()
+        elif primero:
+            self.planificador.programar(_VACIAR_LOTE, self.ventana_lote)
+    
+    def _vaciar_lote(self):
+        with self._lock:
+            lote, self._lote = self._lote, []
+            primeros_eventos = [self._primer_evento.get(archivo, listo) for archivo, listo in lote]
+        if not lote:
+            return
+        
+        archivos = [archivo for archivo, _ in lote]
+        inicio = time.monotonic()
+        logger.info(f"🔄 Organizando automáticamente un lote de {len(archivos)} archivo(s)")
+        try:
+            self.organizador_lote_callback(archivos)
+        except Exception as e:
+            # El lote falló entero: cada archivo vuelve a su ciclo de reintentos
+            for archivo in archivos:
+                self._reintentar(archivo, e)
+            return
+        fin = time.monotonic()
+        
+        latencias = [fin - primero for primero in primeros_eventos]
+        metricas = {
+            'timestamp': datetime.now().isoformat(),
+            'archivos': len(archivos),
+            'espera_lote': inicio - min(listo for _, listo in lote),
+            'duracion': fin - inicio,
+            'latencia_media': sum(latencias) / len(latencias),
+            'latencia_max': max(latencias)
+        }
+        self.metricas_lotes.append(metricas)
+        logger.debug(f"📦 Lote de {metricas['archivos']} archivo(s) en {metricas['duracion']:.3f}s "
+                     f"(latencia máx. {metricas['latencia_max']:.2f}s)")
+        
+        for archivo in archivos:
+            self._descartar(archivo, HECHO)
+    
+    def obtener_metricas_lotes(self) -> Dict[str, Any]:
+        """
+        Resume las métricas de los últimos lotes organizados.
+        
+        Returns:
+            Diccionario con totales, medias y los lotes recientes
+        """
+        lotes = list(self.metricas_lotes)
+        if not lotes:
+            return {'lotes': 0}
+        return {
+            'lotes': len(lotes),
+            'archivos': sum(m['archivos'] for m in lotes),
+            'tamaño_medio': sum(m['archivos'] for m in lotes) / len(lotes),
+            'duracion_media': sum(m['duracion'] for m in lotes) / len(lotes),
+            'latencia_max': max(m['latencia_max'] for m in lotes),
+            'recientes': lotes[-10:]
+        }
     
     def _archivo_en_uso(self, archivo: Path) -> bool:
         """
         Detecta si un archivo está siendo usado (descarga en progreso).
-        Usa múltiples métodos para mayor precisión.
+        Usa múltiples métodos para mayor precisión, sin esperas bloqueantes.
         """
         try:
-            # Método 1: Verificar si el archivo está creciendo
-            try:
-                tamaño_inicial = archivo.stat().st_size
-                time.sleep(0.5)  # Esperar medio segundo
-                tamaño_final = archivo.stat().st_size
-                if tamaño_final > tamaño_inicial:
-                    logger.debug(f"Archivo creciendo: {archivo.name}")
-                    return True
-            except (OSError, FileNotFoundError):
-                return True  # Si no podemos acceder, probablemente está en uso
-            
-            # Método 2: Verificar nombres de archivos temporales comunes
-            nombre_archivo = archivo.name.lower()
-            if (nombre_archivo.endswith(('.tmp', '.temp', '.download', '.crdownload', '.part')) or
-                nombre_archivo.startswith(('~', '.'))):
+            # Método 1: Nombres de archivos temporales comunes
+            if es_temporal(archivo):
                 logger.debug(f"Archivo temporal detectado: {archivo.name}")
                 return True
             
+            # Método 2: El archivo debe llevar varias comprobaciones sin cambiar
+            if not self.estabilidad.comprobar(archivo):
+                logger.debug(f"Archivo aún cambiando: {archivo.name}")
+                return True
+            
             # Método 3: Intentar abrir en modo exclusivo (Windows)
             if sys.platform == "win32":
                 try:
@@ -206,76 +589,120 @@ class EventosDescarga(FileSystemEventHandler):
                 except (PermissionError, IOError):
                     return True
             
-            # Método 4: Verificar si el archivo es muy pequeño (puede estar empezando a descargarse)
-            if archivo.stat().st_size < 1024:  # Menos de 1KB
-                logger.debug(f"Archivo muy pequeño, esperando: {archivo.name}")
-                return True
-                
             return False
             
         except Exception as e:
             logger.debug(f"Error verificando archivo {archivo}: {e}")
             return True  # En caso de duda, asumir que está en uso
     
+    def pendientes(self) -> int:
+        """Archivos esperando su plazo, en proceso o listos en el lote."""
+        with self._lock:
+            en_lote = len(self._lote)
+        return self.planificador.pendientes() + self.planificador.en_proceso() + en_lote
+    
     def detener(self):
-        """Detiene todos los timers pendientes."""
-        with self.lock:
-            for timer in self.timers.values():
-                timer.cancel()
-            self.timers.clear()
+        """Descarta los archivos pendientes y detiene el planificador."""
+        self.planificador.detener()
+        # Los archivos ya listos no se pierden: se organizan antes de salir
+        if self.organizador_lote_callback:
+            self._vaciar_lote()
+        # Lo que siga pendiente queda en la cola para el próximo arranque
+        if self.cola:
+            self.cola.guardar_marca()
+            self.cola.cerrar()
 
 class MonitorTiempoReal:
     """
     Monitor principal para organización automática en tiempo real.
     """
     
-    def __init__(self, carpeta_vigilar: Path, organizador_callback: Callable):
+    def __init__(self, carpeta_vigilar: Path, organizador_callback: Callable,
+                 organizador_lote_callback: Optional[Callable[[List[Path]], Any]] = None,
+                 cola_persistente: bool = True):
         self.carpeta_vigilar = carpeta_vigilar
+        self.cola_persistente = cola_persistente
         self.organizador_callback = organizador_callback
+        self.organizador_lote_callback = organizador_lote_callback
         self.observer: Optional[Observer] = None
         self.event_handler: Optional[EventosDescarga] = None
+        self.backend: Optional[str] = None
         self.activo = False
+    
+    @staticmethod
+    def _crear_observador(backend: str):
+        """
+        Elige el observador: inotify nativo en Linux, watchdog en el resto y,
+        si watchdog no está instalado, sondeo por mtime.
         
-        if not WATCHDOG_AVAILABLE:
-            logger.warning("Watchdog no disponible, monitoreo en tiempo real deshabilitado")
+        Returns:
+            (observador, nombre del backend) o (None, None)
+        """
+        if backend == 'watchdog' or (backend == 'auto' and WATCHDOG_AVAILABLE and not INOTIFY_AVAILABLE):
+            if WATCHDOG_AVAILABLE:
+                return Observer(), 'watchdog'
+            logger.error("Watchdog no está disponible")
+            return None, None
+        
+        observador = crear_observador(backend)
+        if observador is None:
+            logger.error(f"Backend de monitor no disponible: {backend}")
+            return None, None
+        return observador, observador.nombre_backend
     
-    def iniciar(self, delay_segundos: int = 3) -> bool:
+    def iniciar(self, delay_segundos: int = 3, max_workers: Optional[int] = None,
+                recursivo: bool = False, backend: str = 'auto') -> bool:
         """
         Inicia el monitoreo en tiempo real.
         
         Args:
             delay_segundos: Segundos a esperar antes de organizar un archivo
+            max_workers: Hilos que organizan archivos en paralelo (por defecto hasta 4)
+            recursivo: Vigilar también las subcarpetas (y las que se creen después)
+            backend: 'auto', 'inotify', 'watchdog' o 'sondeo'
             
         Returns:
             True si se inició correctamente, False si no
         """
-        if not WATCHDOG_AVAILABLE:
-            logger.error("No se puede iniciar: watchdog no está disponible")
-            return False
-        
         if self.activo:
             logger.warning("Monitor ya está activo")
             return True
         
         try:
-            self.event_handler = EventosDescarga(self.organizador_callback, delay_segundos)
-            self.observer = Observer()
+            cola = ColaPersistente(self.carpeta_vigilar) if self.cola_persistente else None
+            self.event_handler = EventosDescarga(
+                self.organizador_callback, delay_segundos, max_workers,
+                organizador_lote_callback=self.organizador_lote_callback,
+                cola=cola
+            )
+            self.observer, self.backend = self._crear_observador(backend)
+            if self.observer is None:
+                self.event_handler.detener()
+                return False
             self.observer.schedule(
                 self.event_handler,
                 str(self.carpeta_vigilar),
-                recursive=False
+                recursive=recursivo
             )
             
             self.observer.start()
             self.activo = True
+            COLA_MONITOR.fijar_funcion(self.event_handler.pendientes)
             
-            logger.info(f"🔄 Monitor iniciado en: {self.carpeta_vigilar}")
+            logger.info(f"🔄 Monitor iniciado en: {self.carpeta_vigilar} ({self.backend})")
             logger.info(f"⏱️  Delay de organización: {delay_segundos} segundos")
             
+            # Con el observador ya activo no se pierde nada entre la revisión y los eventos
+            reanudados = self.event_handler.reanudar_pendientes(self.carpeta_vigilar)
+            if reanudados:
+                logger.info(f"📋 {reanudados} archivo(s) pendientes o nuevos desde la última sesión")
+            
             return True
             
         except Exception as e:
             logger.error(f"Error iniciando monitor: {e}")
+            if self.event_handler:
+                self.event_handler.detener()
             return False
     
     def detener(self):
@@ -284,6 +711,7 @@ class MonitorTiempoReal:
             return
         
         try:
+            COLA_MONITOR.fijar_funcion(None)
             if self.event_handler:
                 self.event_handler.detener()
             
@@ -297,6 +725,12 @@ class MonitorTiempoReal:
         except Exception as e:
             logger.error(f"Error deteniendo monitor: {e}")
     
+    def obtener_metricas_lotes(self) -> Dict[str, Any]:
+        """Métricas de latencia de los lotes organizados por el monitor."""
+        if self.event_handler:
+            return self.event_handler.obtener_metricas_lotes()
+        return {'lotes': 0}
+    
     def esta_activo(self) -> bool:
         """Retorna si el monitor está activo."""
         if self.observer:
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Motor de reversión: deshace movimientos en paralelo con punto de control
+para poder reanudar una reversión interrumpida
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tipos de reversión (cada uno con su propio punto de control)
+DESHACER_TODO = 'deshacer_todo'
+REVERTIR_FECHAS = 'revertir_fechas'
+
+# Estados de un movimiento tras ejecutarlo
+MOVIDO = 'movido'
+YA_HECHO = 'ya_hecho'
+NO_ENCONTRADO = 'no_encontrado'
+ERROR = 'error'
+
+# Carpetas de la raíz que nunca se deshacen
+CARPETAS_EXCLUIDAS = {'.config', '.git', '__pycache__'}
+
+# En Windows y macOS los nombres no distinguen mayúsculas
+NOMBRES_SIN_MAYUSCULAS = sys.platform in ('win32', 'darwin')
+
+# (origen, destino deseado, número en el diario de movimientos o None)
+Peticion = Tuple[Path, Path, Optional[int]]
+
+
+def _clave_nombre(nombre: str) -> str:
+    return nombre.lower() if NOMBRES_SIN_MAYUSCULAS else nombre
+
+
+# Serializa los movimientos que no pueden reservar el nombre con un enlace
+_lock_sin_enlace = threading.Lock()
+
+
+def _mover_sin_sobrescribir(origen: Path, destino: Path) -> bool:
+    """
+    Mueve `origen` a `destino` sin pisar nada.
+
+    El nombre se reserva de forma atómica creando un enlace duro (falla si
+    ya existe) y después se borra el origen. Donde no hay enlaces duros
+    (otro sistema de archivos, FAT...) se comprueba y mueve bajo un lock.
+
+    Returns:
+        False si `destino` ya existía
+    """
+    try:
+        os.link(origen, destino, follow_symlinks=False)
+    except FileExistsError:
+        return False
+    except (OSError, NotImplementedError):
+        with _lock_sin_enlace:
+            if os.path.lexists(destino):
+                return False
+            shutil.move(str(origen), str(destino))
+        return True
+    os.unlink(origen)
+    return True
+
+
+class IndiceNombres:
+    """
+    Nombres ocupados en las carpetas destino, leídos una sola vez por carpeta
+    (un scandir) y ampliados con los nombres que ya reservó el plan. Resolver
+    un conflicto es una búsqueda en memoria, no un exists() por intento.
+    """
+
+    def __init__(self):
+        self._carpetas: Dict[Path, Set[str]] = {}
+
+    def _ocupados(self, carpeta: Path) -> Set[str]:
+        ocupados = self._carpetas.get(carpeta)
+        if ocupados is None:
+            ocupados = set()
+            try:
+                with os.scandir(carpeta) as entradas:
+                    for entrada in entradas:
+                        ocupados.add(_clave_nombre(entrada.name))
+            except OSError:
+                pass  # Todavía no existe: nada ocupado
+            self._carpetas[carpeta] = ocupados
+        return ocupados
+
+    def reservar(self, destino: Path) -> Path:
+        """Devuelve `destino` o, si está ocupado, nombre_1.ext, nombre_2.ext..."""
+        ocupados = self._ocupados(destino.parent)
+        candidato = destino
+        indice = 1
+        while _clave_nombre(candidato.name) in ocupados:
+            candidato = destino.with_name(f"{destino.stem}_{indice}{destino.suffix}")
+            indice += 1
+        ocupados.add(_clave_nombre(candidato.name))
+        return candidato
+
+    def liberar(self, origen: Path):
+        """Un archivo que sale de su carpeta deja libre su nombre."""
+        ocupados = self._carpetas.get(origen.parent)
+        if ocupados is not None:
+            ocupados.discard(_clave_nombre(origen.name))
+
+
+def planificar_deshacer_todo(carpeta_descargas: Path, profundidad_maxima: int = 10) -> List[Peticion]:
+    """
+    Todos los archivos de las carpetas de la raíz, con destino la raíz.
+
+    Un solo recorrido con scandir; no se sigue más allá de
+    `profundidad_maxima` niveles.
+    """
+    carpeta_descargas = Path(carpeta_descargas)
+    peticiones: List[Peticion] = []
+
+    def recorrer(carpeta: Path, nivel: int):
+        if nivel > profundidad_maxima:
+            return
+        try:
+            with os.scandir(carpeta) as entradas:
+                for entrada in entradas:
+                    try:
+                        if entrada.is_file(follow_symlinks=False):
+                            peticiones.append((Path(entrada.path), carpeta_descargas / entrada.name, None))
+                        elif entrada.is_dir(follow_symlinks=False):
+                            recorrer(Path(entrada.path), nivel + 1)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"No se pudo recorrer {carpeta}: {e}")
+
+    try:
+        with os.scandir(carpeta_descargas) as entradas:
+            raiz = [Path(entrada.path) for entrada in entradas
+                    if entrada.is_dir(follow_symlinks=False) and entrada.name not in CARPETAS_EXCLUIDAS]
+    except OSError as e:
+        logger.error(f"No se pudo leer {carpeta_descargas}: {e}")
+        return []
+
+    for carpeta in raiz:
+        recorrer(carpeta, 0)
+    return peticiones
+
+
+class MotorReversion:
+    """
+    Ejecuta un plan de movimientos inversos.
+
+    preparar() resuelve todos los destinos por adelantado (IndiceNombres) y
+    guarda el plan en .config/reversion_<tipo>.jsonl. ejecutar() mueve los
+    archivos por bloques en un pool de hilos y, tras cada bloque, añade al
+    mismo archivo una línea con los índices completados (flush + fsync). Si
+    la reversión se interrumpe (cancelación, cierre o caída), la siguiente
+    llamada a ejecutar() retoma el plan guardado: los destinos ya están
+    fijados, así que reanudar nunca duplica nombres. Un movimiento hecho pero
+    no anotado se reconoce porque el origen ya no está y el destino sí.
+    revertir() no reanuda el plan viejo tal cual: lo combina con uno nuevo.
+    """
+
+    TAMAÑO_BLOQUE = 256
+
+    def __init__(self, carpeta_descargas: Path, tipo: str, max_workers: int = 4):
+        self.carpeta_descargas = Path(carpeta_descargas)
+        self.tipo = tipo
+        self.max_workers = max_workers
+        self.carpeta_config = self.carpeta_descargas / ".config"
+        self.carpeta_config.mkdir(exist_ok=True)
+        self.archivo_plan = self.carpeta_config / f"reversion_{tipo}.jsonl"
+
+    def pendiente(self) -> bool:
+        """True si hay una reversión de este tipo sin terminar."""
+        return self.archivo_plan.exists()
+
+    def preparar(self, peticiones: Iterable[Peticion]) -> int:
+        """
+        Fija los destinos definitivos y guarda el plan.
+
+        Args:
+            peticiones: (origen, destino deseado, número en el diario o None)
+
+        Returns:
+            Número de movimientos planificados
+        """
+        indice = IndiceNombres()
+        plan: List[Dict[str, Any]] = []
+        for origen, destino, numero in peticiones:
+            if origen == destino:
+                continue
+            indice.liberar(origen)
+            plan.append({'i': len(plan), 'o': str(origen), 'd': str(indice.reservar(destino)), 'n': numero})
+
+        temporal = self.archivo_plan.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'tipo': self.tipo, 'creado': datetime.now().isoformat(),
+                                'total': len(plan)}) + '\n')
+            for movimiento in plan:
+                f.write(json.dumps(movimiento, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.archivo_plan)
+        logger.info(f"📋 Reversión planificada: {len(plan)} movimientos")
+        return len(plan)
+
+    def _cargar_plan(self) -> Tuple[List[Dict[str, Any]], Set[int]]:
+        plan: List[Dict[str, Any]] = []
+        hechos: Set[int] = set()
+        with open(self.archivo_plan, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir tras una caída
+                    continue
+                if 'hechos' in registro:
+                    hechos.update(registro['hechos'])
+                elif 'i' in registro:
+                    plan.append(registro)
+        return plan, hechos
+
+    @staticmethod
+    def _mover(movimiento: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+        """Mueve un archivo; retorna (estado, destino final, error)."""
+        origen = Path(movimiento['o'])
+        destino = Path(movimiento['d'])
+        if not os.path.lexists(origen):
+            if os.path.lexists(destino):
+                return YA_HECHO, str(destino), None
+            return NO_ENCONTRADO, None, None
+        try:
+            if os.path.lexists(destino) and os.path.samefile(origen, destino):
+                # Caída entre el enlace y el borrado del origen
+                os.unlink(origen)
+                return MOVIDO, str(destino), None
+            candidato = destino
+            indice = 1
+            # Si apareció algo con ese nombre después de planificar, nombre_N
+            while not _mover_sin_sobrescribir(origen, candidato):
+                candidato = destino.with_name(f"{destino.stem}_{indice}{destino.suffix}")
+                indice += 1
+            return MOVIDO, str(candidato), None
+        except Exception as e:
+            return ERROR, None, f"Error moviendo {origen.name}: {e}"
+
+    def ejecutar(self, progreso: Optional[Callable[[int, int], None]] = None,
+                 cancelacion=None) -> Dict[str, Any]:
+        """
+        Ejecuta (o reanuda) el plan guardado.
+
+        Args:
+            progreso: Recibe (movimientos completados, total) tras cada bloque
+            cancelacion: Objeto con is_set(); al activarse se termina el
+                         bloque en curso y el plan queda para reanudar
+
+        Returns:
+            Diccionario con 'movidos', 'ya_hechos', 'no_encontrados',
+            'errores', 'completados' (movimientos del plan resueltos, con su
+            número de diario), 'cancelado' y 'reanudado'
+        """
+        resultado: Dict[str, Any] = {
+            'movidos': 0, 'ya_hechos': 0, 'no_encontrados': 0, 'errores': [],
+            'completados': [], 'cancelado': False, 'reanudado': False
+        }
+        if not self.pendiente():
+            return resultado
+
+        plan, hechos = self._cargar_plan()
+        resultado['reanudado'] = bool(hechos)
+        if hechos:
+            logger.info(f"⏯️ Reanudando reversión: {len(hechos)} de {len(plan)} movimientos ya hechos")
+        resultado['completados'] = [m for m in plan if m['i'] in hechos]
+        restantes = [m for m in plan if m['i'] not in hechos]
+        total = len(plan)
+        completados = len(hechos)
+
+        # Carpetas destino creadas una vez, antes de mover
+        for carpeta in {Path(m['d']).parent for m in restantes}:
+            try:
+                carpeta.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.error(f"No se pudo crear {carpeta}: {e}")
+
+        with open(self.archivo_plan, 'a', encoding='utf-8') as punto_control, \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reversion") as pool:
+            for inicio in range(0, len(restantes), self.TAMAÑO_BLOQUE):
+                if cancelacion is not None and cancelacion.is_set():
+                    resultado['cancelado'] = True
+                    break
+                bloque = restantes[inicio:inicio + self.TAMAÑO_BLOQUE]
+                resueltos = []
+                for movimiento, (estado, destino, error) in zip(bloque, pool.map(self._mover, bloque)):
+                    if estado == ERROR:
+                        # Sin anotar: al reanudar se vuelve a intentar
+                        resultado['errores'].append(error)
+                        continue
+                    if estado == MOVIDO:
+                        resultado['movidos'] += 1
+                    elif estado == YA_HECHO:
+                        resultado['ya_hechos'] += 1
+                    else:
+                        resultado['no_encontrados'] += 1
+                    if destino:
+                        movimiento['d'] = destino
+                    resueltos.append(movimiento['i'])
+                    resultado['completados'].append(movimiento)
+
+                punto_control.write(json.dumps({'hechos': resueltos}) + '\n')
+                punto_control.flush()
+                os.fsync(punto_control.fileno())
+                completados += len(resueltos)
+                if progreso:
+                    progreso(completados, total)
+
+        for error in resultado['errores']:
+            logger.error(error)
+
+        if resultado['cancelado']:
+            logger.info(f"⏹️ Reversión interrumpida en {completados}/{total}; se reanudará la próxima vez")
+        else:
+            # Los que fallaron siguen en su sitio: una reversión nueva los volverá a planificar
+            self.descartar()
+            logger.info(f"✅ Reversión terminada: {resultado['movidos']} archivos movidos")
+        return resultado
+
+    def _pendientes_plan(self) -> List[Peticion]:
+        """Movimientos del plan guardado que no llegaron a hacerse, con su destino ya fijado."""
+        plan, hechos = self._cargar_plan()
+        pendientes: List[Peticion] = []
+        for movimiento in plan:
+            if movimiento['i'] in hechos:
+                continue
+            origen = Path(movimiento['o'])
+            # Sin origen ya no hay nada que mover (o se movió sin anotarse);
+            # si pertenece al diario, el plan nuevo lo vuelve a incluir
+            if os.path.lexists(origen):
+                pendientes.append((origen, Path(movimiento['d']), movimiento.get('n')))
+        return pendientes
+
+    def revertir(self, planificar: Callable[[], Iterable[Peticion]],
+                 progreso: Optional[Callable[[int, int], None]] = None,
+                 cancelacion=None) -> Dict[str, Any]:
+        """
+        Planifica con `planificar()` y ejecuta. Si quedó una reversión de
+        este tipo sin terminar, sus movimientos pendientes se combinan con
+        el plan nuevo (conservando sus destinos): lo que se organizó después
+        de interrumpirla también se revierte.
+        """
+        peticiones = list(planificar())
+        reanudado = False
+        if self.pendiente():
+            try:
+                pendientes = self._pendientes_plan()
+            except Exception as e:
+                logger.error(f"Error leyendo la reversión interrumpida: {e}")
+                pendientes = []
+            if pendientes:
+                reanudado = True
+                logger.info(f"⏯️ Reanudando reversión: {len(pendientes)} movimientos pendientes")
+            origenes = {origen for origen, _, _ in pendientes}
+            peticiones = pendientes + [p for p in peticiones if p[0] not in origenes]
+        self.preparar(peticiones)
+        resultado = self.ejecutar(progreso, cancelacion)
+        resultado['reanudado'] = reanudado
+        return resultado
+
+    def descartar(self):
+        """Olvida el plan guardado."""
+        try:
+            self.archivo_plan.unlink()
+        except FileNotFoundError:
+            pass
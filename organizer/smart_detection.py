@@ -6,13 +6,226 @@ Detección inteligente de tipos de archivo basada en contenido
 """
 
 import os
+import struct
 import mimetypes
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .file_features import CaracteristicasArchivo, CacheLRU, identidad_archivo, obtener_caracteristicas
 
 logger = logging.getLogger(__name__)
 
+# Bytes leídos de cada archivo: cubre la cabecera "ustar" de tar (offset 257)
+TAMAÑO_CABECERA = 264
+
+Firma = Tuple[Tuple[int, bytes], ...]
+
+
+def _firma(*piezas: Union[bytes, Tuple[int, bytes]]) -> Firma:
+    """
+    Construye una firma a partir de piezas. Una pieza ``bytes`` va en el offset 0;
+    una tupla ``(offset, bytes)`` va en ese offset. Los huecos son comodines.
+    """
+    return tuple(pieza if isinstance(pieza, tuple) else (0, pieza) for pieza in piezas)
+
+
+class TrieFirmas:
+    """
+    Trie de bytes con comodines para reconocer firmas (magic numbers).
+    
+    Cada firma es una secuencia de bytes con huecos en offsets fijos; buscar
+    recorre la cabecera una sola vez y gana la firma más larga (más específica),
+    por lo que el coste depende de la longitud de la cabecera y no del número
+    de firmas registradas.
+    """
+    
+    __slots__ = ('_hijos', '_comodin', '_resultado')
+    
+    def __init__(self):
+        self._hijos: Dict[int, 'TrieFirmas'] = {}
+        self._comodin: Optional['TrieFirmas'] = None
+        self._resultado: Any = None
+    
+    def añadir(self, firma: Firma, resultado: Any):
+        """Registra una firma con su resultado (tupla o función resolutora)."""
+        longitud = max(offset + len(datos) for offset, datos in firma)
+        secuencia: List[Optional[int]] = [None] * longitud
+        for offset, datos in firma:
+            secuencia[offset:offset + len(datos)] = list(datos)
+        
+        nodo = self
+        for byte in secuencia:
+            if byte is None:
+                if nodo._comodin is None:
+                    nodo._comodin = TrieFirmas()
+                nodo = nodo._comodin
+            else:
+                siguiente = nodo._hijos.get(byte)
+                if siguiente is None:
+                    siguiente = nodo._hijos[byte] = TrieFirmas()
+                nodo = siguiente
+        nodo._resultado = resultado
+    
+    def buscar(self, cabecera: bytes) -> Any:
+        """
+        Retorna el resultado de la firma más larga que coincide con la cabecera,
+        o None si ninguna coincide.
+        """
+        mejor = None
+        mejor_profundidad = -1
+        pendientes = [(self, 0)]
+        longitud = len(cabecera)
+        while pendientes:
+            nodo, profundidad = pendientes.pop()
+            if nodo._resultado is not None and profundidad > mejor_profundidad:
+                mejor, mejor_profundidad = nodo._resultado, profundidad
+            if profundidad >= longitud:
+                continue
+            siguiente = nodo._hijos.get(cabecera[profundidad])
+            if siguiente is not None:
+                pendientes.append((siguiente, profundidad + 1))
+            if nodo._comodin is not None:
+                pendientes.append((nodo._comodin, profundidad + 1))
+        return mejor
+
+
+# Límites del sondeo de contenedores ZIP: coste fijo por archivo
+_EOCD_MINIMO = 22
+_LECTURA_COLA = 4096
+_LECTURA_COLA_MAXIMA = _EOCD_MINIMO + 0xFFFF  # EOCD + comentario máximo
+_LECTURA_DIRECTORIO = 64 * 1024
+
+# Tipo MIME del miembro "mimetype" (ODF/EPUB) → categoría
+_MIMETYPES_ZIP = {
+    b'application/vnd.oasis.opendocument.text': ('Documentos', 'OpenOffice'),
+    b'application/vnd.oasis.opendocument.spreadsheet': ('Hojas de cálculo', 'OpenOffice'),
+    b'application/vnd.oasis.opendocument.presentation': ('Presentaciones', 'OpenOffice'),
+    b'application/vnd.oasis.opendocument.graphics': ('Vectoriales', 'Otros'),
+    b'application/epub+zip': ('Ebooks', 'EPUB'),
+}
+
+
+def _leer_en(f, offset: int, tamaño: int) -> bytes:
+    f.seek(offset)
+    return f.read(tamaño)
+
+
+def _nombres_zip_acotados(archivo: Path, cabecera: bytes) -> Tuple[Optional[bytes], List[bytes]]:
+    """
+    Obtiene, con lecturas de tamaño acotado, el tipo MIME del miembro "mimetype"
+    (si es la primera entrada) y los nombres de las primeras entradas del ZIP:
+    la cabecera local de la primera entrada, el registro de fin de directorio
+    central (EOCD, o su versión ZIP64) y como mucho _LECTURA_DIRECTORIO bytes
+    del directorio central. Nunca se recorre el archivo completo.
+    
+    Returns:
+        Tupla (mimetype o None, nombres encontrados)
+    """
+    nombres: List[bytes] = []
+    mimetype = None
+    
+    with open(archivo, 'rb') as f:
+        # 1. Cabecera local de la primera entrada
+        if len(cabecera) >= 30 and cabecera.startswith(b'PK\x03\x04'):
+            metodo = struct.unpack_from('<H', cabecera, 8)[0]
+            tamaño_comprimido = struct.unpack_from('<I', cabecera, 18)[0]
+            largo_nombre, largo_extra = struct.unpack_from('<HH', cabecera, 26)
+            nombre = cabecera[30:30 + largo_nombre]
+            if len(nombre) < largo_nombre:
+                nombre = _leer_en(f, 30, largo_nombre)
+            nombres.append(nombre)
+            if nombre == b'mimetype' and metodo == 0 and 0 < tamaño_comprimido <= 128:
+                inicio = 30 + largo_nombre + largo_extra
+                mimetype = _leer_en(f, inicio, tamaño_comprimido).strip()
+                return mimetype, nombres
+        
+        # 2. Registro de fin de directorio central (lectura de cola acotada)
+        tamaño_archivo = f.seek(0, os.SEEK_END)
+        cola = b''
+        posicion_eocd = -1
+        for lectura in (_LECTURA_COLA, _LECTURA_COLA_MAXIMA):
+            lectura = min(lectura, tamaño_archivo)
+            cola = _leer_en(f, tamaño_archivo - lectura, lectura)
+            posicion_eocd = cola.rfind(b'PK\x05\x06')
+            if posicion_eocd >= 0 or lectura == tamaño_archivo:
+                break
+        if posicion_eocd < 0 or len(cola) - posicion_eocd < _EOCD_MINIMO:
+            return mimetype, nombres
+        
+        tamaño_directorio, offset_directorio = struct.unpack_from('<II', cola, posicion_eocd + 12)
+        if offset_directorio == 0xFFFFFFFF or tamaño_directorio == 0xFFFFFFFF:
+            # ZIP64: el localizador está justo antes del EOCD
+            localizador = posicion_eocd - 20
+            if localizador < 0 or cola[localizador:localizador + 4] != b'PK\x06\x07':
+                return mimetype, nombres
+            offset_eocd64 = struct.unpack_from('<Q', cola, localizador + 8)[0]
+            eocd64 = _leer_en(f, offset_eocd64, 56)
+            if len(eocd64) < 56 or not eocd64.startswith(b'PK\x06\x06'):
+                return mimetype, nombres
+            tamaño_directorio, offset_directorio = struct.unpack_from('<QQ', eocd64, 40)
+        
+        # 3. Prefijo acotado del directorio central
+        directorio = _leer_en(f, offset_directorio, min(tamaño_directorio, _LECTURA_DIRECTORIO))
+    
+    posicion = 0
+    while posicion + 46 <= len(directorio) and directorio[posicion:posicion + 4] == b'PK\x01\x02':
+        largo_nombre, largo_extra, largo_comentario = struct.unpack_from('<HHH', directorio, posicion + 28)
+        nombre = directorio[posicion + 46:posicion + 46 + largo_nombre]
+        if len(nombre) < largo_nombre:
+            break
+        nombres.append(nombre)
+        posicion += 46 + largo_nombre + largo_extra + largo_comentario
+    
+    return mimetype, nombres
+
+
+# Lecturas de cabecera simultáneas (= descriptores abiertos) durante un escaneo
+MAX_DESCRIPTORES = 16
+
+
+def _leer_cabecera(archivo: Path, tamaño: int) -> Optional[bytes]:
+    """Lee los primeros bytes de un archivo con un único open/pread/close."""
+    try:
+        fd = os.open(archivo, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return None
+    try:
+        if hasattr(os, 'pread'):
+            return os.pread(fd, tamaño, 0)
+        return os.read(fd, tamaño)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+def leer_cabeceras(archivos: List[Path], tamaño: int = TAMAÑO_CABECERA,
+                   max_descriptores: int = MAX_DESCRIPTORES) -> Dict[Path, Optional[bytes]]:
+    """
+    Lee las cabeceras de muchos archivos en paralelo con un pool de hilos.
+    
+    En unidades de red la latencia de apertura domina sobre la lectura, así que
+    solapar las aperturas convierte miles de idas y vueltas secuenciales en
+    lotes paralelos. El tamaño del pool limita los descriptores abiertos.
+    
+    Args:
+        archivos: Archivos a leer
+        tamaño: Bytes a leer de cada archivo
+        max_descriptores: Máximo de archivos abiertos a la vez
+        
+    Returns:
+        Diccionario archivo → cabecera (None si no se pudo leer)
+    """
+    if len(archivos) <= 1 or max_descriptores <= 1:
+        return {archivo: _leer_cabecera(archivo, tamaño) for archivo in archivos}
+    
+    with ThreadPoolExecutor(max_workers=min(max_descriptores, len(archivos)),
+                            thread_name_prefix='cabeceras') as pool:
+        return dict(zip(archivos, pool.map(lambda archivo: _leer_cabecera(archivo, tamaño), archivos)))
+
+
 class DetectorInteligente:
     """
     Detector que combina extensión, contenido y heurísticas para 
@@ -20,35 +233,125 @@ class DetectorInteligente:
     """
     
     def __init__(self):
-        # Firmas de archivos (magic numbers)
-        self.firmas_archivos = {
+        # Firmas de archivos (magic numbers). Las más largas ganan a las más cortas,
+        # así los subtipos (RIFF/WEBP, ftyp/heic, ZIP/mimetype...) no se pisan.
+        zip_mimetype = (0, b'PK\x03\x04'), (30, b'mimetype')
+        self.firmas_archivos: List[Tuple[Firma, Any]] = [
             # Imágenes
-            b'\xFF\xD8\xFF': ('Imágenes', 'Fotografía'),  # JPEG
-            b'\x89PNG\r\n\x1a\n': ('Imágenes', 'Gráficos'),  # PNG
-            b'GIF8': ('Imágenes', 'Gráficos'),  # GIF
-            b'RIFF': ('Imágenes', 'Gráficos'),  # WebP (si contiene WEBP)
+            (_firma(b'\xFF\xD8\xFF'), ('Imágenes', 'Fotografía')),  # JPEG
+            (_firma(b'\x89PNG\r\n\x1a\n'), ('Imágenes', 'Gráficos')),  # PNG
+            (_firma(b'GIF87a'), ('Imágenes', 'Gráficos')),  # GIF
+            (_firma(b'GIF89a'), ('Imágenes', 'Gráficos')),
+            (_firma(b'RIFF', (8, b'WEBP')), ('Imágenes', 'Gráficos')),  # WebP
+            (_firma(b'BM', (6, b'\x00\x00\x00\x00')), ('Imágenes', 'Gráficos')),  # BMP
+            (_firma(b'II*\x00'), ('Imágenes', 'Gráficos')),  # TIFF little endian
+            (_firma(b'MM\x00*'), ('Imágenes', 'Gráficos')),  # TIFF big endian
+            (_firma(b'\x00\x00\x01\x00'), self._detectar_ico),  # ICO
+            (_firma(b'icns'), ('Imágenes', 'Iconos')),
+            (_firma(b'8BPS'), ('Imágenes', 'Edición')),  # Photoshop
+            (_firma(b'gimp xcf'), ('Imágenes', 'Edición')),
+            (_firma((4, b'ftypheic')), ('Imágenes', 'Fotografía')),  # HEIF/HEIC
+            (_firma((4, b'ftypheix')), ('Imágenes', 'Fotografía')),
+            (_firma((4, b'ftypmif1')), ('Imágenes', 'Fotografía')),
+            (_firma((4, b'ftypavif')), ('Imágenes', 'Gráficos')),  # AVIF
             
-            # Videos
-            b'\x00\x00\x00\x18ftypmp4': ('Vídeos', 'Películas'),  # MP4
-            b'\x1a\x45\xdf\xa3': ('Vídeos', 'Películas'),  # WebM/MKV
+            # Videos (ISO-BMFF: tamaño de caja + 'ftyp' + marca en offset 8)
+            (_firma((4, b'ftyp')), ('Vídeos', 'Películas')),  # MP4 y similares
+            (_firma((4, b'ftypqt  ')), ('Vídeos', 'Películas')),  # QuickTime
+            (_firma((4, b'ftyp3gp')), ('Vídeos', 'Clips')),  # 3GPP
+            (_firma((4, b'ftyp3g2')), ('Vídeos', 'Clips')),
+            (_firma(b'\x1a\x45\xdf\xa3'), ('Vídeos', 'Películas')),  # WebM/MKV
+            (_firma(b'RIFF', (8, b'AVI ')), ('Vídeos', 'Películas')),  # AVI
+            (_firma(b'FLV\x01'), ('Vídeos', 'Clips')),  # Flash Video
+            (_firma(b'\x00\x00\x01\xba'), ('Vídeos', 'TV')),  # MPEG-PS
+            (_firma(b'0&\xb2\x75\x8e\x66\xcf\x11'), ('Vídeos', 'TV')),  # ASF/WMV
             
             # Audio
-            b'ID3': ('Audio', 'Música'),  # MP3 con ID3
-            b'\xff\xfb': ('Audio', 'Música'),  # MP3
-            b'fLaC': ('Audio', 'Música'),  # FLAC
+            (_firma(b'ID3'), ('Audio', 'Música')),  # MP3 con ID3
+            (_firma(b'\xff\xfb'), ('Audio', 'Música')),  # MP3
+            (_firma(b'\xff\xf3'), ('Audio', 'Música')),
+            (_firma(b'\xff\xf2'), ('Audio', 'Música')),
+            (_firma(b'\xff\xf1'), ('Audio', 'Música')),  # AAC ADTS
+            (_firma(b'\xff\xf9'), ('Audio', 'Música')),
+            (_firma(b'fLaC'), ('Audio', 'Música')),  # FLAC
+            (_firma(b'OggS'), ('Audio', 'Música')),  # Ogg/Opus
+            (_firma(b'RIFF', (8, b'WAVE')), ('Audio', 'Música')),  # WAV
+            (_firma(b'FORM', (8, b'AIFF')), ('Audio', 'Sonidos')),  # AIFF
+            (_firma(b'MThd'), ('Audio', 'Sonidos')),  # MIDI
+            (_firma(b'#!AMR'), ('Audio', 'Sonidos')),
+            (_firma(b'MAC '), self._detectar_ape),  # Monkey's Audio
+            (_firma((4, b'ftypM4A ')), ('Audio', 'Música')),
+            (_firma((4, b'ftypM4B ')), ('Audio', 'Audiolibros')),
             
             # Documentos
-            b'%PDF': ('PDFs', 'Documentos'),  # PDF
-            b'PK\x03\x04': self._detectar_zip_office,  # ZIP/Office
+            (_firma(b'%PDF'), ('PDFs', 'Documentos')),  # PDF
+            (_firma(b'%!PS'), ('PDFs', 'Electrónicos')),  # PostScript/EPS
+            (_firma(b'AT&TFORM'), ('PDFs', 'Electrónicos')),  # DjVu
+            (_firma(b'{\\rtf'), ('Documentos', 'Word')),  # RTF
+            (_firma(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'), self._detectar_ole),  # Office 97-2003
+            (_firma(b'PK\x03\x04'), self._detectar_zip),  # ZIP/Office/APK
+            (_firma(*zip_mimetype, (38, b'application/vnd.oasis.opendocument.text')), ('Documentos', 'OpenOffice')),
+            (_firma(*zip_mimetype, (38, b'application/vnd.oasis.opendocument.spreadsheet')), ('Hojas de cálculo', 'OpenOffice')),
+            (_firma(*zip_mimetype, (38, b'application/vnd.oasis.opendocument.presentation')), ('Presentaciones', 'OpenOffice')),
+            (_firma(*zip_mimetype, (38, b'application/vnd.oasis.opendocument.graphics')), ('Vectoriales', 'Otros')),
+            (_firma(*zip_mimetype, (38, b'application/epub+zip')), ('Ebooks', 'EPUB')),
+            (_firma((60, b'BOOKMOBI')), ('Ebooks', 'Kindle')),  # MOBI/AZW
+            
+            # Comprimidos
+            (_firma(b"7z\xbc\xaf'\x1c"), ('Comprimidos', 'Comunes')),  # 7-Zip
+            (_firma(b'Rar!\x1a\x07\x00'), ('Comprimidos', 'Comunes')),  # RAR 4
+            (_firma(b'Rar!\x1a\x07\x01\x00'), ('Comprimidos', 'Comunes')),  # RAR 5
+            (_firma(b'PK\x05\x06'), ('Comprimidos', 'Comunes')),  # ZIP vacío
+            (_firma(b'\x1f\x8b'), ('Comprimidos', 'Unix')),  # gzip
+            (_firma(b'BZh'), ('Comprimidos', 'Unix')),  # bzip2
+            (_firma(b'\xfd7zXZ\x00'), ('Comprimidos', 'Unix')),  # xz
+            (_firma((257, b'ustar')), ('Comprimidos', 'Unix')),  # tar
+            (_firma(b'\x28\xb5\x2f\xfd'), ('Comprimidos', 'Especiales')),  # zstd
+            (_firma(b'\x04\x22\x4d\x18'), ('Comprimidos', 'Especiales')),  # LZ4
+            (_firma(b'MSCF'), ('Comprimidos', 'Especiales')),  # CAB
             
             # Ejecutables
-            b'MZ': ('Ejecutables', 'Windows'),  # Windows PE
-            b'\x7fELF': ('Ejecutables', 'Linux'),  # Linux ELF
-            b'\xca\xfe\xba\xbe': ('Ejecutables', 'macOS'),  # macOS Mach-O
+            (_firma(b'MZ'), ('Ejecutables', 'Windows')),  # Windows PE
+            (_firma(b'\x7fELF'), ('Ejecutables', 'Linux')),  # Linux ELF
+            (_firma(b'\xca\xfe\xba\xbe'), ('Ejecutables', 'macOS')),  # macOS Mach-O
+            (_firma(b'\xfe\xed\xfa\xce'), ('Ejecutables', 'macOS')),
+            (_firma(b'\xfe\xed\xfa\xcf'), ('Ejecutables', 'macOS')),
+            (_firma(b'\xce\xfa\xed\xfe'), ('Ejecutables', 'macOS')),
+            (_firma(b'\xcf\xfa\xed\xfe'), ('Ejecutables', 'macOS')),
+            (_firma(b'dex\n'), ('Móviles', 'Android')),  # Dalvik
+            (_firma(b'\x00asm'), ('Web', 'Scripts')),  # WebAssembly
             
-            # APK (ZIP con estructura específica)
-            b'PK\x03\x04': self._detectar_apk,
-        }
+            # Fuentes
+            (_firma(b'wOFF'), ('Fuentes', 'Web')),
+            (_firma(b'wOF2'), ('Fuentes', 'Web')),
+            (_firma(b'OTTO'), ('Fuentes', 'Sistema')),
+            (_firma(b'\x00\x01\x00\x00\x00'), ('Fuentes', 'Sistema')),  # TrueType
+            (_firma(b'ttcf'), ('Fuentes', 'Sistema')),
+            
+            # Datos
+            (_firma(b'SQLite format 3\x00'), ('Datos', 'Bases de datos')),
+            (_firma(b'PAR1'), ('Datos', 'Científicos')),  # Parquet
+            (_firma(b'\x89HDF\r\n\x1a\n'), ('Datos', 'Científicos')),  # HDF5
+            (_firma(b'\x93NUMPY'), ('Machine Learning', 'Datos')),
+            
+            # Imágenes de disco y 3D
+            (_firma(b'vhdxfile'), ('Imágenes de Disco', 'Virtuales')),
+            (_firma(b'conectix'), ('Imágenes de Disco', 'Virtuales')),  # VHD
+            (_firma(b'QFI\xfb'), ('Imágenes de Disco', 'Virtuales')),  # QCOW2
+            (_firma(b'KDMV'), ('Imágenes de Disco', 'Virtuales')),  # VMDK
+            (_firma(b'BLENDER'), ('Archivos 3D', 'Escenas')),
+            (_firma(b'glTF'), ('Archivos 3D', 'Modelos')),
+            
+            # P2P
+            (_firma(b'd8:announce'), ('Descargas P2P', 'Torrents')),
+        ]
+        
+        self._trie = TrieFirmas()
+        for firma, resultado in self.firmas_archivos:
+            self._trie.añadir(firma, resultado)
+        
+        # Resultados del sondeo de ZIP por (dispositivo, inodo, tamaño, mtime)
+        self._cache_zip = CacheLRU()
         
         # Heurísticas por nombre de archivo
         self.heuristicas_nombre = {
@@ -64,27 +367,38 @@ class DetectorInteligente:
             'setup': ('Ejecutables', 'Windows'),
         }
     
-    def detectar_tipo_inteligente(self, archivo: Path) -> Tuple[str, Optional[str]]:
+    def detectar_tipo_inteligente(self, archivo: Path,
+                                  caracteristicas: Optional[CaracteristicasArchivo] = None,
+                                  cabecera: Optional[bytes] = None) -> Tuple[str, Optional[str]]:
         """
         Detecta el tipo de archivo usando múltiples métodos.
         
         Args:
             archivo: Ruta al archivo
+            caracteristicas: Características ya extraídas del archivo (opcional)
+            cabecera: Primeros bytes ya leídos, p. ej. por leer_cabeceras (opcional)
             
         Returns:
             Tupla con (categoría, subcategoría)
         """
-        if not archivo.exists() or not archivo.is_file():
-            return ("Otros", "Desconocidos")
-        
-        # 1. Intentar por firma de archivo (más confiable)
-        categoria_firma = self._detectar_por_firma(archivo)
+        if cabecera is None:
+            if not archivo.exists() or not archivo.is_file():
+                return ("Otros", "Desconocidos")
+            
+            # 1. Intentar por firma de archivo (más confiable)
+            categoria_firma = self._detectar_por_firma(archivo)
+        else:
+            # La lectura previa ya demostró que el archivo existe
+            categoria_firma = self.detectar_por_cabecera(archivo, cabecera)
         if categoria_firma[0] != "Otros":
             logger.debug(f"Detectado por firma: {archivo.name} -> {categoria_firma}")
             return categoria_firma
         
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo)
+        
         # 2. Intentar por heurísticas de nombre
-        categoria_nombre = self._detectar_por_nombre(archivo)
+        categoria_nombre = self._detectar_por_nombre(archivo, caracteristicas)
         if categoria_nombre[0] != "Otros":
             logger.debug(f"Detectado por nombre: {archivo.name} -> {categoria_nombre}")
             return categoria_nombre
@@ -98,26 +412,66 @@ class DetectorInteligente:
         # 4. Fallback a detección por extensión (método original)
         return ("Otros", "Desconocidos")
     
+    def detectar_lote(self, archivos: List[Path],
+                      caracteristicas: Optional[Dict[Path, CaracteristicasArchivo]] = None,
+                      max_descriptores: int = MAX_DESCRIPTORES) -> Dict[Path, Tuple[str, Optional[str]]]:
+        """
+        Detecta el tipo de muchos archivos leyendo sus cabeceras en paralelo
+        (ver leer_cabeceras) y clasificándolas después en el hilo llamador.
+        
+        Args:
+            archivos: Archivos a clasificar
+            caracteristicas: Características ya extraídas por archivo (opcional)
+            max_descriptores: Máximo de archivos abiertos a la vez
+            
+        Returns:
+            Diccionario archivo → (categoría, subcategoría)
+        """
+        caracteristicas = caracteristicas or {}
+        cabeceras = leer_cabeceras(archivos, max_descriptores=max_descriptores)
+        return {
+            archivo: self.detectar_tipo_inteligente(archivo, caracteristicas.get(archivo), cabeceras.get(archivo))
+            for archivo in archivos
+        }
+    
     def _detectar_por_firma(self, archivo: Path) -> Tuple[str, Optional[str]]:
-        """Detecta tipo por firma binaria del archivo."""
+        """Detecta tipo por firma binaria del archivo (una sola lectura)."""
         try:
             with open(archivo, 'rb') as f:
-                header = f.read(32)  # Leer primeros 32 bytes
-                
-            for firma, resultado in self.firmas_archivos.items():
-                if header.startswith(firma):
-                    if callable(resultado):
-                        return resultado(archivo, header)
-                    return resultado
-                    
+                cabecera = f.read(TAMAÑO_CABECERA)
         except (IOError, PermissionError):
-            pass
+            return ("Otros", "Desconocidos")
         
-        return ("Otros", "Desconocidos")
+        return self.detectar_por_cabecera(archivo, cabecera)
+    
+    def detectar_por_cabecera(self, archivo: Path, cabecera: bytes) -> Tuple[str, Optional[str]]:
+        """
+        Clasifica un archivo a partir de una cabecera ya leída.
+        
+        Args:
+            archivo: Ruta al archivo (para los resolutores que necesitan más contexto)
+            cabecera: Primeros bytes del archivo
+            
+        Returns:
+            Tupla con (categoría, subcategoría)
+        """
+        resultado = self._trie.buscar(cabecera)
+        if resultado is None:
+            return ("Otros", "Desconocidos")
+        if callable(resultado):
+            try:
+                return resultado(archivo, cabecera)
+            except Exception as e:
+                logger.debug(f"Error resolviendo firma de {archivo.name}: {e}")
+                return ("Otros", "Desconocidos")
+        return resultado
     
-    def _detectar_por_nombre(self, archivo: Path) -> Tuple[str, Optional[str]]:
+    def _detectar_por_nombre(self, archivo: Path,
+                             caracteristicas: Optional[CaracteristicasArchivo] = None) -> Tuple[str, Optional[str]]:
         """Detecta tipo por heurísticas en el nombre del archivo."""
-        nombre_lower = archivo.stem.lower()
+        if caracteristicas is None:
+            caracteristicas = obtener_caracteristicas(archivo)
+        nombre_lower = caracteristicas.stem_lower
         
         for patron, categoria in self.heuristicas_nombre.items():
             if patron in nombre_lower:
@@ -152,31 +506,103 @@ class DetectorInteligente:
         return ("Otros", "Desconocidos")
     
     def _detectar_zip_office(self, archivo: Path, header: bytes) -> Tuple[str, Optional[str]]:
-        """Detecta si un ZIP es un documento de Office o comprimido normal."""
+        """
+        Detecta si un ZIP es un documento de Office, ODF/EPUB, un APK o un
+        comprimido normal sin abrir el archivo completo: solo se leen la primera
+        cabecera local, el registro final y un prefijo acotado del directorio
+        central. El resultado se cachea por identidad del archivo.
+        """
+        try:
+            clave = identidad_archivo(os.stat(archivo))
+        except OSError:
+            return ('Comprimidos', 'Comunes')
+        
+        resultado = self._cache_zip.obtener(clave)
+        if resultado is not None:
+            return resultado
+        
+        resultado = ('Comprimidos', 'Comunes')
         try:
-            import zipfile
-            with zipfile.ZipFile(archivo, 'r') as zf:
-                archivos_internos = zf.namelist()
+            mimetype, nombres = _nombres_zip_acotados(archivo, header)
+            
+            if mimetype in _MIMETYPES_ZIP:
+                resultado = _MIMETYPES_ZIP[mimetype]
+            # Detectar documentos Office
+            elif any(nombre.startswith(b'word/') for nombre in nombres):
+                resultado = ('Documentos', 'Word')
+            elif any(nombre.startswith(b'xl/') for nombre in nombres):
+                resultado = ('Hojas de cálculo', 'Excel')
+            elif any(nombre.startswith(b'ppt/') for nombre in nombres):
+                resultado = ('Presentaciones', 'PowerPoint')
+            elif b'AndroidManifest.xml' in nombres:
+                resultado = ('Ejecutables', 'Android')  # Es un APK
                 
-                # Detectar documentos Office
-                if any(nombre.startswith('word/') for nombre in archivos_internos):
-                    return ('Documentos', 'Word')
-                elif any(nombre.startswith('xl/') for nombre in archivos_internos):
-                    return ('Hojas de cálculo', 'Excel')
-                elif any(nombre.startswith('ppt/') for nombre in archivos_internos):
-                    return ('Presentaciones', 'PowerPoint')
-                elif 'AndroidManifest.xml' in archivos_internos:
-                    return ('Ejecutables', 'Android')  # Es un APK
-                    
-        except Exception:
-            pass
+        except Exception as e:
+            logger.debug(f"Error sondeando ZIP {archivo.name}: {e}")
         
-        return ('Comprimidos', 'Comunes')
+        self._cache_zip.guardar(clave, resultado)
+        return resultado
     
-    def _detectar_apk(self, archivo: Path, header: bytes) -> Tuple[str, Optional[str]]:
-        """Detecta específicamente APKs."""
+    def _detectar_zip(self, archivo: Path, header: bytes) -> Tuple[str, Optional[str]]:
+        """Detecta APKs por extensión y, si no, inspecciona el contenido del ZIP."""
         if archivo.suffix.lower() == '.apk':
             return ('Ejecutables', 'Android')
         
-        # Si es ZIP, verificar si contiene AndroidManifest.xml
-        return self._detectar_zip_office(archivo, header) 
\ No newline at end of file
+        # Si es ZIP, verificar si es Office o contiene AndroidManifest.xml
+        return self._detectar_zip_office(archivo, header)
+    
+    def _detectar_ico(self, archivo: Path, header: bytes) -> Tuple[str, Optional[str]]:
+        """
+        Valida la cabecera ICO antes de aceptarla.
+        
+        La firma de cuatro bytes aparece en muchos binarios ajenos, así que se
+        exige un número de imágenes plausible y una primera entrada coherente.
+        """
+        if len(header) < 22:
+            return ("Otros", "Desconocidos")
+        num_imagenes, = struct.unpack_from('<H', header, 4)
+        reservado = header[9]
+        planos, bits = struct.unpack_from('<HH', header, 10)
+        tamaño, desplazamiento = struct.unpack_from('<II', header, 14)
+        if (1 <= num_imagenes <= 255 and reservado in (0, 255)
+                and planos in (0, 1) and bits in (0, 1, 4, 8, 16, 24, 32)
+                and tamaño > 0 and desplazamiento >= 6 + 16 * num_imagenes):
+            return ('Imágenes', 'Iconos')
+        return ("Otros", "Desconocidos")
+    
+    def _detectar_ape(self, archivo: Path, header: bytes) -> Tuple[str, Optional[str]]:
+        """
+        Valida la cabecera de Monkey's Audio antes de aceptarla.
+        
+        'MAC ' también puede ser el comienzo de un texto, así que se exige una
+        versión conocida y, según la versión, un descriptor o nivel válidos.
+        """
+        if len(header) < 16:
+            return ("Otros", "Desconocidos")
+        version, = struct.unpack_from('<H', header, 4)
+        if not 3800 <= version <= 4999:
+            return ("Otros", "Desconocidos")
+        if version >= 3980:
+            # Formato moderno: bytes del descriptor y de la cabecera
+            descriptor, cabecera = struct.unpack_from('<II', header, 8)
+            valido = 32 <= descriptor <= 1024 and 16 <= cabecera <= 1024
+        else:
+            # Formato antiguo: nivel de compresión en múltiplos de 1000
+            nivel, = struct.unpack_from('<H', header, 6)
+            valido = nivel in (1000, 2000, 3000, 4000, 5000)
+        if valido:
+            return ('Audio', 'Música')
+        return ("Otros", "Desconocidos")
+    
+    def _detectar_ole(self, archivo: Path, header: bytes) -> Tuple[str, Optional[str]]:
+        """Distingue documentos OLE2 (Office 97-2003, MSI) por su extensión."""
+        por_extension = {
+            '.doc': ('Documentos', 'Word'),
+            '.dot': ('Documentos', 'Word'),
+            '.xls': ('Hojas de cálculo', 'Excel'),
+            '.ppt': ('Presentaciones', 'PowerPoint'),
+            '.pps': ('Presentaciones', 'PowerPoint'),
+            '.msi': ('Ejecutables', 'Windows'),
+            '.msg': ('Documentos', 'Texto'),
+        }
+        return por_extension.get(archivo.suffix.lower(), ('Documentos', 'Word'))
@@ -5,126 +5,359 @@
 Sistema de estadísticas y reportes para DescargasOrdenadas
 """
 
+import copy
 import json
-import os
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
 
+from .storage import DocumentoConfig, transaccion_config
+
 logger = logging.getLogger(__name__)
 
+try:
+    from .stats_timeseries import SerieTemporalEstadisticas, SQLITE_AVAILABLE
+except ImportError:
+    SQLITE_AVAILABLE = False
+
 class EstadisticasOrganizador:
     """
     Recopila y genera estadísticas sobre la organización de archivos.
+    
+    Cada archivo movido llega como un evento (categoría, subcategoría,
+    extensión, tamaño ya conocido por el escaneo) que actualiza los contadores
+    en memoria y se añade a un registro append-only (eventos.jsonl). El
+    snapshot (espacio 'estadisticas' del almacén de configuración) guarda los
+    contadores y el número del último evento incluido; al cargar se
+    reproducen solo los eventos posteriores. Al cerrar una sesión, o cuando
+    el registro crece demasiado, se escribe el snapshot y, una vez
+    confirmado, se vacía el registro (compactación).
+    
+    Los eventos también alimentan la serie temporal (actividad.sqlite3) para
+    consultas por rango de fechas; ver SerieTemporalEstadisticas.
+    
+    Orden de bloqueo: primero la transacción del almacén, después _lock.
+    Nunca se abre una transacción con _lock adquirido (la pasada del
+    organizador ya tiene la transacción abierta cuando cierra la sesión).
     """
     
+    # Eventos acumulados en el registro antes de compactar
+    MAX_EVENTOS_REGISTRO = 5000
+    # Segundos entre flush del registro (además de al cerrar sesión)
+    INTERVALO_FLUSH = 1.0
+    
     def __init__(self, carpeta_descargas: Path):
         self.carpeta_descargas = carpeta_descargas
         self.carpeta_stats = carpeta_descargas / ".config" / "stats"
         self.carpeta_stats.mkdir(parents=True, exist_ok=True)
-        self.archivo_stats = self.carpeta_stats / "statistics.json"
+        self.carpeta_config = carpeta_descargas / ".config"
+        self.snapshot = DocumentoConfig(self.carpeta_config, 'estadisticas', "stats/statistics.json")
+        self.archivo_eventos = self.carpeta_stats / "eventos.jsonl"
+        self._lock = threading.RLock()
+        self._registro = None
+        self._ultimo_flush = 0.0
+        self._eventos_en_registro = 0
+        self._sesion: Optional[Dict[str, Any]] = None
         self.stats = self._cargar_estadisticas()
+        self.serie = None
+        if SQLITE_AVAILABLE:
+            try:
+                self.serie = SerieTemporalEstadisticas(self.carpeta_stats)
+            except Exception as e:
+                logger.error(f"Error abriendo historial de actividad: {e}")
+        self._reproducir_eventos()
     
     def _cargar_estadisticas(self) -> Dict[str, Any]:
         """Carga las estadísticas existentes."""
-        if self.archivo_stats.exists():
+        stats = None
+        try:
+            stats = self.snapshot.cargar()
+        except Exception as e:
+            logger.error(f"Error cargando estadísticas: {e}")
+        
+        if stats is None:
+            stats = {
+                'total_archivos_organizados': 0,
+                'espacio_total_organizado': 0,
+                'sesiones_organizacion': [],
+                'categorias_populares': {},
+                'archivos_por_mes': {},
+                'primera_ejecucion': datetime.now().isoformat(),
+                'ultima_ejecucion': None,
+                'tiempo_total_organizando': 0,
+                'archivos_duplicados_encontrados': 0,
+                'espacio_ahorrado_duplicados': 0
+            }
+        
+        # Contadores añadidos con el registro de eventos
+        stats.setdefault('espacio_por_categoria', {})
+        stats.setdefault('espacio_por_mes', {})
+        stats.setdefault('archivos_por_extension', {})
+        stats.setdefault('ultimo_evento', 0)
+        return stats
+    
+    def _reproducir_eventos(self):
+        """Aplica los eventos del registro que no están en el snapshot."""
+        if not self.archivo_eventos.exists():
+            return
+        
+        aplicados = 0
+        try:
+            with open(self.archivo_eventos, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    self._eventos_en_registro += 1
+                    try:
+                        evento = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea a medio escribir tras una caída
+                        continue
+                    self._registrar_en_serie(evento)
+                    if evento.get('n', 0) <= self.stats['ultimo_evento']:
+                        continue  # Ya incluido en el snapshot
+                    self._aplicar_evento(evento)
+                    aplicados += 1
+        except Exception as e:
+            logger.error(f"Error leyendo registro de estadísticas: {e}")
+        
+        if aplicados:
+            logger.info(f"📊 {aplicados} movimientos recuperados del registro de estadísticas")
+    
+    def _aplicar_evento(self, evento: Dict[str, Any]):
+        # Actualiza los contadores con un movimiento: O(1)
+        categoria = evento['c']
+        tamaño = evento.get('b', 0)
+        mes_clave = datetime.fromtimestamp(evento['t']).strftime('%Y-%m')
+        extension = evento.get('e') or '(sin extensión)'
+        stats = self.stats
+        
+        stats['ultimo_evento'] = max(stats['ultimo_evento'], evento['n'])
+        stats['total_archivos_organizados'] += 1
+        stats['espacio_total_organizado'] += tamaño
+        stats['categorias_populares'][categoria] = stats['categorias_populares'].get(categoria, 0) + 1
+        stats['espacio_por_categoria'][categoria] = stats['espacio_por_categoria'].get(categoria, 0) + tamaño
+        stats['archivos_por_mes'][mes_clave] = stats['archivos_por_mes'].get(mes_clave, 0) + 1
+        stats['espacio_por_mes'][mes_clave] = stats['espacio_por_mes'].get(mes_clave, 0) + tamaño
+        stats['archivos_por_extension'][extension] = stats['archivos_por_extension'].get(extension, 0) + 1
+    
+    def registrar_movimiento(self, categoria: str, subcategoria: Optional[str], tamaño: int,
+                             extension: str = '', momento: Optional[float] = None):
+        """
+        Registra un archivo movido. Coste constante: no accede al archivo.
+        
+        Args:
+            categoria: Categoría destino
+            subcategoria: Subcategoría destino (o None / "General")
+            tamaño: Tamaño en bytes (el que ya conoce quien movió el archivo)
+            extension: Extensión en minúsculas, con punto
+            momento: Timestamp del movimiento (por defecto, ahora)
+        """
+        with self._lock:
+            evento = {
+                'n': self.stats['ultimo_evento'] + 1,
+                't': momento if momento is not None else time.time(),
+                'c': categoria,
+                's': subcategoria or "General",
+                'e': extension,
+                'b': tamaño
+            }
+            self._aplicar_evento(evento)
+            self._registrar_en_serie(evento)
+            
+            if self._sesion is None:
+                self._sesion = {
+                    'inicio': datetime.now(),
+                    'archivos_procesados': 0,
+                    'espacio_procesado': 0,
+                    'categorias': {}
+                }
+            self._sesion['archivos_procesados'] += 1
+            self._sesion['espacio_procesado'] += tamaño
+            self._sesion['categorias'][categoria] = self._sesion['categorias'].get(categoria, 0) + 1
+            
             try:
-                with open(self.archivo_stats, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                self._escribir_evento(evento)
             except Exception as e:
-                logger.error(f"Error cargando estadísticas: {e}")
+                logger.error(f"Error escribiendo registro de estadísticas: {e}")
+            
+            compactar = self._eventos_en_registro >= self.MAX_EVENTOS_REGISTRO
         
-        return {
-            'total_archivos_organizados': 0,
-            'espacio_total_organizado': 0,
-            'sesiones_organizacion': [],
-            'categorias_populares': {},
-            'archivos_por_mes': {},
-            'primera_ejecucion': datetime.now().isoformat(),
-            'ultima_ejecucion': None,
-            'tiempo_total_organizando': 0,
-            'archivos_duplicados_encontrados': 0,
-            'espacio_ahorrado_duplicados': 0
-        }
+        if compactar:
+            self.guardar_estadisticas()
+    
+    def _registrar_en_serie(self, evento: Dict[str, Any]):
+        # La serie recuerda su último evento volcado: al reproducir el
+        # registro solo recibe lo que no llegó a guardar
+        if self.serie is None or evento['n'] <= self.serie.ultimo_evento:
+            return
+        try:
+            self.serie.registrar(evento['c'], evento.get('b', 0), evento['t'], evento['n'])
+        except Exception as e:
+            logger.error(f"Error registrando historial de actividad: {e}")
+    
+    def _escribir_evento(self, evento: Dict[str, Any]):
+        # Llamar con el lock adquirido
+        if self._registro is None:
+            self._registro = open(self.archivo_eventos, 'a', encoding='utf-8')
+        self._registro.write(json.dumps(evento, ensure_ascii=False) + '\n')
+        self._eventos_en_registro += 1
+        ahora = time.monotonic()
+        if ahora - self._ultimo_flush >= self.INTERVALO_FLUSH:
+            self._registro.flush()
+            self._ultimo_flush = ahora
+    
+    def finalizar_sesion(self, tiempo_inicio: Optional[datetime] = None,
+                         tiempo_fin: Optional[datetime] = None):
+        """
+        Cierra la sesión en curso (los movimientos registrados desde la
+        anterior) y guarda el snapshot. Sin movimientos no hace nada.
+        
+        Args:
+            tiempo_inicio: Inicio de la sesión (por defecto, el primer movimiento)
+            tiempo_fin: Fin de la sesión (por defecto, ahora)
+        """
+        with self._lock:
+            if self._sesion is None:
+                return
+            sesion_actual, self._sesion = self._sesion, None
+            
+            tiempo_inicio = tiempo_inicio or sesion_actual['inicio']
+            tiempo_fin = tiempo_fin or datetime.now()
+            sesion = {
+                'fecha': tiempo_inicio.isoformat(),
+                'duracion_segundos': (tiempo_fin - tiempo_inicio).total_seconds(),
+                'archivos_procesados': sesion_actual['archivos_procesados'],
+                'espacio_procesado': sesion_actual['espacio_procesado'],
+                'categorias': sesion_actual['categorias']
+            }
+            
+            self.stats['ultima_ejecucion'] = tiempo_fin.isoformat()
+            self.stats['tiempo_total_organizando'] += sesion['duracion_segundos']
+            
+            # Agregar sesión
+            self.stats['sesiones_organizacion'].append(sesion)
+            
+            # Mantener solo las últimas 100 sesiones
+            if len(self.stats['sesiones_organizacion']) > 100:
+                self.stats['sesiones_organizacion'] = self.stats['sesiones_organizacion'][-100:]
+        
+        self.guardar_estadisticas()
     
     def guardar_estadisticas(self):
-        """Guarda las estadísticas en disco."""
+        """
+        Guarda el snapshot en disco y compacta el registro de eventos.
+        
+        No llamar con _lock adquirido: abre una transacción del almacén.
+        """
+        anidada = self.snapshot.en_transaccion()
         try:
-            with open(self.archivo_stats, 'w', encoding='utf-8') as f:
-                json.dump(self.stats, f, ensure_ascii=False, indent=2)
+            # Las transacciones se serializan: los snapshots se escriben en
+            # el orden en que se copiaron
+            with transaccion_config(self.carpeta_config):
+                with self._lock:
+                    # La serie debe tener todo lo del registro antes de vaciarlo
+                    if self.serie is not None:
+                        self.serie.volcar()
+                    stats = copy.deepcopy(self.stats)
+                self.snapshot.guardar(stats)
+                
+                # Todo lo del registro ya está en el snapshot (ultimo_evento);
+                # se vacía cuando el snapshot queda confirmado, y si el
+                # proceso cae antes, la reproducción ignora lo ya incluido
+                incluido_hasta = stats['ultimo_evento']
+                self.snapshot.al_confirmar(lambda: self._vaciar_registro(incluido_hasta))
         except Exception as e:
+            if anidada:
+                raise
             logger.error(f"Error guardando estadísticas: {e}")
     
+    def _vaciar_registro(self, incluido_hasta: int):
+        with self._lock:
+            if self.stats['ultimo_evento'] != incluido_hasta:
+                return  # Hay eventos posteriores al snapshot: se compactará en el próximo guardado
+            try:
+                if self._registro is not None:
+                    self._registro.close()
+                    self._registro = None
+                open(self.archivo_eventos, 'w', encoding='utf-8').close()
+                self._eventos_en_registro = 0
+            except Exception as e:
+                logger.error(f"Error compactando registro de estadísticas: {e}")
+    
     def registrar_sesion_organizacion(self, archivos_movidos: Dict[str, Dict[str, List[str]]], 
-                                    tiempo_inicio: datetime, tiempo_fin: datetime):
+                                    tiempo_inicio: datetime, tiempo_fin: datetime,
+                                    tamaños: Optional[Dict[str, int]] = None):
         """
-        Registra una sesión de organización.
+        Registra una sesión de organización a partir del resumen por categorías.
+        
+        Para quien no informa de cada movimiento con registrar_movimiento().
+        No accede a los archivos: el tamaño sale de `tamaños` o cuenta como 0.
         
         Args:
             archivos_movidos: Diccionario con archivos organizados
             tiempo_inicio: Momento de inicio
             tiempo_fin: Momento de finalización
+            tamaños: Tamaño en bytes por nombre de archivo (opcional)
         """
-        sesion = {
-            'fecha': tiempo_inicio.isoformat(),
-            'duracion_segundos': (tiempo_fin - tiempo_inicio).total_seconds(),
-            'archivos_procesados': 0,
-            'espacio_procesado': 0,
-            'categorias': {}
-        }
-        
-        # Contar archivos y calcular espacio
+        tamaños = tamaños or {}
+        momento = tiempo_fin.timestamp()
         for categoria, subcategorias in archivos_movidos.items():
-            if categoria not in sesion['categorias']:
-                sesion['categorias'][categoria] = 0
-            
             for subcategoria, archivos in subcategorias.items():
-                sesion['categorias'][categoria] += len(archivos)
-                sesion['archivos_procesados'] += len(archivos)
-                
-                # Intentar calcular tamaño de archivos
                 for archivo in archivos:
-                    try:
-                        ruta_archivo = self.carpeta_descargas / categoria
-                        if subcategoria != "General":
-                            ruta_archivo = ruta_archivo / subcategoria
-                        ruta_archivo = ruta_archivo / Path(archivo).name
-                        
-                        if ruta_archivo.exists():
-                            sesion['espacio_procesado'] += ruta_archivo.stat().st_size
-                    except Exception:
-                        pass
-        
-        # Actualizar estadísticas globales
-        self.stats['total_archivos_organizados'] += sesion['archivos_procesados']
-        self.stats['espacio_total_organizado'] += sesion['espacio_procesado']
-        self.stats['ultima_ejecucion'] = tiempo_fin.isoformat()
-        self.stats['tiempo_total_organizando'] += sesion['duracion_segundos']
-        
-        # Actualizar categorías populares
-        for categoria, cantidad in sesion['categorias'].items():
-            if categoria not in self.stats['categorias_populares']:
-                self.stats['categorias_populares'][categoria] = 0
-            self.stats['categorias_populares'][categoria] += cantidad
-        
-        # Actualizar archivos por mes
-        mes_clave = tiempo_inicio.strftime('%Y-%m')
-        if mes_clave not in self.stats['archivos_por_mes']:
-            self.stats['archivos_por_mes'][mes_clave] = 0
-        self.stats['archivos_por_mes'][mes_clave] += sesion['archivos_procesados']
-        
-        # Agregar sesión
-        self.stats['sesiones_organizacion'].append(sesion)
-        
-        # Mantener solo las últimas 100 sesiones
-        if len(self.stats['sesiones_organizacion']) > 100:
-            self.stats['sesiones_organizacion'] = self.stats['sesiones_organizacion'][-100:]
+                    self.registrar_movimiento(categoria, subcategoria, tamaños.get(archivo, 0),
+                                              Path(archivo).suffix.lower(), momento)
+        self.finalizar_sesion(tiempo_inicio, tiempo_fin)
+    
+    def cerrar(self):
+        """Cierra la sesión pendiente y el registro."""
+        self.finalizar_sesion()
+        with self._lock:
+            if self._registro is not None:
+                self._registro.close()
+                self._registro = None
+            if self.serie is not None:
+                self.serie.cerrar()
+                self.serie = None
+    
+    def actividad_por_categoria(self, dias: int = 90) -> Dict[str, Dict[str, int]]:
+        """
+        Archivos y bytes organizados por categoría en los últimos `dias` días.
         
-        self.guardar_estadisticas()
+        Returns:
+            {categoría: {'archivos': n, 'bytes': n}} (vacío sin historial)
+        """
+        if self.serie is None:
+            return {}
+        totales = self.serie.totales_ultimos_dias(dias)
+        return {categoria: {'archivos': archivos, 'bytes': tamaño}
+                for categoria, (archivos, tamaño) in totales.items()}
+    
+    def serie_actividad(self, desde: datetime, hasta: Optional[datetime] = None,
+                        categoria: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Actividad en el rango dado, con la resolución que permita el historial
+        (minutos para las últimas horas, días o meses para rangos largos).
+        
+        Returns:
+            Lista de {'inicio': datetime, 'archivos', 'bytes'}
+        """
+        if self.serie is None:
+            return []
+        puntos = self.serie.serie(desde.timestamp(), hasta.timestamp() if hasta else None,
+                                  categoria=categoria)
+        for punto in puntos:
+            punto['inicio'] = datetime.fromtimestamp(punto['inicio'])
+        return puntos
     
     def generar_reporte_completo(self) -> str:
         """Genera un reporte completo de estadísticas."""
+        # Los contadores pueden cambiar desde el hilo que organiza
+        with self._lock:
+            return self._generar_reporte()
+    
+    def _generar_reporte(self) -> str:
         reporte = []
         reporte.append("=" * 60)
         reporte.append("   REPORTE DE ESTADÍSTICAS - DESCARGASORDENADAS")
@@ -151,6 +384,24 @@ class EstadisticasOrganizador:
                 reporte.append(f"   📂 {categoria:<20} {cantidad:>6,} archivos ({porcentaje:.1f}%)")
             reporte.append("")
         
+        # Extensiones más frecuentes
+        if self.stats['archivos_por_extension']:
+            reporte.append("📎 EXTENSIONES MÁS FRECUENTES:")
+            extensiones_ordenadas = sorted(self.stats['archivos_por_extension'].items(),
+                                           key=lambda x: x[1], reverse=True)
+            for extension, cantidad in extensiones_ordenadas[:10]:
+                reporte.append(f"   📄 {extension:<20} {cantidad:>6,} archivos")
+            reporte.append("")
+        
+        # Últimos 30 días (historial de actividad)
+        recientes = self.actividad_por_categoria(30)
+        if recientes:
+            reporte.append("📈 ÚLTIMOS 30 DÍAS:")
+            for categoria, datos in sorted(recientes.items(), key=lambda x: x[1]['bytes'], reverse=True)[:10]:
+                reporte.append(f"   📂 {categoria:<20} {datos['archivos']:>6,} archivos  "
+                               f"{self._formatear_bytes(datos['bytes'])}")
+            reporte.append("")
+        
         # Actividad por mes
         if self.stats['archivos_por_mes']:
             reporte.append("📅 ACTIVIDAD POR MES (últimos 6 meses):")
@@ -222,6 +473,10 @@ class EstadisticasOrganizador:
     
     def obtener_resumen_rapido(self) -> Dict[str, Any]:
         """Obtiene un resumen rápido para mostrar en la GUI."""
+        with self._lock:
+            return self._resumen_rapido()
+    
+    def _resumen_rapido(self) -> Dict[str, Any]:
         return {
             'total_archivos': self.stats['total_archivos_organizados'],
             'espacio_total': self._formatear_bytes(self.stats['espacio_total_organizado']),
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Serie temporal de la actividad del organizador (SQLite) con agregados por
+minuto, hora, día y mes
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+    logger.warning("⚠️ sqlite3 no disponible - sin historial de actividad")
+
+# Resoluciones de menor a mayor y segundos que se conservan de cada una
+# (None = sin límite; los meses ocupan una fila por categoría y mes)
+NIVELES = ('minuto', 'hora', 'dia', 'mes')
+RETENCION = {
+    'minuto': 2 * 86400,
+    'hora': 90 * 86400,
+    'dia': 5 * 366 * 86400,
+    'mes': None
+}
+DURACION_APROXIMADA = {
+    'minuto': 60,
+    'hora': 3600,
+    'dia': 86400,
+    'mes': 31 * 86400
+}
+
+TotalesCategoria = Dict[str, Tuple[int, int]]
+
+
+def inicio_bucket(momento: float, nivel: str) -> int:
+    """
+    Inicio (timestamp) del bucket de `nivel` que contiene `momento`.
+
+    Días y meses empiezan a medianoche en hora local, como los informes.
+    """
+    if nivel == 'minuto':
+        return int(momento // 60 * 60)
+    if nivel == 'hora':
+        fecha = datetime.fromtimestamp(momento).replace(minute=0, second=0, microsecond=0)
+    elif nivel == 'dia':
+        fecha = datetime.fromtimestamp(momento).replace(hour=0, minute=0, second=0, microsecond=0)
+    elif nivel == 'mes':
+        fecha = datetime.fromtimestamp(momento).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError(f"Nivel desconocido: {nivel}")
+    return int(fecha.timestamp())
+
+
+class SerieTemporalEstadisticas:
+    """
+    Guarda archivos y bytes organizados por categoría en buckets de tiempo.
+
+    Cada movimiento incrementa a la vez su bucket de minuto, hora, día y mes,
+    así que cada nivel está completo por sí mismo y una consulta lee solo el
+    nivel más grueso que le sirve: "bytes por categoría en los últimos 90
+    días" suma como mucho ~90 filas por categoría usando el índice primario.
+    Los niveles finos se podan según RETENCION; el tamaño de la base queda
+    acotado aunque se use durante años.
+
+    Los incrementos se acumulan en memoria y se escriben en una sola
+    transacción con volcar() (el dueño lo llama al cerrar sesión o cuando
+    pasan INTERVALO_VOLCADO segundos). La tabla meta guarda el número del
+    último evento escrito para que el registro de eventos de
+    EstadisticasOrganizador pueda reponer lo que no llegó a volcarse.
+    """
+
+    INTERVALO_VOLCADO = 5.0
+    # Segundos entre podas de buckets caducados
+    INTERVALO_PODA = 3600.0
+
+    def __init__(self, carpeta_stats: Path):
+        self.archivo_db = Path(carpeta_stats) / "actividad.sqlite3"
+        self._lock = threading.Lock()
+        # (nivel, inicio, categoría) → [archivos, bytes] pendientes de escribir
+        self._pendientes: Dict[Tuple[str, int, str], List[int]] = {}
+        self._ultimo_volcado = time.monotonic()
+        self._ultima_poda = 0.0
+        self._conexion = sqlite3.connect(str(self.archivo_db), check_same_thread=False)
+        self._crear_esquema()
+        self.ultimo_evento = self._leer_meta('ultimo_evento')
+        self._ultimo_pendiente = self.ultimo_evento
+
+    def _crear_esquema(self):
+        with self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " nivel TEXT NOT NULL,"
+                " inicio INTEGER NOT NULL,"
+                " categoria TEXT NOT NULL,"
+                " archivos INTEGER NOT NULL DEFAULT 0,"
+                " bytes INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (nivel, inicio, categoria)"
+                ") WITHOUT ROWID"
+            )
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL)"
+            )
+
+    def _leer_meta(self, clave: str) -> int:
+        fila = self._conexion.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else 0
+
+    def registrar(self, categoria: str, tamaño: int, momento: float, evento: int = 0):
+        """
+        Suma un movimiento a sus cuatro buckets (en memoria hasta volcar()).
+
+        Args:
+            categoria: Categoría destino
+            tamaño: Tamaño en bytes
+            momento: Timestamp del movimiento
+            evento: Número del evento en el registro de estadísticas
+        """
+        with self._lock:
+            for nivel in NIVELES:
+                acumulado = self._pendientes.setdefault((nivel, inicio_bucket(momento, nivel), categoria), [0, 0])
+                acumulado[0] += 1
+                acumulado[1] += tamaño
+            self._ultimo_pendiente = max(self._ultimo_pendiente, evento)
+        if time.monotonic() - self._ultimo_volcado >= self.INTERVALO_VOLCADO:
+            self.volcar()
+
+    def volcar(self):
+        """Escribe los incrementos pendientes en una transacción y poda si toca."""
+        with self._lock:
+            self._ultimo_volcado = time.monotonic()
+            if self._pendientes:
+                filas = [(nivel, inicio, categoria, archivos, tamaño)
+                         for (nivel, inicio, categoria), (archivos, tamaño) in self._pendientes.items()]
+                try:
+                    with self._conexion:
+                        self._conexion.executemany(
+                            "INSERT INTO buckets (nivel, inicio, categoria, archivos, bytes) VALUES (?, ?, ?, ?, ?) "
+                            "ON CONFLICT (nivel, inicio, categoria) DO UPDATE SET "
+                            "archivos = archivos + excluded.archivos, bytes = bytes + excluded.bytes",
+                            filas
+                        )
+                        self._conexion.execute(
+                            "INSERT OR REPLACE INTO meta (clave, valor) VALUES ('ultimo_evento', ?)",
+                            (self._ultimo_pendiente,)
+                        )
+                except sqlite3.Error as e:
+                    # Los pendientes se conservan para el siguiente intento
+                    logger.error(f"Error guardando historial de actividad: {e}")
+                    return
+                self._pendientes.clear()
+                self.ultimo_evento = self._ultimo_pendiente
+
+            if self._ultimo_volcado - self._ultima_poda >= self.INTERVALO_PODA:
+                self._podar()
+                self._ultima_poda = self._ultimo_volcado
+
+    def _podar(self):
+        # Llamar con el lock adquirido
+        ahora = time.time()
+        try:
+            with self._conexion:
+                for nivel, segundos in RETENCION.items():
+                    if segundos is not None:
+                        self._conexion.execute("DELETE FROM buckets WHERE nivel = ? AND inicio < ?",
+                                               (nivel, int(ahora - segundos)))
+        except sqlite3.Error as e:
+            logger.error(f"Error podando historial de actividad: {e}")
+
+    def elegir_nivel(self, desde: float, hasta: float, puntos_maximos: int = 400) -> str:
+        """
+        Nivel más fino que cubre `desde` (según la retención) sin pasar de
+        `puntos_maximos` buckets en el rango.
+        """
+        antiguedad = time.time() - desde
+        for nivel in NIVELES:
+            retencion = RETENCION[nivel]
+            if retencion is not None and antiguedad > retencion:
+                continue
+            if (hasta - desde) / DURACION_APROXIMADA[nivel] <= puntos_maximos:
+                return nivel
+        return 'mes'
+
+    def serie(self, desde: float, hasta: Optional[float] = None, nivel: Optional[str] = None,
+              categoria: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Buckets del rango [desde, hasta), sumando categorías salvo que se
+        filtre por una.
+
+        Los extremos se redondean al inicio del bucket del nivel usado.
+
+        Returns:
+            Lista de {'inicio', 'archivos', 'bytes'} ordenada por tiempo
+        """
+        hasta = hasta if hasta is not None else time.time()
+        nivel = nivel or self.elegir_nivel(desde, hasta)
+        consulta = ("SELECT inicio, SUM(archivos), SUM(bytes) FROM buckets "
+                    "WHERE nivel = ? AND inicio >= ? AND inicio < ?")
+        parametros: list = [nivel, inicio_bucket(desde, nivel), hasta]
+        if categoria is not None:
+            consulta += " AND categoria = ?"
+            parametros.append(categoria)
+        consulta += " GROUP BY inicio ORDER BY inicio"
+
+        self.volcar()
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        return [{'inicio': inicio, 'archivos': archivos, 'bytes': tamaño} for inicio, archivos, tamaño in filas]
+
+    def totales_por_categoria(self, desde: float, hasta: Optional[float] = None) -> TotalesCategoria:
+        """
+        Archivos y bytes por categoría en [desde, hasta).
+
+        Returns:
+            {categoría: (archivos, bytes)}
+        """
+        hasta = hasta if hasta is not None else time.time()
+        nivel = self.elegir_nivel(desde, hasta)
+        self.volcar()
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT categoria, SUM(archivos), SUM(bytes) FROM buckets "
+                "WHERE nivel = ? AND inicio >= ? AND inicio < ? GROUP BY categoria",
+                (nivel, inicio_bucket(desde, nivel), hasta)
+            ).fetchall()
+        return {categoria: (archivos, tamaño) for categoria, archivos, tamaño in filas}
+
+    def totales_ultimos_dias(self, dias: int) -> TotalesCategoria:
+        """Atajo: totales por categoría de los últimos `dias` días."""
+        return self.totales_por_categoria((datetime.now() - timedelta(days=dias)).timestamp())
+
+    def cerrar(self):
+        """Vuelca lo pendiente y cierra la base de datos."""
+        self.volcar()
+        with self._lock:
+            try:
+                self._conexion.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error cerrando historial de actividad: {e}")
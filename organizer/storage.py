@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Almacén común de .config: una sola base SQLite con un espacio por
+subsistema (huella, reglas, modelo de IA, fechas, duplicados, estadísticas)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+    logger.warning("⚠️ sqlite3 no disponible - la configuración se guardará en archivos JSON")
+
+NOMBRE_BASE = "organizador.sqlite3"
+
+# Cada posición lleva el esquema de la versión N a la N+1; la versión actual
+# se guarda en PRAGMA user_version
+MIGRACIONES: List[List[str]] = [
+    [
+        "CREATE TABLE espacios ("
+        " espacio TEXT PRIMARY KEY,"
+        " actualizado REAL NOT NULL"
+        ")",
+        "CREATE TABLE documentos ("
+        " espacio TEXT NOT NULL,"
+        " clave TEXT NOT NULL,"
+        " valor TEXT NOT NULL,"
+        " PRIMARY KEY (espacio, clave)"
+        ") WITHOUT ROWID",
+    ],
+]
+VERSION_ESQUEMA = len(MIGRACIONES)
+
+# Marca de espacio borrado en lo escrito por una transacción
+_BORRADO = object()
+
+
+class AlmacenConfig:
+    """
+    Documentos JSON de los subsistemas guardados en una base SQLite.
+
+    Cada subsistema ocupa un espacio; su documento (un dict) se guarda con
+    una fila por clave de primer nivel, y guardar() solo escribe las filas
+    cuyo valor cambió desde la última escritura (la huella, con una clave
+    por archivo, pasa de reescribirse entera a tocar solo lo nuevo).
+
+    Conexiones: un pool de como mucho MAX_CONEXIONES, creadas bajo demanda.
+    Un hilo toma una para cada operación o para toda su transacción y la
+    devuelve al terminar, así que los hilos de vida corta (cada tarea de la
+    GUI) no dejan conexiones abiertas. Todas las escrituras van en una
+    transacción; transaccion()
+    permite agrupar las de varios subsistemas para que una caída no deje,
+    p. ej., la huella guardada y las estadísticas no. Lo que deba hacerse
+    solo si la transacción se confirma (vaciar un registro de eventos) se
+    encola con al_confirmar().
+    """
+
+    MAX_CONEXIONES = 4
+
+    def __init__(self, carpeta_config: Path):
+        self.carpeta_config = Path(carpeta_config)
+        self.carpeta_config.mkdir(parents=True, exist_ok=True)
+        self.archivo_db = self.carpeta_config / NOMBRE_BASE
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Pool: conexiones libres y total creadas (libres + prestadas)
+        self._disponible = threading.Condition(threading.Lock())
+        self._libres: List[sqlite3.Connection] = []
+        self._creadas = 0
+        # espacio → {clave: JSON escrito}; para escribir solo lo que cambia
+        self._escrito: Dict[str, Dict[str, str]] = {}
+        self._migrar_esquema()
+
+    def _tomar(self) -> "sqlite3.Connection":
+        with self._disponible:
+            while not self._libres and self._creadas >= self.MAX_CONEXIONES:
+                self._disponible.wait()
+            if self._libres:
+                return self._libres.pop()
+            self._creadas += 1
+        try:
+            conexion = sqlite3.connect(str(self.archivo_db), timeout=10.0, isolation_level=None,
+                                       check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+        except BaseException:
+            with self._disponible:
+                self._creadas -= 1
+                self._disponible.notify()
+            raise
+        return conexion
+
+    def _devolver(self, conexion: "sqlite3.Connection"):
+        with self._disponible:
+            self._libres.append(conexion)
+            self._disponible.notify()
+
+    @contextmanager
+    def _usar_conexion(self) -> Iterator["sqlite3.Connection"]:
+        """La conexión de la transacción en curso de este hilo o una prestada del pool."""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is not None:
+            yield conexion
+            return
+        conexion = self._tomar()
+        try:
+            yield conexion
+        finally:
+            self._devolver(conexion)
+
+    def _migrar_esquema(self):
+        with self._usar_conexion() as conexion:
+            version = conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version > VERSION_ESQUEMA:
+            logger.warning(f"⚠️ {NOMBRE_BASE} tiene el esquema v{version}, más nuevo que este programa (v{VERSION_ESQUEMA})")
+            return
+        if version == VERSION_ESQUEMA:
+            return
+        with self.transaccion() as conexion:
+            for paso in range(version, VERSION_ESQUEMA):
+                for sentencia in MIGRACIONES[paso]:
+                    conexion.execute(sentencia)
+            # PRAGMA no admite parámetros
+            conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+        logger.info(f"🗄️ Almacén de configuración en esquema v{VERSION_ESQUEMA}")
+
+    def en_transaccion(self) -> bool:
+        """True si este hilo está dentro de transaccion()."""
+        return getattr(self._local, 'conexion', None) is not None
+
+    @contextmanager
+    def transaccion(self) -> Iterator["sqlite3.Connection"]:
+        """
+        Agrupa escrituras en una transacción. Anidable: solo la más externa
+        confirma o deshace. La conexión queda reservada para este hilo hasta
+        que termina.
+        """
+        local = self._local
+        conexion = getattr(local, 'conexion', None)
+        if conexion is not None:
+            yield conexion
+            return
+
+        conexion = self._tomar()
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._devolver(conexion)
+            raise
+        local.conexion = conexion
+        # Lo escrito en esta transacción (espacio → filas, o _BORRADO); pasa
+        # a _escrito solo al confirmar y se descarta si se deshace
+        local.escrito = {}
+        local.al_confirmar = []
+        try:
+            yield conexion
+            # Bajo _lock: otro hilo no puede comparar contra _escrito entre
+            # el COMMIT y la actualización de la caché
+            with self._lock:
+                conexion.execute("COMMIT")
+                for espacio, filas in local.escrito.items():
+                    if filas is _BORRADO:
+                        self._escrito.pop(espacio, None)
+                    else:
+                        self._escrito[espacio] = filas
+        except BaseException:
+            try:
+                conexion.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            local.conexion = None
+            local.escrito = {}
+            self._devolver(conexion)
+
+        for funcion in local.al_confirmar:
+            try:
+                funcion()
+            except Exception as e:
+                logger.error(f"Error tras confirmar cambios de configuración: {e}")
+
+    def _filas_escritas(self, espacio: str) -> Optional[Dict[str, str]]:
+        """
+        Filas que tiene en la base el espacio según lo escrito por este hilo
+        en la transacción en curso y, si no, lo último confirmado. None si
+        no se conocen.
+        """
+        pendientes = getattr(self._local, 'escrito', None) or {}
+        if espacio in pendientes:
+            filas = pendientes[espacio]
+            return {} if filas is _BORRADO else filas
+        with self._lock:
+            return self._escrito.get(espacio)
+
+    def al_confirmar(self, funcion: Callable[[], None]):
+        """Ejecuta `funcion` cuando se confirme la transacción en curso (o ya, si no hay)."""
+        if self.en_transaccion():
+            self._local.al_confirmar.append(funcion)
+        else:
+            funcion()
+
+    def cargar(self, espacio: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            El documento del espacio o None si nunca se guardó
+        """
+        if self.en_transaccion():
+            # Puede leer filas aún sin confirmar: solo valen para esta transacción
+            filas = self._leer_filas(self._local.conexion, espacio)
+            if filas is not None:
+                self._local.escrito[espacio] = filas
+        else:
+            # Bajo _lock para que una confirmación de otro hilo no quede
+            # tapada por esta lectura en la caché
+            with self._usar_conexion() as conexion, self._lock:
+                filas = self._leer_filas(conexion, espacio)
+                if filas is not None:
+                    self._escrito[espacio] = filas
+        if filas is None:
+            return None
+        return {clave: json.loads(valor) for clave, valor in filas.items()}
+
+    @staticmethod
+    def _leer_filas(conexion: "sqlite3.Connection", espacio: str) -> Optional[Dict[str, str]]:
+        if conexion.execute("SELECT 1 FROM espacios WHERE espacio = ?", (espacio,)).fetchone() is None:
+            return None
+        return dict(conexion.execute("SELECT clave, valor FROM documentos WHERE espacio = ?",
+                                     (espacio,)).fetchall())
+
+    def guardar(self, espacio: str, documento: Dict[str, Any]):
+        """Guarda el documento del espacio escribiendo solo las claves que cambiaron."""
+        nuevas = {clave: json.dumps(valor, ensure_ascii=False) for clave, valor in documento.items()}
+        with self.transaccion() as conexion:
+            anteriores = self._filas_escritas(espacio)
+            if anteriores is None:
+                conexion.execute("DELETE FROM documentos WHERE espacio = ?", (espacio,))
+                anteriores = {}
+            cambiadas = [(espacio, clave, valor) for clave, valor in nuevas.items()
+                         if anteriores.get(clave) != valor]
+            borradas = [(espacio, clave) for clave in anteriores if clave not in nuevas]
+            if cambiadas:
+                conexion.executemany(
+                    "INSERT OR REPLACE INTO documentos (espacio, clave, valor) VALUES (?, ?, ?)", cambiadas)
+            if borradas:
+                conexion.executemany("DELETE FROM documentos WHERE espacio = ? AND clave = ?", borradas)
+            conexion.execute("INSERT OR REPLACE INTO espacios (espacio, actualizado) VALUES (?, ?)",
+                             (espacio, time.time()))
+            self._local.escrito[espacio] = nuevas
+
+    def borrar(self, espacio: str):
+        """Elimina el documento del espacio."""
+        with self.transaccion() as conexion:
+            conexion.execute("DELETE FROM documentos WHERE espacio = ?", (espacio,))
+            conexion.execute("DELETE FROM espacios WHERE espacio = ?", (espacio,))
+            self._local.escrito[espacio] = _BORRADO
+
+    def importar_json(self, espacio: str, archivo: Path) -> Optional[Dict[str, Any]]:
+        """
+        Pasa al almacén el archivo JSON de una versión anterior y lo renombra
+        a <archivo>.migrado (queda como copia de seguridad).
+
+        Returns:
+            El documento importado o None si el archivo no existe
+        """
+        archivo = Path(archivo)
+        if not archivo.exists():
+            return None
+        with open(archivo, 'r', encoding='utf-8') as f:
+            documento = json.load(f)
+        def renombrar():
+            try:
+                os.replace(archivo, archivo.with_name(archivo.name + '.migrado'))
+            except OSError as e:
+                logger.warning(f"No se pudo renombrar {archivo.name} tras migrarlo: {e}")
+
+        self.guardar(espacio, documento)
+        self.al_confirmar(renombrar)
+        logger.info(f"🗄️ {archivo.name} migrado al almacén de configuración")
+        return documento
+
+    def cerrar(self):
+        """Cierra las conexiones libres del pool."""
+        with self._disponible:
+            conexiones, self._libres = self._libres, []
+            self._creadas -= len(conexiones)
+        for conexion in conexiones:
+            try:
+                conexion.close()
+            except sqlite3.Error as e:
+                logger.debug(f"Error cerrando conexión de configuración: {e}")
+        self._local = threading.local()
+
+
+# Un almacén por carpeta .config, compartido por todos los subsistemas
+_almacenes: Dict[Path, Optional[AlmacenConfig]] = {}
+_lock_almacenes = threading.Lock()
+
+
+def obtener_almacen(carpeta_config: Path) -> Optional[AlmacenConfig]:
+    """
+    Almacén compartido de `carpeta_config`, o None si no hay SQLite o no se
+    pudo abrir la base (los subsistemas vuelven entonces a sus archivos JSON).
+    """
+    if not SQLITE_AVAILABLE:
+        return None
+    clave = Path(carpeta_config).resolve()
+    with _lock_almacenes:
+        if clave not in _almacenes:
+            try:
+                _almacenes[clave] = AlmacenConfig(clave)
+            except Exception as e:
+                logger.error(f"❌ No se pudo abrir el almacén de configuración: {e}")
+                _almacenes[clave] = None
+        return _almacenes[clave]
+
+
+@contextmanager
+def transaccion_config(carpeta_config: Path) -> Iterator[None]:
+    """Agrupa en una transacción lo que guarden los subsistemas de `carpeta_config`."""
+    almacen = obtener_almacen(carpeta_config)
+    if almacen is None:
+        yield
+        return
+    with almacen.transaccion():
+        yield
+
+
+class DocumentoConfig:
+    """
+    Documento de un subsistema: se guarda en el almacén común y, si no hay
+    SQLite, en su archivo JSON de siempre. La primera carga importa el JSON
+    que hubiera de versiones anteriores.
+    """
+
+    def __init__(self, carpeta_config: Path, espacio: str, nombre_json: str):
+        self.espacio = espacio
+        self.archivo_json = Path(carpeta_config) / nombre_json
+        self.almacen = obtener_almacen(carpeta_config)
+
+    def cargar(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            El documento guardado o None si no existe
+        """
+        if self.almacen is None:
+            if not self.archivo_json.exists():
+                return None
+            with open(self.archivo_json, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        documento = self.almacen.cargar(self.espacio)
+        if documento is None:
+            documento = self.almacen.importar_json(self.espacio, self.archivo_json)
+        return documento
+
+    def guardar(self, documento: Dict[str, Any]):
+        """Guarda el documento (lanza la excepción si falla)."""
+        if self.almacen is not None:
+            self.almacen.guardar(self.espacio, documento)
+            return
+        temporal = self.archivo_json.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.archivo_json)
+
+    def borrar(self):
+        """Elimina el documento."""
+        if self.almacen is not None:
+            self.almacen.borrar(self.espacio)
+        elif self.archivo_json.exists():
+            self.archivo_json.unlink()
+
+    def en_transaccion(self) -> bool:
+        """
+        True si el guardado forma parte de una transacción abierta: quien
+        guarda debe dejar pasar el error para que se deshaga completa.
+        """
+        return self.almacen is not None and self.almacen.en_transaccion()
+
+    def al_confirmar(self, funcion: Callable[[], None]):
+        """Ejecuta `funcion` cuando lo guardado quede confirmado en disco."""
+        if self.almacen is not None:
+            self.almacen.al_confirmar(funcion)
+        else:
+            funcion()
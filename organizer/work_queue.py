@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cola persistente de archivos pendientes del monitor en tiempo real
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Estados de una entrada de la cola
+PENDIENTE = 'pendiente'
+HECHO = 'hecho'
+FALLIDO = 'fallido'
+DESCARTADO = 'descartado'
+ESTADOS_FINALES = (HECHO, FALLIDO, DESCARTADO)
+
+
+class ColaPersistente:
+    """
+    Registro append-only (JSON Lines) de los archivos que el monitor tiene
+    pendientes, con su estado y número de intentos.
+
+    Cada cambio de estado añade una línea; al cargar, la última línea de cada
+    ruta manda. Si la app se cierra o se cae, las rutas que seguían pendientes
+    se recuperan en el siguiente arranque. El archivo se compacta (solo
+    entradas pendientes) cuando las líneas obsoletas dominan.
+    """
+
+    def __init__(self, carpeta_descargas: Path, intervalo_fsync: float = 1.0):
+        self.carpeta_config = carpeta_descargas / ".config"
+        self.carpeta_config.mkdir(exist_ok=True)
+        self.archivo_cola = self.carpeta_config / "cola_monitor.jsonl"
+        self.intervalo_fsync = intervalo_fsync
+        # ruta → (estado, intentos)
+        self._entradas: Dict[str, Tuple[str, int]] = {}
+        # Instante (ns) hasta el que el monitor vio todos los cambios
+        self.marca: Optional[int] = None
+        self._lineas = 0
+        self._lock = threading.Lock()
+        self._archivo = None
+        self._ultimo_fsync = 0.0
+        self._cargar()
+
+    def _cargar(self):
+        """Reproduce el registro para reconstruir el estado."""
+        if not self.archivo_cola.exists():
+            return
+
+        try:
+            with open(self.archivo_cola, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    self._lineas += 1
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea a medio escribir tras una caída
+                        continue
+                    if 'marca' in registro:
+                        self.marca = registro['marca']
+                        continue
+                    ruta = registro.get('ruta')
+                    if not ruta:
+                        continue
+                    if registro.get('estado') in ESTADOS_FINALES:
+                        self._entradas.pop(ruta, None)
+                    else:
+                        self._entradas[ruta] = (PENDIENTE, registro.get('intentos', 0))
+
+            if self._entradas:
+                logger.info(f"📋 Cola del monitor: {len(self._entradas)} archivo(s) pendientes de la sesión anterior")
+
+        except Exception as e:
+            logger.error(f"Error cargando cola del monitor: {e}")
+
+    def _escribir(self, registro: Dict[str, Any]):
+        # Llamar con el lock adquirido
+        if self._archivo is None:
+            self._archivo = open(self.archivo_cola, 'a', encoding='utf-8')
+        self._archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        # flush basta para sobrevivir a que maten la app; fsync (caída del
+        # sistema) se agrupa para no pagarlo en cada evento
+        self._archivo.flush()
+        ahora = time.monotonic()
+        if ahora - self._ultimo_fsync >= self.intervalo_fsync:
+            os.fsync(self._archivo.fileno())
+            self._ultimo_fsync = ahora
+        self._lineas += 1
+
+    def registrar(self, archivo: Path, estado: str = PENDIENTE, intentos: Optional[int] = None):
+        """
+        Anota el estado de un archivo.
+
+        Args:
+            archivo: Archivo afectado
+            estado: PENDIENTE, HECHO, FALLIDO o DESCARTADO
+            intentos: Intentos fallidos hasta ahora (por defecto se conservan)
+        """
+        ruta = str(archivo)
+        with self._lock:
+            actual = self._entradas.get(ruta)
+            if estado in ESTADOS_FINALES:
+                if actual is None:
+                    return  # Nunca estuvo en la cola
+                del self._entradas[ruta]
+                intentos = actual[1] if intentos is None else intentos
+            else:
+                intentos = (actual[1] if actual else 0) if intentos is None else intentos
+                if actual == (estado, intentos):
+                    return  # Sin cambios: no crecer el registro con eventos repetidos
+                self._entradas[ruta] = (estado, intentos)
+            try:
+                self._escribir({'ruta': ruta, 'estado': estado, 'intentos': intentos, 't': time.time()})
+                self._compactar_si_necesario()
+            except Exception as e:
+                logger.error(f"Error escribiendo cola del monitor: {e}")
+
+    def pendientes(self) -> List[Tuple[Path, int]]:
+        """Retorna los archivos pendientes con sus intentos."""
+        with self._lock:
+            return [(Path(ruta), intentos) for ruta, (_, intentos) in self._entradas.items()]
+
+    def guardar_marca(self, marca_ns: Optional[int] = None):
+        """Registra hasta qué instante el monitor ha visto todos los cambios."""
+        with self._lock:
+            self.marca = marca_ns if marca_ns is not None else time.time_ns()
+            try:
+                self._escribir({'marca': self.marca})
+            except Exception as e:
+                logger.error(f"Error escribiendo cola del monitor: {e}")
+
+    def _compactar_si_necesario(self):
+        # Llamar con el lock adquirido
+        if self._lineas > 1000 and self._lineas > 4 * (len(self._entradas) + 1):
+            self._compactar()
+
+    def _compactar(self):
+        """Reescribe el registro solo con lo vigente (escritura atómica)."""
+        temporal = self.archivo_cola.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            if self.marca is not None:
+                f.write(json.dumps({'marca': self.marca}) + '\n')
+            for ruta, (estado, intentos) in self._entradas.items():
+                f.write(json.dumps({'ruta': ruta, 'estado': estado, 'intentos': intentos},
+                                   ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        os.replace(temporal, self.archivo_cola)
+        self._lineas = len(self._entradas) + (1 if self.marca is not None else 0)
+        logger.debug(f"Cola del monitor compactada: {self._lineas} líneas")
+
+    def cerrar(self):
+        """Compacta y cierra el registro."""
+        with self._lock:
+            try:
+                self._compactar()
+            except Exception as e:
+                logger.error(f"Error compactando cola del monitor: {e}")
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
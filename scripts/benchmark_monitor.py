@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de carga del planificador del monitor en tiempo real.
+
+Simula una ráfaga de eventos (como descomprimir un archivo grande en Descargas
+o sincronizar miles de archivos) y comprueba que el número de hilos no crece
+con el ritmo de eventos y que los eventos repetidos de una misma ruta se
+agrupan en una sola organización.
+
+Uso:
+    python scripts/benchmark_monitor.py --archivos 10000 --eventos-por-archivo 3
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from organizer.real_time_monitor import PlanificadorOrganizacion
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga del planificador del monitor")
+    parser.add_argument('--archivos', type=int, default=10000, help="Rutas distintas en la ráfaga")
+    parser.add_argument('--eventos-por-archivo', type=int, default=3,
+                        help="Eventos por ruta (created/modified/moved)")
+    parser.add_argument('--retraso', type=float, default=0.5, help="Retraso de organización en segundos")
+    parser.add_argument('--trabajo-ms', type=float, default=1.0, help="Coste simulado de organizar un archivo")
+    parser.add_argument('--workers', type=int, default=4, help="Tamaño del pool de workers")
+    args = parser.parse_args()
+
+    procesados = []
+    lock = threading.Lock()
+
+    def organizar(archivo: Path):
+        time.sleep(args.trabajo_ms / 1000.0)
+        with lock:
+            procesados.append(archivo)
+
+    hilos_inicio = threading.active_count()
+    planificador = PlanificadorOrganizacion(organizar, args.workers)
+    rutas = [Path(f"/descargas/archivo_{i}.bin") for i in range(args.archivos)]
+    total_eventos = args.archivos * args.eventos_por_archivo
+
+    pico_hilos = threading.active_count()
+    inicio = time.perf_counter()
+    for _ in range(args.eventos_por_archivo):
+        for ruta in rutas:
+            planificador.programar(ruta, args.retraso)
+        pico_hilos = max(pico_hilos, threading.active_count())
+    duracion_eventos = time.perf_counter() - inicio
+
+    while True:
+        with lock:
+            terminados = len(procesados)
+        pico_hilos = max(pico_hilos, threading.active_count())
+        if terminados >= args.archivos and planificador.pendientes() == 0:
+            break
+        if time.perf_counter() - inicio > args.retraso + 60:
+            print("❌ Tiempo de espera agotado")
+            break
+        time.sleep(0.01)
+    duracion_total = time.perf_counter() - inicio
+
+    planificador.detener()
+
+    print("=" * 60)
+    print("PRUEBA DE CARGA DEL PLANIFICADOR")
+    print("=" * 60)
+    print(f"Eventos generados:    {total_eventos} ({total_eventos / duracion_eventos:,.0f} eventos/s)")
+    print(f"Archivos organizados: {len(procesados)} de {args.archivos} rutas")
+    print(f"Duplicados:           {len(procesados) - len(set(procesados))}")
+    print(f"Hilos al inicio:      {hilos_inicio}")
+    print(f"Pico de hilos:        {pico_hilos} (límite {hilos_inicio + 1 + args.workers})")
+    print(f"Tiempo total:         {duracion_total:.2f}s")
+
+    correcto = (len(procesados) == args.archivos and
+                len(set(procesados)) == args.archivos and
+                pico_hilos <= hilos_inicio + 1 + args.workers)
+    print("✅ Correcto" if correcto else "❌ Fallo")
+    return 0 if correcto else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())